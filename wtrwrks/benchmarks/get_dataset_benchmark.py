@@ -0,0 +1,85 @@
+"""Benchmark of the examples/sec read through Transform._get_dataset with and without the high throughput mode.
+
+Run with:
+  python -m wtrwrks.benchmarks.get_dataset_benchmark --num_examples 100000
+"""
+from __future__ import print_function
+import wtrwrks.transforms.cat_transform as ct
+import argparse
+import numpy as np
+import tensorflow as tf
+import tempfile
+import shutil
+import time
+import os
+
+
+def make_transform(num_examples, num_cols, num_cats, random_seed=0):
+  """Create a cat transform and a random array of categories to write, with some categories missing from the transform's vocabulary."""
+  random_state = np.random.RandomState(random_seed)
+  cats = np.array(['cat_' + str(i) for i in xrange(num_cats)])
+  array = cats[random_state.randint(num_cats, size=(num_examples, num_cols))]
+
+  trans = ct.CatTransform(
+    name='cat',
+    index_to_cat_val=list(cats[:-1]),
+  )
+  trans.calc_global_values(array)
+  return trans, array
+
+
+def time_dataset(trans, file_name_pattern, batch_size, num_batches, high_throughput, num_threads):
+  """Time how long it takes to pull num_batches batches out of the dataset."""
+  graph = tf.Graph()
+  with graph.as_default():
+    dataset = trans._get_dataset(
+      file_name_pattern,
+      batch_size,
+      num_epochs=None,
+      num_threads=num_threads,
+      high_throughput=high_throughput
+    )
+    features = tf.compat.v1.data.make_one_shot_iterator(dataset).get_next()
+
+    with tf.compat.v1.Session(graph=graph) as sess:
+      # Warm up the pipeline before starting the clock
+      sess.run(features)
+
+      start = time.time()
+      for _ in xrange(num_batches):
+        sess.run(features)
+      total = time.time() - start
+
+  return (num_batches * batch_size) / total
+
+
+def main(num_examples, num_files, num_cols, num_cats, batch_size, num_batches, num_threads):
+  temp_dir = tempfile.mkdtemp()
+  try:
+    trans, array = make_transform(num_examples, num_cols, num_cats)
+    trans.write_examples(
+      data_iter=np.array_split(array, num_files),
+      file_name=os.path.join(temp_dir, 'bench.tfrecord'),
+      num_threads=num_threads
+    )
+    file_name_pattern = os.path.join(temp_dir, 'bench_*.tfrecord')
+
+    for high_throughput in (False, True):
+      rate = time_dataset(trans, file_name_pattern, batch_size, num_batches, high_throughput, num_threads)
+      print('high_throughput={}: {:.1f} examples/sec'.format(high_throughput, rate))
+  finally:
+    shutil.rmtree(temp_dir)
+
+
+if __name__ == '__main__':
+  parser = argparse.ArgumentParser(description=__doc__)
+  parser.add_argument('--num_examples', type=int, default=20000)
+  parser.add_argument('--num_files', type=int, default=4)
+  parser.add_argument('--num_cols', type=int, default=10)
+  parser.add_argument('--num_cats', type=int, default=100)
+  parser.add_argument('--batch_size', type=int, default=256)
+  parser.add_argument('--num_batches', type=int, default=200)
+  parser.add_argument('--num_threads', type=int, default=2)
+  args = parser.parse_args()
+
+  main(**vars(args))
@@ -0,0 +1,133 @@
+"""Functions for writing and reading the sidecar offset indices of tfrecord files, which allow individual examples to be read without going through the entire file."""
+import wtrwrks.utils.dir_functions as d
+import numpy as np
+import tensorflow as tf
+import struct
+import re
+
+# Every tfrecord is a uint64 length followed by a uint32 crc of the length,
+# the data and a uint32 crc of the data.
+HEADER_SIZE = 12
+FOOTER_SIZE = 4
+
+
+def index_file_name(file_name):
+  """Get the file name of the offset index that goes along with a tfrecord file."""
+  if not file_name.endswith('.tfrecord'):
+    raise ValueError("file_name must end in '.tfrecord'. Got: ", file_name)
+  return re.sub(r'.tfrecord$', '_index.npy', file_name)
+
+
+def build_index(serials, example_ids=None, start_offset=0):
+  """Create the offset index of a list of serialized examples in the order they are written to a tfrecord file.
+
+  Parameters
+  ----------
+  serials : list of strs
+    The serialized examples in the order they are written.
+  example_ids : list of ints or None
+    The ids associated with each of the serialized examples. Defaults to their position in the list.
+  start_offset : int
+    The byte offset the first example is written at.
+
+  Returns
+  -------
+  index : np.ndarray
+    An int64 array with a row for each example and columns: example_id, byte offset of the record and length of the serialized example.
+
+  """
+  if example_ids is None:
+    example_ids = np.arange(len(serials))
+
+  index = np.zeros([len(serials), 3], dtype=np.int64)
+  offset = start_offset
+  for row_num, serial in enumerate(serials):
+    index[row_num] = [example_ids[row_num], offset, len(serial)]
+    offset += HEADER_SIZE + len(serial) + FOOTER_SIZE
+  return index
+
+
+def write_index(file_name, serials, example_ids=None):
+  """Write the offset index of the serialized examples written to the tfrecord file file_name.
+
+  Parameters
+  ----------
+  file_name : str
+    The name of the tfrecord file the serialized examples were written to.
+  serials : list of strs
+    The serialized examples in the order they were written.
+  example_ids : list of ints or None
+    The ids associated with each of the serialized examples. Defaults to their position in the list.
+
+  Returns
+  -------
+  str
+    The file name of the index.
+
+  """
+  index = build_index(serials, example_ids)
+  fn = index_file_name(file_name)
+  d.save_to_file(index, fn)
+  return fn
+
+
+def read_index(file_name):
+  """Read the offset index associated with the tfrecord file file_name."""
+  fn = index_file_name(file_name)
+  return np.load(fn)
+
+
+def read_serials(file_name, example_ids):
+  """Read the serialized examples with the given ids directly from a tfrecord file using its offset index.
+
+  Parameters
+  ----------
+  file_name : str
+    The name of the tfrecord file.
+  example_ids : list of ints
+    The ids of the examples to read.
+
+  Returns
+  -------
+  serials : list of strs
+    The serialized examples, in the same order as example_ids.
+
+  """
+  index = read_index(file_name)
+  id_to_row = {example_id: row_num for row_num, example_id in enumerate(index[:, 0])}
+
+  serials = []
+  with open(file_name, 'rb') as tfrecord_file:
+    for example_id in example_ids:
+      if example_id not in id_to_row:
+        raise ValueError("No example with id {} in {}".format(example_id, file_name))
+
+      _, offset, length = index[id_to_row[example_id]]
+      tfrecord_file.seek(offset)
+
+      record_length, = struct.unpack('<Q', tfrecord_file.read(8))
+      if record_length != length:
+        raise ValueError("Offset index of {} does not match the file.".format(file_name))
+
+      tfrecord_file.seek(offset + HEADER_SIZE)
+      serials.append(tfrecord_file.read(length))
+
+  return serials
+
+
+def serial_to_array_dict(serial):
+  """Convert a serialized example into a dictionary of flat numpy arrays, one for each feature."""
+  example = tf.train.Example.FromString(serial)
+
+  array_dict = {}
+  for key, feature in example.features.feature.items():
+    kind = feature.WhichOneof('kind')
+    if kind == 'int64_list':
+      array_dict[key] = np.array(feature.int64_list.value, dtype=np.int64)
+    elif kind == 'float_list':
+      array_dict[key] = np.array(feature.float_list.value, dtype=np.float32)
+    elif kind == 'bytes_list':
+      array_dict[key] = np.array(feature.bytes_list.value, dtype=np.object)
+    else:
+      array_dict[key] = np.array([])
+  return array_dict
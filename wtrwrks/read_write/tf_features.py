@@ -67,3 +67,100 @@ def size_from_shape(shape):
     return 1
 
   return np.prod(shape)
+
+
+def select_default_val(dtype):
+  """Choose the value which is left out of a sparsely encoded array based on the inputted numpy datatype."""
+  dtype = np.dtype(dtype)
+  if dtype.type in (np.string_, np.unicode_):
+    return ''
+  return 0
+
+
+def select_sparse_feature_func(dtype, default_val=None):
+  """Choose a feature function which only stores the elements of an array that differ from default_val, along with their flat indices.
+
+  Parameters
+  ----------
+  dtype : numpy dtype
+    The datatype of the arrays that will be converted into features.
+  default_val : object
+    The value which is left out of the encoding. Defaults to '' for strings and 0 for numbers.
+
+  Returns
+  -------
+  func
+    A function which takes in an array and returns a dictionary with an 'indices' and a 'values' feature.
+
+  """
+  dtype = np.dtype(dtype)
+  feature_func = select_feature_func(dtype)
+  if default_val is None:
+    default_val = select_default_val(dtype)
+
+  def sparse_feature_func(value):
+    value = np.array(value).flatten()
+    indices = np.where(value != default_val)[0]
+    return {'indices': _int_feat(indices), 'values': feature_func(value[indices])}
+
+  return sparse_feature_func
+
+
+def sparse_features(indices, values):
+  """Create the index and value features of a sparsely encoded array directly from the flat indices and values of its elements that differ from the default value."""
+  values = np.asarray(values)
+  return {'indices': _int_feat(np.asarray(indices, dtype=np.int64)), 'values': select_feature_func(values.dtype)(values)}
+
+
+def sparse_feature_keys(key):
+  """Get the names of the index and value features that a sparsely encoded array is written to."""
+  return key + '/sparse_indices', key + '/sparse_values'
+
+
+def add_features(example_dict, key, features):
+  """Add the output of a feature function to an example dictionary, splitting sparse features into their index and value features."""
+  if type(features) is not dict:
+    example_dict[key] = features
+    return example_dict
+
+  indices_key, values_key = sparse_feature_keys(key)
+  example_dict[indices_key] = features['indices']
+  example_dict[values_key] = features['values']
+  return example_dict
+
+
+def sparse_to_dense(indices, values, shape, default_val):
+  """Scatter the values of a sparsely encoded array back into a dense array of the proper shape."""
+  values = np.array(values)
+  dtype = values.dtype if values.size else np.array(default_val).dtype
+  dense = np.full([int(size_from_shape(shape))], default_val, dtype=np.result_type(dtype, np.array(default_val).dtype))
+  dense[np.array(indices, dtype=np.int64)] = values
+  return dense.reshape(shape)
+
+
+def select_narrow_dtype(min_val, max_val):
+  """Choose the smallest integer datatype that can hold every value between min_val and max_val."""
+  for dtype in (np.uint8, np.int8, np.uint16, np.int16, np.int32):
+    info = np.iinfo(dtype)
+    if info.min <= min_val and max_val <= info.max:
+      return dtype
+  return np.int64
+
+
+def select_narrow_feature_func(narrow_dtype):
+  """Choose a feature function which writes an integer array as the raw little endian bytes of the narrower datatype narrow_dtype."""
+  narrow_dtype = np.dtype(narrow_dtype).newbyteorder('<')
+
+  def narrow_feature_func(value):
+    value = np.array(value).flatten().astype(narrow_dtype)
+    return _bytes_feat(value.tobytes())
+
+  return narrow_feature_func
+
+
+def narrow_to_wide(value, narrow_dtype, np_type):
+  """Convert the raw bytes written by a narrow feature function back into an array of the declared datatype."""
+  value = np.array(value).flatten()
+  if value.dtype.kind in ('O', 'S'):
+    value = np.frombuffer(value[0], dtype=np.dtype(narrow_dtype).newbyteorder('<'))
+  return value.astype(np_type)
@@ -1,8 +1,250 @@
-"""Functions which deal with differences between strings."""
-import difflib
+"""Functions which deal with differences between strings.
+
+Diff strings are encoded as a sequence of operations on the source string, each of the form '<tag><i1>,<i2>,<length>:<substring>' where the tag is 'd' (delete source_string[i1:i2]) or 'i' (replace source_string[i1:i2] with substring). Strings with no differences have the empty string as their diff. Diff strings from older versions, which were JSON encoded lists of the same operations, can still be reconstructed."""
+import numpy as np
 import json
 
 
+# Pieces of the strings with at most this many characters between them are
+# diffed directly by _greedy_edits, which saves the frontier of every step.
+# Longer ones are first split up by _middle_snake so the memory stays linear.
+MAX_GREEDY_LEN = 256
+
+
+def _greedy_edits(a, b):
+  """Find the shortest sequence of single character deletions and insertions which turns a into b using the O(ND) greedy algorithm of Myers, where N is the combined length of the strings and D is the number of edits. Uses O(D^2) memory to trace the path back.
+
+  Parameters
+  ----------
+  a : str
+    The string being transformed.
+  b : str
+    The string that a is being transformed into.
+
+  Returns
+  -------
+  list of tuples
+    The edits (tag, i, char), ordered by position in a. A deletion ('d', i, '') removes a[i] and an insertion ('i', i, char) puts char before a[i].
+
+  """
+  n, m = len(a), len(b)
+
+  # Find the furthest reaching path along each diagonal k = x - y with d edits,
+  # saving the frontier at each d so the path can be traced back. Only the
+  # diagonals -d to d can be reached with d edits, so that's all that's saved.
+  offset = n + m + 1
+  v = [0] * (2 * offset + 1)
+  trace = []
+  done = False
+  for d in xrange(n + m + 1):
+    trace.append(v[offset - d: offset + d + 1])
+    for k in xrange(-d, d + 1, 2):
+      if k == -d or (k != d and v[offset + k - 1] < v[offset + k + 1]):
+        x = v[offset + k + 1]
+      else:
+        x = v[offset + k - 1] + 1
+      y = x - k
+      while x < n and y < m and a[x] == b[y]:
+        x += 1
+        y += 1
+      v[offset + k] = x
+      if x >= n and y >= m:
+        done = True
+        break
+    if done:
+      break
+
+  # Trace the path back from the end, recording a deletion for every step right
+  # and an insertion for every step down.
+  edits = []
+  x, y = n, m
+  for d in xrange(len(trace) - 1, 0, -1):
+    # The saved frontier starts at diagonal -d.
+    v = trace[d]
+    k = x - y
+    if k == -d or (k != d and v[d + k - 1] < v[d + k + 1]):
+      prev_k = k + 1
+    else:
+      prev_k = k - 1
+    prev_x = v[d + prev_k]
+    prev_y = prev_x - prev_k
+    while x > prev_x and y > prev_y:
+      x -= 1
+      y -= 1
+
+    if x == prev_x:
+      edits.append(('i', x, b[prev_y]))
+    else:
+      edits.append(('d', prev_x, ''))
+    x, y = prev_x, prev_y
+  edits.reverse()
+
+  return edits
+
+
+def _middle_snake(a, b):
+  """Find the middle snake of the shortest edit path from a to b, by running the greedy search forwards from the start and backwards from the end at the same time until they overlap. Only the current frontiers are kept, so it uses O(N) memory.
+
+  Parameters
+  ----------
+  a : str
+    The string being transformed.
+  b : str
+    The string that a is being transformed into.
+
+  Returns
+  -------
+  d : int
+    The number of edits of the shortest path.
+  x, y : int
+    Where the middle snake starts in a and b.
+  u, v : int
+    Where the middle snake ends in a and b.
+
+  """
+  n, m = len(a), len(b)
+  delta = n - m
+  odd = delta % 2 == 1
+  offset = n + m + 1
+
+  # The furthest x reached on each forward diagonal k = x - y, and on each
+  # backward diagonal, where x and y count back from the ends of the strings.
+  forward = [0] * (2 * offset + 1)
+  backward = [0] * (2 * offset + 1)
+  for d in xrange((n + m + 1) // 2 + 1):
+    for k in xrange(-d, d + 1, 2):
+      if k == -d or (k != d and forward[offset + k - 1] < forward[offset + k + 1]):
+        x = forward[offset + k + 1]
+      else:
+        x = forward[offset + k - 1] + 1
+      y = x - k
+      start_x, start_y = x, y
+      while x < n and y < m and a[x] == b[y]:
+        x += 1
+        y += 1
+      forward[offset + k] = x
+
+      # The backward diagonal delta - k was last reached with d - 1 edits.
+      if odd and delta - d < k < delta + d and x + backward[offset + delta - k] >= n:
+        return 2 * d - 1, start_x, start_y, x, y
+
+    for k in xrange(-d, d + 1, 2):
+      if k == -d or (k != d and backward[offset + k - 1] < backward[offset + k + 1]):
+        x = backward[offset + k + 1]
+      else:
+        x = backward[offset + k - 1] + 1
+      y = x - k
+      start_x, start_y = x, y
+      while x < n and y < m and a[n - 1 - x] == b[m - 1 - y]:
+        x += 1
+        y += 1
+      backward[offset + k] = x
+
+      # The forward diagonal delta - k was reached with d edits.
+      if not odd and -d <= delta - k <= d and x + forward[offset + delta - k] >= n:
+        return 2 * d, n - x, m - y, n - start_x, m - start_y
+
+
+def _edits(a, b):
+  """Find the shortest sequence of single character deletions and insertions which turns a into b. Long strings are split at the middle snake of the path and each side is diffed separately, so the memory used stays linear in the length of the strings.
+
+  Parameters
+  ----------
+  a : str
+    The string being transformed.
+  b : str
+    The string that a is being transformed into.
+
+  Returns
+  -------
+  list of tuples
+    The edits (tag, i, char), ordered by position in a. See _greedy_edits.
+
+  """
+  # When one side is empty the edits are just all insertions or deletions.
+  if not a:
+    return [('i', 0, char) for char in b]
+  if not b:
+    return [('d', i, '') for i in xrange(len(a))]
+  if len(a) + len(b) <= MAX_GREEDY_LEN:
+    return _greedy_edits(a, b)
+
+  d, x, y, u, v = _middle_snake(a, b)
+  if d <= 1:
+    return _greedy_edits(a, b)
+
+  return _edits(a[:x], b[:y]) + [(tag, i + u, char) for tag, i, char in _edits(a[u:], b[v:])]
+
+
+def _get_opcodes(source_string, target_string):
+  """Find the shortest sequence of deletions and insertions which turns source_string into target_string using the O(ND) algorithm of Myers, where N is the combined length of the strings and D is the number of edits.
+
+  Parameters
+  ----------
+  source_string : str
+    The string being transformed.
+  target_string : str
+    The string that source string is being transformed into.
+
+  Returns
+  -------
+  list of tuples
+    The operations (tag, i1, i2, substring), ordered by position in source_string.
+
+  """
+  # Anything in common at the start or end doesn't need to go through the
+  # search.
+  start = 0
+  max_start = min(len(source_string), len(target_string))
+  while start < max_start and source_string[start] == target_string[start]:
+    start += 1
+
+  end = 0
+  max_end = max_start - start
+  while end < max_end and source_string[-1 - end] == target_string[-1 - end]:
+    end += 1
+
+  a = source_string[start: len(source_string) - end]
+  b = target_string[start: len(target_string) - end]
+  edits = _edits(a, b)
+
+  # Merge the single character edits which touch each other into operations on
+  # whole substrings.
+  opcodes = []
+  for tag, i, char in edits:
+    if opcodes and i == opcodes[-1][2]:
+      prev_tag, i1, i2, substring = opcodes[-1]
+      if tag == 'd':
+        i2 += 1
+      opcodes[-1] = ('i' if substring + char else 'd', i1, i2, substring + char)
+    else:
+      opcodes.append((tag, i, i + 1 if tag == 'd' else i, char))
+
+  return [(tag, i1 + start, i2 + start, substring) for tag, i1, i2, substring in opcodes]
+
+
+def _encode(opcodes):
+  """Write out a list of operations as a diff string."""
+  return ''.join(['%s%d,%d,%d:%s' % (tag, i1, i2, len(substring), substring) for tag, i1, i2, substring in opcodes])
+
+
+def _decode(diff_string):
+  """Read a list of operations from a diff string, in either the current or the old JSON encoding."""
+  if not diff_string:
+    return []
+  if diff_string[0] == '[':
+    return json.loads(diff_string)
+
+  opcodes = []
+  pos = 0
+  while pos < len(diff_string):
+    colon = diff_string.index(':', pos)
+    i1, i2, length = [int(num) for num in diff_string[pos + 1: colon].split(',')]
+    opcodes.append((diff_string[pos], i1, i2, diff_string[colon + 1: colon + 1 + length]))
+    pos = colon + 1 + length
+  return opcodes
+
+
 def get_diff_string(source_string, target_string):
   """Generate a string which can be used to transform one string into another.
 
@@ -16,37 +258,39 @@ def get_diff_string(source_string, target_string):
   Returns
   -------
   str
-    A string that describes a sequence of operations on source_string to produce target_string.
+    A string that describes a sequence of operations on source_string to produce target_string. Empty if the strings are equal.
 
   """
-  # Split up the strings into lists.
-  source_string = list(source_string)
-  target_string = list(target_string)
+  if source_string == target_string:
+    return ''
+  return _encode(_get_opcodes(source_string, target_string))
 
-  # Use a sequence matcher to identify all the common substrings of
-  # source_string an target_string.
-  matcher = difflib.SequenceMatcher(None, source_string, target_string)
 
-  tag_map = {
-    'delete': 'd',
-    'insert': 'i',
-    'replace': 'i'
-  }
+def get_diff_strings(source_strings, target_strings):
+  """Generate the diff strings of two arrays of strings element by element. Only the elements which actually differ go through get_diff_string.
 
-  # Get out the operation codes which list out all the operations that need to
-  # occur in order to transform source_string into target_string.
-  diff_string = []
-  for tag, i1, i2, j1, j2 in matcher.get_opcodes():
-    if tag == 'equal':
-      continue
+  Parameters
+  ----------
+  source_strings : np.ndarray of strs
+    The strings that use the diff strings to get transformed into the target strings.
+  target_strings : np.ndarray of strs
+    The strings that the source strings are being transformed into.
 
-    substring = ''
-    if tag in ('insert', 'replace'):
-      substring = ''.join(target_string[j1:j2])
+  Returns
+  -------
+  np.ndarray of strs
+    The diff strings, with the same shape as source_strings.
 
-    diff_string.append((tag_map[tag], i1, i2, substring))
+  """
+  source_strings = np.asarray(source_strings)
+  target_strings = np.asarray(target_strings)
+  is_diff = np.asarray(source_strings != target_strings)
+
+  diffs = [get_diff_string(s, t) for s, t in zip(source_strings[is_diff], target_strings[is_diff])]
 
-  return json.dumps(diff_string)
+  diff_strings = np.zeros(is_diff.shape, dtype=np.array(diffs + ['']).dtype)
+  diff_strings[is_diff] = diffs
+  return diff_strings
 
 
 def reconstruct(source_string, diff_string):
@@ -65,11 +309,48 @@ def reconstruct(source_string, diff_string):
     The string that source string is transformed into using the diff string.
 
   """
+  opcodes = _decode(diff_string)
+  if not opcodes:
+    return source_string
+
   target_string = list(source_string)
-  for tag, i1, i2, substring in reversed(json.loads(diff_string)):
+  for tag, i1, i2, substring in reversed(opcodes):
     if tag == 'd':
       del target_string[i1:i2]
     elif tag == 'i':
       target_string[i1:i2] = substring
 
   return ''.join(target_string)
+
+
+def reconstruct_strings(source_strings, diff_strings):
+  """Reconstruct an array of strings from their diff strings element by element. Only the elements with non empty diffs go through reconstruct.
+
+  Parameters
+  ----------
+  source_strings : np.ndarray of strs
+    The strings that use the diff strings to get transformed into the target strings.
+  diff_strings : np.ndarray of strs
+    The diff strings, with the same shape as source_strings.
+
+  Returns
+  -------
+  np.ndarray of strs
+    The reconstructed strings.
+
+  """
+  source_strings = np.asarray(source_strings)
+  diff_strings = np.asarray(diff_strings)
+  is_diff = np.asarray((diff_strings != '') & (diff_strings != '[]'))
+  if not is_diff.any():
+    return source_strings
+
+  targets = [reconstruct(s, d) for s, d in zip(source_strings[is_diff], diff_strings[is_diff])]
+
+  # Widen the array enough to hold the reconstructed strings.
+  targets = np.array(targets)
+  kind = 'U' if 'U' in (source_strings.dtype.kind, targets.dtype.kind) else 'S'
+  width = max(np.char.str_len(source_strings).max(), np.char.str_len(targets).max(), 1)
+  target_strings = source_strings.astype(kind + str(width))
+  target_strings[is_diff] = targets
+  return target_strings
@@ -18,9 +18,48 @@ class TestDiff(unittest.TestCase):
     target = "Hey hey what's happening"
     diff_string = df.get_diff_string(source, target)
 
-    self.assertEqual(diff_string, '[["i", 4, 5, "h"], ["d", 7, 8, ""], ["i", 16, 17, "ha"], ["i", 18, 18, "pening"]]')
+    self.assertEqual(diff_string, 'i4,5,1:hd7,8,0:i16,17,2:hai18,18,6:pening')
     reco = df.reconstruct(source, diff_string)
 
     self.assertEqual(target, reco)
+
+    # Equal strings have no diff.
+    self.assertEqual(df.get_diff_string(source, source), '')
+    self.assertEqual(df.reconstruct(source, ''), source)
+
+    # The old JSON encoded diffs can still be used.
+    old_diff_string = '[["i", 4, 5, "h"], ["d", 7, 8, ""], ["i", 16, 17, "ha"], ["i", 18, 18, "pening"]]'
+    self.assertEqual(df.reconstruct(source, old_diff_string), target)
+
+  def test_random(self):
+    random_state = np.random.RandomState(0)
+    for _ in xrange(500):
+      source = u''.join(random_state.choice(list(u'ab:,1'), size=random_state.randint(10)))
+      target = u''.join(random_state.choice(list(u'abc:,1'), size=random_state.randint(10)))
+      self.assertEqual(df.reconstruct(source, df.get_diff_string(source, target)), target)
+
+  def test_long(self):
+    # Strings this long are split up at the middle snake before being diffed,
+    # which should find just as few edits as diffing them directly.
+    random_state = np.random.RandomState(0)
+    for _ in xrange(20):
+      source = u''.join(random_state.choice(list(u'abcd'), size=random_state.randint(300, 600)))
+      target = u''.join(random_state.choice(list(u'abce'), size=random_state.randint(300, 600)))
+      edits = df._edits(source, target)
+      self.assertEqual(len(edits), len(df._greedy_edits(source, target)))
+      self.assertEqual(df.reconstruct(source, df.get_diff_string(source, target)), target)
+
+    # Completely different strings.
+    source = u'a' * 1000
+    target = u'b' * 800
+    self.assertEqual(df.get_diff_string(source, target), u'i0,1000,800:' + target)
+
+  def test_arrays(self):
+    source = np.array([['hey', 'what'], ['is', 'up']])
+    target = np.array([['Hey', 'what'], ['is', 'happening']])
+    diff_strings = df.get_diff_strings(source, target)
+
+    self.assertEqual(diff_strings.tolist(), [['i0,1,1:H', ''], ['', 'i0,1,2:hai2,2,6:pening']])
+    self.assertEqual(df.reconstruct_strings(source, diff_strings).tolist(), target.tolist())
 if __name__ == "__main__":
   unittest.main()
@@ -1,10 +1,32 @@
 """Functions that create tanks that operate on or create boolean arrays."""
 import numpy as np
 import wtrwrks.tanks.utils as ut
+import wtrwrks.utils.vocab as vo
 import wtrwrks.waterworks.tank as ta
 from wtrwrks.waterworks.empty import empty
 
 
+def isin(a, b):
+  """Find which elements of 'a' are in 'b', using the vectorized lookup of 'b' if it's a Vocabulary rather than building a sorted array out of it every time.
+
+  Parameters
+  ----------
+  a : np.ndarray
+    The elements to look for.
+  b : list, np.ndarray or Vocabulary
+    The elements to look through.
+
+  Returns
+  -------
+  np.ndarray of bools
+    Whether each element of 'a' is in 'b'.
+
+  """
+  if isinstance(b, vo.Vocabulary):
+    return b.isin(a)
+  return np.isin(a, b)
+
+
 def create_one_arg_bool_tank(np_func, class_name, func_name):
   """Create a function which generates the tank instance corresponding to some single argument, boolean valued numpy function. (e.g. np.isnan). The operation will be reversible but in the most trivial and wasteful manner possible. It will just copy over the original array.
 
@@ -240,7 +262,7 @@ class MultiIsIn(ta.Tank):
     target = np.zeros(a.shape, dtype=bool)
     for unique in uniques:
       mask = selector == unique
-      target[mask] = np.isin(a[mask], bs[unique])
+      target[mask] = isin(a[mask], bs[unique])
 
     return {'target': target, 'a': ut.maybe_copy(a), 'bs': ut.maybe_copy(bs), 'selector': ut.maybe_copy(selector)}
 
@@ -1,6 +1,7 @@
 """Cast tank definition."""
 import wtrwrks.waterworks.waterwork_part as wp
 import wtrwrks.waterworks.tank as ta
+import wtrwrks.utils.datetime_functions as dtf
 import numpy as np
 
 
@@ -43,7 +44,12 @@ class Cast(ta.Tank):
 
     """
     a = np.array(a)
-    target = a.astype(dtype)
+    # Parse strings into datetimes once per distinct value rather than once per
+    # element.
+    if np.dtype(dtype).kind == 'M' and a.dtype.kind in ('S', 'U', 'O'):
+      target = dtf.parse_datetimes(a).astype(dtype)
+    else:
+      target = a.astype(dtype)
 
     # If the inputted is of float type and is being cast to an integer, it will
     # lose information. So the difference between the original and casted array
@@ -3,9 +3,162 @@ import wtrwrks.waterworks.waterwork_part as wp
 import wtrwrks.waterworks.tank as ta
 import wtrwrks.tanks.utils as ut
 import wtrwrks.utils.array_functions as af
+import wtrwrks.utils.vocab as vo
 import numpy as np
 
 
+class CatIndexLookup(object):
+  """Arrays precomputed from a cat_to_index_map so that category values can be mapped to indices with a vectorized search and indices mapped back to category values with a single take.
+
+  Parameters
+  ----------
+  cat_to_index_map : dict
+    The map from categorical values to indices. Must be one-to-one.
+
+  Attributes
+  ----------
+  keys : np.ndarray
+    The (non NaN) category values, sorted if they're all numbers or all strings. Otherwise an unsorted array of objects, which is never searched.
+  indices : np.ndarray
+    The index of each of the sorted keys.
+  nan_index : int
+    The index of NaN, -1 if NaN is not in the map.
+  index_to_cat : np.ndarray of objects
+    The category value of each index.
+  size : int
+    The number of entries in cat_to_index_map when the lookup was built.
+
+  """
+
+  def __init__(self, cat_to_index_map):
+    self.cat_to_index_map = cat_to_index_map
+    self.size = len(cat_to_index_map)
+    self.nan_index = -1
+
+    keys = []
+    indices = []
+    for key, index in cat_to_index_map.iteritems():
+      if isinstance(key, float) and np.isnan(key):
+        self.nan_index = index
+        continue
+      keys.append(key)
+      indices.append(index)
+
+    # Only make an array of the keys' own type when they're all numbers or all
+    # strings. Otherwise numpy would convert them to a common type, e.g. 1 to
+    # '1', and they'd match category values that the dict doesn't.
+    self.keys = np.empty([len(keys)], dtype=np.object)
+    self.keys[:] = keys
+    if all(isinstance(key, basestring) for key in keys) or all(isinstance(key, (bool, int, long, float, np.number, np.bool_)) for key in keys):
+      try:
+        self.keys = np.array(keys)
+      except UnicodeError:
+        pass
+
+    self.indices = np.array(indices, dtype=np.int64)
+    if self.keys.dtype.kind != 'O' and len(keys):
+      order = np.argsort(self.keys, kind='mergesort')
+      self.keys = self.keys[order]
+      self.indices = self.indices[order]
+
+    # Make sure the map is one-to-one. Otherwise it isn't reversible.
+    num_indices = max(cat_to_index_map.values()) + 1 if cat_to_index_map else 0
+    self.index_to_cat = np.empty([num_indices], dtype=np.object)
+    is_set = np.zeros([num_indices], dtype=bool)
+    for key, index in cat_to_index_map.iteritems():
+      if is_set[index]:
+        raise ValueError("cat_to_index_map must be one-to-one. " + str(index) + " appears twice.")
+      self.index_to_cat[index] = key
+      is_set[index] = True
+
+  def to_indices(self, cats):
+    """Map an array of category values to their indices.
+
+    Parameters
+    ----------
+    cats : np.ndarray
+      The category values.
+
+    Returns
+    -------
+    target : np.ndarray
+      The indices, -1 for any category value not in the map.
+    isnan : np.ndarray of bools
+      Where cats is NaN.
+
+    """
+    if cats.dtype.kind in ('f', 'c'):
+      isnan = np.isnan(cats)
+    elif cats.dtype.kind == 'O':
+      # NaN is the only value not equal to itself.
+      isnan = np.array(cats != cats, dtype=bool).reshape(cats.shape)
+    else:
+      isnan = np.zeros(cats.shape, dtype=bool)
+
+    target = self._search(cats)
+    if target is None:
+      target = self._hash(cats)
+    target[isnan] = self.nan_index
+
+    return target, isnan
+
+  def to_cats(self, target):
+    """Map an array of indices back to their category values.
+
+    Parameters
+    ----------
+    target : np.ndarray
+      The indices. Any -1's are given the category value of index 0.
+
+    Returns
+    -------
+    np.ndarray of objects
+      The category values.
+
+    """
+    if not self.index_to_cat.size:
+      return np.empty(target.shape, dtype=np.object)
+    cats = self.index_to_cat.take(np.where(target == -1, 0, target))
+    # Taking with a rank 0 target gives back a scalar.
+    return np.asarray(cats, dtype=np.object).reshape(target.shape)
+
+  def _search(self, cats):
+    """Map the category values with a binary search through the sorted keys. Returns None if the keys and cats can't be compared as arrays."""
+    if not self.keys.size:
+      return -1 * np.ones(cats.shape, dtype=np.int64)
+
+    # Only search when the keys and the cats are both numbers or both
+    # strings, so that numpy compares them the way the dict would.
+    kinds = (self.keys.dtype.kind, cats.dtype.kind)
+    both_numbers = all(kind in ('b', 'i', 'u', 'f') for kind in kinds)
+    both_strings = all(kind in ('S', 'U') for kind in kinds)
+    if not (both_numbers or both_strings):
+      return None
+
+    try:
+      locs = np.searchsorted(self.keys, cats)
+      locs = np.minimum(locs, self.keys.size - 1)
+      found = np.asarray(self.keys[locs] == cats, dtype=bool)
+    except (TypeError, ValueError, UnicodeError):
+      return None
+
+    return np.where(found, self.indices[locs], -1).astype(np.int64)
+
+  def _hash(self, cats):
+    """Map the category values by looking up only the unique values in the map."""
+    flat_cats = cats.flatten()
+    if not flat_cats.size:
+      return -1 * np.ones(cats.shape, dtype=np.int64)
+
+    try:
+      uniques, inverse = np.unique(flat_cats, return_inverse=True)
+    except TypeError:
+      uniques, inverse = flat_cats, np.arange(flat_cats.size)
+
+    unique_indices = np.array([self.cat_to_index_map.get(u, -1) for u in uniques.tolist()], dtype=np.int64)
+    return unique_indices[inverse].reshape(cats.shape)
+
+
 class CatToIndex(ta.Tank):
   """The CatToIndex class where the cats input is an numpy array. Handles any rank for 'cats'
 
@@ -48,41 +201,37 @@ class CatToIndex(ta.Tank):
 
     """
     cats = np.array(cats, copy=True)
-    shape = cats.shape
-    is_float = cats.dtype in (np.float64, np.float32)
-    nan_val = -1
-    if is_float:
-      for key, value in cat_to_index_map.iteritems():
-        if np.isnan(key):
-          nan_val = value
-          break
-    # Pull out all the cats which are not in the cat_to_index_map.
-    # If you have a nan not in a float, you're going to get
-    # unexpected results, so here we force nans not to show up in
-    # missing vals if they are in the cat_to_index_map.
-    missing_vals = af.empty_array_like(cats)
-    if is_float:
-      isnan = np.array([True if str(v) == 'nan' else False for v in cats.flatten()]).reshape(cats.shape)
-      mask = (~np.isin(cats, cat_to_index_map.keys())) & (~isnan)
-      missing_vals[mask] = cats[mask]
-    else:
-      mask = ~np.isin(cats, cat_to_index_map.keys())
-      missing_vals[mask] = cats[mask]
+    lookup = self._get_lookup(cat_to_index_map)
 
     # Map all the categorical values to indices, setting an index of -1
     # every time an unsupported category is encoutered.
-    def safe_map(cat):
-      if cat in cat_to_index_map:
-        return cat_to_index_map[cat]
-      elif is_float and np.isnan(cat):
-        return nan_val
-      else:
-        return -1
-    target = np.vectorize(safe_map)(cats)
-    target = target.reshape(shape)
+    target, isnan = lookup.to_indices(cats)
+
+    # Pull out all the cats which are not in the cat_to_index_map. NaNs
+    # never show up in missing vals for float arrays.
+    missing_vals = af.empty_array_like(cats)
+    mask = target == -1
+    if cats.dtype.kind in ('f', 'c'):
+      mask = mask & ~isnan
+    missing_vals[mask] = cats[mask]
 
     return {'target': target, 'missing_vals': missing_vals, 'cat_to_index_map': cat_to_index_map, 'input_dtype': cats.dtype}
 
+  def _get_lookup(self, cat_to_index_map):
+    """Get the precomputed lookup arrays of cat_to_index_map, only building them the first time the map is seen. A Vocabulary already is its own lookup."""
+    if isinstance(cat_to_index_map, vo.Vocabulary):
+      return cat_to_index_map
+
+    if not hasattr(self, 'lookups'):
+      self.lookups = {}
+
+    # Rebuild the lookup if the map has had entries added or removed since.
+    lookup = self.lookups.get(id(cat_to_index_map))
+    if lookup is None or lookup.cat_to_index_map is not cat_to_index_map or len(cat_to_index_map) != lookup.size:
+      lookup = CatIndexLookup(cat_to_index_map)
+      self.lookups[id(cat_to_index_map)] = lookup
+    return lookup
+
   def _pump(self, target, missing_vals, cat_to_index_map, input_dtype):
     """Execute the mapping in the pump (backward) direction .
 
@@ -107,21 +256,12 @@ class CatToIndex(ta.Tank):
 
     """
     missing_vals = np.array(missing_vals)
-    # Convert the cat_to_index_map into an index_to_cat_map, while making
-    # sure it is one-to-one. Otherwise it isn't reversible.
-    index_to_cat_map = {}
-    for k, v in cat_to_index_map.iteritems():
-      if v in index_to_cat_map:
-        raise ValueError("cat_to_index_map must be one-to-one. " + str(v) + " appears twice.")
-      index_to_cat_map[v] = k
-
-    # Need to set the otypes variable for np.vectorize, otherwise it runs
-    # it once to figure out the output type of map_back. This screws up
-    # missing_vals.pop
-    # otype = str if not len(cat_to_index_map) else type(cat_to_index_map.keys()[0])
-    cats = np.array([index_to_cat_map[i] if i != -1 else index_to_cat_map[0] for i in target.flatten()])
-    cats = cats.reshape(target.shape)
+    target = np.array(target)
+    lookup = self._get_lookup(cat_to_index_map)
 
+    # Take the category values of the indices, and fill in the missing
+    # values wherever the index is -1.
+    cats = lookup.to_cats(target)
     mask = target == -1
     cats[mask] = missing_vals[mask]
 
@@ -130,6 +270,105 @@ class CatToIndex(ta.Tank):
     return {'cats': cats, 'cat_to_index_map': cat_to_index_map}
 
 
+class SparseCatToIndex(CatToIndex):
+  """The CatToIndex class where the missing values are outputted sparsely, i.e. as the flat indices of the missing values in 'cats' along with the missing values themselves, rather than as a full array which is almost entirely default values. Any NaNs not found in the map are treated as missing values as well. Handles any rank for 'cats'
+
+  Attributes
+  ----------
+  slot_keys : list of str
+    The tank's (operation's) argument keys. They define the names of the inputs to the tank.
+  tube_keys : dict(
+    keys - strs. The tank's (operation's) output keys. THey define the names of the outputs of the tank
+    values - types. The types of the arguments outputs.
+  )
+    The tank's (operation's) output keys and their corresponding types.
+
+  """
+  func_name = 'sparse_cat_to_index'
+  slot_keys = ['cats', 'cat_to_index_map']
+  tube_keys = ['target', 'cat_to_index_map', 'missing_vals', 'missing_indices', 'input_dtype']
+  pass_through_keys = ['cat_to_index_map']
+
+  def _pour(self, cats, cat_to_index_map):
+    """Execute the mapping in the pour (forward) direction .
+
+    Parameters
+    ----------
+    cats : np.ndarray
+      The categorical values to be mapped to indices
+    cat_to_index_map : dict
+      The map from categorical values to indices.
+
+    Returns
+    -------
+    dict(
+      'target': np.ndarray of ints
+        The indices of all the corresponding category values from 'cats'.
+      'missing_vals': np.ndarray
+        The cats that were not found in cat_to_index_map, in flattened order.
+      'missing_indices': np.ndarray of ints
+        The flat indices of the missing values in 'cats'.
+      'cat_to_index_map' : dict
+        The map from categorical values to indices.
+      'input_dtype': numpy dtype
+        The dtype of the inputted 'cats' array.
+    )
+
+    """
+    cats = np.array(cats)
+    lookup = self._get_lookup(cat_to_index_map)
+
+    target, _ = lookup.to_indices(cats)
+
+    # Only pull out the cats which are not in the cat_to_index_map.
+    missing_indices = np.flatnonzero(target == -1)
+    missing_vals = cats.ravel()[missing_indices]
+
+    return {'target': target, 'missing_vals': missing_vals, 'missing_indices': missing_indices, 'cat_to_index_map': cat_to_index_map, 'input_dtype': cats.dtype}
+
+  def _pump(self, target, missing_vals, missing_indices, cat_to_index_map, input_dtype):
+    """Execute the mapping in the pump (backward) direction .
+
+    Parameters
+    ----------
+    target: np.ndarray of ints
+      The indices of all the corresponding category values from 'cats'.
+    missing_vals: np.ndarray
+      The cats that were not found in cat_to_index_map, in flattened order.
+    missing_indices: np.ndarray of ints
+      The flat indices of the missing values in 'cats'. Any -1 in target without a missing value is given the default value of input_dtype.
+    cat_to_index_map : dict
+      The map from categorical values to indices.
+    input_dtype: numpy dtype
+      The dtype of the inputted 'cats' array.
+
+    Returns
+    -------
+    dict(
+      'cats' : np.ndarray
+        The categorical values to be mapped to indices
+      'cat_to_index_map' : dict
+        The map from categorical values to indices.
+    )
+
+    """
+    target = np.array(target)
+    missing_indices = np.array(missing_indices, dtype=np.int64)
+    lookup = self._get_lookup(cat_to_index_map)
+
+    # Take the category values of the indices, then scatter the missing values
+    # back into their spots.
+    cats = lookup.to_cats(target)
+    mask = target == -1
+    if missing_indices.size < np.sum(mask):
+      cats[mask] = '' if np.dtype(input_dtype).kind in ('S', 'U') else 0
+    cats.flat[missing_indices] = missing_vals
+
+    cats = cats.astype(input_dtype)
+
+    return {'cats': cats, 'cat_to_index_map': cat_to_index_map}
+
+
 class MultiCatToIndex(CatToIndex):
   """The CatToIndex class where the cats input is an numpy array. Handles any rank for 'cats'
 
@@ -184,7 +423,7 @@ class MultiCatToIndex(CatToIndex):
 
       target[mask] = pour_dict['target']
       missing_vals[mask] = pour_dict['missing_vals']
-    return {'target': target, 'missing_vals': missing_vals, 'cat_to_index_maps': cat_to_index_map, 'selector': selector, 'input_dtype': cats.dtype}
+    return {'target': target, 'missing_vals': missing_vals, 'cat_to_index_maps': cat_to_index_maps, 'selector': selector, 'input_dtype': cats.dtype}
 
   def _pump(self, target, selector, missing_vals, cat_to_index_maps, input_dtype):
     """Execute the mapping in the pump (backward) direction .
@@ -21,11 +21,11 @@ class FlatTokenize(ta.Tank):
 
   """
   func_name = 'flat_tokenize'
-  slot_keys = ['strings', 'tokenizer', 'detokenizer', 'ids']
-  tube_keys = ['target', 'tokenizer', 'detokenizer', 'diff', 'shape', 'ids']
-  pass_through_keys = ['tokenizer', 'detokenizer', 'ids']
+  slot_keys = ['strings', 'tokenizer', 'detokenizer', 'ids', 'cache']
+  tube_keys = ['target', 'tokenizer', 'detokenizer', 'diff', 'shape', 'ids', 'cache']
+  pass_through_keys = ['tokenizer', 'detokenizer', 'ids', 'cache']
 
-  def _pour(self, strings, ids, tokenizer, detokenizer=lambda a: ' '.join(a)):
+  def _pour(self, strings, ids, tokenizer, detokenizer=lambda a: ' '.join(a), cache=None):
     """Execute the FlatTokenize tank (operation) in the pour (forward) direction.
 
     Parameters
@@ -38,6 +38,8 @@ class FlatTokenize(ta.Tank):
       Function which takens in a list of tokens and returns a string. Not strictly necessary but it makes the tube 'diff' much smaller if it's close to the real method of detokenizing.
     ids: np.ndarray
       An array of ids which uniquely identify each element of 'strings'. Necessary in order to reconstruct strings since all information about axis is lost when flattened. Each id from ids must be unique.The array of is the same shape as strings
+    cache: LRUCache or None
+      A cache of the tokens and diffs of previously seen strings, so that repeated strings are only tokenized once. Should only be shared between tanks with the same tokenizer and detokenizer.
 
     Returns
     -------
@@ -54,45 +56,51 @@ class FlatTokenize(ta.Tank):
         The shape of the inputted array.
       ids: np.ndarray
         An array of ids which uniquely identify each element of 'strings'. Necessary in order to reconstruct strings. The array of is the same shape as target
+      cache: LRUCache or None
+        A cache of the tokens and diffs of previously seen strings, so that repeated strings are only tokenized once. Should only be shared between tanks with the same tokenizer and detokenizer.
     )
 
     """
     strings = np.array(strings)
     # Guard for the empty array case
     if not strings.size:
-      return {'target': ut.maybe_copy(strings), 'diff': ut.maybe_copy(strings), 'tokenizer': tokenizer, 'detokenizer': detokenizer}
+      return {'target': ut.maybe_copy(strings), 'diff': ut.maybe_copy(strings), 'tokenizer': tokenizer, 'detokenizer': detokenizer, 'cache': cache}
 
     all_tokens = []
     all_diffs = []
-
-    # Go through each element of the string array, and it's corresponding id.
-    r_ids = []
-    for string_id, string in zip(ids.flatten(), strings.flatten()):
-      # Tokenize the string and add it to the long list of all the tokens.
-      tokens = tokenizer(string)
+    lengths = []
+
+    # Go through each element of the string array.
+    for string in strings.flatten():
+      # Tokenize the string and find the string diff after detokenizing the
+      # tokens, unless the string has been seen before.
+      cached = cache.get((string, None)) if cache is not None else None
+      if cached is not None:
+        tokens, diff = cached
+      else:
+        tokens = tokenizer(string)
+        processed = detokenizer(tokens)
+        diff = di.get_diff_string(processed, string)
+        if cache is not None:
+          cache.set((string, None), (tokens, diff))
+
+      # Add the tokens to the long list of all the tokens.
       all_tokens.extend(tokens)
-
-      # Copy the string id len(tokens) times so that the ids always have
-      # the same length as the tokens. This makes it more suitable for breaking
-      # up in downstream tanks.
-      r_ids.extend([string_id] * len(tokens))
-
-      # Find the string diff after detokenizing the tokens.
-      processed = detokenizer(tokens)
-      diff = di.get_diff_string(processed, string)
-
-      # Copy the diff len(tokens) times so that it always has the same size
-      # as tokens. This makes it more suitable for breaking up in downstream
-      # tanks.
-      all_diffs.extend([diff] * len(tokens))
+      all_diffs.append(diff)
+      lengths.append(len(tokens))
 
     target = np.array(all_tokens).astype(strings.dtype)
-    diff = np.array(all_diffs).astype(strings.dtype)
-    r_ids = np.array(r_ids)
 
-    return {'target': target, 'diff': diff, 'tokenizer': tokenizer, 'detokenizer': detokenizer, 'ids': r_ids, 'shape': strings.shape}
+    # Copy each string's id and diff len(tokens) times so that they always
+    # have the same length as the tokens. This makes them more suitable for
+    # breaking up in downstream tanks. The diffs can be longer than the strings
+    # themselves so they keep their own width.
+    diff = np.repeat(np.array(all_diffs), lengths)
+    r_ids = np.repeat(ids.flatten(), lengths)
+
+    return {'target': target, 'diff': diff, 'tokenizer': tokenizer, 'detokenizer': detokenizer, 'ids': r_ids, 'shape': strings.shape, 'cache': cache}
 
-  def _pump(self, target, diff, tokenizer, detokenizer, ids, shape):
+  def _pump(self, target, diff, tokenizer, detokenizer, ids, shape, cache):
     """Execute the FlatTokenize tank (operation) in the pump (backward) direction.
 
     Parameters
@@ -109,6 +117,8 @@ class FlatTokenize(ta.Tank):
       The shape of the inputted array.
     ids: np.ndarray
       An array of ids which uniquely identify each element of 'strings'. Necessary in order to reconstruct strings. The array of is the same shape as target
+    cache: LRUCache or None
+      A cache of the tokens and diffs of previously seen strings, so that repeated strings are only tokenized once. Should only be shared between tanks with the same tokenizer and detokenizer.
 
     Returns
     -------
@@ -121,12 +131,14 @@ class FlatTokenize(ta.Tank):
         Function which takens in a list of tokens and returns a string. Not strictly necessary but it makes the tube 'diff' much smaller if it's close to the real method of detokenizing.
       ids: np.ndarray
         An array of ids which uniquely identify each element of 'strings'. Necessary in order to reconstruct strings since all information about axis is lost when flattened. Each id from ids must be unique.The array of is the same shape as strings
+      cache: LRUCache or None
+        A cache of the tokens and diffs of previously seen strings, so that repeated strings are only tokenized once. Should only be shared between tanks with the same tokenizer and detokenizer.
     )
 
     """
     # Handle the empty array case
     if not ids.size:
-      return {'strings': target.reshape([0] + list(shape[1:])), 'tokenizer': tokenizer, 'detokenizer': detokenizer}
+      return {'strings': target.reshape([0] + list(shape[1:])), 'tokenizer': tokenizer, 'detokenizer': detokenizer, 'cache': cache}
 
     # Get all the unique ids, and the indices which point to that unique value
     # value. Sort them, so that the indices are pulled out in sequential order.
@@ -156,4 +168,4 @@ class FlatTokenize(ta.Tank):
       all_strings.append(string)
     r_ids = np.reshape(r_ids, shape)
     strings = np.reshape(all_strings, shape)
-    return {'strings': strings, 'tokenizer': tokenizer, 'detokenizer': detokenizer, 'ids': r_ids}
+    return {'strings': strings, 'tokenizer': tokenizer, 'detokenizer': detokenizer, 'ids': r_ids, 'cache': cache}
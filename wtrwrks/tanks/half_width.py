@@ -1,7 +1,6 @@
 """HalfWidth tank definition."""
 import wtrwrks.waterworks.tank as ta
 import wtrwrks.tanks.utils as ut
-import wtrwrks.string_manipulations.diff as di
 import numpy as np
 # from chop.mmseg import Tokenizer as MMSEGTokenizer
 # from chop.hmm import Tokenizer as HMMTokenizer
@@ -45,10 +44,7 @@ class HalfWidth(ta.Tank):
     )
 
     """
-    strings = np.array(strings)
-    target = np.vectorize(_half_width)(strings)
-
-    diff = np.vectorize(di.get_diff_string)(target, strings)
+    target, diff = ut.diff_transform(strings, np.vectorize(_half_width))
 
     return {'target': target, 'diff': diff}
 
@@ -71,6 +67,6 @@ class HalfWidth(ta.Tank):
 
     """
 
-    strings = np.vectorize(di.reconstruct)(target, diff)
+    strings = ut.diff_reconstruct(target, diff)
 
     return {'strings': strings}
@@ -0,0 +1,176 @@
+"""HashToIndex tank definition."""
+import wtrwrks.waterworks.waterwork_part as wp
+import wtrwrks.waterworks.tank as ta
+import wtrwrks.utils.array_functions as af
+import numpy as np
+
+
+class HashToIndex(ta.Tank):
+  """The HashToIndex class where the cats input is an numpy array. Maps category values to indices by hashing them into a fixed number of buckets, so no map of category values has to be stored. Since different values can land in the same bucket, all the original values are kept in 'missing_vals' so that they can be recovered exactly. Handles any rank for 'cats'
+
+  Attributes
+  ----------
+  slot_keys : list of str
+    The tank's (operation's) argument keys. They define the names of the inputs to the tank.
+  tube_keys : dict(
+    keys - strs. The tank's (operation's) output keys. THey define the names of the outputs of the tank
+    values - types. The types of the arguments outputs.
+  )
+    The tank's (operation's) output keys and their corresponding types.
+
+  """
+  func_name = 'hash_to_index'
+  slot_keys = ['cats', 'hash_buckets']
+  tube_keys = ['target', 'hash_buckets', 'missing_vals', 'input_dtype']
+  pass_through_keys = ['hash_buckets']
+
+  def _pour(self, cats, hash_buckets):
+    """Execute the mapping in the pour (forward) direction .
+
+    Parameters
+    ----------
+    cats : np.ndarray
+      The categorical values to be mapped to indices
+    hash_buckets : int
+      The number of buckets to hash the category values into.
+
+    Returns
+    -------
+    dict(
+      'target': np.ndarray of ints
+        The bucket of each of the category values, -1 for empty strings.
+      'missing_vals': np.ndarray
+        The original category values.
+      'hash_buckets' : int
+        The number of buckets to hash the category values into.
+      'input_dtype': numpy dtype
+        The dtype of the inputted 'cats' array.
+    )
+
+    """
+    cats = np.array(cats, copy=True)
+    target = af.hash_to_buckets(cats, hash_buckets)
+
+    return {'target': target, 'missing_vals': cats, 'hash_buckets': hash_buckets, 'input_dtype': cats.dtype}
+
+  def _pump(self, target, missing_vals, hash_buckets, input_dtype):
+    """Execute the mapping in the pump (backward) direction .
+
+    Parameters
+    ----------
+    target: np.ndarray of ints
+      The bucket of each of the category values, -1 for empty strings.
+    missing_vals: np.ndarray
+      The original category values.
+    hash_buckets : int
+      The number of buckets to hash the category values into.
+    input_dtype: numpy dtype
+      The dtype of the inputted 'cats' array.
+
+    Returns
+    -------
+    dict(
+      'cats' : np.ndarray
+        The categorical values to be mapped to indices
+      'hash_buckets' : int
+        The number of buckets to hash the category values into.
+    )
+
+    """
+    # The hashes can't be inverted, so the category values come entirely from
+    # the missing values.
+    cats = np.array(missing_vals).astype(input_dtype)
+
+    return {'cats': cats, 'hash_buckets': hash_buckets}
+
+
+class SparseHashToIndex(HashToIndex):
+  """The HashToIndex class where the original values are outputted sparsely, i.e. as the flat indices of the values in 'cats' which were hashed along with the values themselves. The empty strings, which aren't hashed, are left out. Handles any rank for 'cats'
+
+  Attributes
+  ----------
+  slot_keys : list of str
+    The tank's (operation's) argument keys. They define the names of the inputs to the tank.
+  tube_keys : dict(
+    keys - strs. The tank's (operation's) output keys. THey define the names of the outputs of the tank
+    values - types. The types of the arguments outputs.
+  )
+    The tank's (operation's) output keys and their corresponding types.
+
+  """
+  func_name = 'sparse_hash_to_index'
+  slot_keys = ['cats', 'hash_buckets']
+  tube_keys = ['target', 'hash_buckets', 'missing_vals', 'missing_indices', 'input_dtype']
+  pass_through_keys = ['hash_buckets']
+
+  def _pour(self, cats, hash_buckets):
+    """Execute the mapping in the pour (forward) direction .
+
+    Parameters
+    ----------
+    cats : np.ndarray
+      The categorical values to be mapped to indices
+    hash_buckets : int
+      The number of buckets to hash the category values into.
+
+    Returns
+    -------
+    dict(
+      'target': np.ndarray of ints
+        The bucket of each of the category values, -1 for empty strings.
+      'missing_vals': np.ndarray
+        The category values which were hashed, in flattened order.
+      'missing_indices': np.ndarray of ints
+        The flat indices of the missing values in 'cats'.
+      'hash_buckets' : int
+        The number of buckets to hash the category values into.
+      'input_dtype': numpy dtype
+        The dtype of the inputted 'cats' array.
+    )
+
+    """
+    cats = np.array(cats)
+    target = af.hash_to_buckets(cats, hash_buckets)
+
+    missing_indices = np.flatnonzero(target != -1)
+    missing_vals = cats.ravel()[missing_indices]
+
+    return {'target': target, 'missing_vals': missing_vals, 'missing_indices': missing_indices, 'hash_buckets': hash_buckets, 'input_dtype': cats.dtype}
+
+  def _pump(self, target, missing_vals, missing_indices, hash_buckets, input_dtype):
+    """Execute the mapping in the pump (backward) direction .
+
+    Parameters
+    ----------
+    target: np.ndarray of ints
+      The bucket of each of the category values, -1 for empty strings.
+    missing_vals: np.ndarray
+      The category values which were hashed, in flattened order.
+    missing_indices: np.ndarray of ints
+      The flat indices of the missing values in 'cats'.
+    hash_buckets : int
+      The number of buckets to hash the category values into.
+    input_dtype: numpy dtype
+      The dtype of the inputted 'cats' array.
+
+    Returns
+    -------
+    dict(
+      'cats' : np.ndarray
+        The categorical values to be mapped to indices
+      'hash_buckets' : int
+        The number of buckets to hash the category values into.
+    )
+
+    """
+    target = np.array(target)
+    missing_indices = np.array(missing_indices, dtype=np.int64)
+
+    # Start from all empty strings and scatter the hashed values back into
+    # their spots.
+    cats = np.full(target.shape, '' if np.dtype(input_dtype).kind in ('S', 'U') else 0, dtype=np.object)
+    cats.flat[missing_indices] = missing_vals
+
+    cats = cats.astype(input_dtype)
+
+    return {'cats': cats, 'hash_buckets': hash_buckets}
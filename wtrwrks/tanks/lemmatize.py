@@ -1,7 +1,6 @@
 """Lemmatize tank definition."""
 import wtrwrks.waterworks.tank as ta
 import wtrwrks.tanks.utils as ut
-import wtrwrks.string_manipulations.diff as di
 import numpy as np
 # from chop.mmseg import Tokenizer as MMSEGTokenizer
 # from chop.hmm import Tokenizer as HMMTokenizer
@@ -47,10 +46,7 @@ class Lemmatize(ta.Tank):
     )
 
     """
-    strings = np.array(strings)
-    target = np.vectorize(lemmatizer)(strings)
-
-    diff = np.vectorize(di.get_diff_string)(target, strings)
+    target, diff = ut.diff_transform(strings, np.vectorize(lemmatizer))
 
     return {'target': target, 'diff': diff, 'lemmatizer': lemmatizer}
 
@@ -76,6 +72,6 @@ class Lemmatize(ta.Tank):
     )
 
     """
-    strings = np.vectorize(di.reconstruct)(target, diff)
+    strings = ut.diff_reconstruct(target, diff)
 
     return {'strings': strings, 'lemmatizer': lemmatizer}
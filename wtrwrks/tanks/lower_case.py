@@ -1,7 +1,6 @@
 """LowerCase tank definition."""
 import wtrwrks.waterworks.tank as ta
 import wtrwrks.tanks.utils as ut
-import wtrwrks.string_manipulations.diff as di
 import numpy as np
 # from chop.mmseg import Tokenizer as MMSEGTokenizer
 # from chop.hmm import Tokenizer as HMMTokenizer
@@ -43,10 +42,7 @@ class LowerCase(ta.Tank):
     )
 
     """
-    strings = np.array(strings)
-    target = np.char.lower(strings)
-
-    diff = np.vectorize(di.get_diff_string)(target, strings)
+    target, diff = ut.diff_transform(strings, np.char.lower)
     self.target = target
     self.diff = diff
     return {'target': target, 'diff': diff}
@@ -70,6 +66,6 @@ class LowerCase(ta.Tank):
 
     """
 
-    strings = np.vectorize(di.reconstruct)(target, diff)
+    strings = ut.diff_reconstruct(target, diff)
 
     return {'strings': strings}
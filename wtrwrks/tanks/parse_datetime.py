@@ -0,0 +1,88 @@
+"""ParseDatetime tank definition."""
+import wtrwrks.waterworks.waterwork_part as wp
+import wtrwrks.waterworks.tank as ta
+import wtrwrks.utils.datetime_functions as dtf
+import numpy as np
+
+
+class ParseDatetime(ta.Tank):
+  """The defintion of the ParseDatetime tank. Contains the implementations of the _pour and _pump methods, as well as which slots and tubes the waterwork objects will look for.
+
+  Attributes
+  ----------
+  slot_keys: list of strs
+    The names off all the tank's slots, i.e. inputs in the pour (forward) direction, or outputs in the pump (backward) direction
+  tubes: list of strs
+    The names off all the tank's tubes, i.e. outputs in the pour (forward) direction,
+
+  """
+
+  func_name = 'parse_datetime'
+  slot_keys = ['a', 'input_format']
+  tube_keys = ['target', 'input_format', 'input_dtype', 'diff']
+  pass_through_keys = ['input_format']
+
+  def _pour(self, a, input_format):
+    """Execute the ParseDatetime tank (operation) in the pour (forward) direction.
+
+    Parameters
+    ----------
+    a: np.ndarray of strs
+      The array of datetime strings to be parsed.
+    input_format: str or None
+      The strptime format of the strings. If None, then the format is detected from the strings.
+
+    Returns
+    -------
+    dict(
+      target: np.ndarray of datetime64
+        The parsed datetimes.
+      input_format: str or None
+        The strptime format of the strings. If None, then the format is detected from the strings.
+      input_dtype: numpy dtype
+        The dtype of the original array.
+      diff: np.ndarray of unicode
+        The original strings which can't be reproduced by formatting the datetimes (e.g. '2019-1-1' rather than '2019-01-01'), and empty strings everywhere else.
+    )
+
+    """
+    a = np.array(a)
+    target = dtf.parse_datetimes(a, input_format)
+
+    # Only save the strings which don't come back out when the datetimes are
+    # formatted again.
+    strings = a.astype(np.unicode)
+    diff = np.where(dtf.format_datetimes(target, input_format) != strings, strings, u'')
+
+    return {'target': target, 'input_format': input_format, 'input_dtype': a.dtype, 'diff': diff}
+
+  def _pump(self, target, input_format, input_dtype, diff):
+    """Execute the ParseDatetime tank (operation) in the pump (backward) direction.
+
+    Parameters
+    ----------
+    target: np.ndarray of datetime64
+      The parsed datetimes.
+    input_format: str or None
+      The strptime format of the strings. If None, then the format is detected from the strings.
+    input_dtype: numpy dtype
+      The dtype of the original array.
+    diff: np.ndarray of unicode
+      The original strings which can't be reproduced by formatting the datetimes (e.g. '2019-1-1' rather than '2019-01-01'), and empty strings everywhere else.
+
+    Returns
+    -------
+    dict(
+      a: np.ndarray of strs
+        The array of datetime strings to be parsed.
+      input_format: str or None
+        The strptime format of the strings. If None, then the format is detected from the strings.
+    )
+
+    """
+    a = dtf.format_datetimes(target, input_format)
+    if diff.size:
+      a = np.where(diff != u'', diff, a)
+    a = a.astype(input_dtype)
+
+    return {'a': a, 'input_format': input_format}
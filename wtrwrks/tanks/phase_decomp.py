@@ -42,10 +42,11 @@ class PhaseDecomp(ta.Tank):
     )
 
     """
-    exp = np.tensordot(a, w_k, [[], []])
-
-    div = np.floor_divide(exp, 1)
-    target = np.mod(exp, 1)
+    # Split the phases into their whole and fractional parts in place, rather
+    # than creating a new (examples x frequencies) array for each.
+    target = np.multiply.outer(a, w_k)
+    div = np.floor(target)
+    target -= div
 
     return {'target': target, 'div': div, 'w_k': w_k}
 
@@ -67,18 +68,11 @@ class PhaseDecomp(ta.Tank):
     )
 
     """
-    # print target, div, w_k
-    w_rank = len(w_k.shape)
-    a_rank = len(target.shape) - w_rank
-
-    tiled_w_k = np.reshape(w_k, [1] * a_rank + list(w_k.shape))
-    tiled_w_k = np.tile(tiled_w_k, list(target.shape[: a_rank]) + [1] * w_rank)
-
-    axes = np.arange(a_rank, a_rank + w_rank, dtype=np.int64)
-    a = (target + div)/tiled_w_k
-
+    # Every frequency gives back the same values, so only the last one is
+    # needed.
+    last = (Ellipsis,) + (-1,) * len(w_k.shape)
+    a = (target[last] + div[last]) / w_k[last]
+    a = np.array(a, dtype=np.float64)
     a[np.isnan(a)] = 1.0
-    for axis in xrange(w_rank):
-      a = a[..., -1]
 
     return {'a': a, 'w_k': w_k}
@@ -0,0 +1,111 @@
+"""PiecewiseLinear tank definition."""
+import wtrwrks.waterworks.waterwork_part as wp
+import wtrwrks.waterworks.tank as ta
+import wtrwrks.tanks.utils as ut
+import numpy as np
+
+
+def _check_knots(xp, fp):
+  """Make sure the knots define a function which can be inverted."""
+  xp = np.asarray(xp, dtype=np.float64)
+  fp = np.asarray(fp, dtype=np.float64)
+  if len(xp.shape) != 1 or xp.shape != fp.shape or xp.size < 2:
+    raise ValueError("xp and fp must be rank 1 arrays of the same size with at least two knots. Got shapes {} and {}".format(xp.shape, fp.shape))
+  if not (np.diff(xp) > 0).all() or not (np.diff(fp) > 0).all():
+    raise ValueError("xp and fp must both be strictly increasing so that the function can be inverted.")
+  return xp, fp
+
+
+def _interp(a, xp, fp):
+  """Evaluate the piecewise linear function running through the knots (xp, fp). Unlike np.interp, values past the first and last knots are extrapolated along the first and last pieces rather than clamped, so that the function is invertible everywhere."""
+  slopes = np.diff(fp) / np.diff(xp)
+  locs = np.clip(np.searchsorted(xp, a, side='right') - 1, 0, xp.size - 2)
+  return fp[locs] + (a - xp[locs]) * slopes[locs]
+
+
+class PiecewiseLinear(ta.Tank):
+  """The defintion of the PiecewiseLinear tank. Contains the implementations of the _pour and _pump methods, as well as which slots and tubes the waterwork objects will look for.
+
+  Attributes
+  ----------
+  slot_keys: list of strs
+    The names off all the tank's slots, i.e. inputs in the pour (forward) direction, or outputs in the pump (backward) direction
+  tubes: list of strs
+    The names off all the tank's tubes, i.e. outputs in the pour (forward) direction,
+
+  """
+
+  func_name = 'piecewise_linear'
+  slot_keys = ['a', 'xp', 'fp']
+  tube_keys = ['target', 'xp', 'fp']
+  pass_through_keys = ['xp', 'fp']
+
+  def _apply(self, a, xp, fp):
+    """Apply the piecewise linear function(s) to an array, either the same function to every element or one function for each index of the last dimension."""
+    a = np.asarray(a, dtype=np.float64)
+    if type(xp) not in (list, tuple):
+      xp, fp = _check_knots(xp, fp)
+      return _interp(a, xp, fp)
+
+    if len(xp) != len(fp) or not a.shape or a.shape[-1] != len(xp):
+      raise ValueError("When xp and fp are lists there must be one set of knots for each index of the last dimension of 'a'. Got {}, {} and {}".format(len(xp), len(fp), a.shape))
+
+    target = np.empty(a.shape, dtype=np.float64)
+    for index, (col_xp, col_fp) in enumerate(zip(xp, fp)):
+      col_xp, col_fp = _check_knots(col_xp, col_fp)
+      target[..., index] = _interp(a[..., index], col_xp, col_fp)
+    return target
+
+  def _pour(self, a, xp, fp):
+    """Execute the PiecewiseLinear tank (operation) in the pour (forward) direction.
+
+    Parameters
+    ----------
+    a: np.ndarray
+      The array to apply the function to.
+    xp: np.ndarray or list of np.ndarrays
+      The strictly increasing x coordinates of the knots of the function. If a list, then there is one set of knots for each index of the last dimension of 'a'.
+    fp: np.ndarray or list of np.ndarrays
+      The strictly increasing y coordinates of the knots of the function.
+
+    Returns
+    -------
+    dict(
+      target: np.ndarray
+        The array with the function applied.
+      xp: np.ndarray or list of np.ndarrays
+        The strictly increasing x coordinates of the knots of the function.
+      fp: np.ndarray or list of np.ndarrays
+        The strictly increasing y coordinates of the knots of the function.
+    )
+
+    """
+    return {'target': self._apply(a, xp, fp), 'xp': xp, 'fp': fp}
+
+  def _pump(self, target, xp, fp):
+    """Execute the PiecewiseLinear tank (operation) in the pump (backward) direction.
+
+    Parameters
+    ----------
+    target: np.ndarray
+      The array with the function applied.
+    xp: np.ndarray or list of np.ndarrays
+      The strictly increasing x coordinates of the knots of the function.
+    fp: np.ndarray or list of np.ndarrays
+      The strictly increasing y coordinates of the knots of the function.
+
+    Returns
+    -------
+    dict(
+      a: np.ndarray
+        The array to apply the function to.
+      xp: np.ndarray or list of np.ndarrays
+        The strictly increasing x coordinates of the knots of the function.
+      fp: np.ndarray or list of np.ndarrays
+        The strictly increasing y coordinates of the knots of the function.
+    )
+
+    """
+    # The inverse of a strictly increasing piecewise linear function is the
+    # piecewise linear function with the knots' coordinates swapped.
+    return {'a': self._apply(target, fp, xp), 'xp': xp, 'fp': fp}
@@ -0,0 +1,265 @@
+"""RemoveStopwords tank definition."""
+import wtrwrks.waterworks.waterwork_part as wp
+import wtrwrks.waterworks.tank as ta
+import wtrwrks.tanks.utils as ut
+import numpy as np
+
+
+def _to_unicode(string):
+  """Decode utf-8 byte strings so they compare equal to the unicode tokens."""
+  if isinstance(string, str):
+    return string.decode('utf-8')
+  return string
+
+
+def stopword_set(stopwords):
+  """Convert a set of stopwords to a set of unicode strings. The bundled stopword sets (e.g. wtrwrks.string_manipulations.ja_stopwords) mix utf-8 byte strings and unicode. The empty string is the padding token so it's never a stopword."""
+  return set(_to_unicode(s) for s in stopwords) - set([u''])
+
+
+def is_stopword(strings, stopwords):
+  """Find which of an array of tokens are stopwords, looking up each distinct token in the set only once.
+
+  Parameters
+  ----------
+  strings : np.ndarray of strs
+    The tokens.
+  stopwords : set of unicode
+    The stopwords, as outputted by stopword_set.
+
+  Returns
+  -------
+  np.ndarray of bools
+    Whether each token is a stopword.
+
+  """
+  if not strings.size or not stopwords:
+    return np.zeros(strings.shape, dtype=bool)
+
+  (uniques,), inverse = ut.unique_inverse(strings)
+  is_stopword = np.array([_to_unicode(u) in stopwords for u in uniques.tolist()], dtype=bool)
+  return is_stopword[inverse].reshape(strings.shape)
+
+
+def _take_last(a, indices):
+  """Pick out the elements of a at indices along the last axis, i.e. np.take_along_axis(a, indices, axis=-1), which older versions of numpy don't have."""
+  num_rows = int(np.prod(a.shape[:-1]))
+  rows = np.arange(num_rows)[:, np.newaxis]
+  flat_indices = indices.reshape(num_rows, indices.shape[-1])
+  return a.reshape(num_rows, a.shape[-1])[rows, flat_indices].reshape(indices.shape)
+
+
+def _compact(strings, mask):
+  """Remove the masked tokens and shift the remaining ones left along the last axis, padding with empty strings."""
+  # A stable sort of the mask puts the kept tokens first, in their original
+  # order.
+  order = np.argsort(mask, axis=-1, kind='mergesort')
+  target = _take_last(strings, order)
+  target[np.sort(mask, axis=-1)] = ''
+
+  removed_indices = np.flatnonzero(mask)
+  removed_vals = strings.ravel()[removed_indices]
+  return target, removed_vals, removed_indices
+
+
+def _expand(target, removed_vals, removed_indices):
+  """Put the removed tokens back into their places, the inverse of _compact."""
+  mask = np.zeros(target.size, dtype=bool)
+  mask[removed_indices] = True
+  mask = mask.reshape(target.shape)
+
+  # The n-th kept token of a row is at the n-th spot of the compacted row.
+  kept = ~mask
+  rank = np.cumsum(kept, axis=-1) - 1
+  strings = np.empty(target.shape, dtype=np.object)
+  strings[kept] = _take_last(target, np.where(kept, rank, 0))[kept]
+  strings.flat[removed_indices] = removed_vals
+
+  return strings.astype(target.dtype.type)
+
+
+class RemoveStopwords(ta.Tank):
+  """The RemoveStopwords class. Removes all the stopwords from an array of tokens, shifting the remaining tokens to the left along the last (i.e. token) dimension. The removed tokens are kept sparsely, as their values and flat indices, so the original tokens can be recovered exactly.
+
+  Attributes
+  ----------
+  slot_keys : list of str
+    The tank's (operation's) argument keys. They define the names of the inputs to the tank.
+  tube_keys : dict(
+    keys - strs. The tank's (operation's) output keys. THey define the names of the outputs of the tank
+    values - types. The types of the arguments outputs.
+  )
+    The tank's (operation's) output keys and their corresponding types.
+
+  """
+  func_name = 'remove_stopwords'
+  slot_keys = ['strings', 'stopwords']
+  tube_keys = ['target', 'stopwords', 'removed_vals', 'removed_indices']
+  pass_through_keys = ['stopwords']
+
+  def _get_stopwords(self, stopwords):
+    """Get the stopwords as a set of unicode strings, only converting them the first time the set is seen."""
+    if not hasattr(self, 'stopword_sets'):
+      self.stopword_sets = {}
+
+    key = id(stopwords)
+    if key not in self.stopword_sets or self.stopword_sets[key][0] is not stopwords:
+      self.stopword_sets[key] = (stopwords, stopword_set(stopwords))
+    return self.stopword_sets[key][1]
+
+  def _pour(self, strings, stopwords):
+    """Execute the RemoveStopwords tank (operation) in the pour (forward) direction.
+
+    Parameters
+    ----------
+    strings : np.ndarray of strs
+      The tokens, with the tokens of each string along the last dimension and padded with empty strings.
+    stopwords : set of strs
+      The stopwords to remove.
+
+    Returns
+    -------
+    dict(
+      'target': np.ndarray of strs
+        The tokens with the stopwords removed and the remaining tokens shifted left.
+      'stopwords' : set of strs
+        The stopwords to remove.
+      'removed_vals': np.ndarray of strs
+        The removed stopwords, in flattened order.
+      'removed_indices': np.ndarray of ints
+        The flat indices of the removed stopwords in 'strings'.
+    )
+
+    """
+    strings = np.array(strings)
+    mask = is_stopword(strings, self._get_stopwords(stopwords))
+    target, removed_vals, removed_indices = _compact(strings, mask)
+
+    return {'target': target, 'stopwords': stopwords, 'removed_vals': removed_vals, 'removed_indices': removed_indices}
+
+  def _pump(self, target, stopwords, removed_vals, removed_indices):
+    """Execute the RemoveStopwords tank (operation) in the pump (backward) direction.
+
+    Parameters
+    ----------
+    target: np.ndarray of strs
+      The tokens with the stopwords removed and the remaining tokens shifted left.
+    stopwords : set of strs
+      The stopwords to remove.
+    removed_vals: np.ndarray of strs
+      The removed stopwords, in flattened order.
+    removed_indices: np.ndarray of ints
+      The flat indices of the removed stopwords in 'strings'.
+
+    Returns
+    -------
+    dict(
+      'strings' : np.ndarray of strs
+        The tokens, with the tokens of each string along the last dimension and padded with empty strings.
+      'stopwords' : set of strs
+        The stopwords to remove.
+    )
+
+    """
+    target = np.array(target)
+    removed_indices = np.array(removed_indices, dtype=np.int64)
+    strings = _expand(target, removed_vals, removed_indices)
+
+    return {'strings': strings, 'stopwords': stopwords}
+
+
+class MultiRemoveStopwords(RemoveStopwords):
+  """The RemoveStopwords class where each token is given a language by a selector, and only the stopwords of that language are removed.
+
+  Attributes
+  ----------
+  slot_keys : list of str
+    The tank's (operation's) argument keys. They define the names of the inputs to the tank.
+  tube_keys : dict(
+    keys - strs. The tank's (operation's) output keys. THey define the names of the outputs of the tank
+    values - types. The types of the arguments outputs.
+  )
+    The tank's (operation's) output keys and their corresponding types.
+
+  """
+  func_name = 'multi_remove_stopwords'
+  slot_keys = ['strings', 'stopwords', 'selector']
+  tube_keys = ['target', 'stopwords', 'selector', 'removed_vals', 'removed_indices']
+  pass_through_keys = ['stopwords', 'selector']
+
+  def _pour(self, strings, stopwords, selector):
+    """Execute the MultiRemoveStopwords tank (operation) in the pour (forward) direction.
+
+    Parameters
+    ----------
+    strings : np.ndarray of strs
+      The tokens, with the tokens of each string along the last dimension and padded with empty strings.
+    stopwords : dict of sets of strs
+      The stopwords to remove for each language. Languages which aren't in the dict have no stopwords.
+    selector : np.ndarray of strs
+      The language of each token. Must have the same shape as 'strings'.
+
+    Returns
+    -------
+    dict(
+      'target': np.ndarray of strs
+        The tokens with the stopwords removed and the remaining tokens shifted left.
+      'stopwords' : dict of sets of strs
+        The stopwords to remove for each language.
+      'selector' : np.ndarray of strs
+        The language of each token.
+      'removed_vals': np.ndarray of strs
+        The removed stopwords, in flattened order.
+      'removed_indices': np.ndarray of ints
+        The flat indices of the removed stopwords in 'strings'.
+    )
+
+    """
+    strings = np.array(strings)
+    if strings.shape != selector.shape:
+      raise ValueError("Shape of strings and selector must match. Got {} and {}".format(strings.shape, selector.shape))
+
+    mask = np.zeros(strings.shape, dtype=bool)
+    for language in np.unique(selector):
+      if language not in stopwords:
+        continue
+      lang_mask = selector == language
+      mask[lang_mask] = is_stopword(strings[lang_mask], self._get_stopwords(stopwords[language]))
+
+    target, removed_vals, removed_indices = _compact(strings, mask)
+
+    return {'target': target, 'stopwords': stopwords, 'selector': selector, 'removed_vals': removed_vals, 'removed_indices': removed_indices}
+
+  def _pump(self, target, stopwords, selector, removed_vals, removed_indices):
+    """Execute the MultiRemoveStopwords tank (operation) in the pump (backward) direction.
+
+    Parameters
+    ----------
+    target: np.ndarray of strs
+      The tokens with the stopwords removed and the remaining tokens shifted left.
+    stopwords : dict of sets of strs
+      The stopwords to remove for each language.
+    selector : np.ndarray of strs
+      The language of each token.
+    removed_vals: np.ndarray of strs
+      The removed stopwords, in flattened order.
+    removed_indices: np.ndarray of ints
+      The flat indices of the removed stopwords in 'strings'.
+
+    Returns
+    -------
+    dict(
+      'strings' : np.ndarray of strs
+        The tokens, with the tokens of each string along the last dimension and padded with empty strings.
+      'stopwords' : dict of sets of strs
+        The stopwords to remove for each language.
+      'selector' : np.ndarray of strs
+        The language of each token.
+    )
+
+    """
+    target = np.array(target)
+    removed_indices = np.array(removed_indices, dtype=np.int64)
+    strings = _expand(target, removed_vals, removed_indices)
+
+    return {'strings': strings, 'stopwords': stopwords, 'selector': selector}
@@ -106,3 +106,110 @@ class Replace(ta.Tank):
       a[mask] = replaced_vals[mask]
     a = a.astype(replaced_vals.dtype.type)
     return {'a': a, 'mask': mask, 'replace_with': replace_with}
+
+
+class SparseReplace(Replace):
+  """The Replace tank where the replaced values are outputted sparsely, i.e. as the flat indices of the replaced values in 'a' along with the replaced values themselves, rather than as a full array which is almost entirely default values.
+
+  Attributes
+  ----------
+  slot_keys: list of strs
+    The names off all the tank's slots, i.e. inputs in the pour (forward) direction, or outputs in the pump (backward) direction
+  tubes: list of strs
+    The names off all the tank's tubes, i.e. outputs in the pour (forward) direction,
+
+  """
+
+  func_name = 'sparse_replace'
+  slot_keys = ['a', 'mask', 'replace_with']
+  tube_keys = ['target', 'mask', 'replaced_vals', 'replaced_indices', 'replace_with']
+  pass_through_keys = ['mask', 'replace_with']
+
+  def _pour(self, a, mask, replace_with):
+    """Execute the SparseReplace tank (operation) in the pour (forward) direction.
+
+    Parameters
+    ----------
+    a: np.ndarray
+      The array which has values that are to be replaced.
+    mask: np.ndarray of bools
+      An array of booleans whose True values denote which of array 'a's values are to be replaced.
+    replace_with: np.ndarray
+      The values to be used to replace the corresponding values in 'a'.
+
+    Returns
+    -------
+    dict(
+      target: np.ndarray of same type as 'a'
+        The array with the necessary values replaced.
+      mask: np.ndarray of bools
+        An array of booleans whose True values denote which of array 'a's values are to be replaced.
+      replaced_vals: np.ndarray of same type as 'a'
+        The values that were overwritten when they were replaced by the replace_with values, in flattened order.
+      replaced_indices: np.ndarray of ints
+        The flat indices of the replaced values in 'a'.
+      replace_with: np.ndarray
+        The values to be used to replace the corresponding values in 'a'.
+    )
+
+    """
+    replace_with = np.array(replace_with)
+    target = ut.maybe_copy(a)
+
+    # Save only the values that are going to be replaced. The mask can select
+    # whole subarrays along the leading dimensions, so broadcast it out to the
+    # full shape first.
+    full_mask = self._full_mask(mask, target.shape)
+    replaced_indices = np.flatnonzero(full_mask)
+    replaced_vals = target[full_mask]
+
+    target[mask] = replace_with
+
+    return {'target': target, 'mask': mask, 'replaced_vals': replaced_vals, 'replaced_indices': replaced_indices, 'replace_with': replace_with}
+
+  def _pump(self, target, mask, replaced_vals, replaced_indices, replace_with):
+    """Execute the SparseReplace tank (operation) in the pump (backward) direction.
+
+    Parameters
+    ----------
+    target: np.ndarray of same type as 'a'
+      The array with the necessary values replaced.
+    mask: np.ndarray of bools
+      An array of booleans whose True values denote which of array 'a's values are to be replaced.
+    replaced_vals: np.ndarray of same type as 'a'
+      The values that were overwritten when they were replaced by the replace_with values, in flattened order.
+    replaced_indices: np.ndarray of ints
+      The flat indices of the replaced values in 'a'. Any replaced value without an index is given the default value.
+    replace_with: np.ndarray
+      The values to be used to replace the corresponding values in 'a'.
+
+    Returns
+    -------
+    dict(
+      a: np.ndarray
+        The array which has values that are to be replaced.
+      mask: np.ndarray of bools
+        An array of booleans whose True values denote which of array 'a's values are to be replaced.
+      replace_with: np.ndarray
+        The values to be used to replace the corresponding values in 'a'.
+    )
+
+    """
+    a = np.array(target, copy=True)
+    mask = np.array(mask, dtype=bool)
+    replaced_vals = np.array(replaced_vals)
+    replaced_indices = np.array(replaced_indices, dtype=np.int64)
+    if replaced_vals.size and replaced_vals.dtype.itemsize > a.dtype.itemsize:
+      a = a.astype(replaced_vals.dtype)
+
+    if replaced_indices.size < np.sum(self._full_mask(mask, a.shape)):
+      a[mask] = af.empty_array_like(a[mask])
+    a.flat[replaced_indices] = replaced_vals
+
+    return {'a': a, 'mask': mask, 'replace_with': replace_with}
+
+  def _full_mask(self, mask, shape):
+    """Broadcast a mask over the leading dimensions of an array out to the array's full shape."""
+    mask = np.array(mask, dtype=bool)
+    mask = mask.reshape(mask.shape + (1,) * (len(shape) - len(mask.shape)))
+    return np.broadcast_to(mask, shape)
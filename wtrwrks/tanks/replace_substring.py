@@ -1,6 +1,6 @@
 """ReplaceSubstring tank definition."""
 import wtrwrks.waterworks.tank as ta
-import wtrwrks.string_manipulations.diff as di
+import wtrwrks.tanks.utils as ut
 import numpy as np
 
 
@@ -46,10 +46,7 @@ class ReplaceSubstring(ta.Tank):
     )
 
     """
-    strings = np.array(strings)
-    target = np.char.replace(strings, old_substring, new_substring)
-
-    diff = np.vectorize(di.get_diff_string)(target, strings)
+    target, diff = ut.diff_transform(strings, lambda a: np.char.replace(a, old_substring, new_substring))
 
     return {'target': target, 'diff': diff, 'old_substring': old_substring, 'new_substring': new_substring}
 
@@ -79,6 +76,6 @@ class ReplaceSubstring(ta.Tank):
     )
 
     """
-    strings = np.vectorize(di.reconstruct)(target, diff)
+    strings = ut.diff_reconstruct(target, diff)
 
     return {'strings': strings, 'old_substring': old_substring, 'new_substring': new_substring}
@@ -16,10 +16,13 @@ import wtrwrks.tanks.transpose as tr
 import wtrwrks.tanks.pack as pc
 import wtrwrks.tanks.pack_with_row_map as pw
 import wtrwrks.tanks.datetime_to_num as dtn
+import wtrwrks.tanks.parse_datetime as pdt
 import wtrwrks.tanks.tokenize as to
 import wtrwrks.tanks.lower_case as lc
 import wtrwrks.tanks.half_width as hw
+import wtrwrks.tanks.hash_to_index as hti
 import wtrwrks.tanks.phase_decomp as phd
+import wtrwrks.tanks.piecewise_linear as pl
 import wtrwrks.tanks.lemmatize as lm
 import wtrwrks.tanks.split as sp
 import wtrwrks.tanks.partition as pa
@@ -32,6 +35,7 @@ import wtrwrks.tanks.shape as sh
 import wtrwrks.tanks.getitem as gi
 import wtrwrks.tanks.reshape as rh
 import wtrwrks.tanks.remove as rm
+import wtrwrks.tanks.remove_stopwords as rsw
 import wtrwrks.tanks.bert_random_insert as be
 import wtrwrks.tanks.tile as tl
 import wtrwrks.tanks.dim_size as ds
@@ -737,7 +741,7 @@ def equals(a=empty, b=empty, waterwork=None, name=None, slot_plugs=None, tube_pl
   return tank.get_tubes(), tank.get_slots()
 
 
-def flat_tokenize(strings=empty, ids=empty, tokenizer=empty, detokenizer=empty, waterwork=None, name=None, slot_plugs=None, tube_plugs=None, slot_names=None, tube_names=None):
+def flat_tokenize(strings=empty, ids=empty, tokenizer=empty, detokenizer=empty, cache=None, waterwork=None, name=None, slot_plugs=None, tube_plugs=None, slot_names=None, tube_names=None):
   """Tokenize an array of strings according to the supplied tokenizer function, but instead of keeping the original structure of the inputted array, flatten the array and put all tokens from all strings on the same axis.
 
   Parameters
@@ -750,6 +754,8 @@ def flat_tokenize(strings=empty, ids=empty, tokenizer=empty, detokenizer=empty,
     Function which takens in a list of tokens and returns a string. Not strictly necessary but it makes the tube 'diff' much smaller if it's close to the real method of detokenizing.
   ids: np.ndarray
     An array of ids which uniquely identify each element of 'strings'. Necessary in order to reconstruct strings since all information about axis is lost when flattened. Each id from ids must be unique.The array of is the same shape as strings
+  cache: LRUCache or None
+    A cache of the tokens and diffs of previously seen strings, so that repeated strings are only tokenized once. Should only be shared between tanks with the same tokenizer and detokenizer.
 
   waterwork : Waterwork or None
     The waterwork to add the tank (operation) to. Default's to the _default_waterwork.
@@ -771,6 +777,8 @@ def flat_tokenize(strings=empty, ids=empty, tokenizer=empty, detokenizer=empty,
       The shape of the inputted array.
     ids: np.ndarray
       An array of ids which uniquely identify each element of 'strings'. Necessary in order to reconstruct strings. The array of is the same shape as target
+    cache: LRUCache or None
+      A cache of the tokens and diffs of previously seen strings, so that repeated strings are only tokenized once. Should only be shared between tanks with the same tokenizer and detokenizer.
   )
     A dictionary where the keys are the tube names and the values are the tube objects of the FlatTokenize tank.
   slots: dict(
@@ -782,11 +790,13 @@ def flat_tokenize(strings=empty, ids=empty, tokenizer=empty, detokenizer=empty,
         Function which takens in a list of tokens and returns a string. Not strictly necessary but it makes the tube 'diff' much smaller if it's close to the real method of detokenizing.
       ids: np.ndarray
         An array of ids which uniquely identify each element of 'strings'. Necessary in order to reconstruct strings since all information about axis is lost when flattened. Each id from ids must be unique.The array of is the same shape as strings
+      cache: LRUCache or None
+        A cache of the tokens and diffs of previously seen strings, so that repeated strings are only tokenized once. Should only be shared between tanks with the same tokenizer and detokenizer.
   )
     A dictionary where the keys are the slot names and the values are the slot objects of the FlatTokenize tank.
 
   """
-  tank = ft.FlatTokenize(strings=strings, tokenizer=tokenizer, detokenizer=detokenizer, ids=ids)
+  tank = ft.FlatTokenize(strings=strings, tokenizer=tokenizer, detokenizer=detokenizer, ids=ids, cache=cache)
   if slot_plugs is not None:
     for key in slot_plugs:
       tank.get_slots()[key].set_plug(slot_plugs[key])
@@ -943,6 +953,59 @@ def half_width(strings=empty, waterwork=None, name=None, slot_plugs=None, tube_p
   return tank.get_tubes(), tank.get_slots()
 
 
+def hash_to_index(cats=empty, hash_buckets=empty, waterwork=None, name=None, slot_plugs=None, tube_plugs=None, slot_names=None, tube_names=None):
+  """Convert an array of category values into indices by hashing them into a fixed number of buckets, so that no map of category values is needed. Empty strings are given -1 as an index. All the original values are kept in 'missing_vals' so they can be recovered exactly.
+
+  Parameters
+  ----------
+  cats: np.ndarray
+    The array with all the category values to map to indices.
+  hash_buckets: int
+    The number of buckets to hash the category values into.
+
+  waterwork : Waterwork or None
+    The waterwork to add the tank (operation) to. Default's to the _default_waterwork.
+  name : str or None
+      The name of the tank (operation) within the waterwork
+
+  Returns
+  -------
+  tubes: dict(
+    target: np.ndarray of ints
+      The bucket of each of the category values from 'cats'.
+    hash_buckets: int
+      The number of buckets to hash the category values into.
+    missing_vals: np.ndarray
+      The original category values.
+    input_dtype: a numpy dtype
+      The dtype of the inputted 'cats' array.
+  )
+    A dictionary where the keys are the tube names and the values are the tube objects of the HashToIndex tank.
+  slots: dict(
+      cats: np.ndarray
+        The array with all the category values to map to indices.
+      hash_buckets: int
+        The number of buckets to hash the category values into.
+  )
+    A dictionary where the keys are the slot names and the values are the slot objects of the HashToIndex tank.
+
+  """
+  tank = hti.HashToIndex(cats=cats, hash_buckets=hash_buckets, waterwork=waterwork, name=name)
+  if slot_plugs is not None:
+    for key in slot_plugs:
+      tank.get_slots()[key].set_plug(slot_plugs[key])
+  if tube_plugs is not None:
+    for key in tube_plugs:
+      tank.get_tubes()[key].set_plug(tube_plugs[key])
+  if slot_names is not None:
+    for key in slot_names:
+      tank.get_slots()[key].set_name(slot_names[key])
+  if tube_names is not None:
+    for key in tube_names:
+      tank.get_tubes()[key].set_name(tube_names[key])
+  return tank.get_tubes(), tank.get_slots()
+
+
 def iter_dict(a=empty, keys=None, type_dict=None, waterwork=None, name=None, slot_plugs=None, tube_plugs=None, slot_names=None, tube_names=None):
   """Create a dictionary of tubes from a tube which is dictionary valued. Necessary if one wants to operate on the individual values of a dictionary rather then the entire dictionary.
 
@@ -1422,7 +1485,66 @@ def multi_isin(a=empty, bs=empty, selector=empty, type_dict=None, waterwork=None
   return tank.get_tubes(), tank.get_slots()
 
 
-def multi_tokenize(strings=empty, selector=empty, tokenizers=empty, max_len=empty, detokenizers=empty, waterwork=None, name=None, slot_plugs=None, tube_plugs=None, slot_names=None, tube_names=None):
+def multi_remove_stopwords(strings=empty, stopwords=empty, selector=empty, waterwork=None, name=None, slot_plugs=None, tube_plugs=None, slot_names=None, tube_names=None):
+  """Remove the stopwords of each token's language from an array of tokens, shifting the remaining tokens to the left along the last (i.e. token) dimension. The removed tokens are kept sparsely so the original tokens can be recovered exactly.
+
+  Parameters
+  ----------
+  strings: np.ndarray of strs
+    The tokens, with the tokens of each string along the last dimension and padded with empty strings.
+  stopwords: dict of sets of strs
+    The stopwords to remove for each language. Languages which aren't in the dict have no stopwords.
+  selector: np.ndarray of strs
+    The language of each token. Must have the same shape as 'strings'.
+
+  waterwork : Waterwork or None
+    The waterwork to add the tank (operation) to. Default's to the _default_waterwork.
+  name : str or None
+      The name of the tank (operation) within the waterwork
+
+  Returns
+  -------
+  tubes: dict(
+    target: np.ndarray of strs
+      The tokens with the stopwords removed and the remaining tokens shifted left.
+    stopwords: dict of sets of strs
+      The stopwords to remove for each language.
+    selector: np.ndarray of strs
+      The language of each token.
+    removed_vals: np.ndarray of strs
+      The removed stopwords, in flattened order.
+    removed_indices: np.ndarray of ints
+      The flat indices of the removed stopwords in 'strings'.
+  )
+    A dictionary where the keys are the tube names and the values are the tube objects of the MultiRemoveStopwords tank.
+  slots: dict(
+      strings: np.ndarray of strs
+        The tokens, with the tokens of each string along the last dimension and padded with empty strings.
+      stopwords: dict of sets of strs
+        The stopwords to remove for each language.
+      selector: np.ndarray of strs
+        The language of each token.
+  )
+    A dictionary where the keys are the slot names and the values are the slot objects of the MultiRemoveStopwords tank.
+
+  """
+  tank = rsw.MultiRemoveStopwords(strings=strings, stopwords=stopwords, selector=selector, waterwork=waterwork, name=name)
+  if slot_plugs is not None:
+    for key in slot_plugs:
+      tank.get_slots()[key].set_plug(slot_plugs[key])
+  if tube_plugs is not None:
+    for key in tube_plugs:
+      tank.get_tubes()[key].set_plug(tube_plugs[key])
+  if slot_names is not None:
+    for key in slot_names:
+      tank.get_slots()[key].set_name(slot_names[key])
+  if tube_names is not None:
+    for key in tube_names:
+      tank.get_tubes()[key].set_name(tube_names[key])
+  return tank.get_tubes(), tank.get_slots()
+
+
+def multi_tokenize(strings=empty, selector=empty, tokenizers=empty, max_len=empty, detokenizers=empty, cache=None, waterwork=None, name=None, slot_plugs=None, tube_plugs=None, slot_names=None, tube_names=None):
   """Tokenize an array of strings according to the supplied tokenizer function, keeping the original shape of the array of strings but adding an additional 'token' dimension.
 
   Parameters
@@ -1435,6 +1557,8 @@ def multi_tokenize(strings=empty, selector=empty, tokenizers=empty, max_len=empt
     Function which takens in a list of tokens and returns a string. Not strictly necessary but it makes the tube 'diff' much smaller if it's close to the real method of detokenizing.
   max_len: int
     The maximum number of tokens. Defines the size of the added dimension.
+  cache: LRUCache or None
+    A cache of the tokens and diffs of previously seen strings, so that repeated strings are only tokenized once. Should only be shared between tanks with the same tokenizers, detokenizers and max_len.
 
   waterwork : Waterwork or None
     The waterwork to add the tank (operation) to. Default's to the _default_waterwork.
@@ -1452,6 +1576,8 @@ def multi_tokenize(strings=empty, selector=empty, tokenizers=empty, max_len=empt
       Function which takens in a list of tokens and returns a string. Not strictly necessary but it makes the tube 'diff' much smaller if it's close to the real method of detokenizing.
     diff: np.ndarray of strings
       The array of strings which define the differences between the original string and the string that has been tokenized then detokenized.
+    cache: LRUCache or None
+      A cache of the tokens and diffs of previously seen strings, so that repeated strings are only tokenized once. Should only be shared between tanks with the same tokenizers, detokenizers and max_len.
   )
     A dictionary where the keys are the tube names and the values are the tube objects of the Tokenize tank.
   slots: dict(
@@ -1463,11 +1589,13 @@ def multi_tokenize(strings=empty, selector=empty, tokenizers=empty, max_len=empt
         Function which takens in a list of tokens and returns a string. Not strictly necessary but it makes the tube 'diff' much smaller if it's close to the real method of detokenizing.
       max_len: int
         The maximum number of tokens. Defines the size of the added dimension.
+      cache: LRUCache or None
+        A cache of the tokens and diffs of previously seen strings, so that repeated strings are only tokenized once. Should only be shared between tanks with the same tokenizers, detokenizers and max_len.
   )
     A dictionary where the keys are the slot names and the values are the slot objects of the Tokenize tank.
 
   """
-  tank = to.MultiTokenize(strings=strings, selector=selector, tokenizers=tokenizers, max_len=max_len, detokenizers=detokenizers, waterwork=waterwork, name=name)
+  tank = to.MultiTokenize(strings=strings, selector=selector, tokenizers=tokenizers, max_len=max_len, detokenizers=detokenizers, cache=cache, waterwork=waterwork, name=name)
 
   if slot_plugs is not None:
     for key in slot_plugs:
@@ -1689,6 +1817,59 @@ def pack_with_row_map(a=empty, row_map=empty, default_val=empty, waterwork=None,
   return tank.get_tubes(), tank.get_slots()
 
 
+def parse_datetime(a=empty, input_format=empty, waterwork=None, name=None, slot_plugs=None, tube_plugs=None, slot_names=None, tube_names=None):
+  """Parse an array of datetime strings into datetime64, saving whatever is needed to get back the exact original strings.
+
+  Parameters
+  ----------
+  a: np.ndarray of strs
+    The array of datetime strings to be parsed.
+  input_format: str or None
+    The strptime format of the strings. If None, then the format is detected from the strings.
+
+  waterwork : Waterwork or None
+    The waterwork to add the tank (operation) to. Default's to the _default_waterwork.
+  name : str or None
+      The name of the tank (operation) within the waterwork
+
+  Returns
+  -------
+  tubes: dict(
+    target: np.ndarray of datetime64
+      The parsed datetimes.
+    input_format: str or None
+      The strptime format of the strings. If None, then the format is detected from the strings.
+    input_dtype: numpy dtype
+      The dtype of the original array.
+    diff: np.ndarray of unicode
+      The original strings which can't be reproduced by formatting the datetimes, and empty strings everywhere else.
+  )
+    A dictionary where the keys are the tube names and the values are the tube objects of the ParseDatetime tank.
+  slots: dict(
+      a: np.ndarray of strs
+        The array of datetime strings to be parsed.
+      input_format: str or None
+        The strptime format of the strings. If None, then the format is detected from the strings.
+  )
+    A dictionary where the keys are the slot names and the values are the slot objects of the ParseDatetime tank.
+
+  """
+  tank = pdt.ParseDatetime(a=a, input_format=input_format, waterwork=waterwork, name=name)
+  if slot_plugs is not None:
+    for key in slot_plugs:
+      tank.get_slots()[key].set_plug(slot_plugs[key])
+  if tube_plugs is not None:
+    for key in tube_plugs:
+      tank.get_tubes()[key].set_plug(tube_plugs[key])
+  if slot_names is not None:
+    for key in slot_names:
+      tank.get_slots()[key].set_name(slot_names[key])
+  if tube_names is not None:
+    for key in tube_names:
+      tank.get_tubes()[key].set_name(tube_names[key])
+  return tank.get_tubes(), tank.get_slots()
+
+
 def partition(a=empty, ranges=empty, type_dict=None, waterwork=None, name=None, slot_plugs=None, tube_plugs=None, slot_names=None, tube_names=None):
   """Create a list of array slices according to the ranges. All slices are ranges of the 0th axis of the array.
 
@@ -1851,6 +2032,61 @@ def phase_decomp(a=empty, w_k=empty, waterwork=None, name=None, slot_plugs=None,
   return tank.get_tubes(), tank.get_slots()
 
 
+def piecewise_linear(a=empty, xp=empty, fp=empty, waterwork=None, name=None, slot_plugs=None, tube_plugs=None, slot_names=None, tube_names=None):
+  """Apply the strictly increasing piecewise linear function running through the knots (xp, fp) to an array. Values past the first and last knots are extrapolated along the first and last pieces, so the function can be inverted exactly in the pump direction.
+
+  Parameters
+  ----------
+  a: np.ndarray
+    The array to apply the function to.
+  xp: np.ndarray or list of np.ndarrays
+    The strictly increasing x coordinates of the knots of the function. If a list, then there is one set of knots for each index of the last dimension of 'a'.
+  fp: np.ndarray or list of np.ndarrays
+    The strictly increasing y coordinates of the knots of the function.
+
+  waterwork : Waterwork or None
+    The waterwork to add the tank (operation) to. Default's to the _default_waterwork.
+  name : str or None
+      The name of the tank (operation) within the waterwork
+
+  Returns
+  -------
+  tubes: dict(
+    target: np.ndarray
+      The array with the function applied.
+    xp: np.ndarray or list of np.ndarrays
+      The strictly increasing x coordinates of the knots of the function.
+    fp: np.ndarray or list of np.ndarrays
+      The strictly increasing y coordinates of the knots of the function.
+  )
+    A dictionary where the keys are the tube names and the values are the tube objects of the PiecewiseLinear tank.
+  slots: dict(
+      a: np.ndarray
+        The array to apply the function to.
+      xp: np.ndarray or list of np.ndarrays
+        The strictly increasing x coordinates of the knots of the function.
+      fp: np.ndarray or list of np.ndarrays
+        The strictly increasing y coordinates of the knots of the function.
+  )
+    A dictionary where the keys are the slot names and the values are the slot objects of the PiecewiseLinear tank.
+
+  """
+  tank = pl.PiecewiseLinear(a=a, xp=xp, fp=fp, waterwork=waterwork, name=name)
+  if slot_plugs is not None:
+    for key in slot_plugs:
+      tank.get_slots()[key].set_plug(slot_plugs[key])
+  if tube_plugs is not None:
+    for key in tube_plugs:
+      tank.get_tubes()[key].set_plug(tube_plugs[key])
+  if slot_names is not None:
+    for key in slot_names:
+      tank.get_slots()[key].set_name(slot_names[key])
+  if tube_names is not None:
+    for key in tube_names:
+      tank.get_tubes()[key].set_name(tube_names[key])
+  return tank.get_tubes(), tank.get_slots()
+
+
 def print_val(**kwargs):
   """Convert a list of Tubes into a single Tube. Usually called by the waterwork object.
 
@@ -2190,6 +2426,59 @@ def remove(a=empty, mask=empty, waterwork=None, name=None, slot_plugs=None, tube
   return tank.get_tubes(), tank.get_slots()
 
 
+def remove_stopwords(strings=empty, stopwords=empty, waterwork=None, name=None, slot_plugs=None, tube_plugs=None, slot_names=None, tube_names=None):
+  """Remove the stopwords from an array of tokens, shifting the remaining tokens to the left along the last (i.e. token) dimension. The removed tokens are kept sparsely so the original tokens can be recovered exactly.
+
+  Parameters
+  ----------
+  strings: np.ndarray of strs
+    The tokens, with the tokens of each string along the last dimension and padded with empty strings.
+  stopwords: set of strs
+    The stopwords to remove.
+
+  waterwork : Waterwork or None
+    The waterwork to add the tank (operation) to. Default's to the _default_waterwork.
+  name : str or None
+      The name of the tank (operation) within the waterwork
+
+  Returns
+  -------
+  tubes: dict(
+    target: np.ndarray of strs
+      The tokens with the stopwords removed and the remaining tokens shifted left.
+    stopwords: set of strs
+      The stopwords to remove.
+    removed_vals: np.ndarray of strs
+      The removed stopwords, in flattened order.
+    removed_indices: np.ndarray of ints
+      The flat indices of the removed stopwords in 'strings'.
+  )
+    A dictionary where the keys are the tube names and the values are the tube objects of the RemoveStopwords tank.
+  slots: dict(
+      strings: np.ndarray of strs
+        The tokens, with the tokens of each string along the last dimension and padded with empty strings.
+      stopwords: set of strs
+        The stopwords to remove.
+  )
+    A dictionary where the keys are the slot names and the values are the slot objects of the RemoveStopwords tank.
+
+  """
+  tank = rsw.RemoveStopwords(strings=strings, stopwords=stopwords, waterwork=waterwork, name=name)
+  if slot_plugs is not None:
+    for key in slot_plugs:
+      tank.get_slots()[key].set_plug(slot_plugs[key])
+  if tube_plugs is not None:
+    for key in tube_plugs:
+      tank.get_tubes()[key].set_plug(tube_plugs[key])
+  if slot_names is not None:
+    for key in slot_names:
+      tank.get_slots()[key].set_name(slot_names[key])
+  if tube_names is not None:
+    for key in tube_names:
+      tank.get_tubes()[key].set_name(tube_names[key])
+  return tank.get_tubes(), tank.get_slots()
+
+
 def reshape(a=empty, shape=empty, waterwork=None, name=None, slot_plugs=None, tube_plugs=None, slot_names=None, tube_names=None):
   """Get the shape of an array.
 
@@ -2283,6 +2572,175 @@ def shape(a=empty, waterwork=None, name=None, slot_plugs=None, tube_plugs=None,
   return tank.get_tubes(), tank.get_slots()
 
 
+def sparse_cat_to_index(cats=empty, cat_to_index_map=empty, waterwork=None, name=None, slot_plugs=None, tube_plugs=None, slot_names=None, tube_names=None):
+  """Convert an array of values drawn from a set of categories into an index according to the map cat_to_index_map, while keeping track of the values that aren't found in the map. Any values not found in the map are given -1 as an index. The missing values are kept sparsely, as their flat indices and values, rather than as a full array.
+
+  Parameters
+  ----------
+  cats: np.ndarray
+    The array with all the category values to map to indices.
+  cat_to_index_map: dict
+    The mapping from category value to index. Must be one to one and contain all indices from zero to len(cat_to_index_map) - 1
+
+  waterwork : Waterwork or None
+    The waterwork to add the tank (operation) to. Default's to the _default_waterwork.
+  name : str or None
+      The name of the tank (operation) within the waterwork
+
+  Returns
+  -------
+  tubes: dict(
+    target: np.ndarray of ints
+      The indices of all the corresponding category values from 'cats'.
+    cat_to_index_map: dict
+      The mapping from category value to index. Must be one to one and contain all indices from zero to len(cat_to_index_map) - 1
+    missing_vals: np.ndarray
+      All the category values from 'cats' which were not found in cat_to_index_map, in flattened order.
+    missing_indices: np.ndarray of ints
+      The flat indices of the missing values in 'cats'.
+    input_dtype: a numpy dtype
+      The dtype of the inputted 'cats' array.
+  )
+    A dictionary where the keys are the tube names and the values are the tube objects of the SparseCatToIndex tank.
+  slots: dict(
+      cats: np.ndarray
+        The array with all the category values to map to indices.
+      cat_to_index_map: dict
+        The mapping from category value to index. Must be one to one and contain all indices from zero to len(cat_to_index_map) - 1
+  )
+    A dictionary where the keys are the slot names and the values are the slot objects of the SparseCatToIndex tank.
+
+  """
+  tank = cti.SparseCatToIndex(cats=cats, cat_to_index_map=cat_to_index_map, waterwork=waterwork, name=name)
+  if slot_plugs is not None:
+    for key in slot_plugs:
+      tank.get_slots()[key].set_plug(slot_plugs[key])
+  if tube_plugs is not None:
+    for key in tube_plugs:
+      tank.get_tubes()[key].set_plug(tube_plugs[key])
+  if slot_names is not None:
+    for key in slot_names:
+      tank.get_slots()[key].set_name(slot_names[key])
+  if tube_names is not None:
+    for key in tube_names:
+      tank.get_tubes()[key].set_name(tube_names[key])
+  return tank.get_tubes(), tank.get_slots()
+
+
+def sparse_hash_to_index(cats=empty, hash_buckets=empty, waterwork=None, name=None, slot_plugs=None, tube_plugs=None, slot_names=None, tube_names=None):
+  """Convert an array of category values into indices by hashing them into a fixed number of buckets, so that no map of category values is needed. Empty strings are given -1 as an index. The original values are kept sparsely, as their flat indices and values, so they can be recovered exactly.
+
+  Parameters
+  ----------
+  cats: np.ndarray
+    The array with all the category values to map to indices.
+  hash_buckets: int
+    The number of buckets to hash the category values into.
+
+  waterwork : Waterwork or None
+    The waterwork to add the tank (operation) to. Default's to the _default_waterwork.
+  name : str or None
+      The name of the tank (operation) within the waterwork
+
+  Returns
+  -------
+  tubes: dict(
+    target: np.ndarray of ints
+      The bucket of each of the category values from 'cats'.
+    hash_buckets: int
+      The number of buckets to hash the category values into.
+    missing_vals: np.ndarray
+      The category values which were hashed (i.e. everything but the empty strings), in flattened order.
+    missing_indices: np.ndarray of ints
+      The flat indices of the missing values in 'cats'.
+    input_dtype: a numpy dtype
+      The dtype of the inputted 'cats' array.
+  )
+    A dictionary where the keys are the tube names and the values are the tube objects of the SparseHashToIndex tank.
+  slots: dict(
+      cats: np.ndarray
+        The array with all the category values to map to indices.
+      hash_buckets: int
+        The number of buckets to hash the category values into.
+  )
+    A dictionary where the keys are the slot names and the values are the slot objects of the SparseHashToIndex tank.
+
+  """
+  tank = hti.SparseHashToIndex(cats=cats, hash_buckets=hash_buckets, waterwork=waterwork, name=name)
+  if slot_plugs is not None:
+    for key in slot_plugs:
+      tank.get_slots()[key].set_plug(slot_plugs[key])
+  if tube_plugs is not None:
+    for key in tube_plugs:
+      tank.get_tubes()[key].set_plug(tube_plugs[key])
+  if slot_names is not None:
+    for key in slot_names:
+      tank.get_slots()[key].set_name(slot_names[key])
+  if tube_names is not None:
+    for key in tube_names:
+      tank.get_tubes()[key].set_name(tube_names[key])
+  return tank.get_tubes(), tank.get_slots()
+
+
+def sparse_replace(a=empty, mask=empty, replace_with=empty, waterwork=None, name=None, slot_plugs=None, tube_plugs=None, slot_names=None, tube_names=None):
+  """Replace the values of an array with some other values specified by replace_with. The replaced values are kept sparsely, as their flat indices and values, rather than as a full array.
+
+  Parameters
+  ----------
+  a: np.ndarray
+    The array which has values that are to be replaced.
+  mask: np.ndarray of bools
+    An array of booleans whose True values denote which of array 'a's values are to be replaced.
+  replace_with: np.ndarray
+    The values to be used to replace the corresponding values in 'a'.
+
+  waterwork : Waterwork or None
+    The waterwork to add the tank (operation) to. Default's to the _default_waterwork.
+  name : str or None
+      The name of the tank (operation) within the waterwork
+
+  Returns
+  -------
+  tubes: dict(
+    target: np.ndarray of same type as 'a'
+      The array with the necessary values replaced.
+    mask: np.ndarray of bools
+      An array of booleans whose True values denote which of array 'a's values are to be replaced.
+    replaced_vals: np.ndarray of same type as 'a'
+      The values that were overwritten when they were replaced by the replace_with values, in flattened order.
+    replaced_indices: np.ndarray of ints
+      The flat indices of the replaced values in 'a'.
+    replace_with: np.ndarray
+      The values to be used to replace the corresponding values in 'a'.
+  )
+    A dictionary where the keys are the tube names and the values are the tube objects of the SparseReplace tank.
+  slots: dict(
+      a: np.ndarray
+        The array which has values that are to be replaced.
+      mask: np.ndarray of bools
+        An array of booleans whose True values denote which of array 'a's values are to be replaced.
+      replace_with: np.ndarray
+        The values to be used to replace the corresponding values in 'a'.
+  )
+    A dictionary where the keys are the slot names and the values are the slot objects of the SparseReplace tank.
+
+  """
+  tank = rp.SparseReplace(a=a, mask=mask, replace_with=replace_with, waterwork=waterwork, name=name)
+  if slot_plugs is not None:
+    for key in slot_plugs:
+      tank.get_slots()[key].set_plug(slot_plugs[key])
+  if tube_plugs is not None:
+    for key in tube_plugs:
+      tank.get_tubes()[key].set_plug(tube_plugs[key])
+  if slot_names is not None:
+    for key in slot_names:
+      tank.get_slots()[key].set_name(slot_names[key])
+  if tube_names is not None:
+    for key in tube_names:
+      tank.get_tubes()[key].set_name(tube_names[key])
+  return tank.get_tubes(), tank.get_slots()
+
+
 def split(a=empty, indices=empty, axis=empty, type_dict=None, waterwork=None, name=None, slot_plugs=None, tube_plugs=None, slot_names=None, tube_names=None):
   """Split up an array along an axis according to provided indices. For a more detailed description look at the documentation for the corresponding numpy function.
 
@@ -2441,7 +2899,7 @@ def tile(a=empty, reps=empty, waterwork=None, name=None, slot_plugs=None, tube_p
   return tank.get_tubes(), tank.get_slots()
 
 
-def tokenize(strings=empty, tokenizer=empty, max_len=empty, detokenizer=empty, waterwork=None, name=None, slot_plugs=None, tube_plugs=None, slot_names=None, tube_names=None):
+def tokenize(strings=empty, tokenizer=empty, max_len=empty, detokenizer=empty, cache=None, waterwork=None, name=None, slot_plugs=None, tube_plugs=None, slot_names=None, tube_names=None):
   """Tokenize an array of strings according to the supplied tokenizer function, keeping the original shape of the array of strings but adding an additional 'token' dimension.
 
   Parameters
@@ -2454,6 +2912,8 @@ def tokenize(strings=empty, tokenizer=empty, max_len=empty, detokenizer=empty, w
     Function which takens in a list of tokens and returns a string. Not strictly necessary but it makes the tube 'diff' much smaller if it's close to the real method of detokenizing.
   max_len: int
     The maximum number of tokens. Defines the size of the added dimension.
+  cache: LRUCache or None
+    A cache of the tokens and diffs of previously seen strings, so that repeated strings are only tokenized once. Should only be shared between tanks with the same tokenizers, detokenizers and max_len.
 
   waterwork : Waterwork or None
     The waterwork to add the tank (operation) to. Default's to the _default_waterwork.
@@ -2471,6 +2931,8 @@ def tokenize(strings=empty, tokenizer=empty, max_len=empty, detokenizer=empty, w
       Function which takens in a list of tokens and returns a string. Not strictly necessary but it makes the tube 'diff' much smaller if it's close to the real method of detokenizing.
     diff: np.ndarray of strings
       The array of strings which define the differences between the original string and the string that has been tokenized then detokenized.
+    cache: LRUCache or None
+      A cache of the tokens and diffs of previously seen strings, so that repeated strings are only tokenized once. Should only be shared between tanks with the same tokenizers, detokenizers and max_len.
   )
     A dictionary where the keys are the tube names and the values are the tube objects of the Tokenize tank.
   slots: dict(
@@ -2482,11 +2944,13 @@ def tokenize(strings=empty, tokenizer=empty, max_len=empty, detokenizer=empty, w
         Function which takens in a list of tokens and returns a string. Not strictly necessary but it makes the tube 'diff' much smaller if it's close to the real method of detokenizing.
       max_len: int
         The maximum number of tokens. Defines the size of the added dimension.
+      cache: LRUCache or None
+        A cache of the tokens and diffs of previously seen strings, so that repeated strings are only tokenized once. Should only be shared between tanks with the same tokenizers, detokenizers and max_len.
   )
     A dictionary where the keys are the slot names and the values are the slot objects of the Tokenize tank.
 
   """
-  tank = to.Tokenize(strings=strings, tokenizer=tokenizer, max_len=max_len, detokenizer=detokenizer, waterwork=waterwork, name=name)
+  tank = to.Tokenize(strings=strings, tokenizer=tokenizer, max_len=max_len, detokenizer=detokenizer, cache=cache, waterwork=waterwork, name=name)
   # return tank['target'], tank['tokenizer'], tank['delimiter'], tank['diff'], tank.get_slots()
 
   if slot_plugs is not None:
@@ -2658,7 +3122,7 @@ greater = bo.create_two_arg_bool_tank(np.greater, class_name='Greater', func_nam
 greater_equal = bo.create_two_arg_bool_tank(np.greater_equal, class_name='GreaterEqual', func_name='greater_equal')
 less = bo.create_two_arg_bool_tank(np.less, class_name='Less', func_name='less')
 less_equal = bo.create_two_arg_bool_tank(np.less_equal, class_name='LessEqual', func_name='less_equal')
-isin = bo.create_two_arg_bool_tank(np.isin, class_name='IsIn', func_name='isin')
+isin = bo.create_two_arg_bool_tank(bo.isin, class_name='IsIn', func_name='isin')
 
 max = rd.create_one_arg_reduce_tank(np.max, class_name='Max', func_name='max')
 min = rd.create_one_arg_reduce_tank(np.min, class_name='Min', func_name='min')
@@ -5,6 +5,100 @@ import wtrwrks.string_manipulations.diff as di
 import numpy as np
 
 
+def _tokenize_strings(strings, tokenizer, detokenizer, max_len, cache=None, language=None):
+  """Tokenize a batch of strings into at most max_len tokens each and find the diff strings needed to get them back. Each distinct string is only tokenized once. If the tokenizer has a tokenize_batch method (which takes a list of strings and returns a list of lists of tokens) then all the strings are handed to it at once, otherwise the tokenizer is called on them one by one. If a cache is given, the results are looked up in (and saved to) it under the string and its language so that strings repeated across pours are only tokenized once.
+
+  Parameters
+  ----------
+  strings: np.ndarray of strs
+    The strings to tokenize.
+  tokenizer: func
+    Function which converts a string into a list of strings.
+  detokenizer: func
+    Function which takens in a list of tokens and returns a string.
+  max_len: int
+    The maximum number of tokens. Defines the size of the token rows.
+  cache: LRUCache or None
+    The cache of previously tokenized strings.
+  language: str or None
+    The language of the strings, if there are several tokenizers.
+
+  Returns
+  -------
+  list of lists of strs
+    The tokens of each string, truncated to max_len.
+  list of strs
+    The diff strings which reconstruct the original strings from the detokenized tokens.
+
+  """
+  # Find the distinct strings, and the position of each string in them.
+  positions = {}
+  inverse = [positions.setdefault(string, len(positions)) for string in strings]
+  distinct = sorted(positions, key=positions.get)
+
+  results = [None] * len(distinct)
+  if cache is not None:
+    for num, string in enumerate(distinct):
+      results[num] = cache.get((string, language, max_len))
+  missing = [num for num, result in enumerate(results) if result is None]
+
+  # Tokenize all the strings that weren't in the cache.
+  missing_strings = [distinct[num] for num in missing]
+  tokenize_batch = getattr(tokenizer, 'tokenize_batch', None)
+  if tokenize_batch is not None:
+    all_tokens = tokenize_batch(missing_strings)
+  else:
+    all_tokens = [tokenizer(string) for string in missing_strings]
+
+  for num, string, tokens in zip(missing, missing_strings, all_tokens):
+    # Truncate the tokens if there are too many of them.
+    tokens = list(tokens)[:max_len]
+
+    # Detokenize the tokens, padded with '' the same way they are in the token
+    # array, and find the diff string which reconstructs the original string.
+    processed = detokenizer(tokens + [''] * (max_len - len(tokens)))
+    diff = di.get_diff_string(processed, string)
+
+    results[num] = (tokens, diff)
+    if cache is not None:
+      cache.set((string, language, max_len), results[num])
+
+  return [results[num][0] for num in inverse], [results[num][1] for num in inverse]
+
+
+def _fill_tokens(all_tokens, max_len):
+  """Put lists of tokens into a single preallocated array, where each list is a row padded out with ''. The dtype is wide enough to hold the longest token.
+
+  Parameters
+  ----------
+  all_tokens: list of lists of strs
+    The tokens of each string, with at most max_len tokens each.
+  max_len: int
+    The size of each row.
+
+  Returns
+  -------
+  np.ndarray of strs
+    The array of tokens, with shape [len(all_tokens), max_len].
+
+  """
+  lengths = np.array([len(tokens) for tokens in all_tokens], dtype=np.int64)
+
+  # Let numpy find the kind and width of the dtype from all the tokens at once.
+  # The extra '' keeps it a string type even if there are no tokens at all.
+  flat_tokens = np.array([t for tokens in all_tokens for t in tokens] + [''])[:-1]
+
+  # Find the row and column of each token in the flat list from the offsets of
+  # the start of each row.
+  starts = np.cumsum(lengths) - lengths
+  rows = np.repeat(np.arange(len(all_tokens)), lengths)
+  cols = np.arange(flat_tokens.size) - np.repeat(starts, lengths)
+
+  target = np.zeros([len(all_tokens), max_len], dtype=flat_tokens.dtype)
+  target[rows, cols] = flat_tokens
+  return target
+
+
 class Tokenize(ta.Tank):
   """The defintion of the Tokenize tank. Contains the implementations of the _pour and _pump methods, as well as which slots and tubes the waterwork objects will look for.
 
@@ -18,11 +112,11 @@ class Tokenize(ta.Tank):
   """
 
   func_name = 'tokenize'
-  slot_keys = ['strings', 'tokenizer', 'detokenizer', 'max_len']
-  tube_keys = ['target', 'tokenizer', 'detokenizer', 'diff']
-  pass_through_keys = ['tokenizer', 'detokenizer']
+  slot_keys = ['strings', 'tokenizer', 'detokenizer', 'max_len', 'cache']
+  tube_keys = ['target', 'tokenizer', 'detokenizer', 'diff', 'cache']
+  pass_through_keys = ['tokenizer', 'detokenizer', 'cache']
 
-  def _pour(self, strings, tokenizer, max_len, detokenizer):
+  def _pour(self, strings, tokenizer, max_len, detokenizer, cache):
     """Execute the Tokenize tank (operation) in the pour (forward) direction.
 
     Parameters
@@ -35,6 +129,8 @@ class Tokenize(ta.Tank):
       Function which takens in a list of tokens and returns a string. Not strictly necessary but it makes the tube 'diff' much smaller if it's close to the real method of detokenizing.
     max_len: int
       The maximum number of tokens. Defines the size of the added dimension.
+    cache: LRUCache or None
+      A cache of the tokens and diffs of previously seen strings, so that repeated strings are only tokenized once. Should only be shared between tanks with the same tokenizers, detokenizers and max_len.
 
     Returns
     -------
@@ -47,6 +143,8 @@ class Tokenize(ta.Tank):
         Function which takens in a list of tokens and returns a string. Not strictly necessary but it makes the tube 'diff' much smaller if it's close to the real method of detokenizing.
       diff: np.ndarray of strings
         The array of strings which define the differences between the original string and the string that has been tokenized then detokenized.
+      cache: LRUCache or None
+        A cache of the tokens and diffs of previously seen strings, so that repeated strings are only tokenized once. Should only be shared between tanks with the same tokenizers, detokenizers and max_len.
     )
 
     """
@@ -56,45 +154,23 @@ class Tokenize(ta.Tank):
     # print detokenizer('I went on a run yesterday. I saw a bird and it was magnificent. I hope to see one again tomorrow.')
     # Handle the empty array case
     if not strings.size:
-      return {'target': ut.maybe_copy(strings), 'diff': ut.maybe_copy(strings), 'tokenizer': tokenizer, 'detokenizer': detokenizer}
-
-    all_tokens = []
-    all_diffs = []
-
-    lengths = []
-    for string in strings.flatten():
-      # Tokenize the string, and regularize the length of the array by padding
-      # with '' to fill out the array if it's too small or truncated if it's
-      # too long.
-      tokens = np.array(tokenizer(string))
-      lengths.append(len(tokens))
-      if tokens.size < max_len:
-        num = max_len - tokens.size
-        tokens = np.concatenate([tokens, np.full([num], '')])
-      else:
-        tokens = tokens[:max_len]
-
-      all_tokens.append(tokens)
-      # Detokenize the tokens and reconstruct the orignal string from the
-      # diff_string
-      processed = detokenizer(tokens)
-      diff = di.get_diff_string(processed, string)
-      all_diffs.append(np.array(diff, dtype=np.unicode))
-
-    # Combine all the tokens arrays into a single array and reshape to the
-    # shape of the original strings array with an additional dimesion of size
-    # max_len.
-    token_array = np.stack(all_tokens)
-    target = np.reshape(token_array, list(strings.shape) + [max_len])
+      return {'target': ut.maybe_copy(strings), 'diff': ut.maybe_copy(strings), 'tokenizer': tokenizer, 'detokenizer': detokenizer, 'cache': cache}
+
+    all_tokens, all_diffs = _tokenize_strings(strings.flatten(), tokenizer, detokenizer, max_len, cache)
+
+    # Fill all the tokens into a single array and reshape to the shape of the
+    # original strings array with an additional dimesion of size max_len.
+    target = _fill_tokens(all_tokens, max_len)
+    target = np.reshape(target, list(strings.shape) + [max_len])
 
     # Keep all the string diffs and reshape it to match the original strings
     # array shape.
-    diff_array = np.stack(all_diffs)
-    diff = np.reshape(diff_array, strings.shape)
+    diff = np.array(all_diffs, dtype=np.unicode)
+    diff = np.reshape(diff, strings.shape)
 
-    return {'target': target, 'diff': diff, 'tokenizer': tokenizer, 'detokenizer': detokenizer}
+    return {'target': target, 'diff': diff, 'tokenizer': tokenizer, 'detokenizer': detokenizer, 'cache': cache}
 
-  def _pump(self, target, diff, tokenizer, detokenizer):
+  def _pump(self, target, diff, tokenizer, detokenizer, cache):
     """Execute the Tokenize tank (operation) in the pump (backward) direction.
 
     Parameters
@@ -107,6 +183,8 @@ class Tokenize(ta.Tank):
       Function which takens in a list of tokens and returns a string. Not strictly necessary but it makes the tube 'diff' much smaller if it's close to the real method of detokenizing.
     diff: np.ndarray of strings
       The array of strings which define the differences between the original string and the string that has been tokenized then detokenized.
+    cache: LRUCache or None
+      A cache of the tokens and diffs of previously seen strings, so that repeated strings are only tokenized once. Should only be shared between tanks with the same tokenizers, detokenizers and max_len.
 
     Returns
     -------
@@ -119,6 +197,8 @@ class Tokenize(ta.Tank):
         Function which takens in a list of tokens and returns a string. Not strictly necessary but it makes the tube 'diff' much smaller if it's close to the real method of detokenizing.
       max_len: int
         The maximum number of tokens. Defines the size of the added dimension.
+      cache: LRUCache or None
+        A cache of the tokens and diffs of previously seen strings, so that repeated strings are only tokenized once. Should only be shared between tanks with the same tokenizers, detokenizers and max_len.
     )
 
     """
@@ -137,7 +217,7 @@ class Tokenize(ta.Tank):
 
     # Reshape to the original shape.
     strings = np.reshape(all_strings, target.shape[:-1])
-    return {'strings': strings, 'tokenizer': tokenizer, 'max_len': max_len, 'detokenizer': detokenizer}
+    return {'strings': strings, 'tokenizer': tokenizer, 'max_len': max_len, 'detokenizer': detokenizer, 'cache': cache}
 
 
 class MultiTokenize(ta.Tank):
@@ -153,11 +233,11 @@ class MultiTokenize(ta.Tank):
   """
 
   func_name = 'multi_tokenize'
-  slot_keys = ['strings', 'selector', 'tokenizers', 'detokenizers', 'max_len']
-  tube_keys = ['target', 'selector', 'tokenizers', 'detokenizers', 'diff']
-  pass_through_keys = ['tokenizers', 'detokenizers', 'selector']
+  slot_keys = ['strings', 'selector', 'tokenizers', 'detokenizers', 'max_len', 'cache']
+  tube_keys = ['target', 'selector', 'tokenizers', 'detokenizers', 'diff', 'cache']
+  pass_through_keys = ['tokenizers', 'detokenizers', 'selector', 'cache']
 
-  def _pour(self, strings, selector, tokenizers, max_len, detokenizers):
+  def _pour(self, strings, selector, tokenizers, max_len, detokenizers, cache):
     """Execute the Tokenize tank (operation) in the pour (forward) direction.
 
     Parameters
@@ -170,6 +250,8 @@ class MultiTokenize(ta.Tank):
       Function which takens in a list of tokens and returns a string. Not strictly necessary but it makes the tube 'diff' much smaller if it's close to the real method of detokenizing.
     max_len: int
       The maximum number of tokens. Defines the size of the added dimension.
+    cache: LRUCache or None
+      A cache of the tokens and diffs of previously seen strings, so that repeated strings are only tokenized once. Should only be shared between tanks with the same tokenizers, detokenizers and max_len.
 
     Returns
     -------
@@ -182,6 +264,8 @@ class MultiTokenize(ta.Tank):
         Function which takens in a list of tokens and returns a string. Not strictly necessary but it makes the tube 'diff' much smaller if it's close to the real method of detokenizing.
       diff: np.ndarray of strings
         The array of strings which define the differences between the original string and the string that has been tokenized then detokenized.
+      cache: LRUCache or None
+        A cache of the tokens and diffs of previously seen strings, so that repeated strings are only tokenized once. Should only be shared between tanks with the same tokenizers, detokenizers and max_len.
     )
 
     """
@@ -195,47 +279,35 @@ class MultiTokenize(ta.Tank):
     # print detokenizer('I went on a run yesterday. I saw a bird and it was magnificent. I hope to see one again tomorrow.')
     # Handle the empty array case
     if not strings.size:
-      return {'target': ut.maybe_copy(strings), 'selector': ut.maybe_copy(selector), 'diff': ut.maybe_copy(strings), 'tokenizers': tokenizers, 'detokenizers': detokenizers}
-
-    all_tokens = []
-    all_diffs = []
-
-    lengths = []
-    for string, language in zip(strings.flatten(), selector.flatten()):
-      # Tokenize the string, and regularize the length of the array by padding
-      # with '' to fill out the array if it's too small or truncated if it's
-      # too long.
-      tokenizer = tokenizers[language]
-      tokens = np.array(tokenizer(string))
-      lengths.append(len(tokens))
-      if tokens.size < max_len:
-        num = max_len - tokens.size
-        tokens = np.concatenate([tokens, np.full([num], '')])
-      else:
-        tokens = tokens[:max_len]
-
-      all_tokens.append(tokens)
-      # Detokenize the tokens and reconstruct the orignal string from the
-      # diff_string
-      detokenizer = detokenizers[language]
-      processed = detokenizer(tokens)
-      diff = di.get_diff_string(processed, string)
-      all_diffs.append(np.array(diff, dtype=np.unicode))
-
-    # Combine all the tokens arrays into a single array and reshape to the
-    # shape of the original strings array with an additional dimesion of size
-    # max_len.
-    token_array = np.stack(all_tokens)
-    target = np.reshape(token_array, list(strings.shape) + [max_len])
+      return {'target': ut.maybe_copy(strings), 'selector': ut.maybe_copy(selector), 'diff': ut.maybe_copy(strings), 'tokenizers': tokenizers, 'detokenizers': detokenizers, 'cache': cache}
+
+    flat_strings = strings.flatten()
+    flat_selector = selector.flatten()
+
+    # Tokenize all the strings of each language together, and then put the
+    # results back in their original order.
+    all_tokens = [None] * strings.size
+    all_diffs = [None] * strings.size
+    for language in np.unique(flat_selector):
+      indices = np.where(flat_selector == language)[0]
+      lang_tokens, lang_diffs = _tokenize_strings(flat_strings[indices], tokenizers[language], detokenizers[language], max_len, cache, language)
+      for index, tokens, diff in zip(indices, lang_tokens, lang_diffs):
+        all_tokens[index] = tokens
+        all_diffs[index] = diff
+
+    # Fill all the tokens into a single array and reshape to the shape of the
+    # original strings array with an additional dimesion of size max_len.
+    target = _fill_tokens(all_tokens, max_len)
+    target = np.reshape(target, list(strings.shape) + [max_len])
 
     # Keep all the string diffs and reshape it to match the original strings
     # array shape.
-    diff_array = np.stack(all_diffs)
-    diff = np.reshape(diff_array, strings.shape)
+    diff = np.array(all_diffs, dtype=np.unicode)
+    diff = np.reshape(diff, strings.shape)
 
-    return {'target': target, 'diff': diff, 'tokenizers': tokenizers, 'detokenizers': detokenizers, 'selector': selector}
+    return {'target': target, 'diff': diff, 'tokenizers': tokenizers, 'detokenizers': detokenizers, 'selector': selector, 'cache': cache}
 
-  def _pump(self, target, selector, diff, tokenizers, detokenizers):
+  def _pump(self, target, selector, diff, tokenizers, detokenizers, cache):
     """Execute the Tokenize tank (operation) in the pump (backward) direction.
 
     Parameters
@@ -248,6 +320,8 @@ class MultiTokenize(ta.Tank):
       Function which takens in a list of tokens and returns a string. Not strictly necessary but it makes the tube 'diff' much smaller if it's close to the real method of detokenizing.
     diff: np.ndarray of strings
       The array of strings which define the differences between the original string and the string that has been tokenized then detokenized.
+    cache: LRUCache or None
+      A cache of the tokens and diffs of previously seen strings, so that repeated strings are only tokenized once. Should only be shared between tanks with the same tokenizers, detokenizers and max_len.
 
     Returns
     -------
@@ -260,6 +334,8 @@ class MultiTokenize(ta.Tank):
         Function which takens in a list of tokens and returns a string. Not strictly necessary but it makes the tube 'diff' much smaller if it's close to the real method of detokenizing.
       max_len: int
         The maximum number of tokens. Defines the size of the added dimension.
+      cache: LRUCache or None
+        A cache of the tokens and diffs of previously seen strings, so that repeated strings are only tokenized once. Should only be shared between tanks with the same tokenizers, detokenizers and max_len.
     )
 
     """
@@ -279,4 +355,4 @@ class MultiTokenize(ta.Tank):
 
     # Reshape to the original shape.
     strings = np.reshape(all_strings, target.shape[:-1])
-    return {'strings': strings, 'selector': selector,  'tokenizers': tokenizers, 'max_len': max_len, 'detokenizers': detokenizers}
+    return {'strings': strings, 'selector': selector,  'tokenizers': tokenizers, 'max_len': max_len, 'detokenizers': detokenizers, 'cache': cache}
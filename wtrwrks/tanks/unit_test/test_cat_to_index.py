@@ -1,6 +1,8 @@
 import unittest
 import wtrwrks.utils.test_helpers as th
 import wtrwrks.tanks.tank_defs as td
+import wtrwrks.waterworks.waterwork as wa
+import wtrwrks.utils.vocab as vo
 import numpy as np
 
 
@@ -57,5 +59,105 @@ class TestCatToIndex(th.TestTank):
       type_dict={'cats': np.ndarray, 'cat_to_index_map': dict}
     )
 
+  def test_nan_and_long_missing(self):
+    cat_to_index_map = {1.: 0, np.nan: 1}
+    self.pour_pump(
+      td.cat_to_index,
+      {'cats': np.array([[1., np.nan], [np.nan, 5.]]), 'cat_to_index_map': cat_to_index_map},
+      {
+        'target': np.array([[0, 1], [1, -1]]),
+        'missing_vals': [[0., 0.], [0., 5.]],
+        'cat_to_index_map': cat_to_index_map,
+        'input_dtype': np.float64
+      },
+      type_dict={'cats': np.ndarray, 'cat_to_index_map': dict}
+    )
+
+    cat_to_index_map = {'a': 0, 'b': 1}
+    self.pour_pump(
+      td.cat_to_index,
+      {'cats': np.array([['a', 'None'], ['b', 'a']]), 'cat_to_index_map': cat_to_index_map},
+      {
+        'target': np.array([[0, -1], [1, 0]]),
+        'missing_vals': [['', 'None'], ['', '']],
+        'cat_to_index_map': cat_to_index_map,
+        'input_dtype': np.array([['None']]).dtype
+      },
+      type_dict={'cats': np.ndarray, 'cat_to_index_map': dict}
+    )
+
+  def test_sparse(self):
+    cat_to_index_map = {'a': 0, 'b': 1, 'c': 2, 'd': 3}
+    self.pour_pump(
+      td.sparse_cat_to_index,
+      {'cats': np.array([['a', 'b'], ['c', 'd'], ['e', 'f'], ['a', 'None']]), 'cat_to_index_map': cat_to_index_map},
+      {
+        'target': np.array([[0, 1], [2, 3], [-1, -1], [0, -1]]),
+        'missing_vals': np.array(['e', 'f', 'None']),
+        'missing_indices': np.array([4, 5, 7]),
+        'cat_to_index_map': cat_to_index_map,
+        'input_dtype': np.array(['None']).dtype
+      },
+      type_dict={'cats': np.ndarray, 'cat_to_index_map': dict}
+    )
+
+    cat_to_index_map = {1.: 0, 2.: 1}
+    self.pour_pump(
+      td.sparse_cat_to_index,
+      {'cats': np.array([1., np.nan, 2., 5.]), 'cat_to_index_map': cat_to_index_map},
+      {
+        'target': np.array([0, -1, 1, -1]),
+        'missing_vals': np.array([np.nan, 5.]),
+        'missing_indices': np.array([1, 3]),
+        'cat_to_index_map': cat_to_index_map,
+        'input_dtype': np.float64
+      },
+      type_dict={'cats': np.ndarray, 'cat_to_index_map': dict}
+    )
+
+  def test_mixed_keys(self):
+    # The string '1' isn't the int 1, so it's a missing value.
+    cat_to_index_map = {1: 0, 'a': 1}
+    self.pour_pump(
+      td.sparse_cat_to_index,
+      {'cats': np.array(['1', 'a', 'z']), 'cat_to_index_map': cat_to_index_map},
+      {
+        'target': np.array([-1, 1, -1]),
+        'missing_vals': np.array(['1', 'z']),
+        'missing_indices': np.array([0, 2]),
+        'cat_to_index_map': cat_to_index_map,
+        'input_dtype': np.array(['z']).dtype
+      },
+      type_dict={'cats': np.ndarray, 'cat_to_index_map': dict}
+    )
+
+  def test_lookup_cache(self):
+    # Maps with gaps in their indices only have their lookup built once.
+    cat_to_index_map = {'a': 0, 'b': 2}
+    with wa.Waterwork():
+      tubes, _ = td.cat_to_index(np.array(['a', 'b', 'c']), cat_to_index_map)
+    tank = tubes['target'].tank
+    lookup = tank._get_lookup(cat_to_index_map)
+    self.assertTrue(tank._get_lookup(cat_to_index_map) is lookup)
+
+    cat_to_index_map['c'] = 1
+    self.assertFalse(tank._get_lookup(cat_to_index_map) is lookup)
+    self.assertEqual(tank._get_lookup(cat_to_index_map).to_indices(np.array(['c']))[0].tolist(), [1])
+
+  def test_vocabulary(self):
+    vocab = vo.Vocabulary(['[UNK]', 'a', 'b'])
+    self.pour_pump(
+      td.sparse_cat_to_index,
+      {'cats': np.array([['a', 'b'], ['c', ''], ['b', 'long']]), 'cat_to_index_map': vocab},
+      {
+        'target': np.array([[1, 2], [-1, -1], [2, -1]]),
+        'missing_vals': np.array(['c', '', 'long']),
+        'missing_indices': np.array([2, 3, 5]),
+        'cat_to_index_map': vocab,
+        'input_dtype': np.array(['long']).dtype
+      },
+      type_dict={'cats': np.ndarray, 'cat_to_index_map': dict}
+    )
+
 if __name__ == "__main__":
     unittest.main()
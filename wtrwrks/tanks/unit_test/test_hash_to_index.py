@@ -0,0 +1,62 @@
+import unittest
+import wtrwrks.utils.test_helpers as th
+import wtrwrks.utils.array_functions as af
+import wtrwrks.tanks.tank_defs as td
+import numpy as np
+
+
+class TestHashToIndex(th.TestTank):
+  def test_two_d(self):
+    cats = np.array([['a', 'b'], ['c', ''], ['a', 'None']])
+    target = af.hash_to_buckets(cats, 10)
+
+    # The same values always land in the same buckets, and byte strings land
+    # in the same buckets as unicode ones.
+    self.assertEqual(target[0, 0], target[2, 0])
+    self.assertEqual(target[1, 1], -1)
+    self.assertTrue(((target[target != -1] >= 0) & (target[target != -1] < 10)).all())
+    self.assertTrue((af.hash_to_buckets(cats.astype(np.unicode), 10) == target).all())
+
+    self.pour_pump(
+      td.hash_to_index,
+      {'cats': cats, 'hash_buckets': 10},
+      {
+        'target': target,
+        'missing_vals': cats,
+        'hash_buckets': 10,
+        'input_dtype': cats.dtype
+      },
+      type_dict={'cats': np.ndarray, 'hash_buckets': int}
+    )
+
+  def test_sparse(self):
+    cats = np.array([['a', 'b'], ['c', ''], ['a', 'None']])
+    self.pour_pump(
+      td.sparse_hash_to_index,
+      {'cats': cats, 'hash_buckets': 10},
+      {
+        'target': af.hash_to_buckets(cats, 10),
+        'missing_vals': np.array(['a', 'b', 'c', 'a', 'None']),
+        'missing_indices': np.array([0, 1, 2, 4, 5]),
+        'hash_buckets': 10,
+        'input_dtype': cats.dtype
+      },
+      type_dict={'cats': np.ndarray, 'hash_buckets': int}
+    )
+
+    cats = np.array([1., np.nan, 2., 5.])
+    self.pour_pump(
+      td.sparse_hash_to_index,
+      {'cats': cats, 'hash_buckets': 7},
+      {
+        'target': af.hash_to_buckets(cats, 7),
+        'missing_vals': cats,
+        'missing_indices': np.array([0, 1, 2, 3]),
+        'hash_buckets': 7,
+        'input_dtype': np.float64
+      },
+      type_dict={'cats': np.ndarray, 'hash_buckets': int}
+    )
+
+if __name__ == "__main__":
+    unittest.main()
@@ -42,7 +42,7 @@ def basic_lemmatizer(string):
 class TestLemmatize(th.TestTank):
   def test_scalar(self):
     strings = "running"
-    diff = '[["i", 3, 3, "ning"]]'
+    diff = 'i3,3,4:ning'
     self.pour_pump(
       td.lemmatize,
       {
@@ -59,7 +59,7 @@ class TestLemmatize(th.TestTank):
 
   def test_one_d(self):
     lemmatizer = lambda s: s
-    diff = [['[]', '[]', '[]', '[]', '[]', '[]', '[]', '[]', '[]', '[]'], ['[]', '[]', '[]', '[]', '[]', '[]', '[]', '[]', '[]', '[]']]
+    diff = [['', '', '', '', '', '', '', '', '', ''], ['', '', '', '', '', '', '', '', '', '']]
     strings = np.array([[u'\u30c1\u30e9\u30b7', u'\u30fb', u'\u52e7\u8a98', u'\u5370\u5237', u'\u7269', u'\u306e', u'\u7121\u65ad', u'\u6295\u51fd', u'\u306f', u'\u4e00'], [u'\u3059\u307f\u307e\u305b', u'\u3093', u'\u304c', u'\u3001', u'\u3082\u3046', u'\u4e00', u'\u5ea6', u'\u3069\u304a\u9858\u3044', u'\u3057', u'\u307e\u3059']], dtype=np.unicode)
     target = np.array([[u'\u30c1\u30e9\u30b7', u'\u30fb', u'\u52e7\u8a98', u'\u5370\u5237', u'\u7269', u'\u306e', u'\u7121\u65ad', u'\u6295\u51fd', u'\u306f', u'\u4e00'], [u'\u3059\u307f\u307e\u305b', u'\u3093', u'\u304c', u'\u3001', u'\u3082\u3046', u'\u4e00', u'\u5ea6', u'\u3069\u304a\u9858\u3044', u'\u3057', u'\u307e\u3059']], dtype=np.unicode)
     self.pour_pump(
@@ -80,11 +80,11 @@ class TestLemmatize(th.TestTank):
 
     diff = [
       [
-        ['[]', '[["i", 0, 2, "is"]]', '[]', '[]', '[]', '[]', '[]', '[]', '[]', '[]'],
-        ['[]', '[]', '[]', '[["i", 2, 4, "s"]]', '[["i", 3, 3, "n"]]', '[]', '[]', '[]', '[]', '[]']],
+        ['', 'i0,2,2:is', '', '', '', '', '', '', '', ''],
+        ['', '', '', 'i2,4,1:s', 'i3,3,1:n', '', '', '', '', '']],
       [
-        ['[]', '[]', '[["i", 0, 2, "is"]]', '[]', '[]', '[]', '[]', '[]', '[]', '[]'],
-        ['[]', '[]', '[]', '[]', '[]', '[]', '[]', '[]', '[]', '[]']
+        ['', '', 'i0,2,2:is', '', '', '', '', '', '', ''],
+        ['', '', '', '', '', '', '', '', '', '']
       ]
     ]
 
@@ -113,5 +113,41 @@ class TestLemmatize(th.TestTank):
       test_type=False
     )
 
+  def test_repeated(self):
+    # Each distinct string should only be lemmatized once per pour, plus the
+    # call np.vectorize makes to find the output type.
+    lemmas = {'running': 'run', 'ran': 'run', 'runs': 'run'}
+    calls = []
+
+    def lemmatizer(string):
+      calls.append(string)
+      return lemmas.get(string, string)
+
+    strings = np.array([
+      ['running', 'ran', 'running'],
+      ['runs', 'running', 'run']
+    ])
+    diff = [
+      ['i3,3,4:ning', 'i1,2,1:a', 'i3,3,4:ning'],
+      ['i3,3,1:s', 'i3,3,4:ning', '']
+    ]
+    self.pour_pump(
+      td.lemmatize,
+      {
+        'strings': strings,
+        'lemmatizer': lemmatizer,
+      },
+      {
+        'target': [['run', 'run', 'run'], ['run', 'run', 'run']],
+        'diff': diff,
+        'lemmatizer': lemmatizer,
+      },
+      test_type=False
+    )
+    self.assertEqual(sorted(set(calls)), ['ran', 'run', 'running', 'runs'])
+
+    # The tank is poured twice by pour_pump.
+    self.assertEqual(len(calls), 2 * (4 + 1))
+
 if __name__ == "__main__":
     unittest.main()
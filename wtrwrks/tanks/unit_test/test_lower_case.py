@@ -8,7 +8,7 @@ import tinysegmenter
 class TestLowerCase(th.TestTank):
   def test_scalar(self):
     strings = "It is what it is."
-    diff = '[["i", 0, 1, "I"]]'
+    diff = 'i0,1,1:I'
     self.pour_pump(
       td.lower_case,
       {
@@ -26,7 +26,7 @@ class TestLowerCase(th.TestTank):
       u'チラシ・勧誘印刷物の無断投函は一切お断り',
       u'すみませんが、もう一度どお願いします。'
     ])
-    diff = ['[]', '[]']
+    diff = ['', '']
     self.pour_pump(
       td.lower_case,
       {
@@ -51,8 +51,8 @@ class TestLowerCase(th.TestTank):
       ]
     ])
     diff = [
-      ['[["i", 0, 1, "I"]]', '[["i", 0, 1, "W"], ["i", 10, 11, "B"]]'],
-      ['[["i", 0, 1, "T"], ["i", 37, 39, "OK"]]', '[["i", 0, 1, "D"]]']
+      ['i0,1,1:I', 'i0,1,1:Wi10,11,1:B'],
+      ['i0,1,1:Ti37,39,2:OK', 'i0,1,1:D']
     ]
 
     self.pour_pump(
@@ -67,5 +67,27 @@ class TestLowerCase(th.TestTank):
       test_type=False
     )
 
+  def test_repeated(self):
+    strings = np.array([
+      ["It", "it", "It"],
+      ["IT", "it", "It"]
+    ])
+    diff = [
+      ['i0,1,1:I', '', 'i0,1,1:I'],
+      ['i0,2,2:IT', '', 'i0,1,1:I']
+    ]
+
+    self.pour_pump(
+      td.lower_case,
+      {
+        'strings': strings,
+      },
+      {
+        'target': [['it', 'it', 'it'], ['it', 'it', 'it']],
+        'diff': diff,
+      },
+      test_type=False
+    )
+
 if __name__ == "__main__":
     unittest.main()
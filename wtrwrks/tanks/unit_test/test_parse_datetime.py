@@ -0,0 +1,73 @@
+import unittest
+import wtrwrks.utils.test_helpers as th
+import wtrwrks.tanks.tank_defs as td
+import numpy as np
+
+
+class TestParseDatetime(th.TestTank):
+
+  def test_iso(self):
+    a = np.array([['2019-01-01', '2019-01-02 10:30'], ['', '2019-01-03T10:30']])
+    target = np.array([['2019-01-01', '2019-01-02T10:30'], ['NaT', '2019-01-03T10:30']], dtype='datetime64[m]')
+    self.pour_pump(
+      td.parse_datetime,
+      {'a': a, 'input_format': None},
+      {
+        'target': target,
+        'input_format': None,
+        'input_dtype': a.dtype,
+        'diff': np.array([[u'', u'2019-01-02 10:30'], [u'', u'']])
+      },
+      test_type=False
+    )
+
+  def test_input_format(self):
+    a = np.array([['01/31/2019', '03/04/2019'], ['NaT', '1/31/2019']], dtype=np.object)
+    target = np.array([['2019-01-31', '2019-03-04'], ['NaT', '2019-01-31']], dtype='datetime64[us]')
+    self.pour_pump(
+      td.parse_datetime,
+      {'a': a, 'input_format': '%m/%d/%Y'},
+      {
+        'target': target,
+        'input_format': '%m/%d/%Y',
+        'input_dtype': a.dtype,
+        'diff': np.array([[u'', u''], [u'NaT', u'1/31/2019']])
+      },
+      test_type=False
+    )
+
+    # The format is detected, but the strings are written back out in ISO 8601
+    # so they all end up in the diff.
+    self.pour_pump(
+      td.parse_datetime,
+      {'a': a, 'input_format': None},
+      {
+        'target': target,
+        'input_format': None,
+        'input_dtype': a.dtype,
+        'diff': np.array([[u'01/31/2019', u'03/04/2019'], [u'NaT', u'1/31/2019']])
+      },
+      test_type=False
+    )
+
+    # Compact dates are all digits, so they mustn't be taken for ISO 8601
+    # years.
+    a = np.array(['20190131', '20190304', ''])
+    self.pour_pump(
+      td.parse_datetime,
+      {'a': a, 'input_format': None},
+      {
+        'target': np.array(['2019-01-31', '2019-03-04', 'NaT'], dtype='datetime64[us]'),
+        'input_format': None,
+        'input_dtype': a.dtype,
+        'diff': np.array([u'20190131', u'20190304', u''])
+      },
+      test_type=False
+    )
+
+    with self.assertRaises(ValueError):
+      td.parse_datetime(np.array(['2019-01-01', 'yesterday']), None)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,33 @@
+import unittest
+import wtrwrks.utils.test_helpers as th
+import wtrwrks.tanks.tank_defs as td
+import numpy as np
+
+
+class TestPiecewiseLinear(th.TestTank):
+  def test_one_d(self):
+    xp = np.array([0., 1., 3.])
+    fp = np.array([0., 0.5, 1.])
+    self.pour_pump(
+      td.piecewise_linear,
+      {'a': np.array([0., 0.5, 2., 3., 5., -1.]), 'xp': xp, 'fp': fp},
+      {'target': np.array([0., 0.25, 0.75, 1., 1.5, -0.5]), 'xp': xp, 'fp': fp},
+      type_dict={'a': np.ndarray, 'xp': np.ndarray, 'fp': np.ndarray}
+    )
+
+  def test_two_d(self):
+    xp = [np.array([0., 1.]), np.array([0., 10., 20.])]
+    fp = [np.array([0., 1.]), np.array([0., 0.9, 1.])]
+    self.pour_pump(
+      td.piecewise_linear,
+      {'a': np.array([[0.5, 5.], [1., 15.], [2., 20.]]), 'xp': xp, 'fp': fp},
+      {'target': np.array([[0.5, 0.45], [1., 0.95], [2., 1.]]), 'xp': xp, 'fp': fp},
+      type_dict={'a': np.ndarray, 'xp': list, 'fp': list}
+    )
+
+  def test_errors(self):
+    with self.assertRaises(ValueError):
+      td.piecewise_linear(np.array([1., 2.]), np.array([0., 0., 1.]), np.array([0., 0.5, 1.]))
+
+if __name__ == "__main__":
+    unittest.main()
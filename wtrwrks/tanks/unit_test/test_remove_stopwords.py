@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+import unittest
+import wtrwrks.utils.test_helpers as th
+import wtrwrks.tanks.tank_defs as td
+import wtrwrks.string_manipulations.ja_stopwords as jas
+import numpy as np
+
+
+class TestRemoveStopwords(th.TestTank):
+  def test_two_d(self):
+    stopwords = set(['the', 'a'])
+    self.pour_pump(
+      td.remove_stopwords,
+      {
+        'strings': np.array([['the', 'cat', 'sat', ''], ['a', 'dog', 'the', 'end'], ['', '', '', '']]),
+        'stopwords': stopwords
+      },
+      {
+        'target': np.array([['cat', 'sat', '', ''], ['dog', 'end', '', ''], ['', '', '', '']]),
+        'stopwords': stopwords,
+        'removed_vals': np.array(['the', 'a', 'the']),
+        'removed_indices': np.array([0, 4, 6]),
+      },
+      test_type=False
+    )
+
+  def test_ja(self):
+    # The bundled stopword sets mix utf-8 byte strings and unicode.
+    self.pour_pump(
+      td.remove_stopwords,
+      {
+        'strings': np.array([[[u'チラシ', u'の', u'無断', u'は']]]),
+        'stopwords': jas.stopwords
+      },
+      {
+        'target': np.array([[[u'チラシ', u'無断', u'', u'']]]),
+        'stopwords': jas.stopwords,
+        'removed_vals': np.array([u'の', u'は']),
+        'removed_indices': np.array([1, 3]),
+      },
+      test_type=False
+    )
+
+  def test_multi(self):
+    stopwords = {'en': set(['the']), 'ja': jas.stopwords}
+    self.pour_pump(
+      td.multi_remove_stopwords,
+      {
+        'strings': np.array([[u'the', u'の', u'cat'], [u'の', u'the', u'']]),
+        'stopwords': stopwords,
+        'selector': np.array([['en', 'en', 'en'], ['ja', 'ja', 'ja']])
+      },
+      {
+        'target': np.array([[u'の', u'cat', u''], [u'the', u'', u'']]),
+        'stopwords': stopwords,
+        'selector': np.array([['en', 'en', 'en'], ['ja', 'ja', 'ja']]),
+        'removed_vals': np.array([u'the', u'の']),
+        'removed_indices': np.array([0, 3]),
+      },
+      test_type=False
+    )
+
+if __name__ == "__main__":
+    unittest.main()
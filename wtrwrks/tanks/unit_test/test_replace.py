@@ -77,5 +77,41 @@ class TestReplace(th.TestTank):
       test_type=False
     )
 
+  def test_sparse(self):
+    self.pour_pump(
+      td.sparse_replace,
+      {
+        'a': np.array([[0, 1], [2, 3], [4, 5], [1, 0]]),
+        'mask': np.array([[0, 1], [1, 1], [0, 1], [1, 0]]).astype(bool),
+        'replace_with': np.array([6, 7, 6, 7, 6])
+      },
+      {
+        'target': np.array([[0, 6], [7, 6], [4, 7], [6, 0]]),
+        'mask': np.array([[0, 1], [1, 1], [0, 1], [1, 0]]).astype(bool),
+        'replaced_vals': np.array([1, 2, 3, 5, 1]),
+        'replaced_indices': np.array([1, 2, 3, 5, 6]),
+        'replace_with': np.array([6, 7, 6, 7, 6])
+      },
+      type_dict={'a': np.ndarray, 'mask': np.ndarray, 'replace_with': np.ndarray}
+    )
+
+    self.pour_pump(
+      td.sparse_replace,
+      {
+        'a': np.array([[u'a', u'b'], [u'cc', u'd'], [u'e', u'f']]),
+        'mask': np.array([False, True, False]),
+        'replace_with': np.array([u'z'])
+      },
+      {
+        'target': np.array([[u'a', u'b'], [u'z', u'z'], [u'e', u'f']]),
+        'mask': np.array([False, True, False]),
+        'replaced_vals': np.array([u'cc', u'd']),
+        'replaced_indices': np.array([2, 3]),
+        'replace_with': np.array([u'z'])
+      },
+      type_dict={'a': np.ndarray, 'mask': np.ndarray, 'replace_with': np.ndarray},
+      test_type=False
+    )
+
 if __name__ == "__main__":
     unittest.main()
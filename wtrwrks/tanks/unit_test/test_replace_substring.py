@@ -8,7 +8,7 @@ import tinysegmenter
 class TestReplaceSubstring(th.TestTank):
   def test_scalar(self):
     strings = np.array("It is what it is.")
-    diff = np.array('[["i", 6, 6, "what"]]')
+    diff = np.array('i6,6,4:what')
     old_substring = 'what'
     new_substring = ''
     self.pour_pump(
@@ -32,7 +32,7 @@ class TestReplaceSubstring(th.TestTank):
       u'チラシ・勧誘印刷物の無断投函は一切お断り',
       u'すみませんが、もう一度どお願いします。'
     ])
-    diff = ['[]', '[]']
+    diff = ['', '']
     old_substring = u'ー'
     new_substring = 'bamboozle'
     self.pour_pump(
@@ -63,8 +63,8 @@ class TestReplaceSubstring(th.TestTank):
       ]
     ])
     diff = [
-      ['[["i", 3, 12, "is"], ["i", 21, 30, "is"]]', '[]'],
-      ['[["i", 8, 17, "is"]]', '[]']
+      ['i3,12,2:isi21,30,2:is', ''],
+      ['i8,17,2:is', '']
     ]
     old_substring = 'is'
     new_substring = 'bamboozle'
@@ -84,5 +84,30 @@ class TestReplaceSubstring(th.TestTank):
       test_type=False
     )
 
+  def test_repeated(self):
+    strings = np.array([
+      ['a-b', 'a-b', 'c'],
+      ['a-b-c', 'a-b', 'c']
+    ])
+    diff = [
+      ['i1,1,1:-', 'i1,1,1:-', ''],
+      ['i1,1,1:-i2,2,1:-', 'i1,1,1:-', '']
+    ]
+    self.pour_pump(
+      td.replace_substring,
+      {
+        'strings': strings,
+        'old_substring': '-',
+        'new_substring': ''
+      },
+      {
+        'target': [['ab', 'ab', 'c'], ['abc', 'ab', 'c']],
+        'diff': diff,
+        'old_substring': '-',
+        'new_substring': ''
+      },
+      test_type=False
+    )
+
 if __name__ == "__main__":
     unittest.main()
@@ -2,28 +2,44 @@
 import unittest
 import wtrwrks.utils.test_helpers as th
 import wtrwrks.tanks.tank_defs as td
+import wtrwrks.utils.lru_cache as lc
 import numpy as np
 import tinysegmenter
 
+
+class BatchTokenizer(object):
+  def __init__(self):
+    self.batches = []
+
+  def __call__(self, string):
+    return string.split()
+
+  def tokenize_batch(self, strings):
+    self.batches.append(list(strings))
+    return [string.split() for string in strings]
+
+
 class TestTokenize(th.TestTank):
   def test_scalar(self):
     tokenizer = lambda s: s.split()
     detokenizer = lambda a: ' '.join(a)
     strings = "It is what it is."
-    diff = '[["d", 17, 22, ""]]'
+    diff = 'd17,22,0:'
     self.pour_pump(
       td.tokenize,
       {
         'strings': strings,
         'tokenizer': tokenizer,
         'max_len': 10,
-        'detokenizer': detokenizer
+        'detokenizer': detokenizer,
+        'cache': None
       },
       {
         'target': ['It', 'is', 'what', 'it', 'is.', '', '', '', '', ''],
         'diff': diff,
         'tokenizer': tokenizer,
-        'detokenizer': detokenizer
+        'detokenizer': detokenizer,
+        'cache': None
       },
       test_type=False
     )
@@ -36,7 +52,7 @@ class TestTokenize(th.TestTank):
       u'チラシ・勧誘印刷物の無断投函は一切お断り',
       u'すみませんが、もう一度どお願いします。'
     ])
-    diff = ['[["i", 16, 16, "\\u5207\\u304a\\u65ad\\u308a"]]', '[["i", 18, 18, "\\u3002"]]']
+    diff = [u'i16,16,4:\u5207\u304a\u65ad\u308a', u'i18,18,1:\u3002']
     target = [[u'\u30c1\u30e9\u30b7', u'\u30fb', u'\u52e7\u8a98', u'\u5370\u5237', u'\u7269', u'\u306e', u'\u7121\u65ad', u'\u6295\u51fd', u'\u306f', u'\u4e00'], [u'\u3059\u307f\u307e\u305b', u'\u3093', u'\u304c', u'\u3001', u'\u3082\u3046', u'\u4e00', u'\u5ea6', u'\u3069\u304a\u9858\u3044', u'\u3057', u'\u307e\u3059']]
     self.pour_pump(
       td.tokenize,
@@ -44,13 +60,15 @@ class TestTokenize(th.TestTank):
         'strings': strings,
         'tokenizer': tokenizer,
         'max_len': 10,
-        'detokenizer': detokenizer
+        'detokenizer': detokenizer,
+        'cache': None
       },
       {
         'target': target,
         'diff': diff,
         'tokenizer': tokenizer,
-        'detokenizer': detokenizer
+        'detokenizer': detokenizer,
+        'cache': None
       },
       test_type=False
     )
@@ -69,8 +87,8 @@ class TestTokenize(th.TestTank):
       ]
     ])
     diff = [
-      ['[["d", 17, 22, ""]]', '[["d", 42, 45, ""]]'],
-      ['[["d", 40, 42, ""]]', '[["i", 50, 50, " blows."]]']
+      ['d17,22,0:', 'd42,45,0:'],
+      ['d40,42,0:', 'i50,50,7: blows.']
     ]
 
     target = np.array(
@@ -89,13 +107,111 @@ class TestTokenize(th.TestTank):
         'strings': strings,
         'tokenizer': tokenizer,
         'max_len': 10,
-        'detokenizer': detokenizer
+        'detokenizer': detokenizer,
+        'cache': None
       },
       {
         'target': target,
         'diff': diff,
         'tokenizer': tokenizer,
-        'detokenizer': detokenizer
+        'detokenizer': detokenizer,
+        'cache': None
+      },
+      test_type=False
+    )
+
+  def test_cache(self):
+    tokenizer = lambda s: s.split()
+    detokenizer = lambda a: ' '.join(a)
+    cache = lc.LRUCache(max_size=10)
+    strings = np.array([
+      ["It is.", "It is."],
+      ["It is  what", "It is."]
+    ])
+    self.pour_pump(
+      td.tokenize,
+      {
+        'strings': strings,
+        'tokenizer': tokenizer,
+        'max_len': 3,
+        'detokenizer': detokenizer,
+        'cache': cache
+      },
+      {
+        'target': [[['It', 'is.', ''], ['It', 'is.', '']], [['It', 'is', 'what'], ['It', 'is.', '']]],
+        'diff': [['d6,7,0:', 'd6,7,0:'], ['i6,6,1: ', 'd6,7,0:']],
+        'tokenizer': tokenizer,
+        'detokenizer': detokenizer,
+        'cache': cache
+      },
+      test_type=False
+    )
+
+    # Each distinct string is only looked up once per pour, and only tokenized
+    # in the first (eager) pour.
+    self.assertEqual(cache.get_metrics(), {'hits': 2, 'misses': 2, 'evictions': 0, 'hit_rate': 0.5, 'size': 2})
+
+  def test_multi(self):
+    en_tokenizer = BatchTokenizer()
+    tokenizers = {'en': en_tokenizer, 'ja': lambda s: list(s)}
+    detokenizers = {'en': lambda a: ' '.join(a), 'ja': lambda a: ''.join(a)}
+    strings = np.array([
+      [u"It is.", u"\u3042\u3044"],
+      [u"\u3046", u"It is."]
+    ])
+    selector = np.array([
+      ['en', 'ja'],
+      ['ja', 'en']
+    ])
+    self.pour_pump(
+      td.multi_tokenize,
+      {
+        'strings': strings,
+        'selector': selector,
+        'tokenizers': tokenizers,
+        'max_len': 3,
+        'detokenizers': detokenizers,
+        'cache': None
+      },
+      {
+        'target': [[[u'It', u'is.', u''], [u'\u3042', u'\u3044', u'']], [[u'\u3046', u'', u''], [u'It', u'is.', u'']]],
+        'diff': [[u'd6,7,0:', u''], [u'', u'd6,7,0:']],
+        'selector': selector,
+        'tokenizers': tokenizers,
+        'detokenizers': detokenizers,
+        'cache': None
+      },
+      test_type=False
+    )
+
+    # The distinct english strings are handed to the tokenizer in a single
+    # batch on each pour.
+    self.assertEqual(en_tokenizer.batches, [[u"It is."], [u"It is."]])
+
+  def test_flat(self):
+    tokenizer = lambda s: s.split()
+    detokenizer = lambda a: ' '.join(a)
+    strings = np.array([
+      ["a  b", "c"],
+      ["g", "d e f"]
+    ])
+    self.pour_pump(
+      td.flat_tokenize,
+      {
+        'strings': strings,
+        'ids': np.array([[1, 2], [3, 4]]),
+        'tokenizer': tokenizer,
+        'detokenizer': detokenizer,
+        'cache': None
+      },
+      {
+        'target': ['a', 'b', 'c', 'g', 'd', 'e', 'f'],
+        'diff': ['i2,2,1: ', 'i2,2,1: ', '', '', '', '', ''],
+        'ids': [1, 1, 2, 3, 4, 4, 4],
+        'shape': (2, 2),
+        'tokenizer': tokenizer,
+        'detokenizer': detokenizer,
+        'cache': None
       },
       test_type=False
     )
@@ -1,4 +1,5 @@
 """Simple functions that help out in tank definitions."""
+import wtrwrks.string_manipulations.diff as di
 import copy
 import numpy as np
 
@@ -25,3 +26,92 @@ def maybe_copy(a):
     return copy.copy(a)
 
   return a
+
+
+def unique_inverse(*arrays):
+  """Find the distinct elements of an array, or the distinct tuples of elements of several arrays of the same shape, so that an elementwise operation only needs to be run once per distinct value. The results can be scattered back out to the full array with result[inverse].reshape(shape).
+
+  Parameters
+  ----------
+  *arrays : np.ndarrays
+    The arrays, all of the same shape.
+
+  Returns
+  -------
+  uniques : list of np.ndarrays
+    The elements of each distinct tuple, one rank 1 array for each of the inputted arrays.
+  inverse : np.ndarray of ints
+    The index of the distinct tuple for each element of the flattened arrays.
+
+  """
+  arrays = [np.asarray(a) for a in arrays]
+  if len(arrays) == 1:
+    uniques, inverse = np.unique(arrays[0], return_inverse=True)
+    return [uniques], inverse
+
+  # Give each tuple a single integer key made from the indices of its elements
+  # in the distinct values of each array.
+  all_uniques = []
+  keys = np.zeros(arrays[0].size, dtype=np.int64)
+  for a in arrays:
+    uniques, inverse = np.unique(a, return_inverse=True)
+    keys = keys * max(uniques.size, 1) + inverse
+    all_uniques.append(uniques)
+
+  keys, inverse = np.unique(keys, return_inverse=True)
+
+  # Decode the keys back into the distinct elements of each array.
+  uniques = []
+  for a_uniques in reversed(all_uniques):
+    size = max(a_uniques.size, 1)
+    uniques.append(a_uniques[keys % size])
+    keys = keys // size
+  uniques.reverse()
+
+  return uniques, inverse
+
+
+def diff_transform(strings, func):
+  """Run an elementwise string transformation along with the diff strings needed to undo it. Since arrays of strings tend to be full of repeats, the transformation and the diff are only done once per distinct string and the results scattered back out.
+
+  Parameters
+  ----------
+  strings : np.ndarray of strs
+    The strings to transform.
+  func : func
+    Function which takes in the array of distinct strings and returns the array of transformed strings.
+
+  Returns
+  -------
+  target : np.ndarray of strs
+    The transformed strings.
+  diff : np.ndarray of strs
+    The diff strings which turn the transformed strings back into the originals.
+
+  """
+  strings = np.asarray(strings)
+  (uniques,), inverse = unique_inverse(strings)
+  target = func(uniques)
+  diff = di.get_diff_strings(target, uniques)
+  return target[inverse].reshape(strings.shape), diff[inverse].reshape(strings.shape)
+
+
+def diff_reconstruct(target, diff):
+  """Undo a diff_transform, reconstructing each distinct pair of transformed string and diff string only once.
+
+  Parameters
+  ----------
+  target : np.ndarray of strs
+    The transformed strings.
+  diff : np.ndarray of strs
+    The diff strings which turn the transformed strings back into the originals.
+
+  Returns
+  -------
+  np.ndarray of strs
+    The original strings.
+
+  """
+  (target_uniques, diff_uniques), inverse = unique_inverse(target, diff)
+  strings = di.reconstruct_strings(target_uniques, diff_uniques)
+  return strings[inverse].reshape(np.shape(target))
@@ -3,6 +3,8 @@ import transform as n
 from wtrwrks.waterworks.empty import empty
 import wtrwrks.tanks.tank_defs as td
 import wtrwrks.read_write.tf_features as feat
+import wtrwrks.utils.accumulators as acc
+import wtrwrks.utils.array_functions as af
 import numpy as np
 import logging
 import tensorflow as tf
@@ -23,8 +25,18 @@ class CatTransform(n.Transform):
     How to normalize the data. Subtracting out the mean and dividing by the standard deviation or leaving as is.
   norm_axis : 0, 1, or None
     In the case that 'norm_mode' has a non None value, what axis should be used for the normalization. None implies both 0 and 1.
-  index_to_cat_val : list
-    The mapping from index number to category value.
+  index_to_cat_val : list or None
+    The mapping from index number to category value. If None, the category values are learned from the data during calc_global_values.
+  max_categories : int or None
+    When learning the category values, the maximum number of (most frequent) category values to keep. None implies all of them.
+  min_count : int
+    When learning the category values, the minimum number of times a category value must appear to be kept.
+  max_tracked_cat_vals : int or None
+    When learning the category values, the maximum number of distinct values to hold exact counts for per column. Past this the counts fall back to a heavy hitters summary, which keeps memory bounded but makes the counts of the rarer values approximate. None implies no limit.
+  index_only : bool
+    Whether or not to only output the indices (and missing values) rather than the one hots as well. The (normalized) one hots are rebuilt from the indices when the examples are read into tensorflow, or can be dropped in favor of an embedding of the indices.
+  hash_buckets : int or None
+    If set, the category values are mapped to indices by hashing them into this many buckets rather than looking them up in index_to_cat_val, so no category values are learned or stored. All the category values are kept in the 'missing_vals' so that they can still be reconstructed exactly.
 
   Attributes
   ----------
@@ -47,13 +59,13 @@ class CatTransform(n.Transform):
 
   """
 
-  attribute_dict = {'norm_mode': None, 'norm_axis': 0, 'name': '', 'mean': None, 'std': None, 'dtype': np.float64, 'index_to_cat_val': None, 'cat_val_to_index': None}
+  attribute_dict = {'norm_mode': None, 'norm_axis': 0, 'name': '', 'mean': None, 'std': None, 'dtype': np.float64, 'index_to_cat_val': None, 'cat_val_to_index': None, 'max_categories': None, 'min_count': 1, 'max_tracked_cat_vals': 1000000, 'index_only': False, 'hash_buckets': None}
   for k, v in n.Transform.attribute_dict.iteritems():
     if k in attribute_dict:
       continue
     attribute_dict[k] = v
 
-  required_params = set(['index_to_cat_val'])
+  required_params = set([])
   required_params.update(n.Transform.required_params)
 
   def __init__(self, from_file=None, save_dict=None, **kwargs):
@@ -75,8 +87,18 @@ class CatTransform(n.Transform):
       How to normalize the data. Subtracting out the mean and dividing by the standard deviation or leaving as is.
     norm_axis : 0, 1, or None
       In the case that 'norm_mode' has a non None value, what axis should be used for the normalization. None implies both 0 and 1.
-    index_to_cat_val : list
-      The mapping from index number to category value.
+    index_to_cat_val : list or None
+      The mapping from index number to category value. If None, the category values are learned from the data during calc_global_values.
+    max_categories : int or None
+      When learning the category values, the maximum number of (most frequent) category values to keep. None implies all of them.
+    min_count : int
+      When learning the category values, the minimum number of times a category value must appear to be kept.
+    max_tracked_cat_vals : int or None
+      When learning the category values, the maximum number of distinct values to hold exact counts for per column. Past this the counts fall back to a heavy hitters summary, which keeps memory bounded but makes the counts of the rarer values approximate. None implies no limit.
+    index_only : bool
+      Whether or not to only output the indices (and missing values) rather than the one hots as well. The (normalized) one hots are rebuilt from the indices when the examples are read into tensorflow, or can be dropped in favor of an embedding of the indices.
+    hash_buckets : int or None
+      If set, the category values are mapped to indices by hashing them into this many buckets rather than looking them up in index_to_cat_val, so no category values are learned or stored. All the category values are kept in the 'missing_vals' so that they can still be reconstructed exactly.
     **kwargs :
       The keyword arguments that set the values of the attributes defined in the attribute_dict.
 
@@ -84,7 +106,7 @@ class CatTransform(n.Transform):
     super(CatTransform, self).__init__(from_file, save_dict, **kwargs)
 
     # Check index to cat value are all unique.
-    if len(self.index_to_cat_val) != len(set(self.index_to_cat_val)):
+    if self.index_to_cat_val is not None and len(self.index_to_cat_val) != len(set(self.index_to_cat_val)):
       raise ValueError("All elements of index_to_cat_val must be unique")
 
     # Ensure a valid norm mode was passed
@@ -97,9 +119,21 @@ class CatTransform(n.Transform):
     if self.norm_axis not in valid_norm_axis:
       raise ValueError("{} is an invalid norm_axis. Accepted norm axes are ".format(self.norm_mode, valid_norm_axis))
 
+    # The statistics of learned category values are built from per column
+    # counts, which can't give per row statistics.
+    if self.index_to_cat_val is None and self.hash_buckets is None and self.norm_mode == 'mean_std' and self.norm_axis == 1:
+      raise ValueError("norm_axis 1 is not supported when learning index_to_cat_val from the data.")
+
+    # Per row statistics can't be applied to one hots rebuilt one example at
+    # a time.
+    if self.index_only and self.norm_mode == 'mean_std' and self.norm_axis == 1:
+      raise ValueError("norm_axis 1 is not supported with index_only.")
+
   def __len__(self):
     """Get the length of the transformed data"""
     # assert self.is_calc_run, ("Must run calc_global_values before taking the len.")
+    if self.hash_buckets is not None:
+      return self.hash_buckets
     return len(self.index_to_cat_val)
 
   def _calc_global_values(self, array):
@@ -116,68 +150,107 @@ class CatTransform(n.Transform):
     else:
       array = np.array(array, dtype=self.input_dtype)
 
-    batch_size = float(array.shape[0])
-    total_examples = self.num_examples + batch_size
-
-    if self.norm_mode == 'mean_std':
-      if not len(self.index_to_cat_val):
-        raise ValueError("index_to_cat_val has no valid values.")
-
-      # Find all the category values which are not known
-      valid_cats = np.isin(array, self.index_to_cat_val)
-      array = np.array(array, copy=True)
-
-      # Replace the unknown category values with some default value.
-      default_val = self.index_to_cat_val[0]
-      if isinstance(default_val, float) and np.isnan(default_val):
-        default_val = self.index_to_cat_val[1]
-      array[~valid_cats] = default_val
-
-      one_hots = np.zeros(list(array.shape) + [len(self.index_to_cat_val)], dtype=np.float64)
-
-      # Convert the category values to indices, using the cat_vat_to_index.
-      indices = np.vectorize(self.cat_val_to_index.get)(array)
-
-      # Generate all the indices of the 'indices' array. i.e. one_hot_indices is
-      # equal to something like (0, 0...0), (0, 0 ... 1)... (n1, n2... nk).
-      # Where n1..nk are the size of each dimension of 'indices'. Then append
-      # the corresponding value from 'indices' to get the full location of where
-      # a 1 should be in the one_hots array.
-      one_hot_indices = np.unravel_index(np.arange(indices.size, dtype=np.int32), indices.shape)
-      one_hot_indices = tuple(list(one_hot_indices) + [indices.flatten()])
-
-      # Set all the proper locations to 1. And then undo the setting of the
-      # not valid categories.
-      # one_hot_indices = np.array(one_hot_indices, dtype=np.int32)
-      one_hots[one_hot_indices] = 1
-      one_hots[~valid_cats] = 0
-
-      # Get the mean and standard deviation of the one_hots.
-      if self.mean is None:
-        self.mean = np.mean(one_hots, axis=self.norm_axis)
-        self.var = np.var(one_hots, axis=self.norm_axis)
+    if self.cat_val_counts is not None:
+      # Learning the category values, so just count up the values in each
+      # column.
+      if not self.cat_val_counts:
+        self.cat_val_counts = [acc.CountAccumulator(self.max_tracked_cat_vals) for _ in xrange(array.shape[1])]
+      for col_num, counts in enumerate(self.cat_val_counts):
+        counts.update(array[:, col_num])
+
+    elif self.norm_mode == 'mean_std':
+      if self.hash_buckets is not None:
+        indices = af.hash_to_buckets(array, self.hash_buckets)
       else:
-        self.mean = (self.num_examples / total_examples) * self.mean + (batch_size / total_examples) * np.mean(one_hots, axis=self.norm_axis)
-        self.var = (self.num_examples / total_examples) * self.mean + (batch_size / total_examples) * np.var(one_hots, axis=self.norm_axis)
+        if not len(self.index_to_cat_val):
+          raise ValueError("index_to_cat_val has no valid values.")
+
+        # Convert the category values to indices by only looking up the unique
+        # values, with -1 for unknown category values.
+        uniques, inverse = np.unique(array, return_inverse=True)
+        unique_indices = np.array([self.cat_val_to_index.get(u, -1) for u in uniques.tolist()], dtype=np.int64)
+        indices = unique_indices[inverse].reshape(array.shape)
+
+      # Add the moments of the one_hots to the running mean and variance,
+      # using only the counts of each index.
+      if self.norm_axis == 1:
+        row_counts = self._count_indices(indices.T)
+        self.moments.merge(acc.MomentAccumulator.from_counts(row_counts, indices.shape[1], self.norm_axis))
+      else:
+        col_counts = self._count_indices(indices)
+        self.moments.merge(self._moments_from_col_counts(col_counts, indices.shape[0]))
+
+    self.num_examples += array.shape[0]
+
+  def _count_indices(self, indices):
+    """Count the number of times each index appears in each column of a rank 2 array of indices, ignoring the -1's.
+
+    Parameters
+    ----------
+    indices : np.ndarray
+      The rank 2 array of indices.
+
+    Returns
+    -------
+    np.ndarray
+      The counts, with shape [number of columns, number of category values].
+
+    """
+    num_cats = len(self)
+    num_cols = indices.shape[1]
 
-    self.num_examples += batch_size
+    # Offset the indices of each column so they all get counted in a single
+    # bincount.
+    valid = indices != -1
+    flat = (indices + np.arange(num_cols, dtype=np.int64) * num_cats)[valid]
+    counts = np.bincount(flat, minlength=num_cols * num_cats)
+    return counts.reshape([num_cols, num_cats])
 
   def _finish_calc(self):
     """Finish up the calc global value process."""
-    if self.norm_mode == 'mean_std':
-      self.std = np.sqrt(self.var)
+    if self.cat_val_counts is not None:
+      self._finish_learning_cat_vals()
+    elif self.norm_mode == 'mean_std':
+      self.mean = self.moments.mean
+      self.std = np.sqrt(self.moments.var)
 
+    if self.norm_mode == 'mean_std':
       # If there are any standard deviations of 0, replace them with 1's,
       # print out a warning.
       if len(self.std[self.std == 0]):
         zero_std_cat_vals = []
-        for index in np.where(self.std == 0.0)[0]:
-          zero_std_cat_vals.append(self.index_to_cat_val[index])
+        for index in np.unique(np.where(self.std == 0.0)[-1]):
+          # Hashed category values can only be reported by their bucket.
+          zero_std_cat_vals.append(index if self.hash_buckets is not None else self.index_to_cat_val[index])
 
         logging.warn(self.name + " has zero-valued stds at " + str(zero_std_cat_vals) + " replacing with 1's")
 
         self.std[self.std == 0] = 1.0
 
+  def _finish_learning_cat_vals(self):
+    """Set index_to_cat_val from the counts of the category values, and the mean and standard deviation from the counts of the kept ones."""
+    total_counts = acc.CountAccumulator()
+    for counts in self.cat_val_counts:
+      total_counts.merge(counts)
+
+    self.index_to_cat_val = total_counts.most_common(self.max_categories, self.min_count)
+    if not self.index_to_cat_val:
+      raise ValueError("No category values of " + self.name + " appear at least min_count times.")
+
+    self.cat_val_to_index = {}
+    for index, cat_val in enumerate(self.index_to_cat_val):
+      self.cat_val_to_index[cat_val] = index
+
+    if self.norm_mode == 'mean_std':
+      col_counts = np.array([[counts.counts.get(cat_val, 0) for cat_val in self.index_to_cat_val] for counts in self.cat_val_counts], dtype=np.int64)
+      moments = self._moments_from_col_counts(col_counts, self.num_examples)
+      self.mean = moments.mean
+      self.std = np.sqrt(moments.var)
+
+  def _get_calc_state(self):
+    """Get the partial global values calculated so far, in a form that can be merged with those calculated from other chunks of the data by _merge_calc_state."""
+    return {'num_examples': self.num_examples, 'moments': self.moments, 'cat_val_counts': self.cat_val_counts}
+
   def _get_array_attributes(self, prefix=''):
     """Get the dictionary that contain the original shapes of the arrays before being converted into tfrecord examples.
 
@@ -193,21 +266,28 @@ class CatTransform(n.Transform):
 
     """
     att_dict = {}
+    # Missing values are almost always the default value, so only store the
+    # ones that aren't.
     att_dict['missing_vals'] = {
       'shape': [len(self.cols)],
       'tf_type': feat.select_tf_dtype(self.input_dtype),
       'size': feat.size_from_shape([len(self.cols)]),
-      'feature_func': feat.select_feature_func(self.input_dtype),
-      'np_type': self.input_dtype
-    }
-    one_hots_shape = [len(self.cols)] + [len(self.index_to_cat_val)]
-    att_dict['one_hots'] = {
-      'shape': one_hots_shape,
-      'tf_type': feat.select_tf_dtype(self.dtype),
-      'size': feat.size_from_shape(one_hots_shape),
-      'feature_func': feat.select_feature_func(self.dtype),
-      'np_type': self.dtype
+      'feature_func': feat.select_sparse_feature_func(self.input_dtype),
+      'np_type': self.input_dtype,
+      'sparse': True,
+      'default_val': feat.select_default_val(self.input_dtype)
     }
+    if self.sparse_missing_vals:
+      att_dict['missing_vals']['tap_indices_key'] = self._pre('missing_indices', prefix)
+    if not self.index_only:
+      one_hots_shape = [len(self.cols)] + [len(self)]
+      att_dict['one_hots'] = {
+        'shape': one_hots_shape,
+        'tf_type': feat.select_tf_dtype(self.dtype),
+        'size': feat.size_from_shape(one_hots_shape),
+        'feature_func': feat.select_feature_func(self.dtype),
+        'np_type': self.dtype
+      }
     att_dict['indices'] = {
       'shape': [len(self.cols)],
       'tf_type': tf.int64,
@@ -215,19 +295,106 @@ class CatTransform(n.Transform):
       'feature_func': feat._int_feat,
       'np_type': np.int64
     }
+    # Indices run from -1 (missing) to the number of categories.
+    self._narrow_array_attributes(att_dict['indices'], -1, len(self) - 1)
 
     att_dict = self._pre(att_dict, prefix)
     return att_dict
 
+  def _merge_calc_state(self, calc_state):
+    """Merge in the partial global values calculated from another chunk of the data.
+
+    Parameters
+    ----------
+    calc_state : dict
+      The partial global values, as outputted by _get_calc_state.
+
+    """
+    self.num_examples += calc_state['num_examples']
+    self.moments.merge(calc_state['moments'])
+
+    if self.cat_val_counts is not None:
+      for counts, other_counts in zip(self.cat_val_counts, calc_state['cat_val_counts']):
+        counts.merge(other_counts)
+
+  def _moments_from_col_counts(self, col_counts, num_rows):
+    """Get the moments of the one hots along norm_axis from the number of times each category value appears in each column.
+
+    Parameters
+    ----------
+    col_counts : np.ndarray
+      The counts, with shape [number of columns, number of category values].
+    num_rows : int
+      The number of rows the counts were taken over.
+
+    Returns
+    -------
+    MomentAccumulator
+      The moments of the one hots.
+
+    """
+    num_cols, num_cats = col_counts.shape
+    if self.norm_axis == 0:
+      return acc.MomentAccumulator.from_counts(col_counts, num_rows, self.norm_axis)
+    elif self.norm_axis == (0, 1):
+      return acc.MomentAccumulator.from_counts(col_counts.sum(axis=0), num_rows * num_cols, self.norm_axis)
+    return acc.MomentAccumulator.from_counts(col_counts.sum(), num_rows * num_cols * num_cats, self.norm_axis)
+
+  def _rebuild_features(self, features, prefix='', keep_features=None, drop_features=None):
+    """Add the (normalized) one hots to the tensors read from the examples, rebuilding them from the indices when only the indices were written.
+
+    Parameters
+    ----------
+    features : dict of tensors
+      The tensors read from the examples.
+    prefix : str
+      Any additional prefix string/dictionary keys start with. Defaults to no additional prefix.
+    keep_features : list of strs
+      The features that were kept after reading in from the tfrecords. Defaults to all of them.
+    drop_features : list of strs
+      The features that were dropped when reading from the tfrecords.
+
+    Returns
+    -------
+    features : dict of tensors
+      The tensors with the one hots added.
+
+    """
+    indices_key = self._pre('indices', prefix)
+    one_hots_key = self._pre('one_hots', prefix)
+    if not self.index_only or indices_key not in features:
+      return features
+    if keep_features is not None and one_hots_key not in keep_features:
+      return features
+    if drop_features is not None and one_hots_key in drop_features:
+      return features
+
+    # Missing values have index -1, which tf.one_hot turns into all zeros.
+    tf_dtype = tf.as_dtype(self.dtype)
+    one_hots = tf.one_hot(features[indices_key], len(self), dtype=tf_dtype)
+    if self.norm_mode == 'mean_std':
+      one_hots = (one_hots - tf.constant(self.mean, dtype=tf_dtype)) / tf.constant(self.std, dtype=tf_dtype)
+    features[one_hots_key] = one_hots
+
+    return features
+
   def _start_calc(self):
     """Start the calc global value process."""
     # Create the mapping from category values to index in the vector and
     # vice versa
     self.cat_val_to_index = {}
 
-    for unique_num, unique in enumerate(self.index_to_cat_val):
-      cat_val = self.index_to_cat_val[unique_num]
-      self.cat_val_to_index[cat_val] = unique_num
+    # If there are no category values yet, then they need to be learned, unless
+    # they're hashed.
+    self.cat_val_counts = None
+    if self.index_to_cat_val is not None:
+      for unique_num, unique in enumerate(self.index_to_cat_val):
+        cat_val = self.index_to_cat_val[unique_num]
+        self.cat_val_to_index[cat_val] = unique_num
+    elif self.hash_buckets is None:
+      self.cat_val_counts = []
+
+    self.moments = acc.MomentAccumulator(axis=self.norm_axis)
     self.num_examples = 0.
 
   def define_waterwork(self, array=empty, return_tubes=None, prefix=''):
@@ -244,13 +411,36 @@ class CatTransform(n.Transform):
       The waterwork with all the tanks (operations) added, and names set.
 
     """
-    # Convert the category values to indices.
-    cti, cti_slots = td.cat_to_index(
-      array, self.cat_val_to_index,
-      tube_plugs={'input_dtype': lambda z: self.input_dtype}
-    )
+    # Convert the category values to indices, either by hashing them or by
+    # looking them up.
+    if self.hash_buckets is not None:
+      hash_to_index = td.sparse_hash_to_index if self.sparse_missing_vals else td.hash_to_index
+      cti, cti_slots = hash_to_index(
+        array, self.hash_buckets,
+        tube_plugs={'input_dtype': lambda z: self.input_dtype}
+      )
+    else:
+      cat_to_index = td.sparse_cat_to_index if self.sparse_missing_vals else td.cat_to_index
+      cti, cti_slots = cat_to_index(
+        array, self.cat_val_to_index,
+        tube_plugs={'input_dtype': lambda z: self.input_dtype}
+      )
     cti_slots['cats'].set_name('array')
     cti['missing_vals'].set_name('missing_vals')
+    if self.sparse_missing_vals:
+      cti['missing_indices'].set_name('missing_indices')
+
+    # Only output the indices, the one hots get rebuilt from them when read.
+    if self.index_only:
+      cti['target'].set_name('indices')
+
+      if return_tubes is not None:
+        ww = cti['target'].waterwork
+        r_tubes = []
+        for r_tube_key in return_tubes:
+          r_tubes.append(ww.maybe_get_tube(r_tube_key))
+        return r_tubes
+      return
 
     # Clone the indices so that a copy of 'indices' can be outputted as a tap.
     cloned, _ = td.clone(cti['target'])
@@ -258,7 +448,7 @@ class CatTransform(n.Transform):
 
     # Convert the indices into one-hot vectors.
     one_hots, _ = td.one_hot(
-      cloned['b'], len(self.cat_val_to_index),
+      cloned['b'], len(self),
       tube_plugs={
         'missing_vals': lambda z: np.ones(z[self._pre('indices', prefix)].shape)*-2
       }
@@ -298,7 +488,7 @@ class CatTransform(n.Transform):
 
     """
     if var_lim is None:
-      if self.input_dtype in (np.dtype('U'), np.dtype('S'), np.dtype('O')):
+      if self.input_dtype in (np.dtype('U'), np.dtype('S'), np.dtype('O')) and self.hash_buckets is None:
         var_lim = 1
         for cat_val in self.index_to_cat_val:
           if len(cat_val) > var_lim:
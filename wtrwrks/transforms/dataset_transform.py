@@ -98,11 +98,7 @@ class DatasetTransform(tr.Transform):
       Some of the data that will be transformed.
 
     """
-    df = pd.DataFrame(
-      data=array,
-      index=range(array.shape[0]),
-      columns=self.cols
-    )
+    col_to_index = {col: index for index, col in enumerate(self.cols)}
     for key in self.transform_names:
       trans = self.transforms[key]
       cols = self.transform_cols[key]
@@ -113,16 +109,22 @@ class DatasetTransform(tr.Transform):
       self.transform_cols[key] = cols
       self.transforms[key].cols = cols
 
-      # Get the subarrays and cast them to valid dtypes.
-      subarray = df[cols].values
+      # Get the subarrays and cast them to valid dtypes. Pull the columns
+      # straight out of the array and only copy again if the dtype changes.
+      subarray = array[:, [col_to_index[col] for col in cols]]
       if trans.input_dtype is None:
         raise ValueError("Must explicitly set the input dtype if using the transform as part of a dataset_transform.")
-      subarray = subarray.astype(trans.input_dtype)
+      # Datetimes are left for the transform to parse, since it can do it
+      # once per distinct value.
+      if np.dtype(trans.input_dtype).kind != 'M':
+        subarray = subarray.astype(trans.input_dtype, copy=False)
 
       # Calculate the global values for this transform.
       self.transforms[key]._calc_global_values(subarray)
       self.transforms[key].is_calc_run = True
 
+    self.num_examples += array.shape[0]
+
   def _finish_calc(self):
     """Finish up the calc global value process."""
     # Run the finsh calc of it's constituents
@@ -150,7 +152,7 @@ class DatasetTransform(tr.Transform):
     for key in self.attribute_dict:
       if key == 'transforms':
         continue
-      setattr(self, key, save_dict[key])
+      setattr(self, key, save_dict.get(key, self.attribute_dict[key]))
 
     transforms = {}
     for key in save_dict['transforms']:
@@ -180,6 +182,13 @@ class DatasetTransform(tr.Transform):
       att_dict.update(trans_att_dict)
     return att_dict
 
+  def _get_calc_state(self):
+    """Get the partial global values calculated so far, in a form that can be merged with those calculated from other chunks of the data by _merge_calc_state."""
+    calc_state = {'num_examples': self.num_examples, 'transforms': {}}
+    for key in self.transform_names:
+      calc_state['transforms'][key] = self.transforms[key]._get_calc_state()
+    return calc_state
+
   def _get_eval_cls_cols(self, already_added_cols=None):
     """Get a dictionary of the sqlalchemy column types"""
 
@@ -193,6 +202,44 @@ class DatasetTransform(tr.Transform):
     pprint.pprint(eval_cls_cols)
     return eval_cls_cols
 
+  def _merge_calc_state(self, calc_state):
+    """Merge in the partial global values calculated from another chunk of the data.
+
+    Parameters
+    ----------
+    calc_state : dict
+      The partial global values, as outputted by _get_calc_state.
+
+    """
+    self.num_examples += calc_state['num_examples']
+    for key in self.transform_names:
+      self.transforms[key]._merge_calc_state(calc_state['transforms'][key])
+
+  def _rebuild_features(self, features, prefix='', keep_features=None, drop_features=None):
+    """Add any tensors which aren't written to the examples but can be rebuilt from the ones that are.
+
+    Parameters
+    ----------
+    features : dict of tensors
+      The tensors read from the examples.
+    prefix : str
+      Any additional prefix string/dictionary keys start with. Defaults to no additional prefix.
+    keep_features : list of strs
+      The features that were kept after reading in from the tfrecords. Defaults to all of them.
+    drop_features : list of strs
+      The features that were dropped when reading from the tfrecords.
+
+    Returns
+    -------
+    features : dict of tensors
+      The tensors with any rebuilt ones added.
+
+    """
+    for key in self.transform_names:
+      trans = self.transforms[key]
+      features = trans._rebuild_features(features, os.path.join(prefix, self.name), keep_features, drop_features)
+    return features
+
   def _save_dict(self):
     """Create the dictionary of values needed in order to reconstruct the transform."""
     save_dict = {}
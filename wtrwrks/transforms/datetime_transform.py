@@ -5,6 +5,8 @@ import datetime
 import logging
 import wtrwrks.tanks.tank_defs as td
 import wtrwrks.read_write.tf_features as feat
+import wtrwrks.utils.accumulators as acc
+import wtrwrks.utils.datetime_functions as dtf
 from wtrwrks.waterworks.empty import empty
 import tensorflow as tf
 
@@ -30,6 +32,8 @@ class DateTimeTransform(n.Transform):
     Function which fills in NaT values with some value. This function takes in a numpy array which contains NaT and returns one whith those values replaced with valid values.
   zero_datetime : datetime.datetime
     The time that will be defined as 0 when transformed. defaults to 1970-1-1.
+  input_format : str or None
+    The strptime format of the inputted datetime strings. If None, then the format is detected from the strings themselves, which works for ISO 8601 and other common formats. Only used if the inputted array is made of strings, in which case the original strings are written back out in pump.
 
   Attributes
   ----------
@@ -53,7 +57,7 @@ class DateTimeTransform(n.Transform):
     The stored maxes to be used to normalize data.
 
   """
-  attribute_dict = {'norm_mode': None, 'norm_axis': None, 'num_units': 1, 'time_unit': 'D', 'fill_nat_func': lambda array: np.array(datetime.datetime(1970, 1, 1)), 'name': '', 'mean': None, 'std': None, 'min': None, 'max': None, 'dtype': np.float64, 'input_dtype': np.datetime64, 'zero_datetime': datetime.datetime(1970, 1, 1)}
+  attribute_dict = {'norm_mode': None, 'norm_axis': None, 'num_units': 1, 'time_unit': 'D', 'fill_nat_func': lambda array: np.array(datetime.datetime(1970, 1, 1)), 'name': '', 'mean': None, 'std': None, 'min': None, 'max': None, 'dtype': np.float64, 'input_dtype': np.datetime64, 'zero_datetime': datetime.datetime(1970, 1, 1), 'input_format': None}
 
   for k, v in n.Transform.attribute_dict.iteritems():
     if k in attribute_dict:
@@ -88,6 +92,8 @@ class DateTimeTransform(n.Transform):
       Function which fills in NaT values with some value. This function takes in a numpy array which contains NaT and returns one whith those values replaced with valid values.
     zero_datetime : datetime.datetime
       The time that will be defined as 0 when transformed. defaults to 1970-1-1.
+    input_format : str or None
+      The strptime format of the inputted datetime strings. If None, then the format is detected from the strings themselves, which works for ISO 8601 and other common formats. Only used if the inputted array is made of strings, in which case the original strings are written back out in pump.
     **kwargs :
       The keyword arguments that set the values of the attributes defined in the attribute_dict.
 
@@ -129,47 +135,32 @@ class DateTimeTransform(n.Transform):
     """
     if self.input_dtype is None:
       self.input_dtype = array.dtype
-    else:
-      array = np.array(array, dtype=self.input_dtype)
-    array = array.astype(np.datetime64)
-
-    batch_size = float(array.shape[0])
-    total_examples = self.num_examples + batch_size
-
-    # Get the inputted dtype
-    if self.norm_mode == 'mean_std':
-      # Find the means and standard deviations of each column
-      array[np.isnat(array)] = self.fill_nat_func(array)
-      temp_array = (array - self.zero_datetime)/np.timedelta64(self.num_units, self.time_unit)
-      temp_array = temp_array.astype(self.dtype)
-
-      if self.mean is None:
-        self.mean = np.mean(temp_array, axis=self.norm_axis)
-        self.var = np.var(temp_array, axis=self.norm_axis)
-      else:
-        self.mean = (self.num_examples / total_examples) * self.mean + (batch_size / total_examples) * np.mean(temp_array, axis=self.norm_axis)
-        self.var = np.var(temp_array, axis=self.norm_axis)
-
-    elif self.norm_mode == 'min_max':
-      # Find the means and standard deviations of each column
-      # temp_col_array = col_array[~np.isnat(col_array)]
+    elif array.dtype.kind in ('S', 'U') or (self.input_format is not None and array.dtype.kind == 'O'):
+      # Strings are parsed within the waterwork so that they can be written
+      # back out in pump.
+      self.input_dtype = array.dtype.type
+
+    # Detect the format from the first chunk so that it's only done once, and so
+    # the strings can be formatted the same way in pump.
+    array, input_format = dtf.parse_datetimes(array, self.input_format, return_format=True)
+    if self._is_string_input():
+      self.input_format = input_format
+
+    if self.norm_mode is not None:
+      # Add the chunk, in units of num_units time_units since the zero
+      # datetime, to the running mean, variance, min and max.
       array[np.isnat(array)] = self.fill_nat_func(array)
       temp_array = (array - self.zero_datetime)/np.timedelta64(self.num_units, self.time_unit)
       temp_array = temp_array.astype(self.dtype)
+      self.moments.update(temp_array)
 
-      if self.min is None:
-        self.min = np.min(temp_array, axis=self.norm_axis)
-        self.max = np.max(temp_array, axis=self.norm_axis)
-      else:
-        self.min = np.minimum(self.min, np.min(temp_array, axis=self.norm_axis))
-        self.max = np.maximum(self.max, np.max(temp_array, axis=self.norm_axis))
-
-    self.num_examples += batch_size
+    self.num_examples += array.shape[0]
 
   def _finish_calc(self):
     """Finish up the calc global value process."""
     if self.norm_mode == 'mean_std':
-      self.std = np.sqrt(self.var)
+      self.mean = self.moments.mean
+      self.std = np.sqrt(self.moments.var)
       # If there are any standard deviations of 0, replace them with 1's,
       # print out a warning.
       if len(self.std[self.std == 0]):
@@ -181,6 +172,9 @@ class DateTimeTransform(n.Transform):
 
         self.std[self.std == 0] = 1.0
     elif self.norm_mode == 'min_max':
+      self.min = self.moments.min
+      self.max = self.moments.max
+
       # Test to make sure that min and max are not equal. If they are replace
       # with default values.
       if (self.min == self.max).any():
@@ -191,6 +185,10 @@ class DateTimeTransform(n.Transform):
 
         logging.warn("DatetimeTransform " + self.name + " the same values for min and max, replacing with " + str(self.min) + " " + str(self.max) + " respectively.")
 
+  def _get_calc_state(self):
+    """Get the partial global values calculated so far, in a form that can be merged with those calculated from other chunks of the data by _merge_calc_state."""
+    return {'num_examples': self.num_examples, 'moments': self.moments}
+
   def _get_array_attributes(self, prefix=''):
     """Get the dictionary that contain the original shapes of the arrays before being converted into tfrecord examples.
 
@@ -220,6 +218,7 @@ class DateTimeTransform(n.Transform):
       'feature_func': feat._int_feat,
       'np_type': np.bool
     }
+    self._narrow_array_attributes(att_dict['nats'], 0, 1)
     att_dict['diff'] = {
       'shape': list([len(self.cols)]),
       'tf_type': tf.int64,
@@ -227,10 +226,39 @@ class DateTimeTransform(n.Transform):
       'feature_func': feat._int_feat,
       'np_type': np.int64
     }
+    if self._is_string_input():
+      att_dict['string_diff'] = {
+        'shape': list([len(self.cols)]),
+        'tf_type': tf.string,
+        'size': feat.size_from_shape([len(self.cols)]),
+        'feature_func': feat._bytes_feat,
+        'np_type': np.unicode
+      }
 
     att_dict = self._pre(att_dict, prefix)
     return att_dict
 
+  def _is_string_input(self):
+    """Whether or not the inputted array is made of strings that need to be parsed."""
+    return np.dtype(self.input_dtype).kind != 'M'
+
+  def _merge_calc_state(self, calc_state):
+    """Merge in the partial global values calculated from another chunk of the data.
+
+    Parameters
+    ----------
+    calc_state : dict
+      The partial global values, as outputted by _get_calc_state.
+
+    """
+    self.num_examples += calc_state['num_examples']
+    self.moments.merge(calc_state['moments'])
+
+  def _start_calc(self):
+    """Start the calc global value process."""
+    self.moments = acc.MomentAccumulator(axis=self.norm_axis)
+    self.num_examples = 0.
+
   def define_waterwork(self, array=empty, return_tubes=None, prefix=''):
     """Get the waterwork that completely describes the pour and pump transformations.
 
@@ -245,14 +273,27 @@ class DateTimeTransform(n.Transform):
       The waterwork with all the tanks (operations) added, and names set.
 
     """
-    # Replace all the NaT's with the inputted replace_with.
+    # Parse any strings, saving whichever ones can't be reproduced by formatting
+    # the datetimes.
+    if self._is_string_input():
+      parsed, parsed_slots = td.parse_datetime(
+        array, self.input_format,
+        tube_plugs={'input_dtype': lambda z: self.input_dtype}
+      )
+      parsed_slots['a'].set_name('array')
+      parsed['diff'].set_name('string_diff')
+      array = parsed['target']
+
+    # Replace all the NaT's with the inputted replace_with. Strings are handed
+    # to fill_nat_func as the datetimes they've already been parsed into.
+    fill_key = 'parsed' if self._is_string_input() else 'array'
     nats, nats_slots = td.isnat(array)
-    nats_slots['a'].set_name('array')
+    nats_slots['a'].set_name(fill_key)
 
     replaced, _ = td.replace(
       nats['a'], nats['target'],
       slot_plugs={
-        'replace_with': lambda z: self.fill_nat_func(z[self._pre('array', prefix)])
+        'replace_with': lambda z: self.fill_nat_func(z[self._pre(fill_key, prefix)])
       },
       tube_plugs={
         'replace_with': np.array([]),
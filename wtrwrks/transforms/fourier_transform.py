@@ -5,6 +5,7 @@ import datetime
 import logging
 import wtrwrks.tanks.tank_defs as td
 import wtrwrks.read_write.tf_features as feat
+import wtrwrks.utils.datetime_functions as dtf
 from wtrwrks.waterworks.empty import empty
 import tensorflow as tf
 import sqlalchemy as sa
@@ -31,6 +32,8 @@ class FourierTransform(n.Transform):
     Function which fills in NaT values with some value. This function takes in a numpy array which contains NaT and returns one whith those values replaced with valid values.
   zero_datetime : datetime.datetime
     The time that will be defined as 0 when transformed. defaults to 1970-1-1.
+  block_size : int
+    The maximum number of elements of the (examples x frequencies) matrix of complex exponentials to hold in memory at once when calculating the spectrum. The frequencies (and if need be the examples) are worked through in blocks which fit under this limit.
 
   Attributes
   ----------
@@ -54,7 +57,7 @@ class FourierTransform(n.Transform):
     The stored maxes to be used to normalize data.
 
   """
-  attribute_dict = {'num_units': 1, 'time_unit': 'D', 'fill_nat_func': lambda array: np.array(datetime.datetime(1970, 1, 1)), 'fill_nan_func': lambda array: np.array(0.0), 'name': '', 'dtype': np.float64, 'input_dtype': np.object, 'zero_datetime': None, 'end_datetime': None, 'num_frequencies': None, 'top_frequencies': None, 'X_k': None, 'w_k': None}
+  attribute_dict = {'num_units': 1, 'time_unit': 'D', 'fill_nat_func': lambda array: np.array(datetime.datetime(1970, 1, 1)), 'fill_nan_func': lambda array: np.array(0.0), 'name': '', 'dtype': np.float64, 'input_dtype': np.object, 'zero_datetime': None, 'end_datetime': None, 'num_frequencies': None, 'top_frequencies': None, 'X_k': None, 'w_k': None, 'block_size': 2 ** 20}
 
   for k, v in n.Transform.attribute_dict.iteritems():
     if k in attribute_dict:
@@ -89,6 +92,8 @@ class FourierTransform(n.Transform):
       Function which fills in NaT values with some value. This function takes in a numpy array which contains NaT and returns one whith those values replaced with valid values.
     zero_datetime : datetime.datetime
       The time that will be defined as 0 when transformed. defaults to 1970-1-1.
+    block_size : int
+      The maximum number of elements of the (examples x frequencies) matrix of complex exponentials to hold in memory at once when calculating the spectrum. The frequencies (and if need be the examples) are worked through in blocks which fit under this limit.
     **kwargs :
       The keyword arguments that set the values of the attributes defined in the attribute_dict.
 
@@ -140,13 +145,10 @@ class FourierTransform(n.Transform):
     if len(array.shape) < 2 or array.shape[1] != 2:
       raise ValueError("Array must have exactly two columns. The first being the time, and the second being the amplitude.")
 
-    batch_size = float(array.shape[0])
-    total_examples = self.num_examples + batch_size
-
-    if not batch_size:
+    if not array.shape[0]:
       return
 
-    time_array = array[:, 0].astype(np.datetime64)
+    time_array = dtf.parse_datetimes(array[:, 0])
     time_array[np.isnat(time_array)] = self.fill_nat_func(time_array)
 
     # Get the maximum time and convert it to dtype
@@ -160,21 +162,36 @@ class FourierTransform(n.Transform):
 
     amp_array = array[:, 1: 2].astype(np.float64)
     amp_array[np.isnan(amp_array)] = self.fill_nan_func(amp_array)
-    amp_array = np.tile(amp_array, [1, self.num_frequencies])
-
-    exp = np.exp(-2.0j * np.pi * np.tensordot(time_array, self.w_k, [[], []]))
-
-    self.X_k = batch_size / total_examples * np.mean(amp_array * exp, axis=0) + self.num_examples / total_examples * self.X_k
-
-    self.num_examples += batch_size
+    amp_array = amp_array[:, 0]
+
+    # Add the chunk to the running sum of amp * exp(-2 pi i t w). The matrix of
+    # complex exponentials is built up one block at a time so that no more than
+    # block_size elements are ever held in memory.
+    num_rows = max(1, min(time_array.size, self.block_size))
+    num_cols = max(1, self.block_size // num_rows)
+    for row_num in xrange(0, time_array.size, num_rows):
+      times = time_array[row_num: row_num + num_rows]
+      amps = amp_array[row_num: row_num + num_rows]
+      for col_num in xrange(0, self.w_k.size, num_cols):
+        exp = np.exp(-2.0j * np.pi * np.multiply.outer(times, self.w_k[col_num: col_num + num_cols]))
+        self.X_k[col_num: col_num + num_cols] += np.dot(amps, exp)
+
+    self.num_examples += array.shape[0]
 
   def _finish_calc(self):
     """Finish up the calc global value process."""
+    # Turn the sum into a mean.
+    if self.num_examples:
+      self.X_k = self.X_k / self.num_examples
 
     sort_inds = np.argsort(np.abs(self.X_k))[::-1]
     self.X_k = self.X_k[sort_inds]
     self.w_k = self.w_k[sort_inds]
 
+  def _get_calc_state(self):
+    """Get the partial global values calculated so far, in a form that can be merged with those calculated from other chunks of the data by _merge_calc_state."""
+    return {'num_examples': self.num_examples, 'X_k': self.X_k}
+
   def _get_array_attributes(self, prefix=''):
     """Get the dictionary that contain the original shapes of the arrays before being converted into tfrecord examples.
 
@@ -246,6 +263,18 @@ class FourierTransform(n.Transform):
 
     return eval_cls_cols
 
+  def _merge_calc_state(self, calc_state):
+    """Merge in the partial global values calculated from another chunk of the data.
+
+    Parameters
+    ----------
+    calc_state : dict
+      The partial global values, as outputted by _get_calc_state.
+
+    """
+    self.num_examples += calc_state['num_examples']
+    self.X_k = self.X_k + calc_state['X_k']
+
   def _start_calc(self):
     """Start the calc global value process."""
     # Create the mapping from category values to index in the vector and
@@ -2,10 +2,13 @@
 import transform as n
 import numpy as np
 import wtrwrks.tanks.tank_defs as td
+import wtrwrks.tanks.remove_stopwords as rsw
+import wtrwrks.utils.accumulators as acc
+import wtrwrks.utils.lru_cache as lc
+import wtrwrks.utils.vocab as vo
 import wtrwrks.read_write.tf_features as feat
 from wtrwrks.waterworks.empty import empty
 import tensorflow as tf
-import operator
 import unicodedata
 
 def _half_width(string):
@@ -33,10 +36,16 @@ class MultiLingualStringTransform(n.Transform):
     The maximum allowed number of words in a sentence. Also decides the inner most dimension of the outputted indices array.
   max_vocab_size : int
     The maximum allowed number of words in the vocabulary.
+  max_tracked_words : int or None
+    When building the vocabularies, the maximum number of distinct words to hold exact counts for per language. Past this the counts fall back to a heavy hitters summary, which keeps memory bounded but makes the counts of the rarer words approximate. None implies no limit.
   word_tokenizers : dict of funcs
     A dicitonary of which maps a language to a function. The functions take in a string and split it up into a list of words.
   word_detokenizers : dict of funcs
     A dicitonary of which maps a language to a function. The functions take in a list of words and output a string. Doesn't have to be an exact inverse to word_tokenizer but should be close otherwise a lot of large diff strings will have to be outputted in order to reproduce the original strings.
+  tokenize_cache_size : int or None
+    The maximum number of distinct strings whose tokens are cached, so that strings which are repeated across pours are only tokenized once. None implies no caching.
+  stopwords : dict of sets of strs or None
+    A dictionary which maps a language to a set of stopwords (e.g. wtrwrks.string_manipulations.ja_stopwords.stopwords). If set, the stopwords of each string's language are removed from the tokens before they're converted to indices, and the remaining words shifted left to fill the space. The stopwords are left out of the vocabularies, and the removed ones are kept in 'removed_stopwords' so that the strings can still be reconstructed exactly.
 
   Attributes
   ----------
@@ -50,12 +59,14 @@ class MultiLingualStringTransform(n.Transform):
     The number of rows that have passed through the calc_global_values function.
   is_calc_run : bool
     Whether or not calc_global_values has been run for this transform.
-  word_to_index_maps : dict of dict
+  word_to_index_maps : dict of Vocabulary
     A dicitionary which maps a language to a another mapping. The mapping is from word to index number.
+  tokenize_cache : LRUCache or None
+    The cache of tokenized strings shared by all the pours of the waterwork. Its get_metrics method reports the hit rate.
 
   """
 
-  attribute_dict = {'name': '', 'dtype': np.int64, 'input_shape': None, 'index_to_word_maps': None, 'word_to_index_maps': None, 'max_sent_len': None, 'word_tokenizers': None, 'lemmatize': False, 'lemmatizer': None, 'half_width': False, 'lower_case': False, 'word_detokenizers': None, 'max_vocab_size': None}
+  attribute_dict = {'name': '', 'dtype': np.int64, 'input_shape': None, 'index_to_word_maps': None, 'word_to_index_maps': None, 'max_sent_len': None, 'word_tokenizers': None, 'lemmatize': False, 'lemmatizer': None, 'half_width': False, 'lower_case': False, 'word_detokenizers': None, 'max_vocab_size': None, 'max_tracked_words': 1000000, 'tokenize_cache_size': None, 'stopwords': None}
 
   for k, v in n.Transform.attribute_dict.iteritems():
     if k in attribute_dict:
@@ -90,21 +101,38 @@ class MultiLingualStringTransform(n.Transform):
       The maximum allowed number of words in a sentence. Also decides the inner most dimension of the outputted indices array.
     max_vocab_size : int
       The maximum allowed number of words in the vocabulary.
+    max_tracked_words : int or None
+      When building the vocabularies, the maximum number of distinct words to hold exact counts for per language. Past this the counts fall back to a heavy hitters summary, which keeps memory bounded but makes the counts of the rarer words approximate. None implies no limit.
     word_tokenizers : dict of funcs
       A dicitonary of which maps a language to a function. The functions take in a string and split it up into a list of words.
     word_detokenizers : dict of funcs
       A dicitonary of which maps a language to a function. The functions take in a list of words and output a string. Doesn't have to be an exact inverse to word_tokenizer but should be close otherwise a lot of large diff strings will have to be outputted in order to reproduce the original strings.
+    tokenize_cache_size : int or None
+      The maximum number of distinct strings whose tokens are cached, so that strings which are repeated across pours are only tokenized once. None implies no caching.
+    stopwords : dict of sets of strs or None
+      A dictionary which maps a language to a set of stopwords (e.g. wtrwrks.string_manipulations.ja_stopwords.stopwords). If set, the stopwords of each string's language are removed from the tokens before they're converted to indices, and the remaining words shifted left to fill the space. The stopwords are left out of the vocabularies, and the removed ones are kept in 'removed_stopwords' so that the strings can still be reconstructed exactly.
     **kwargs :
       The keyword arguments that set the values of the attributes defined in the attribute_dict.
 
     """
     super(MultiLingualStringTransform, self).__init__(from_file, save_dict, **kwargs)
+    self.tokenize_cache = None
+
+    # The words are only saved in the vocabularies, so pull them back out.
+    if self.index_to_word_maps is None and self.word_to_index_maps is not None:
+      self.index_to_word_maps = {l: list(self.word_to_index_maps[l]) for l in self.word_to_index_maps}
 
     # Require either a index to word mappings or a max vocab size if they are
     # to be built from scratch
     if self.index_to_word_maps is None and self.max_vocab_size is None:
       raise ValueError("Must supply index_to_word_maps mapping or a max_vocab_size.")
 
+    # Transforms saved with word_to_index dicts get Vocabularies instead.
+    if self.word_to_index_maps is not None:
+      for language, word_to_index in self.word_to_index_maps.items():
+        if not isinstance(word_to_index, vo.Vocabulary):
+          self.word_to_index_maps[language] = vo.Vocabulary(self.index_to_word_maps[language])
+
   def __len__(self):
     """Get the length of the transformed data."""
     return self.max_sent_len
@@ -147,14 +175,22 @@ class MultiLingualStringTransform(n.Transform):
         if self.half_width:
           strings = np.vectorize(_half_width)(strings)
 
+        # Tokenize all the strings of the language at once if the tokenizer
+        # supports it.
         word_tokenizer = self.word_tokenizers[language]
-
-        for string in strings:
-          # Tokenize each request, add the tokens to the set of all words
-          tokens = word_tokenizer(string)
-          for token_num, token in enumerate(tokens):
-            self.all_words[language].setdefault(token, 0)
-            self.all_words[language][token] += 1
+        tokenize_batch = getattr(word_tokenizer, 'tokenize_batch', None)
+        if tokenize_batch is not None:
+          all_tokens = tokenize_batch(list(strings))
+        else:
+          all_tokens = [word_tokenizer(string) for string in strings]
+
+        # Add the tokens to the counts of all the words of the language,
+        # leaving out its stopwords since they never make it to the vocabulary
+        # lookup.
+        tokens = np.array([token for tokens in all_tokens for token in tokens])
+        if self.stopwords and language in self.stopwords:
+          tokens = tokens[~rsw.is_stopword(tokens, rsw.stopword_set(self.stopwords[language]))]
+        self.word_counts[language].update(tokens)
 
     else:
       self.max_vocab_size = max([len(v) for v in self.index_to_word_maps.items()])
@@ -164,12 +200,10 @@ class MultiLingualStringTransform(n.Transform):
     if self.index_to_word_maps is None:
       self.index_to_word_maps = {}
       for language in sorted(self.word_tokenizers):
-        # Sort the dict by the number of times the words appear
-        sorted_words = sorted(self.all_words[language].items(), key=operator.itemgetter(1), reverse=True)
-
-        # Pull out the first 'max_vocab_size' words
+        # Pull out the 'max_vocab_size' most frequent words, leaving room for
+        # the unknown token.
         corrected_vocab_size = self.max_vocab_size - 1
-        sorted_words = [w for w, c in sorted_words[:corrected_vocab_size]]
+        sorted_words = self.word_counts[language].most_common(corrected_vocab_size, break_ties=False)
 
         # Create the mapping from category values to index in the vector and
         # vice versa
@@ -183,9 +217,11 @@ class MultiLingualStringTransform(n.Transform):
 
     self.word_to_index_maps = {}
     for language in sorted(self.word_tokenizers):
-      self.word_to_index_maps[language] = {
-        word: num for num, word in enumerate(self.index_to_word_maps[language])
-      }
+      self.word_to_index_maps[language] = vo.Vocabulary(self.index_to_word_maps[language])
+
+  def _get_calc_state(self):
+    """Get the partial global values calculated so far, in a form that can be merged with those calculated from other chunks of the data by _merge_calc_state."""
+    return {'word_counts': self.word_counts}
 
   def _get_array_attributes(self, prefix=''):
     """Get the dictionary that contain the original shapes of the arrays before being converted into tfrecord examples.
@@ -221,6 +257,26 @@ class MultiLingualStringTransform(n.Transform):
         'feature_func': feat._int_feat if key == 'indices' else feat._bytes_feat,
         'np_type': np.int64 if key == 'indices' else np.unicode
       }
+
+      # The diffs and missing values are almost always empty, so only store
+      # the ones that aren't.
+      if key in self._get_sparse_array_keys():
+        default_val = ''
+        att_dict[key]['sparse'] = True
+        att_dict[key]['default_val'] = default_val
+        att_dict[key]['feature_func'] = feat.select_sparse_feature_func(np.unicode, default_val)
+      if key == 'missing_vals' and self.sparse_missing_vals:
+        att_dict[key]['tap_indices_key'] = self._pre('missing_indices', prefix)
+      if key == 'removed_stopwords':
+        att_dict[key]['tap_indices_key'] = self._pre('removed_stopword_indices', prefix)
+
+      # Indices run from -1 (padding) to the size of the largest vocabulary.
+      if key == 'indices':
+        if self.index_to_word_maps is not None:
+          vocab_size = max([len(v) for v in self.index_to_word_maps.values()])
+        else:
+          vocab_size = self.max_vocab_size
+        self._narrow_array_attributes(att_dict[key], -1, vocab_size)
     att_dict = self._pre(att_dict, prefix)
     return att_dict
 
@@ -233,21 +289,42 @@ class MultiLingualStringTransform(n.Transform):
       array_keys.append('half_width_diff')
     if self.lemmatize:
       array_keys.append('lemmatize_diff')
+    if self.stopwords:
+      array_keys.append('removed_stopwords')
     return array_keys
 
+  def _get_sparse_array_keys(self):
+    """Get the list of keys whose arrays are sparsely encoded when written to tfrecords."""
+    return [k for k in self._get_array_keys() if k not in ('indices', 'languages')]
+
+  def _merge_calc_state(self, calc_state):
+    """Merge in the partial global values calculated from another chunk of the data.
+
+    Parameters
+    ----------
+    calc_state : dict
+      The partial global values, as outputted by _get_calc_state.
+
+    """
+    for language in self.word_counts:
+      self.word_counts[language].merge(calc_state['word_counts'][language])
+
   def _save_dict(self):
     """Create the dictionary of values needed in order to reconstruct the transform."""
     save_dict = {}
     for key in self.attribute_dict:
       save_dict[key] = getattr(self, key)
     save_dict['__class__'] = str(self.__class__.__name__)
+
+    # Don't store the words twice, they can be pulled out of the vocabularies.
+    if self.word_to_index_maps is not None:
+      save_dict['index_to_word_maps'] = None
     return save_dict
 
   def _start_calc(self):
     """Start the calc global value process."""
-    # Create the mapping from category values to index in the vector and
-    # vice versa
-    self.all_words = {l: {} for l in self.word_tokenizers}
+    # Keep the running counts of all the words of each language.
+    self.word_counts = {l: acc.CountAccumulator(self.max_tracked_words) for l in self.word_tokenizers}
 
   def define_waterwork(self, array=empty, return_tubes=None, prefix=''):
     """Get the waterwork that completely describes the pour and pump transformations.
@@ -269,13 +346,18 @@ class MultiLingualStringTransform(n.Transform):
 
     splits, _ = td.iter_list(splits['target'], 2)
 
+    # Cache the tokenized strings across all the pours of the waterwork.
+    if self.tokenize_cache_size:
+      self.tokenize_cache = lc.LRUCache(self.tokenize_cache_size)
+
     # Tokenize the full strings into words
     tokens, tokens_slots = td.multi_tokenize(
       strings=splits[0],
       selector=splits[1],
       tokenizers=self.word_tokenizers,
       detokenizers=self.word_detokenizers,
-      max_len=self.max_sent_len
+      max_len=self.max_sent_len,
+      cache=self.tokenize_cache
     )
 
     # Set the names of various tubes and slots to make it easier to reference
@@ -322,13 +404,23 @@ class MultiLingualStringTransform(n.Transform):
       }
     )
 
+    # Remove the stopwords of each string's language, keeping the removed
+    # words and where they were so they can be put back.
+    selector = tile['target']
+    if self.stopwords:
+      tokens, tokens_slots = td.multi_remove_stopwords(tokens['target'], self.stopwords, selector)
+      tokens['removed_vals'].set_name('removed_stopwords')
+      tokens['removed_indices'].set_name('removed_stopword_indices')
+      tokens_slots['stopwords'].set_name('stopwords')
+      selector = tokens['selector']
+
     # Find all the strings which are not in the list of known words and
     # replace them with the 'unknown token'.
-    maps_with_empty_strings = {k: v + [''] for k, v in self.index_to_word_maps.iteritems()}
-    isin, isin_slots = td.multi_isin(tokens['target'], maps_with_empty_strings, tile['target'])
+    isin, isin_slots = td.multi_isin(tokens['target'], self.word_to_index_maps, selector)
 
     mask, _ = td.logical_not(isin['target'])
-    tokens, _ = td.replace(
+    replace = td.sparse_replace if self.sparse_missing_vals else td.replace
+    tokens, _ = replace(
       isin['a'], mask['target'], '[UNK]',
       tube_plugs={
         'mask': lambda z: z[self._pre('indices', prefix)] == 0
@@ -337,6 +429,8 @@ class MultiLingualStringTransform(n.Transform):
 
     # Keep track values that were overwritten with a 'unknown token'
     tokens['replaced_vals'].set_name('missing_vals')
+    if self.sparse_missing_vals:
+      tokens['replaced_indices'].set_name('missing_indices')
     isin_slots['bs'].set_name('index_to_word_maps')
 
     # Convert the tokens into indices.
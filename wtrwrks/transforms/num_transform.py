@@ -4,6 +4,7 @@ import numpy as np
 import logging
 import wtrwrks.tanks.tank_defs as td
 import wtrwrks.read_write.tf_features as feat
+import wtrwrks.utils.accumulators as acc
 import tensorflow as tf
 from wtrwrks.waterworks.empty import empty
 
@@ -19,12 +20,16 @@ class NumTransform(n.Transform):
     The data type the transformed data should have. Defaults to np.float64.
   input_dtype: numpy dtype
     The datatype of the original inputted array.
-  norm_mode : "mean_std", "min_max" or None
-    How to normalize the data. Subtracting out the mean and dividing by the standard deviation; Subtracting out min and dividing by the difference between max and min; or leaving as is.
+  norm_mode : "mean_std", "min_max", "quantile" or None
+    How to normalize the data. Subtracting out the mean and dividing by the standard deviation; Subtracting out min and dividing by the difference between max and min; Mapping each value to its (approximate) quantile through a piecewise linear approximation of the cumulative distribution function; or leaving as is.
   norm_axis : 0, 1, or None
-    In the case that 'norm_mode' has a non None value, what axis should be used for the normalization. None implies both 0 and 1.
+    In the case that 'norm_mode' has a non None value, what axis should be used for the normalization. None implies both 0 and 1. The quantile norm_mode does not support 1.
   fill_nan_func : np.array(dtype=np.float64) -> np.array(dtype=np.float64)
     Function which fills in NaN values with some value. This function takes in a numpy array which contains NaN and returns one whith those values replaced with valid values.
+  num_quantiles : int
+    The number of pieces of the piecewise linear cumulative distribution function used by the quantile norm_mode.
+  sketch_size : int
+    The size of the quantile sketches built during calc_global_values for the quantile norm_mode. Larger sketches use more memory but give more accurate quantiles.
 
   Attributes
   ----------
@@ -46,11 +51,15 @@ class NumTransform(n.Transform):
     The stored mins to be used to normalize data.
   max : numpy array
     The stored maxes to be used to normalize data.
+  quantiles : list of numpy arrays
+    The x coordinates of the knots of the piecewise linear cumulative distribution function of each column, used by the quantile norm_mode.
+  quantile_ranks : list of numpy arrays
+    The y coordinates (i.e. the quantiles) of the knots of the piecewise linear cumulative distribution function of each column.
 
 
   """
 
-  attribute_dict = {'norm_mode': None, 'norm_axis': None, 'fill_nan_func': lambda array: np.array(0), 'name': '', 'mean': None, 'std': None, 'min': None, 'max': None}
+  attribute_dict = {'norm_mode': None, 'norm_axis': None, 'fill_nan_func': lambda array: np.array(0), 'name': '', 'mean': None, 'std': None, 'min': None, 'max': None, 'num_quantiles': 100, 'sketch_size': 200, 'quantiles': None, 'quantile_ranks': None}
 
   for k, v in n.Transform.attribute_dict.iteritems():
     if k in attribute_dict:
@@ -75,12 +84,16 @@ class NumTransform(n.Transform):
       The data type the transformed data should have. Defaults to np.float64.
     input_dtype: numpy dtype
       The datatype of the original inputted array.
-    norm_mode : "mean_std", "min_max" or None
-      How to normalize the data. Subtracting out the mean and dividing by the standard deviation; Subtracting out min and dividing by the difference between max and min; or leaving as is.
+    norm_mode : "mean_std", "min_max", "quantile" or None
+      How to normalize the data. Subtracting out the mean and dividing by the standard deviation; Subtracting out min and dividing by the difference between max and min; Mapping each value to its (approximate) quantile through a piecewise linear approximation of the cumulative distribution function; or leaving as is.
     norm_axis : 0, 1, or None
-      In the case that 'norm_mode' has a non None value, what axis should be used for the normalization. None implies both 0 and 1.
+      In the case that 'norm_mode' has a non None value, what axis should be used for the normalization. None implies both 0 and 1. The quantile norm_mode does not support 1.
     fill_nan_func : np.array(dtype=np.float64) -> np.array(dtype=np.float64)
       Function which fills in NaN values with some value. This function takes in a numpy array which contains NaN and returns one whith those values replaced with valid values.
+    num_quantiles : int
+      The number of pieces of the piecewise linear cumulative distribution function used by the quantile norm_mode.
+    sketch_size : int
+      The size of the quantile sketches built during calc_global_values for the quantile norm_mode. Larger sketches use more memory but give more accurate quantiles.
     **kwargs :
       The keyword arguments that set the values of the attributes defined in the attribute_dict.
 
@@ -88,7 +101,7 @@ class NumTransform(n.Transform):
     super(NumTransform, self).__init__(from_file, save_dict, **kwargs)
 
     # Ensure a valid norm mode was passed
-    valid_norm_modes = ('mean_std', 'min_max', None)
+    valid_norm_modes = ('mean_std', 'min_max', 'quantile', None)
     if self.norm_mode not in valid_norm_modes:
       raise ValueError("{} is an invalid norm_mode. Accepted norm mods are ".format(self.norm_mode, valid_norm_modes))
 
@@ -97,6 +110,10 @@ class NumTransform(n.Transform):
     if self.norm_axis not in valid_norm_axis:
       raise ValueError("{} is an invalid norm_axis. Accepted norm axes are ".format(self.norm_axis, valid_norm_axis))
 
+    # The quantiles are of the values in the columns, rows are just examples.
+    if self.norm_mode == 'quantile' and self.norm_axis == 1:
+      raise ValueError("norm_axis 1 is not supported by the quantile norm_mode.")
+
   def __len__(self):
     """Get the length of the transformed data"""
     # assert self.is_calc_run, ("Must run calc_global_values before taking the len.")
@@ -112,46 +129,41 @@ class NumTransform(n.Transform):
 
     """
     if self.input_dtype is None:
-      self.input_dtype = array.input_dtype
+      self.input_dtype = array.dtype
     else:
       array = np.array(array, dtype=self.input_dtype)
 
     if self.dtype is None:
       self.dtype = self.input_dtype
 
-    batch_size = float(array.shape[0])
-    total_examples = self.num_examples + batch_size
-
     array = array.astype(self.dtype)
 
-    if self.norm_mode == 'mean_std':
-      # Find the means and standard deviations of each column
+    if self.norm_mode is not None:
       array[np.isnan(array)] = self.fill_nan_func(array)
-      self.mean = np.mean(array, axis=self.norm_axis)
-      self.std = np.std(array, axis=self.norm_axis)
 
-      if self.mean is None:
-        self.mean = np.mean(array, axis=self.norm_axis)
-        self.var = np.var(array, axis=self.norm_axis)
-      else:
-        self.mean = (self.num_examples / total_examples) * self.mean + (batch_size / total_examples) * np.mean(array, axis=self.norm_axis)
-        self.var = np.var(array, axis=self.norm_axis)
-
-    elif self.norm_mode == 'min_max':
-      # Find the means and standard deviations of each column
-      array[np.isnan(array)] = self.fill_nan_func(array)
+    if self.norm_mode == 'quantile':
+      # Add the chunk to the quantile sketch of each column, or to a single
+      # sketch of all the values.
+      if self.sketches is None:
+        num_sketches = array.shape[1] if self.norm_axis == 0 else 1
+        self.sketches = [acc.QuantileSketch(k=self.sketch_size) for _ in xrange(num_sketches)]
 
-      if self.min is None:
-        self.min = np.min(array, axis=self.norm_axis)
-        self.max = np.max(array, axis=self.norm_axis)
+      if self.norm_axis == 0:
+        for col_num, sketch in enumerate(self.sketches):
+          sketch.update(array[:, col_num])
       else:
-        self.min = np.minimum(self.min, np.min(array, axis=self.norm_axis))
-        self.max = np.maximum(self.max, np.max(array, axis=self.norm_axis))
+        self.sketches[0].update(array)
+    elif self.norm_mode is not None:
+      # Add the chunk to the running mean, variance, min and max.
+      self.moments.update(array)
+
+    self.num_examples += array.shape[0]
 
   def _finish_calc(self):
     """Finish up the calc global value process."""
     if self.norm_mode == 'mean_std':
-      self.std = np.sqrt(self.var)
+      self.mean = self.moments.mean
+      self.std = np.sqrt(self.moments.var)
       # If there are any standard deviations of 0, replace them with 1's,
       # print out a warning.
       if len(self.std[self.std == 0]):
@@ -163,6 +175,9 @@ class NumTransform(n.Transform):
 
         self.std[self.std == 0] = 1.0
     elif self.norm_mode == 'min_max':
+      self.min = self.moments.min
+      self.max = self.moments.max
+
       # Test to make sure that min and max are not equal. If they are replace
       # with default values.
       if (self.min == self.max).any():
@@ -172,6 +187,24 @@ class NumTransform(n.Transform):
           self.max = self.max + 1
 
         logging.warn("NumTransform " + self.name + " the same values for min and max, replacing with " + str(self.min) + " " + str(self.max) + " respectively.")
+    elif self.norm_mode == 'quantile':
+      probs = np.linspace(0., 1., self.num_quantiles + 1)
+      self.quantiles = []
+      self.quantile_ranks = []
+      for sketch in self.sketches:
+        quantiles, quantile_ranks = self._get_cdf_knots(sketch.quantiles(probs), probs)
+        self.quantiles.append(quantiles)
+        self.quantile_ranks.append(quantile_ranks)
+
+      # A single sketch of all the values gives the same function for every
+      # column.
+      if len(self.sketches) == 1:
+        self.quantiles = self.quantiles * len(self.cols)
+        self.quantile_ranks = self.quantile_ranks * len(self.cols)
+
+  def _get_calc_state(self):
+    """Get the partial global values calculated so far, in a form that can be merged with those calculated from other chunks of the data by _merge_calc_state."""
+    return {'num_examples': self.num_examples, 'moments': self.moments, 'sketches': self.sketches}
 
   def _get_array_attributes(self, prefix=''):
     """Get the dictionary that contain the original shapes of the arrays before being converted into tfrecord examples.
@@ -202,10 +235,67 @@ class NumTransform(n.Transform):
       'feature_func': feat._int_feat,
       'np_type': np.bool
     }
+    self._narrow_array_attributes(att_dict['nans'], 0, 1)
 
     att_dict = self._pre(att_dict, prefix)
     return att_dict
 
+  def _get_cdf_knots(self, quantiles, probs):
+    """Turn the estimated values at some quantiles into the knots of a strictly increasing, and so invertible, piecewise linear cumulative distribution function.
+
+    Parameters
+    ----------
+    quantiles : np.ndarray
+      The (non decreasing) estimated values at each of the quantiles.
+    probs : np.ndarray
+      The (increasing) quantiles.
+
+    Returns
+    -------
+    quantiles : np.ndarray
+      The x coordinates of the knots.
+    quantile_ranks : np.ndarray
+      The y coordinates of the knots.
+
+    """
+    # Values which take up a whole range of quantiles (e.g. lots of zeros) are
+    # given the middle of the range.
+    unique_quantiles, first = np.unique(quantiles, return_index=True)
+    _, last = np.unique(quantiles[::-1], return_index=True)
+    last = quantiles.size - 1 - last
+    quantile_ranks = (probs[first] + probs[last]) / 2.
+
+    if unique_quantiles.size == 1:
+      logging.warn("NumTransform " + self.name + " has only one value " + str(unique_quantiles[0]) + ", mapping it to the 0 quantile.")
+      unique_quantiles = np.array([unique_quantiles[0], unique_quantiles[0] + 1.])
+      quantile_ranks = np.array([0., 1.])
+
+    return unique_quantiles, quantile_ranks
+
+  def _merge_calc_state(self, calc_state):
+    """Merge in the partial global values calculated from another chunk of the data.
+
+    Parameters
+    ----------
+    calc_state : dict
+      The partial global values, as outputted by _get_calc_state.
+
+    """
+    self.num_examples += calc_state['num_examples']
+    self.moments.merge(calc_state['moments'])
+
+    if self.sketches is None:
+      self.sketches = calc_state['sketches']
+    elif calc_state['sketches'] is not None:
+      for sketch, other in zip(self.sketches, calc_state['sketches']):
+        sketch.merge(other)
+
+  def _start_calc(self):
+    """Start the calc global value process."""
+    self.moments = acc.MomentAccumulator(axis=self.norm_axis)
+    self.sketches = None
+    self.num_examples = 0.
+
   def define_waterwork(self, array=empty, return_tubes=None, prefix=''):
     """Get the waterwork that completely describes the pour and pump transformations.
 
@@ -257,6 +347,8 @@ class NumTransform(n.Transform):
         nums['target'], (self.max - self.min),
         tube_plugs={'a_is_smaller': False, 'smaller_size_array': (self.max - self.min), 'missing_vals': np.array([]), 'remainder': np.array([])}
       )
+    elif self.norm_mode == 'quantile':
+      nums, _ = td.piecewise_linear(nums['target'], self.quantiles, self.quantile_ranks)
 
     nums['target'].set_name('nums')
 
@@ -2,10 +2,13 @@
 import transform as n
 import numpy as np
 import wtrwrks.tanks.tank_defs as td
+import wtrwrks.tanks.remove_stopwords as rsw
+import wtrwrks.utils.accumulators as acc
+import wtrwrks.utils.lru_cache as lc
+import wtrwrks.utils.vocab as vo
 import wtrwrks.read_write.tf_features as feat
 from wtrwrks.waterworks.empty import empty
 import tensorflow as tf
-import operator
 import unicodedata
 
 
@@ -34,10 +37,18 @@ class StringTransform(n.Transform):
     The maximum allowed number of words in a sentence. Also decides the inner most dimension of the outputted indices array.
   max_vocab_size : int
     The maximum allowed number of words in the vocabulary.
+  max_tracked_words : int or None
+    When building the vocabulary, the maximum number of distinct words to hold exact counts for. Past this the counts fall back to a heavy hitters summary, which keeps memory bounded but makes the counts of the rarer words approximate. None implies no limit.
   word_tokenizer : func
     A function that takes in a string and splits it up into a list of words.
   word_detokenizer : func
     A function that takes in a list of words and outputs a string. Doesn't have to be an exact inverse to word_tokenizer but should be close otherwise a lot of large diff strings will have to be outputted in order to reproduce the original strings.
+  tokenize_cache_size : int or None
+    The maximum number of distinct strings whose tokens are cached, so that strings which are repeated across pours are only tokenized once. None implies no caching.
+  hash_buckets : int or None
+    If set, the words are mapped to indices by hashing them into this many buckets rather than looking them up in a vocabulary, so no vocabulary is built or stored. All the words are kept in the 'missing_vals' so that the strings can still be reconstructed exactly.
+  stopwords : set of strs or None
+    If set, these words are removed from the tokens before they're converted to indices, and the remaining words shifted left to fill the space. The stopwords are left out of the vocabulary, and the removed ones are kept in 'removed_stopwords' so that the strings can still be reconstructed exactly.
 
   Attributes
   ----------
@@ -51,12 +62,16 @@ class StringTransform(n.Transform):
     The number of rows that have passed through the calc_global_values function.
   is_calc_run : bool
     Whether or not calc_global_values has been run for this transform.
-  word_to_index : dict
+  word_to_index : Vocabulary
     The mapping from word to index number.
+  max_string_len : int or None
+    The length of the longest string seen by calc_global_values when hash_buckets is set. Since there's no vocabulary to estimate the length of the strings from, it sets the limit of the VARCHAR field in get_schema_dict.
+  tokenize_cache : LRUCache or None
+    The cache of tokenized strings shared by all the pours of the waterwork. Its get_metrics method reports the hit rate.
 
   """
 
-  attribute_dict = {'name': '', 'dtype': np.int64, 'input_shape': None, 'index_to_word': None, 'word_to_index': None, 'max_sent_len': None, 'word_tokenizer': lambda a: a.split(), 'half_width': False, 'lower_case': False, 'word_detokenizer': lambda a: ' '.join(a), 'max_vocab_size': None}
+  attribute_dict = {'name': '', 'dtype': np.int64, 'input_shape': None, 'index_to_word': None, 'word_to_index': None, 'max_sent_len': None, 'word_tokenizer': lambda a: a.split(), 'half_width': False, 'lower_case': False, 'word_detokenizer': lambda a: ' '.join(a), 'max_vocab_size': None, 'max_tracked_words': 1000000, 'tokenize_cache_size': None, 'hash_buckets': None, 'max_string_len': None, 'stopwords': None}
 
   for k, v in n.Transform.attribute_dict.iteritems():
     if k in attribute_dict:
@@ -91,20 +106,37 @@ class StringTransform(n.Transform):
       The maximum allowed number of words in a sentence. Also decides the inner most dimension of the outputted indices array.
     max_vocab_size : int
       The maximum allowed number of words in the vocabulary.
+    max_tracked_words : int or None
+      When building the vocabulary, the maximum number of distinct words to hold exact counts for. Past this the counts fall back to a heavy hitters summary, which keeps memory bounded but makes the counts of the rarer words approximate. None implies no limit.
     word_tokenizer : func
       A function that takes in a string and splits it up into a list of words.
     word_detokenizer : func
       A function that takes in a list of words and outputs a string. Doesn't have to be an exact inverse to word_tokenizer but should be close otherwise a lot of large diff strings will have to be outputted in order to reproduce the original strings.
+    tokenize_cache_size : int or None
+      The maximum number of distinct strings whose tokens are cached, so that strings which are repeated across pours are only tokenized once. None implies no caching.
+    hash_buckets : int or None
+      If set, the words are mapped to indices by hashing them into this many buckets rather than looking them up in a vocabulary, so no vocabulary is built or stored. All the words are kept in the 'missing_vals' so that the strings can still be reconstructed exactly.
+    stopwords : set of strs or None
+      If set, these words are removed from the tokens before they're converted to indices, and the remaining words shifted left to fill the space. The stopwords are left out of the vocabulary, and the removed ones are kept in 'removed_stopwords' so that the strings can still be reconstructed exactly.
     **kwargs :
       The keyword arguments that set the values of the attributes defined in the attribute_dict.
 
     """
     super(StringTransform, self).__init__(from_file, save_dict, **kwargs)
+    self.tokenize_cache = None
+
+    # The words are only saved in the vocabulary, so pull them back out.
+    if self.index_to_word is None and isinstance(self.word_to_index, vo.Vocabulary):
+      self.index_to_word = list(self.word_to_index)
 
     # Require either a index to word mapping or a max vocab size if it is to be
-    # built from scratch.
-    if self.index_to_word is None and self.max_vocab_size is None:
-      raise ValueError("Must supply index_to_word mapping or a max_vocab_size.")
+    # built from scratch, unless the words are hashed.
+    if self.index_to_word is None and self.max_vocab_size is None and self.hash_buckets is None:
+      raise ValueError("Must supply index_to_word mapping, a max_vocab_size or hash_buckets.")
+
+    # Transforms saved with a word_to_index dict get a Vocabulary instead.
+    if self.word_to_index is not None and not isinstance(self.word_to_index, vo.Vocabulary):
+      self.word_to_index = vo.Vocabulary(self.index_to_word)
 
   def __len__(self):
     return self.max_sent_len
@@ -122,7 +154,12 @@ class StringTransform(n.Transform):
       self.dtype = array.dtype
     else:
       array = np.array(array, dtype=self.input_dtype)
-    if self.index_to_word is None:
+    if self.hash_buckets is not None:
+      # Keep track of the longest string, since there's no vocabulary to
+      # estimate it from.
+      lengths = [len(string) for string in np.unique(array)]
+      self.max_string_len = max([self.max_string_len] + lengths)
+    if self.index_to_word is None and self.hash_buckets is None:
       # Get all the words and the number of times they appear
       strings = array.flatten()
       if self.lower_case:
@@ -131,22 +168,31 @@ class StringTransform(n.Transform):
       if self.half_width:
         strings = np.vectorize(_half_width)(strings)
 
-      for string in strings:
-        # Tokenize each request, add the tokens to the set of all words
-        tokens = self.word_tokenizer(string)
-        for token_num, token in enumerate(tokens):
-          self.all_words.setdefault(token, 0)
-          self.all_words[token] += 1
+      # Tokenize all the strings at once if the tokenizer supports it.
+      tokenize_batch = getattr(self.word_tokenizer, 'tokenize_batch', None)
+      if tokenize_batch is not None:
+        all_tokens = tokenize_batch(list(strings))
+      else:
+        all_tokens = [self.word_tokenizer(string) for string in strings]
+
+      # Add the tokens to the counts of all the words, leaving out the
+      # stopwords since they never make it to the vocabulary lookup.
+      tokens = np.array([token for tokens in all_tokens for token in tokens])
+      if self.stopwords:
+        tokens = tokens[~rsw.is_stopword(tokens, rsw.stopword_set(self.stopwords))]
+      self.word_counts.update(tokens)
 
   def _finish_calc(self):
     """Finish up the calc global value process."""
-    if self.index_to_word is None:
-      # Sort the dict by the number of times the words appear
-      sorted_words = sorted(self.all_words.items(), key=operator.itemgetter(1), reverse=True)
+    # Hashed words don't need a vocabulary.
+    if self.hash_buckets is not None:
+      return
 
-      # Pull out the first 'max_vocab_size' words
+    if self.index_to_word is None:
+      # Pull out the 'max_vocab_size' most frequent words, leaving room for the
+      # unknown token.
       corrected_vocab_size = self.max_vocab_size - 1
-      sorted_words = [w for w, c in sorted_words[:corrected_vocab_size]]
+      sorted_words = self.word_counts.most_common(corrected_vocab_size, break_ties=False)
 
       # Create the mapping from category values to index in the vector and
       # vice versa
@@ -155,9 +201,11 @@ class StringTransform(n.Transform):
     else:
       self.max_vocab_size = len(self.index_to_word)
 
-    self.word_to_index = {
-      word: num for num, word in enumerate(self.index_to_word)
-    }
+    self.word_to_index = vo.Vocabulary(self.index_to_word)
+
+  def _get_calc_state(self):
+    """Get the partial global values calculated so far, in a form that can be merged with those calculated from other chunks of the data by _merge_calc_state."""
+    return {'word_counts': self.word_counts, 'max_string_len': self.max_string_len}
 
   def _get_array_attributes(self, prefix=''):
     """Get the dictionary that contain the original shapes of the arrays before being converted into tfrecord examples.
@@ -193,6 +241,28 @@ class StringTransform(n.Transform):
         'feature_func': feat._int_feat if key == 'indices' else feat._bytes_feat,
         'np_type': np.int64 if key == 'indices' else np.unicode
       }
+
+      # The diffs and missing values are almost always empty, so only store
+      # the ones that aren't.
+      if key in self._get_sparse_array_keys():
+        default_val = ''
+        att_dict[key]['sparse'] = True
+        att_dict[key]['default_val'] = default_val
+        att_dict[key]['feature_func'] = feat.select_sparse_feature_func(np.unicode, default_val)
+      if key == 'missing_vals' and self.sparse_missing_vals:
+        att_dict[key]['tap_indices_key'] = self._pre('missing_indices', prefix)
+      if key == 'removed_stopwords':
+        att_dict[key]['tap_indices_key'] = self._pre('removed_stopword_indices', prefix)
+
+      # Indices run from -1 (padding) to the size of the vocabulary.
+      if key == 'indices':
+        if self.hash_buckets is not None:
+          vocab_size = self.hash_buckets
+        elif self.index_to_word is not None:
+          vocab_size = len(self.index_to_word)
+        else:
+          vocab_size = self.max_vocab_size
+        self._narrow_array_attributes(att_dict[key], -1, vocab_size)
     att_dict = self._pre(att_dict, prefix)
     return att_dict
 
@@ -203,21 +273,43 @@ class StringTransform(n.Transform):
       array_keys.append('lower_case_diff')
     if self.half_width:
       array_keys.append('half_width_diff')
+    if self.stopwords:
+      array_keys.append('removed_stopwords')
     return array_keys
 
+  def _get_sparse_array_keys(self):
+    """Get the list of keys whose arrays are sparsely encoded when written to tfrecords."""
+    return [k for k in self._get_array_keys() if k != 'indices']
+
+  def _merge_calc_state(self, calc_state):
+    """Merge in the partial global values calculated from another chunk of the data.
+
+    Parameters
+    ----------
+    calc_state : dict
+      The partial global values, as outputted by _get_calc_state.
+
+    """
+    self.word_counts.merge(calc_state['word_counts'])
+    self.max_string_len = max(self.max_string_len, calc_state['max_string_len'])
+
   def _save_dict(self):
     """Create the dictionary of values needed in order to reconstruct the transform."""
     save_dict = {}
     for key in self.attribute_dict:
       save_dict[key] = getattr(self, key)
     save_dict['__class__'] = str(self.__class__.__name__)
+
+    # Don't store the words twice, they can be pulled out of the vocabulary.
+    if isinstance(self.word_to_index, vo.Vocabulary):
+      save_dict['index_to_word'] = None
     return save_dict
 
   def _start_calc(self):
     """Start the calc global value process."""
-    # Create the mapping from category values to index in the vector and
-    # vice versa
-    self.all_words = {}
+    # Keep the running counts of all the words.
+    self.word_counts = acc.CountAccumulator(self.max_tracked_words)
+    self.max_string_len = 0 if self.hash_buckets is not None else None
 
   def define_waterwork(self, array=empty, return_tubes=None, prefix=''):
     """Get the waterwork that completely describes the pour and pump transformations.
@@ -233,8 +325,12 @@ class StringTransform(n.Transform):
       The waterwork with all the tanks (operations) added, and names set.
 
     """
+    # Cache the tokenized strings across all the pours of the waterwork.
+    if self.tokenize_cache_size:
+      self.tokenize_cache = lc.LRUCache(self.tokenize_cache_size)
+
     # Tokenize the full strings into words
-    tokens, tokens_slots = td.tokenize(strings=array, tokenizer=self.word_tokenizer, detokenizer=self.word_detokenizer, max_len=self.max_sent_len)
+    tokens, tokens_slots = td.tokenize(strings=array, tokenizer=self.word_tokenizer, detokenizer=self.word_detokenizer, max_len=self.max_sent_len, cache=self.tokenize_cache)
     tokens_slots['strings'].unplug()
 
     # Set the names of various tubes and slots to make it easier to reference
@@ -257,11 +353,42 @@ class StringTransform(n.Transform):
       tokens, tokens_slots = td.half_width(tokens['target'])
       tokens['diff'].set_name('half_width_diff')
 
+    # Remove the stopwords, keeping the removed words and where they were so
+    # they can be put back.
+    if self.stopwords:
+      tokens, tokens_slots = td.remove_stopwords(tokens['target'], self.stopwords)
+      tokens['removed_vals'].set_name('removed_stopwords')
+      tokens['removed_indices'].set_name('removed_stopword_indices')
+      tokens_slots['stopwords'].set_name('stopwords')
+
+    # Hash the words straight into indices, keeping all of them as missing
+    # values since the hashes can't be reversed.
+    if self.hash_buckets is not None:
+      hash_to_index = td.sparse_hash_to_index if self.sparse_missing_vals else td.hash_to_index
+      indices, indices_slots = hash_to_index(
+        tokens['target'], self.hash_buckets,
+        tube_plugs={'input_dtype': self.input_dtype}
+      )
+      indices['target'].set_name('indices')
+      indices['missing_vals'].set_name('missing_vals')
+      if self.sparse_missing_vals:
+        indices['missing_indices'].set_name('missing_indices')
+      indices_slots['hash_buckets'].set_name('hash_buckets')
+
+      if return_tubes is not None:
+        ww = indices['target'].waterwork
+        r_tubes = []
+        for r_tube_key in return_tubes:
+          r_tubes.append(ww.maybe_get_tube(r_tube_key))
+        return r_tubes
+      return
+
     # Find all the strings which are not in the list of known words and
     # replace them with the 'unknown token'.
-    isin, isin_slots = td.isin(tokens['target'], self.index_to_word + [''])
+    isin, isin_slots = td.isin(tokens['target'], self.word_to_index)
     mask, _ = td.logical_not(isin['target'])
-    tokens, _ = td.replace(
+    replace = td.sparse_replace if self.sparse_missing_vals else td.replace
+    tokens, _ = replace(
       isin['a'], mask['target'], self.index_to_word[0],
       tube_plugs={
         'mask': lambda z: z[self._pre('indices', prefix)] == 0
@@ -270,6 +397,8 @@ class StringTransform(n.Transform):
 
     # Keep track values that were overwritten with a 'unknown token'
     tokens['replaced_vals'].set_name('missing_vals')
+    if self.sparse_missing_vals:
+      tokens['replaced_indices'].set_name('missing_indices')
     isin_slots['b'].set_name('index_to_word')
 
     # Convert the tokens into indices.
@@ -306,7 +435,9 @@ class StringTransform(n.Transform):
       Dictionary where the keys are the field names and the values are the SQL data types.
 
     """
-    if var_lim is None:
+    if var_lim is None and self.hash_buckets is not None:
+      var_lim = max(self.max_string_len, 1)
+    elif var_lim is None:
       var_lim = self.max_sent_len
       for word in self.index_to_word:
         if len(word) * self.max_sent_len > var_lim:
@@ -0,0 +1,136 @@
+"""Definition of the SubwordTransform."""
+import string_transform as st
+import wtrwrks.utils.word_piece as wpi
+
+
+class SubwordTransform(st.StringTransform):
+  """Object that transforms raw strings into vectorized word pieces (subwords) with all the necessary data needed in order to completely reconstruct the original strings. Rare words are split into pieces from a vocabulary of bounded size rather than being replaced by the unknown token, so far fewer of the original words have to be stored in the missing values.
+
+  Parameters
+  ----------
+  name : str
+    The name of the transform.
+  dtype : numpy dtype
+    The data type the transformed data should have. Defaults to np.float64.
+  input_dtype: numpy dtype
+    The datatype of the original inputted array.
+  lower_case : bool
+    Whether or not to lower_case all the strings.
+  half_width : bool
+    Whether or not to convert all full width characters to half width.
+  index_to_word : list
+    The mapping from index number to word piece, with the pieces which continue a word prefixed by '##'. If None, the word pieces are learned from the data during calc_global_values.
+  max_sent_len : int
+    The maximum allowed number of word pieces in a sentence. Also decides the inner most dimension of the outputted indices array.
+  max_vocab_size : int
+    The maximum allowed number of word pieces in the vocabulary.
+  max_tracked_words : int or None
+    When learning the vocabulary, the maximum number of distinct words to hold exact counts for. Past this the counts fall back to a heavy hitters summary, which keeps memory bounded but makes the counts of the rarer words approximate. None implies no limit.
+  word_splitter : func
+    A function that takes in a string and splits it up into a list of words, which are then split into word pieces.
+  max_word_len : int
+    Words longer than this aren't split into pieces, and are treated as unknown.
+  tokenize_cache_size : int or None
+    The maximum number of distinct strings whose tokens are cached, so that strings which are repeated across pours are only tokenized once. None implies no caching.
+
+  Attributes
+  ----------
+  attribute_dict: dict
+    The keys are the attributes of the class while the values are the default values. It's done this way rather than defined in the __init__ because this dictionary also defines what values need to be saved when written to disk, and what values need to be displayed when printed to the terminal.
+  required_params: set of strs
+    The parameters that must be provided to the transform at definition.
+  cols : list of strs
+    The column names of the array or dataframe to be transformed.
+  num_examples : int
+    The number of rows that have passed through the calc_global_values function.
+  is_calc_run : bool
+    Whether or not calc_global_values has been run for this transform.
+  word_to_index : dict
+    The mapping from word piece to index number.
+  word_tokenizer : WordPieceTokenizer or func
+    The tokenizer which splits strings into word pieces. Until the vocabulary is learned it's just the word_splitter.
+
+  """
+
+  attribute_dict = {'word_splitter': lambda a: a.split(), 'max_word_len': 100}
+
+  for k, v in st.StringTransform.attribute_dict.iteritems():
+    if k in attribute_dict:
+      continue
+    attribute_dict[k] = v
+
+  required_params = set([])
+  required_params.update(st.StringTransform.required_params)
+
+  def __init__(self, from_file=None, save_dict=None, **kwargs):
+    """Define a transform using a dictionary, file, or by setting the attribute values in kwargs.
+
+    Parameters
+    ----------
+    from_file : None or str
+      The file path of the Tranform that was written to disk.
+    save_dict : dict or None
+      The dictionary of attributes that completely define a Transform.
+    name : str
+      The name of the transform.
+    dtype : numpy dtype
+      The data type the transformed data should have. Defaults to np.float64.
+    input_dtype: numpy dtype
+      The datatype of the original inputted array.
+    lower_case : bool
+      Whether or not to lower_case all the strings.
+    half_width : bool
+      Whether or not to convert all full width characters to half width.
+    index_to_word : list
+      The mapping from index number to word piece, with the pieces which continue a word prefixed by '##'. If None, the word pieces are learned from the data during calc_global_values.
+    max_sent_len : int
+      The maximum allowed number of word pieces in a sentence. Also decides the inner most dimension of the outputted indices array.
+    max_vocab_size : int
+      The maximum allowed number of word pieces in the vocabulary.
+    max_tracked_words : int or None
+      When learning the vocabulary, the maximum number of distinct words to hold exact counts for. Past this the counts fall back to a heavy hitters summary, which keeps memory bounded but makes the counts of the rarer words approximate. None implies no limit.
+    word_splitter : func
+      A function that takes in a string and splits it up into a list of words, which are then split into word pieces.
+    max_word_len : int
+      Words longer than this aren't split into pieces, and are treated as unknown.
+    tokenize_cache_size : int or None
+      The maximum number of distinct strings whose tokens are cached, so that strings which are repeated across pours are only tokenized once. None implies no caching.
+    **kwargs :
+      The keyword arguments that set the values of the attributes defined in the attribute_dict.
+
+    """
+    super(SubwordTransform, self).__init__(from_file, save_dict, **kwargs)
+
+    if self.hash_buckets is not None:
+      raise ValueError("hash_buckets is not supported by SubwordTransform, the word pieces need a vocabulary.")
+
+    # The word pieces are joined back together by the detokenizer. Before the
+    # vocabulary is learned, the strings are only split into whole words so
+    # that they can be counted.
+    self.word_detokenizer = wpi.detokenize
+    if self.index_to_word is not None:
+      self._set_word_tokenizer()
+    else:
+      self.word_tokenizer = self.word_splitter
+
+  def _finish_calc(self):
+    """Finish up the calc global value process."""
+    if self.index_to_word is None:
+      # Train the word pieces on the counted words, leaving room for the
+      # unknown token.
+      word_counts = [(word, self.word_counts.counts[word]) for word in self.word_counts.most_common()]
+      pieces = wpi.train_word_pieces(word_counts, self.max_vocab_size - 1)
+      self.index_to_word = ['[UNK]'] + sorted(pieces)
+
+    super(SubwordTransform, self)._finish_calc()
+    self._set_word_tokenizer()
+
+  def _set_word_tokenizer(self):
+    """Build the word piece tokenizer from the vocabulary."""
+    self.word_tokenizer = wpi.WordPieceTokenizer(
+      self.index_to_word,
+      word_splitter=self.word_splitter,
+      lower_case=self.lower_case,
+      half_width=self.half_width,
+      max_word_len=self.max_word_len
+    )
@@ -10,11 +10,18 @@ import tensorflow as tf
 import itertools
 import wtrwrks.utils.multiprocessing as mh
 import wtrwrks.utils.batch_functions as b
+import wtrwrks.utils.vocab as vo
+import wtrwrks.read_write.tf_features as feat
+import wtrwrks.read_write.offset_index as oi
 import logging
 import random
 import glob
+import hashlib
 import sqlalchemy as sa
 
+# The most tfrecord files to read from at once in high throughput mode.
+MAX_INTERLEAVE_FILES = 16
+
 
 class Transform(object):
   """Abstract class used to create mappings from raw to vectorized, normalized data and vice versa. These transform store all the information necessary to create a Waterwork object which can do all the necessary reversible alterations to the data and also to transform it back to its original form.
@@ -27,6 +34,10 @@ class Transform(object):
     The data type the transformed data should have. Defaults to np.float64.
   input_dtype: numpy dtype
     The datatype of the original inputted array.
+  narrow_dtypes : bool
+    Whether or not to write integer taps with a known range (e.g. indices) using the smallest integer datatype that holds the range. They are restored to their declared datatype when read.
+  sparse_missing_vals : bool
+    Whether or not to output the missing value taps sparsely, i.e. as a 'missing_vals' tap of only the missing values along with a 'missing_indices' tap of their flat indices, rather than as full arrays which are almost entirely default values.
 
   Attributes
   ----------
@@ -43,7 +54,7 @@ class Transform(object):
 
   """
 
-  attribute_dict = {'name': '', 'cols': None, 'num_examples': None, 'is_calc_run': False, 'input_dtype': None, 'dtype': None}
+  attribute_dict = {'name': '', 'cols': None, 'num_examples': None, 'is_calc_run': False, 'input_dtype': None, 'dtype': None, 'narrow_dtypes': False, 'sparse_missing_vals': True}
   required_params = set(['name'])
 
   def __init__(self, from_file=None, save_dict=None, **kwargs):
@@ -61,6 +72,10 @@ class Transform(object):
       The data type the transformed data should have. Defaults to np.float64.
     input_dtype: numpy dtype
       The datatype of the original inputted array.
+    narrow_dtypes : bool
+      Whether or not to write integer taps with a known range (e.g. indices) using the smallest integer datatype that holds the range. They are restored to their declared datatype when read.
+    sparse_missing_vals : bool
+      Whether or not to output the missing value taps sparsely, i.e. as a 'missing_vals' tap of only the missing values along with a 'missing_indices' tap of their flat indices, rather than as full arrays which are almost entirely default values.
     **kwargs :
       The keyword arguments that set the values of the attributes defined in the attribute_dict.
 
@@ -68,6 +83,7 @@ class Transform(object):
     # Build from file
     if from_file is not None:
       save_dict = d.read_from_file(from_file)
+      save_dict = vo.load_vocabularies(save_dict, from_file)
       self._from_save_dict(save_dict)
     # Build from dict
     elif save_dict is not None:
@@ -101,19 +117,52 @@ class Transform(object):
   def __len__(self):
     raise NotImplementedError()
 
+  def _dense_to_sparse_taps(self, arrays_dict, att_dict):
+    """Convert the full arrays of any taps which the waterwork outputs sparsely into their sparse form, i.e. the values which aren't the default value along with their flat indices.
+
+    Parameters
+    ----------
+    arrays_dict : dict of arrays
+      The arrays of a batch of examples.
+    att_dict : dict
+      The dictionary of array attributes from _get_array_attributes.
+
+    Returns
+    -------
+    arrays_dict : dict of arrays
+      The arrays with the full arrays of the sparse taps replaced with their values, and their flat indices added.
+
+    """
+    r_dict = {}
+    r_dict.update(arrays_dict)
+    for key in att_dict:
+      indices_key = att_dict[key].get('tap_indices_key')
+      if indices_key is None or key not in r_dict or indices_key in r_dict:
+        continue
+
+      flat = r_dict[key].flatten()
+      indices = np.flatnonzero(flat != att_dict[key]['default_val'])
+      r_dict[indices_key] = indices
+      r_dict[key] = flat[indices]
+    return r_dict
+
   def _finish_calc(self):
     """Finish up the calc global value process."""
     return
 
   def _from_save_dict(self, save_dict):
-    """Reconstruct the transform object from the dictionary of attributes."""
+    """Reconstruct the transform object from the dictionary of attributes. Any attributes missing from the dictionary, e.g. those added since it was saved, are given their default values."""
     for key in self.attribute_dict:
-      setattr(self, key, save_dict[key])
+      setattr(self, key, save_dict.get(key, self.attribute_dict[key]))
 
   def _get_array_attributes(self, prefix):
     raise NotImplementedError()
 
-  def _get_dataset(self, file_name_pattern, batch_size, num_epochs=None, num_examples=None, filters=None, keep_features=None, drop_features=None, add_tensors=None, num_threads=1, shuffle_buffer_size=10000, random_seed=None):
+  def _get_calc_state(self):
+    """Get the partial global values calculated so far, in a form that can be merged with those calculated from other chunks of the data by _merge_calc_state."""
+    raise NotImplementedError("{} does not support calculating global values with multiple workers.".format(self.__class__.__name__))
+
+  def _get_dataset(self, file_name_pattern, batch_size, num_epochs=None, num_examples=None, filters=None, keep_features=None, drop_features=None, add_tensors=None, num_threads=1, shuffle_buffer_size=10000, random_seed=None, high_throughput=False, cache_dir=None):
     """Create the tensoflow dataset object to be used for input into training pipelines.
 
     Parameters
@@ -140,6 +189,10 @@ class Transform(object):
       How many examples to shuffle together.
     random_seed : int or None
       The seed to set the random number generator
+    high_throughput : bool
+      Whether to read several files at once, parse whole batches of examples at a time, let tensorflow tune the parallelism and prefetch batches.
+    cache_dir : str or None
+      A local directory to cache the decoded and filtered examples in. The first epoch reads and parses the tfrecords and writes the cache, every later epoch streams from the cache. Datasets of different files, features, filters or numbers of examples are cached to different files in the directory.
 
     Returns
     -------
@@ -155,47 +208,65 @@ class Transform(object):
     file_names.sort()
     shuffled_file_names = random.sample(file_names, len(file_names))
 
-    # Define the dataset object from the tfrecord files
-    dataset = tf.compat.v1.data.TFRecordDataset(shuffled_file_names)
-
-    # If num steps was given then use that to define how long to run the dataset
-    if num_examples is not None:
-      dataset = dataset.take(num_examples)
-      dataset = dataset.shuffle(
-          buffer_size=shuffle_buffer_size
+    # Define the dataset object from the tfrecord files. In high throughput
+    # mode read from several files at once.
+    if high_throughput:
+      dataset = tf.data.Dataset.from_tensor_slices(shuffled_file_names)
+      dataset = dataset.interleave(
+        tf.data.TFRecordDataset,
+        cycle_length=self._interleave_cycle_length(len(file_names), num_threads),
+        num_parallel_calls=tf.data.experimental.AUTOTUNE
       )
-    # Otherwise use the number of epochs
     else:
-      # Convert num epochs to integer
-      if num_epochs is not None and type(num_epochs) is not int and not (tf.is_tensor(num_epochs) and num_epochs.dtype is tf.int64):
-        logging.warn(
-          '%s is not a whole number. Will be converted to %s',
-          num_epochs,
-          int(num_epochs)
-        )
-        num_epochs = int(num_epochs)
-
-      dataset = dataset.shuffle(shuffle_buffer_size, random_seed)
-      dataset = dataset.repeat(num_epochs)
-      # Shuffle the dataset
-      # s_and_r = tf.compat.v1.data.experimental.shuffle_and_repeat(
-      #     buffer_size=shuffle_buffer_size,
-      #     count=num_epochs
-      # )
-      # dataset = dataset.apply(s_and_r)
+      dataset = tf.compat.v1.data.TFRecordDataset(shuffled_file_names)
+
+    # Convert num epochs to integer
+    if num_epochs is not None and type(num_epochs) is not int and not (tf.is_tensor(num_epochs) and num_epochs.dtype is tf.int64):
+      logging.warn(
+        '%s is not a whole number. Will be converted to %s',
+        num_epochs,
+        int(num_epochs)
+      )
+      num_epochs = int(num_epochs)
 
-    # Read and decode the dataset
-    dataset = dataset.map(
-      lambda se: self.read_and_decode(se, '', keep_features, drop_features),
-      num_parallel_calls=num_threads
-    )
+    # Decode, filter and cache the examples before shuffling and repeating so
+    # that only the first epoch has to parse the tfrecords.
+    if cache_dir is not None:
+      dataset = self._get_cached_dataset(dataset, cache_dir, file_name_pattern, batch_size, num_epochs, num_examples, filters, keep_features, drop_features, num_threads, shuffle_buffer_size, random_seed, high_throughput)
 
-    # If any filters were put in place filter the values.
-    if filters is not None:
-      for key in filters:
-        dataset = dataset.filter(
-          filters[key]
+    else:
+      # If num steps was given then use that to define how long to run the dataset
+      if num_examples is not None:
+        dataset = dataset.take(num_examples)
+        dataset = dataset.shuffle(
+            buffer_size=shuffle_buffer_size
         )
+      # Otherwise use the number of epochs
+      else:
+        dataset = dataset.shuffle(shuffle_buffer_size, random_seed)
+        dataset = dataset.repeat(num_epochs)
+        # Shuffle the dataset
+        # s_and_r = tf.compat.v1.data.experimental.shuffle_and_repeat(
+        #     buffer_size=shuffle_buffer_size,
+        #     count=num_epochs
+        # )
+        # dataset = dataset.apply(s_and_r)
+
+      if high_throughput and batch_size is not None:
+        return self._get_high_throughput_dataset(dataset, batch_size, filters, keep_features, drop_features, add_tensors)
+
+      # Read and decode the dataset
+      dataset = dataset.map(
+        lambda se: self.read_and_decode(se, '', keep_features, drop_features),
+        num_parallel_calls=tf.data.experimental.AUTOTUNE if high_throughput else num_threads
+      )
+
+      # If any filters were put in place filter the values.
+      if filters is not None:
+        for key in filters:
+          dataset = dataset.filter(
+            filters[key]
+          )
 
     # Batch out the data
     if batch_size is not None:
@@ -208,6 +279,146 @@ class Transform(object):
           kwargs[key] = add_tensors[key]
           return kwargs
         dataset = dataset.map(_add_tensor)
+
+    if high_throughput:
+      dataset = dataset.prefetch(tf.data.experimental.AUTOTUNE)
+    return dataset
+
+  def _get_cached_dataset(self, dataset, cache_dir, file_name_pattern, batch_size, num_epochs=None, num_examples=None, filters=None, keep_features=None, drop_features=None, num_threads=1, shuffle_buffer_size=10000, random_seed=None, high_throughput=False):
+    """Decode and filter a dataset of serialized examples, cache the decoded examples to a local directory, then shuffle and repeat them.
+
+    Parameters
+    ----------
+    dataset : tf.compat.v1.dataset
+      The dataset of serialized examples.
+    cache_dir : str
+      The local directory to write the cache files to.
+    file_name_pattern : string
+      The file name pattern of the tfrecord files the examples were read from.
+    batch_size : int
+      The number of examples to parse at once in high throughput mode.
+    num_epochs : int
+      The number times to run through the full dataset of examples. Defaults to running indefinitely.
+    num_examples : int
+      Number of examples to run in the dataset before terminating. Cannot use when num_epochs is defined
+    filters : dict of functions
+      Any pre preprocessing filters to put on the dataset. The keys are the filter names, the values are the filter themselves
+    keep_features : list of strs
+      The features to keep after reading in from the tfrecords. Defaults to all of them.
+    drop_features : list of strs
+      The features to drop when reading from the tfrecords. Defaults to None. Can only use this or keep_features not both.
+    num_threads : int
+      The number of io threads to use.
+    shuffle_buffer_size : int
+      How many examples to shuffle together.
+    random_seed : int or None
+      The seed to set the random number generator
+    high_throughput : bool
+      Whether to parse whole batches of examples at a time and let tensorflow tune the parallelism.
+
+    Returns
+    -------
+    dataset : tf.compat.v1.dataset
+      The unbatched dataset of decoded examples.
+
+    """
+    if num_examples is not None:
+      dataset = dataset.take(num_examples)
+
+    # Read and decode the dataset
+    if high_throughput and batch_size is not None:
+      dataset = dataset.batch(batch_size)
+      dataset = dataset.map(
+        lambda se: self.read_and_decode_batch(se, '', keep_features, drop_features),
+        num_parallel_calls=tf.data.experimental.AUTOTUNE
+      )
+      dataset = dataset.apply(tf.data.experimental.unbatch())
+    else:
+      dataset = dataset.map(
+        lambda se: self.read_and_decode(se, '', keep_features, drop_features),
+        num_parallel_calls=tf.data.experimental.AUTOTUNE if high_throughput else num_threads
+      )
+
+    # If any filters were put in place filter the values.
+    if filters is not None:
+      for key in filters:
+        dataset = dataset.filter(
+          filters[key]
+        )
+
+    # Write the decoded examples to the cache on the first pass through and
+    # read them back from it on every pass after that. The cache file is named
+    # after everything that determines which examples end up in it, so that
+    # datasets built from other files, features or filters don't share it.
+    d.maybe_create_dir(cache_dir)
+    cache_key = [file_name_pattern, num_examples, keep_features, drop_features]
+    if filters is not None:
+      cache_key.append([(key, filters[key].__code__.co_code) for key in sorted(filters)])
+    cache_name = 'decoded_' + hashlib.md5(repr(cache_key)).hexdigest()
+    dataset = dataset.cache(os.path.join(cache_dir, cache_name))
+
+    dataset = dataset.shuffle(shuffle_buffer_size, random_seed)
+    if num_examples is None:
+      dataset = dataset.repeat(num_epochs)
+
+    return dataset
+
+  def _get_high_throughput_dataset(self, dataset, batch_size, filters=None, keep_features=None, drop_features=None, add_tensors=None):
+    """Batch, parse and prefetch a dataset of serialized examples, decoding each batch in a single map.
+
+    Parameters
+    ----------
+    dataset : tf.compat.v1.dataset
+      The dataset of serialized examples.
+    batch_size : int
+      The number of example to include in a single batch.
+    filters : dict of functions
+      Any pre preprocessing filters to put on the dataset. The keys are the filter names, the values are the filter themselves
+    keep_features : list of strs
+      The features to keep after reading in from the tfrecords. Defaults to all of them.
+    drop_features : list of strs
+      The features to drop when reading from the tfrecords. Defaults to None. Can only use this or keep_features not both.
+    add_tensors : dict of tensors
+      Any additional tensors to add into the dataset object.
+
+    Returns
+    -------
+    dataset : tf.compat.v1.dataset
+      The dataset object to feed into tensorflow training pipelines.
+
+    """
+    if add_tensors is None:
+      add_tensors = {}
+
+    def _add_tensors(features):
+      features.update(add_tensors)
+      return features
+
+    # Batch before parsing so the entire batch is decoded, reshaped and cast
+    # in a single map.
+    dataset = dataset.batch(batch_size)
+    if filters is None:
+      dataset = dataset.map(
+        lambda se: _add_tensors(self.read_and_decode_batch(se, '', keep_features, drop_features)),
+        num_parallel_calls=tf.data.experimental.AUTOTUNE
+      )
+    # The filters are defined on single examples, so the batches have to be
+    # broken up, filtered and rebatched.
+    else:
+      dataset = dataset.map(
+        lambda se: self.read_and_decode_batch(se, '', keep_features, drop_features),
+        num_parallel_calls=tf.data.experimental.AUTOTUNE
+      )
+      dataset = dataset.apply(tf.data.experimental.unbatch())
+      for key in filters:
+        dataset = dataset.filter(
+          filters[key]
+        )
+      dataset = dataset.batch(batch_size)
+      if add_tensors:
+        dataset = dataset.map(_add_tensors)
+
+    dataset = dataset.prefetch(tf.data.experimental.AUTOTUNE)
     return dataset
 
   def _get_eval_cls_cols(self, already_added_cols=None):
@@ -249,6 +460,21 @@ class Transform(object):
         index=np.arange(data.shape[0])
       )
 
+  def _interleave_cycle_length(self, num_files, num_threads):
+    """Get the number of tfrecord files to read from at once in high throughput mode. Every file is read in parallel, up to MAX_INTERLEAVE_FILES, unless more threads were asked for."""
+    return max(min(num_files, MAX_INTERLEAVE_FILES), num_threads, 1)
+
+  def _merge_calc_state(self, calc_state):
+    """Merge in the partial global values calculated from another chunk of the data.
+
+    Parameters
+    ----------
+    calc_state : dict
+      The partial global values, as outputted by _get_calc_state.
+
+    """
+    raise NotImplementedError("{} does not support calculating global values with multiple workers.".format(self.__class__.__name__))
+
   def _nopre(self, to_unprefix, prefix=''):
     """Strip the self.name/prefix from a string or keys of a dictionary.
 
@@ -310,6 +536,117 @@ class Transform(object):
         r_d[key] = to_prefix[key]
     return r_d
 
+  def _narrow_array_attributes(self, array_attributes, min_val, max_val):
+    """If narrow_dtypes is set, alter the attributes of an integer array so that it's written using the smallest datatype that holds all the values between min_val and max_val.
+
+    Parameters
+    ----------
+    array_attributes : dict
+      The attributes of a single array, from _get_array_attributes.
+    min_val : int
+      The smallest value the array can have.
+    max_val : int
+      The largest value the array can have.
+
+    Returns
+    -------
+    array_attributes : dict
+      The attributes with the narrow datatype and its feature function set.
+
+    """
+    if not self.narrow_dtypes:
+      return array_attributes
+
+    narrow_np_type = feat.select_narrow_dtype(min_val, max_val)
+    array_attributes['narrow_np_type'] = narrow_np_type
+    array_attributes['feature_func'] = feat.select_narrow_feature_func(narrow_np_type)
+    return array_attributes
+
+  def _narrow_to_wide(self, array_dict, att_dict):
+    """Convert any arrays of a single example written with a narrow datatype back into their declared datatype.
+
+    Parameters
+    ----------
+    array_dict : dict of arrays
+      The arrays associated with a single example.
+    att_dict : dict
+      The dictionary of array attributes from _get_array_attributes.
+
+    Returns
+    -------
+    array_dict : dict of arrays
+      The arrays with the narrow arrays restored to their declared datatypes.
+
+    """
+    r_dict = {}
+    r_dict.update(array_dict)
+    for key in att_dict:
+      if 'narrow_np_type' not in att_dict[key] or key not in r_dict:
+        continue
+
+      r_dict[key] = feat.narrow_to_wide(
+        r_dict[key],
+        att_dict[key]['narrow_np_type'],
+        att_dict[key]['np_type']
+      )
+    return r_dict
+
+  def _sparse_to_dense(self, array_dict, att_dict):
+    """Convert any sparsely encoded arrays of a single example back into dense arrays.
+
+    Parameters
+    ----------
+    array_dict : dict of arrays
+      The arrays associated with a single example.
+    att_dict : dict
+      The dictionary of array attributes from _get_array_attributes.
+
+    Returns
+    -------
+    array_dict : dict of arrays
+      The arrays with the index and value arrays of sparse features replaced with the dense array.
+
+    """
+    r_dict = {}
+    r_dict.update(array_dict)
+    for key in att_dict:
+      if not att_dict[key].get('sparse', False):
+        continue
+
+      indices_key, values_key = feat.sparse_feature_keys(key)
+      if indices_key not in r_dict:
+        continue
+
+      r_dict[key] = feat.sparse_to_dense(
+        r_dict.pop(indices_key),
+        r_dict.pop(values_key),
+        att_dict[key]['shape'],
+        att_dict[key]['default_val']
+      )
+    return r_dict
+
+  def _rebuild_features(self, features, prefix='', keep_features=None, drop_features=None):
+    """Add any tensors which aren't written to the examples but can be rebuilt from the ones that are. Nothing needs to be rebuilt by default.
+
+    Parameters
+    ----------
+    features : dict of tensors
+      The tensors read from the examples.
+    prefix : str
+      Any additional prefix string/dictionary keys start with. Defaults to no additional prefix.
+    keep_features : list of strs
+      The features that were kept after reading in from the tfrecords. Defaults to all of them.
+    drop_features : list of strs
+      The features that were dropped when reading from the tfrecords.
+
+    Returns
+    -------
+    features : dict of tensors
+      The tensors with any rebuilt ones added.
+
+    """
+    return features
+
   def _save_dict(self):
     """Create the dictionary of values needed in order to reconstruct the transform."""
     save_dict = {}
@@ -324,7 +661,7 @@ class Transform(object):
     """Start the calc global value process."""
     self.num_examples = 0.
 
-  def calc_global_values(self, data=None, data_iter=None):
+  def calc_global_values(self, data=None, data_iter=None, num_workers=1):
     """Calculate any values needed for the transform that require information from the entired dataset.
 
     Parameters
@@ -333,6 +670,8 @@ class Transform(object):
       The entire dataset in the form of a numpy array or a pandas DataFrame. Should have the same columns as the arrays that will be fed to the pour method.
     data_iter : iterator of np.array or pd.DataFrame
       The entire dataset in the form of an iterator of numpy array or a pandas DataFrame. Needed if the dataset is too large to fit in memory. Should have the same columns as the arrays that will be fed to the pour method. Can only use if 'data' is not being used
+    num_workers : int
+      The number of processes to calculate the global values of the chunks of data_iter in. Each worker calculates the partial values of one chunk, which are then merged together, so at most num_workers chunks are held in memory at once.
 
     """
     if data is not None and data_iter is None:
@@ -342,31 +681,53 @@ class Transform(object):
     else:
       raise ValueError("Must supply exactly one array or array_iter.")
 
+    if type(data_iter) in (list, tuple):
+      data_iter = (i for i in data_iter)
+
     self._start_calc()
-    has_at_least_one = False
-    for data_num, data in enumerate(data_iter):
-      if data_num == 0:
-        has_at_least_one = True
-        if type(data) is pd.DataFrame:
-          is_df = True
-          self.cols = list(data.columns)
-        else:
-          is_df = False
-          self.cols = [self.name + '_' + str(dim) for dim in xrange(data.shape[1])]
-      data = data.values if is_df else data
 
-      if data_num == 0:
-        if self.input_dtype is None:
-          self.input_dtype = data.dtype
+    # Run the first chunk in this process so that the columns and dtypes are
+    # set before any of the chunks are handed out to the workers.
+    data = next(data_iter, None)
+    if data is None:
+      raise ValueError("No data was passed to calc_global_values.")
 
-        if len(data.shape) != 2:
-          raise ValueError("Only rank 2 arrays are supported for transforms. Got {}".format(len(data.shape)))
+    if type(data) is pd.DataFrame:
+      is_df = True
+      self.cols = list(data.columns)
+    else:
+      is_df = False
+      self.cols = [self.name + '_' + str(dim) for dim in xrange(data.shape[1])]
+    data = data.values if is_df else data
 
-      self._calc_global_values(data)
-    self._finish_calc()
+    if self.input_dtype is None:
+      self.input_dtype = data.dtype
 
-    if not has_at_least_one:
-      raise ValueError("No data was passed to calc_global_values.")
+    if len(data.shape) != 2:
+      raise ValueError("Only rank 2 arrays are supported for transforms. Got {}".format(len(data.shape)))
+
+    self._calc_global_values(data)
+
+    if num_workers == 1:
+      for data in data_iter:
+        data = data.values if is_df else data
+        self._calc_global_values(data)
+    else:
+      save_dict = self._save_dict()
+      cls = self.__class__
+
+      def calc_func(data):
+        trans = cls(save_dict=save_dict)
+        trans._start_calc()
+        trans._calc_global_values(data)
+        return trans._get_calc_state()
+
+      for batch in b.batcher(data_iter, num_workers):
+        batch = [data.values if is_df else data for data in batch]
+        for calc_state in mh.multi_map(calc_func, batch, num_workers):
+          self._merge_calc_state(calc_state)
+
+    self._finish_calc()
     self.is_calc_run = True
 
   def define_waterwork(self, array=None, return_tubes=None, prefix=''):
@@ -404,11 +765,14 @@ class Transform(object):
 
     """
     arrays_dict = {}
+    att_dict = self._get_array_attributes(prefix)
 
     # If the examples are all broken up into individual rows then put them into
     # one large dictionary of arrays
     if type(example_dicts) is not dict:
       for array_dict in example_dicts:
+        array_dict = self._sparse_to_dense(array_dict, att_dict)
+        array_dict = self._narrow_to_wide(array_dict, att_dict)
         for key in array_dict:
           arrays_dict.setdefault(key, [])
           arrays_dict[key].append(array_dict[key])
@@ -419,12 +783,11 @@ class Transform(object):
       arrays_dict.update(example_dicts)
 
     # Do any necessary reshaping and recasting
-    att_dict = self._get_array_attributes(prefix)
     for key in arrays_dict:
       arrays_dict[key] = arrays_dict[key].reshape([-1] + att_dict[key]['shape'])
       arrays_dict[key] = arrays_dict[key].astype(att_dict[key]['np_type'])
 
-    return arrays_dict
+    return self._dense_to_sparse_taps(arrays_dict, att_dict)
 
   def get_default_array(self, batch_size=1):
     """Get an array of the proper shape and type that matches the input array.
@@ -502,7 +865,7 @@ class Transform(object):
 
     return feed_iter
 
-  def get_dataset_iter_init(self, dataset_iter, file_name_pattern, batch_size, num_epochs=None, num_examples=None, filters=None, keep_features=None, drop_features=None, add_tensors=None, num_threads=1, shuffle_buffer_size=1000, random_seed=None):
+  def get_dataset_iter_init(self, dataset_iter, file_name_pattern, batch_size, num_epochs=None, num_examples=None, filters=None, keep_features=None, drop_features=None, add_tensors=None, num_threads=1, shuffle_buffer_size=1000, random_seed=None, high_throughput=False, cache_dir=None):
     """Create the tensoflow dataset object to be used for input into training pipelines.
 
     Parameters
@@ -531,6 +894,10 @@ class Transform(object):
       How many examples to shuffle together.
     random_seed : int or None
       The seed to set the random number generator
+    high_throughput : bool
+      Whether to read several files at once, parse whole batches of examples at a time, let tensorflow tune the parallelism and prefetch batches.
+    cache_dir : str or None
+      A local directory to cache the decoded and filtered examples in, so that only the first epoch parses the tfrecords.
 
     Returns
     -------
@@ -538,7 +905,7 @@ class Transform(object):
       The dataset object to feed into tensorflow training pipelines.
 
     """
-    dataset = self._get_dataset(file_name_pattern, batch_size, num_epochs, num_examples, filters, keep_features, drop_features, add_tensors, num_threads, shuffle_buffer_size, random_seed)
+    dataset = self._get_dataset(file_name_pattern, batch_size, num_epochs, num_examples, filters, keep_features, drop_features, add_tensors, num_threads, shuffle_buffer_size, random_seed, high_throughput, cache_dir)
 
     return dataset_iter.make_initializer(dataset)
 
@@ -709,6 +1076,61 @@ class Transform(object):
 
     return data
 
+  def read_examples(self, file_name, example_ids, prefix='', df=False):
+    """Read individual examples from a tfrecord file written with an offset index and pump them back into the original data.
+
+    Parameters
+    ----------
+    file_name : str
+      The name of the tfrecord file, written with write_index=True.
+    example_ids : list of ints
+      The ids of the examples to read.
+    prefix : str
+      Any additional prefix string/dictionary keys start with. Defaults to no additional prefix.
+    df : bool
+      Whether or not to return the pumped data as a pandas DataFrame.
+
+    Returns
+    -------
+    np.ndarray or pd.DataFrame
+      The original rows of the requested examples, in the order of example_ids.
+
+    """
+    serials = oi.read_serials(file_name, example_ids)
+    tap_dict = self.serials_to_tap_dict(serials, prefix)
+    return self.pump(tap_dict, df=df)
+
+  def serials_to_tap_dict(self, serials, prefix=''):
+    """Convert serialized examples of this transform into a tap dict without going through a tensorflow pipeline.
+
+    Parameters
+    ----------
+    serials : list of strs
+      The serialized examples.
+    prefix : str
+      Any additional prefix string/dictionary keys start with. Defaults to no additional prefix.
+
+    Returns
+    -------
+    tap_dict: dict
+      The dictionary all information needed to completely reconstruct the original data.
+
+    """
+    att_dict = self._get_array_attributes(prefix)
+
+    array_dicts = []
+    for serial in serials:
+      array_dict = oi.serial_to_array_dict(serial)
+
+      # Decode any utf-8 strings
+      for key in array_dict:
+        att_key = key.replace('/sparse_values', '')
+        if att_key in att_dict and np.dtype(att_dict[att_key]['np_type']).char == 'U':
+          array_dict[key] = np.array([v.decode('utf-8') for v in array_dict[key]], dtype=np.unicode)
+      array_dicts.append(array_dict)
+
+    return self.examples_to_tap_dict(array_dicts, prefix)
+
   def read_and_decode(self, serialized_example, prefix='', keep_features=None, drop_features=None):
     """Convert a serialized example created from an example dictionary from this transform into a dictionary of shaped tensors for a tensorflow pipeline.
 
@@ -728,9 +1150,70 @@ class Transform(object):
     features : dict of tensors
       The tensors created by decoding the serialized example
 
+    """
+    feature_dict, att_dict = self._get_feature_dict(prefix, keep_features, drop_features)
+
+    # Parse the example
+    features = tf.io.parse_single_example(
+      serialized=serialized_example,
+      features=feature_dict
+    )
+
+    features = self._shape_features(features, att_dict)
+    return self._rebuild_features(features, prefix, keep_features, drop_features)
+
+  def read_and_decode_batch(self, serialized_examples, prefix='', keep_features=None, drop_features=None):
+    """Convert a batch of serialized examples created from example dictionaries from this transform into a dictionary of shaped tensors, parsing the whole batch at once.
+
+    Parameters
+    ----------
+    serialized_examples : 1D tensor of tfrecord serialized examples
+      The serialized examples to read and convert to a dictionary of tensors.
+    prefix : str
+      A string to prefix the dictionary keys with.
+    keep_features : list of strs
+      The features to keep after reading in from the tfrecords. Defaults to all of them.
+    drop_features : list of strs
+      The features to drop when reading from the tfrecords. Defaults to None. Can only use this or keep_features not both.
+
+    Returns
+    -------
+    features : dict of tensors
+      The tensors created by decoding the serialized examples, with a batch dimension prepended.
+
+    """
+    feature_dict, att_dict = self._get_feature_dict(prefix, keep_features, drop_features)
+
+    # Parse the whole batch of examples
+    features = tf.io.parse_example(
+      serialized=serialized_examples,
+      features=feature_dict
+    )
+
+    features = self._shape_features(features, att_dict, batched=True)
+    return self._rebuild_features(features, prefix, keep_features, drop_features)
+
+  def _get_feature_dict(self, prefix='', keep_features=None, drop_features=None):
+    """Get the tensorflow feature objects needed to parse the examples of this transform.
+
+    Parameters
+    ----------
+    prefix : str
+      A string to prefix the dictionary keys with.
+    keep_features : list of strs
+      The features to keep after reading in from the tfrecords. Defaults to all of them.
+    drop_features : list of strs
+      The features to drop when reading from the tfrecords. Defaults to None. Can only use this or keep_features not both.
+
+    Returns
+    -------
+    feature_dict : dict
+      The feature objects to pass to the tensorflow parsing functions.
+    att_dict : dict
+      The array attributes of the features that are kept.
+
     """
     feature_dict = {}
-    shape_dict = {}
 
     att_dict = self._get_array_attributes(prefix)
 
@@ -738,28 +1221,66 @@ class Transform(object):
     if drop_features is None:
       drop_features = []
     if keep_features is not None:
-      att_dict = {k: att_dict[k] for k in keep_features}
+      att_dict = {k: att_dict[k] for k in keep_features if k in att_dict}
+    att_dict = {k: att_dict[k] for k in att_dict if k not in drop_features}
 
     for key in att_dict:
-      if key in drop_features:
-        continue
+      # Define the tf feature object. Sparsely encoded arrays are read from
+      # their index and value features, narrowed arrays are read as raw bytes.
+      if 'narrow_np_type' in att_dict[key]:
+        feature_dict[key] = tf.io.FixedLenFeature([], tf.string)
+      elif att_dict[key].get('sparse', False):
+        indices_key, values_key = feat.sparse_feature_keys(key)
+        feature_dict[key] = tf.io.SparseFeature(
+          index_key=indices_key,
+          value_key=values_key,
+          dtype=att_dict[key]['tf_type'],
+          size=int(att_dict[key]['size'])
+        )
+      else:
+        feature_dict[key] = tf.io.FixedLenFeature(
+          att_dict[key]['size'],
+          att_dict[key]['tf_type']
+        )
 
-      # Define the tf feature object and pull out the correct shape
-      feature_dict[key] = tf.io.FixedLenFeature(
-        att_dict[key]['size'],
-        att_dict[key]['tf_type']
-      )
-      shape_dict[key] = att_dict[key]['shape']
+    return feature_dict, att_dict
 
-    # Parse the example
-    features = tf.io.parse_single_example(
-      serialized=serialized_example,
-      features=feature_dict
-    )
+  def _shape_features(self, features, att_dict, batched=False):
+    """Densify, reshape and cast the tensors outputted by the tensorflow parsing functions.
 
-    # Do any reshaping and cast to float if the numpy dtype is np.float64
-    for key in shape_dict:
-      features[key] = tf.reshape(features[key], shape_dict[key])
+    Parameters
+    ----------
+    features : dict of tensors
+      The parsed tensors.
+    att_dict : dict
+      The array attributes of the parsed features.
+    batched : bool
+      Whether or not the tensors have a batch dimension.
+
+    Returns
+    -------
+    features : dict of tensors
+      The tensors with their original shapes and types.
+
+    """
+    for key in att_dict:
+      if 'narrow_np_type' in att_dict[key]:
+        features[key] = tf.io.decode_raw(
+          features[key],
+          tf.as_dtype(att_dict[key]['narrow_np_type'])
+        )
+        features[key] = tf.cast(features[key], att_dict[key]['tf_type'])
+      elif att_dict[key].get('sparse', False):
+        features[key] = tf.sparse.to_dense(
+          features[key],
+          default_value=att_dict[key]['default_val']
+        )
+
+      # Do any reshaping and cast to float if the numpy dtype is np.float64
+      shape = att_dict[key]['shape']
+      if batched:
+        shape = [-1] + list(shape)
+      features[key] = tf.reshape(features[key], shape)
       np_dtype = att_dict[key]['np_type']
       if np_dtype == np.float64:
         features[key] = tf.cast(features[key], dtype=tf.float64)
@@ -767,8 +1288,8 @@ class Transform(object):
     return features
 
   def save_to_file(self, path):
-    """Save the transform object to disk."""
-    save_dict = self._save_dict()
+    """Save the transform object to disk. Any vocabularies are written to their own .npy files alongside it, so that they're memory mapped when it's read back in."""
+    save_dict = vo.save_vocabularies(self._save_dict(), path)
     d.save_to_file(save_dict, path)
 
   def tap_dict_to_examples(self, tap_dict, prefix=''):
@@ -785,12 +1306,27 @@ class Transform(object):
       The example dictionaries which contain tf.train.Features.
 
     """
-    num_examples = tap_dict[tap_dict.keys()[0]].shape[0]
-
     # Get the dictionary of attributes (shape, dtype, etc.) of the arrays in
     # pour_outputs.
     att_dict = self._get_array_attributes(prefix)
 
+    # Separate out the taps which are outputted sparsely, along with the taps
+    # of their flat indices.
+    sparse_keys = [k for k in tap_dict if att_dict.get(k, {}).get('tap_indices_key') in tap_dict]
+    indices_keys = set([att_dict[k]['tap_indices_key'] for k in sparse_keys])
+    dense_keys = [k for k in tap_dict if k not in sparse_keys and k not in indices_keys]
+
+    num_examples = tap_dict[dense_keys[0]].shape[0]
+
+    # The flat indices of the sparse taps run over the whole batch, so find
+    # where each row's values start and their indices within the row.
+    sparse_rows = {}
+    for key in sparse_keys:
+      row_size = int(feat.size_from_shape(att_dict[key]['shape']))
+      flat_indices = np.array(tap_dict[att_dict[key]['tap_indices_key']], dtype=np.int64)
+      bounds = np.searchsorted(flat_indices, np.arange(num_examples + 1) * row_size)
+      sparse_rows[key] = (flat_indices % row_size, bounds)
+
     # Go through each row and each key of pour_outputs. Flatten the array and
     # convert it into it's proper feature. Return as list of dicts.
     example_dicts = []
@@ -798,16 +1334,22 @@ class Transform(object):
     for row_num in xrange(num_examples):
       example_dict = {}
 
-      for key in tap_dict:
+      for key in dense_keys:
         dtype = att_dict[key]['np_type']
         flat = tap_dict[key][row_num].flatten().astype(dtype)
-        example_dict[key] = att_dict[key]['feature_func'](flat)
+        feat.add_features(example_dict, key, att_dict[key]['feature_func'](flat))
+
+      for key in sparse_keys:
+        row_indices, bounds = sparse_rows[key]
+        start, end = bounds[row_num], bounds[row_num + 1]
+        values = np.asarray(tap_dict[key][start: end]).astype(att_dict[key]['np_type'])
+        feat.add_features(example_dict, key, feat.sparse_features(row_indices[start: end], values))
 
       example_dicts.append(example_dict)
 
     return example_dicts
 
-  def write_examples(self, data=None, data_iter=None, file_name=None, file_num_offset=0, batch_size=1, num_threads=1, skip_fails=False, skip_keys=None, use_threading=False, serialize_func=None, prefix=''):
+  def write_examples(self, data=None, data_iter=None, file_name=None, file_num_offset=0, batch_size=1, num_threads=1, skip_fails=False, skip_keys=None, use_threading=False, serialize_func=None, prefix='', write_index=False):
     """Pours the arrays then writes the examples to tfrecords in a multithreading manner. It creates one example per 'row', i.e. axis=0 of the arrays. All arrays must have the same axis=0 dimension and must be of a type that can be written to a tfrecord
 
     Parameters
@@ -834,6 +1376,8 @@ class Transform(object):
       The function that handles the transformation from numpy array to serialized example, if the user does not want to use the default one.
     prefix : str
       Any additional prefix string/dictionary keys start with. Defaults to no additional prefix.
+    write_index : bool
+      Whether or not to write a sidecar offset index next to each tfrecord file so that individual examples can be read with read_examples. The example ids are the positions of the examples in the written data.
     """
     # Make sure only data or data_iter is passed
     if data is not None and data_iter is None:
@@ -878,6 +1422,7 @@ class Transform(object):
 
     # Batch out the data iterator into batches of batch size
     file_names = []
+    num_written = 0
     for batch_num, batch in enumerate(b.batcher(data_iter, batch_size)):
       logging.info("Serializing batch %s", batch_num)
 
@@ -910,4 +1455,12 @@ class Transform(object):
       logging.info("Finished writing batch %s", batch_num)
       writer.close()
 
+      # Write the byte offsets of each example so they can be read
+      # individually later.
+      all_serials = [serial for serials in all_serials for serial in serials]
+      if write_index:
+        example_ids = np.arange(num_written, num_written + len(all_serials))
+        oi.write_index(fn, all_serials, example_ids)
+      num_written += len(all_serials)
+
     return file_names
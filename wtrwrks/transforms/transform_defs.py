@@ -3,6 +3,7 @@ import num_transform
 import datetime_transform
 import fourier_transform
 import string_transform
+import subword_transform
 import multi_lingual_string_transform
 import dataset_transform
 
@@ -10,6 +11,7 @@ CatTransform = cat_transform.CatTransform
 NumTransform = num_transform.NumTransform
 DateTimeTransform = datetime_transform.DateTimeTransform
 StringTransform = string_transform.StringTransform
+SubwordTransform = subword_transform.SubwordTransform
 MultiLingualStringTransform = multi_lingual_string_transform.MultiLingualStringTransform
 DatasetTransform = dataset_transform.DatasetTransform
 FourierTransform = fourier_transform.FourierTransform
@@ -1,9 +1,12 @@
+import os
 import shutil
 import tempfile
 import unittest
 import wtrwrks.utils.test_helpers as th
 import wtrwrks.transforms.cat_transform as n
+import wtrwrks.utils.array_functions as af
 import numpy as np
+import tensorflow as tf
 import pandas as pd
 
 
@@ -39,7 +42,8 @@ class TestCatTransform(th.TestTransform):
         trans,
         self.array[:, 0: 1].astype(np.str),
         {
-          'cat/missing_vals': [[''], [''], [''], ['']],
+          'cat/missing_vals': np.array([], dtype='|S1'),
+          'cat/missing_indices': np.array([], dtype=np.int64),
           'cat/one_hots': target,
           'cat/indices': indices
         }
@@ -66,7 +70,8 @@ class TestCatTransform(th.TestTransform):
         trans,
         self.array[:, 0: 2].astype(np.str),
         {
-          'cat/missing_vals': np.array([['', ''], ['', ''], ['', ''], ['', '']], dtype='|S4'),
+          'cat/missing_vals': np.array([], dtype='|S4'),
+          'cat/missing_indices': np.array([], dtype=np.int64),
           'cat/one_hots': target,
           'cat/indices': indices
         }
@@ -98,7 +103,8 @@ class TestCatTransform(th.TestTransform):
         trans,
         self.array[:, 0: 2].astype(np.str),
         {
-          'cat/missing_vals': np.array([['', ''], ['', ''], ['', ''], ['', '']], dtype='|S4'),
+          'cat/missing_vals': np.array([], dtype='|S4'),
+          'cat/missing_indices': np.array([], dtype=np.int64),
           'cat/one_hots': target,
           'cat/indices': indices
         }
@@ -118,7 +124,8 @@ class TestCatTransform(th.TestTransform):
         trans,
         self.array[:, 0: 1].astype(np.str),
         {
-          'cat/missing_vals': [[''], [''], ['c'], ['']],
+          'cat/missing_vals': np.array(['c'], dtype='|S1'),
+          'cat/missing_indices': np.array([2], dtype=np.int64),
           'cat/one_hots': target,
           'cat/indices': indices
         }
@@ -139,7 +146,8 @@ class TestCatTransform(th.TestTransform):
         trans,
         self.array[:, 2: 3].astype(np.float64),
         {
-          'cat/missing_vals': np.array([[0.0], [0.0], [0.0], [0.0]], dtype=float),
+          'cat/missing_vals': np.array([], dtype=float),
+          'cat/missing_indices': np.array([], dtype=np.int64),
           'cat/one_hots': target,
           'cat/indices': indices
         }
@@ -170,13 +178,306 @@ class TestCatTransform(th.TestTransform):
         trans,
         self.array[:, 1: 2].astype(np.str),
         {
-          'cat/missing_vals': np.array([[''], [''], [''], ['']], dtype='|S4'),
+          'cat/missing_vals': np.array([], dtype='|S4'),
+          'cat/missing_indices': np.array([], dtype=np.int64),
           'cat/one_hots': target,
           'cat/indices': indices
         }
       )
       trans = self.write_read(trans, self.temp_dir)
 
+  def test_mean_std_axes(self):
+    array = np.random.RandomState(0).choice(['a', 'b', 'c', 'd'], size=(20, 3))
+    index_to_cat_val = ['a', 'b', 'c']
+    one_hots = (array[:, :, np.newaxis] == np.array(index_to_cat_val)).astype(np.float64)
+    for norm_axis in [0, (0, 1), None]:
+      trans = n.CatTransform(
+        name='cat',
+        norm_mode='mean_std',
+        norm_axis=norm_axis,
+        index_to_cat_val=index_to_cat_val
+      )
+      trans.calc_global_values(data_iter=[array[0: 8], array[8: 20]])
+      self.equals(trans.mean, np.mean(one_hots, axis=norm_axis), test_type=False)
+      self.equals(trans.std, np.std(one_hots, axis=norm_axis), test_type=False)
+
+  def test_learn_cat_vals(self):
+    array = np.array([['a', 'b'], ['b', 'b'], ['c', 'b'], ['a', 'd'], ['b', 'a']])
+    for num_workers in [1, 2]:
+      trans = n.CatTransform(
+        name='cat',
+        norm_mode='mean_std',
+        min_count=2
+      )
+      trans.calc_global_values(data_iter=[array[0: 2], array[2: 4], array[4: 5]], num_workers=num_workers)
+
+      # Ordered by count, ties broken by value.
+      self.assertEqual(trans.index_to_cat_val, ['b', 'a'])
+      target = np.array([
+        [[0., 1.], [1., 0.]],
+        [[1., 0.], [1., 0.]],
+        [[0., 0.], [1., 0.]],
+        [[0., 1.], [0., 0.]],
+        [[1., 0.], [0., 1.]],
+      ])
+      self.equals(trans.mean, np.mean(target, axis=0))
+      self.equals(trans.std, np.std(target, axis=0))
+
+      self.pour_pump(
+        trans,
+        array,
+        {
+          'cat/missing_vals': np.array(['c', 'd'], dtype='|S1'),
+          'cat/missing_indices': np.array([4, 7], dtype=np.int64),
+          'cat/one_hots': (target - trans.mean) / trans.std,
+          'cat/indices': [[1, 0], [0, 0], [-1, 0], [1, -1], [0, 1]]
+        }
+      )
+
+    trans = n.CatTransform(
+      name='cat',
+      max_categories=1
+    )
+    trans.calc_global_values(array)
+    self.assertEqual(trans.index_to_cat_val, ['b'])
+
+  def test_hash_buckets(self):
+    array = np.array([['a', 'b'], ['b', 'b'], ['c', 'b'], ['a', 'd'], ['b', 'a']])
+    indices = af.hash_to_buckets(array, 16)
+    one_hots = (indices[:, :, np.newaxis] == np.arange(16)).astype(np.float64)
+    mean = np.mean(one_hots, axis=0)
+    std = np.std(one_hots, axis=0)
+    std[std == 0] = 1.0
+    for num_workers in [1, 2]:
+      trans = n.CatTransform(
+        name='cat',
+        norm_mode='mean_std',
+        hash_buckets=16
+      )
+      trans.calc_global_values(data_iter=[array[0: 2], array[2: 5]], num_workers=num_workers)
+      self.assertEqual(trans.index_to_cat_val, None)
+      self.assertEqual(len(trans), 16)
+      self.equals(trans.mean, mean)
+      self.equals(trans.std, std)
+
+      # Every value is kept in the missing values, so they can be recovered
+      # even when they share a bucket.
+      for i in xrange(2):
+        self.pour_pump(
+          trans,
+          array,
+          {
+            'cat/missing_vals': array.flatten(),
+            'cat/missing_indices': np.arange(10, dtype=np.int64),
+            'cat/one_hots': (one_hots - mean) / std,
+            'cat/indices': indices
+          }
+        )
+        trans = self.write_read(trans, self.temp_dir)
+    self.write_read_example(trans, array, self.temp_dir)
+
+  def test_read_write_sparse(self):
+    array = self.array[:, 0: 1].astype(np.str)
+    trans = n.CatTransform(
+      name='cat',
+      index_to_cat_val=self.index_to_cat_val
+    )
+    trans.calc_global_values(array)
+
+    att_dict = trans._get_array_attributes()
+    self.assertTrue(att_dict['cat/missing_vals']['sparse'])
+
+    example_dicts = trans.tap_dict_to_examples(trans.pour(array))
+    self.assertEqual(len(example_dicts[0]['cat/missing_vals/sparse_values'].bytes_list.value), 0)
+    self.assertEqual(list(example_dicts[2]['cat/missing_vals/sparse_indices'].int64_list.value), [0])
+
+    self.write_read_example(trans, array, self.temp_dir)
+
+  def test_narrow_dtypes(self):
+    array = self.array[:, 0: 1].astype(np.str)
+    narrow_trans = n.CatTransform(
+      name='cat',
+      index_to_cat_val=self.index_to_cat_val,
+      narrow_dtypes=True
+    )
+    narrow_trans.calc_global_values(array)
+    self.assertEqual(narrow_trans._get_array_attributes()['cat/indices']['narrow_np_type'], np.int8)
+
+    trans = n.CatTransform(
+      name='cat',
+      index_to_cat_val=self.index_to_cat_val
+    )
+    trans.calc_global_values(array)
+
+    # The narrowed indices should take up less space
+    tap_dict = trans.pour(array)
+    example = trans.tap_dict_to_examples(tap_dict)[2]['cat/indices']
+    narrow_example = narrow_trans.tap_dict_to_examples(tap_dict)[2]['cat/indices']
+    self.assertLess(narrow_example.ByteSize(), example.ByteSize())
+
+    for i in xrange(2):
+      self.write_read_example(narrow_trans, array, self.temp_dir)
+      narrow_trans = self.write_read(narrow_trans, self.temp_dir)
+
+  def test_get_dataset(self):
+    array = self.array[:, 0: 1].astype(np.str)
+    trans = n.CatTransform(
+      name='cat',
+      index_to_cat_val=self.index_to_cat_val
+    )
+    trans.calc_global_values(array)
+    trans.write_examples(array, file_name=os.path.join(self.temp_dir, 'cat.tfrecord'))
+
+    batches = {}
+    for high_throughput in (False, True):
+      dataset = trans._get_dataset(
+        os.path.join(self.temp_dir, 'cat_*.tfrecord'),
+        batch_size=3,
+        num_epochs=1,
+        shuffle_buffer_size=1,
+        high_throughput=high_throughput
+      )
+      features = tf.compat.v1.data.make_one_shot_iterator(dataset).get_next()
+
+      batches[high_throughput] = []
+      with tf.compat.v1.Session() as sess:
+        try:
+          while True:
+            batches[high_throughput].append(sess.run(features))
+        except tf.errors.OutOfRangeError:
+          pass
+
+    self.assertEqual(len(batches[True]), 2)
+    for batch, ht_batch in zip(batches[False], batches[True]):
+      self.assertEqual(sorted(batch.keys()), sorted(ht_batch.keys()))
+      for key in batch:
+        self.equals(batch[key], ht_batch[key])
+
+    # Every file is read at once by default, up to a limit.
+    self.assertEqual(trans._interleave_cycle_length(3, 1), 3)
+    self.assertEqual(trans._interleave_cycle_length(1000, 1), 16)
+    self.assertEqual(trans._interleave_cycle_length(1000, 32), 32)
+
+  def test_index_only(self):
+    array = np.array([['a', 'b'], ['b', 'c'], ['c', 'b'], ['a', 'a']])
+    trans = n.CatTransform(
+      name='cat',
+      norm_mode='mean_std',
+      index_to_cat_val=self.index_to_cat_val,
+      index_only=True
+    )
+    trans.calc_global_values(array)
+    full_trans = n.CatTransform(
+      name='cat',
+      norm_mode='mean_std',
+      index_to_cat_val=self.index_to_cat_val
+    )
+    full_trans.calc_global_values(array)
+    one_hots = full_trans.pour(array)['cat/one_hots']
+
+    for i in xrange(2):
+      self.pour_pump(
+        trans,
+        array,
+        {
+          'cat/missing_vals': np.array(['c', 'c'], dtype='|S1'),
+          'cat/missing_indices': np.array([3, 4], dtype=np.int64),
+          'cat/indices': [[0, 1], [1, -1], [-1, 1], [0, 0]]
+        }
+      )
+      trans = self.write_read(trans, self.temp_dir)
+
+    trans.write_examples(array, file_name=os.path.join(self.temp_dir, 'cat.tfrecord'))
+    for high_throughput in (False, True):
+      dataset = trans._get_dataset(
+        os.path.join(self.temp_dir, 'cat_*.tfrecord'),
+        batch_size=4,
+        num_epochs=1,
+        shuffle_buffer_size=1,
+        high_throughput=high_throughput
+      )
+      features = tf.compat.v1.data.make_one_shot_iterator(dataset).get_next()
+      with tf.compat.v1.Session() as sess:
+        batch = sess.run(features)
+
+      self.assertEqual(sorted(batch.keys()), ['cat/indices', 'cat/missing_vals', 'cat/one_hots'])
+      self.equals(batch['cat/one_hots'], one_hots)
+
+  def test_get_dataset_cache(self):
+    array = self.array[:, 0: 1].astype(np.str)
+    trans = n.CatTransform(
+      name='cat',
+      index_to_cat_val=self.index_to_cat_val
+    )
+    trans.calc_global_values(array)
+    file_names = trans.write_examples(array, file_name=os.path.join(self.temp_dir, 'cat.tfrecord'))
+    cache_dir = os.path.join(self.temp_dir, 'cache')
+
+    for i in xrange(2):
+      dataset = trans._get_dataset(
+        os.path.join(self.temp_dir, 'cat_*.tfrecord'),
+        batch_size=None,
+        num_epochs=2,
+        shuffle_buffer_size=1,
+        cache_dir=cache_dir
+      )
+      features = tf.compat.v1.data.make_one_shot_iterator(dataset).get_next()
+
+      examples = []
+      with tf.compat.v1.Session() as sess:
+        try:
+          while True:
+            examples.append(sess.run(features))
+        except tf.errors.OutOfRangeError:
+          pass
+
+      self.assertEqual(len(examples), 8)
+      self.equals(
+        np.stack([e['cat/missing_vals'] for e in examples]).astype(str),
+        np.array([[''], [''], ['c'], ['']] * 2)
+      )
+
+      # The second time around the examples have to come from the cache.
+      if i == 0:
+        for file_name in file_names:
+          os.remove(file_name)
+
+    # A dataset of fewer examples doesn't read from the same cache.
+    trans.write_examples(array, file_name=os.path.join(self.temp_dir, 'cat.tfrecord'))
+    dataset = trans._get_dataset(
+      os.path.join(self.temp_dir, 'cat_*.tfrecord'),
+      batch_size=None,
+      num_examples=2,
+      shuffle_buffer_size=1,
+      cache_dir=cache_dir
+    )
+    features = tf.compat.v1.data.make_one_shot_iterator(dataset).get_next()
+
+    examples = []
+    with tf.compat.v1.Session() as sess:
+      try:
+        while True:
+          examples.append(sess.run(features))
+      except tf.errors.OutOfRangeError:
+        pass
+    self.assertEqual(len(examples), 2)
+
+  def test_read_examples_by_id(self):
+    array = self.array[:, 0: 1].astype(np.str)
+    trans = n.CatTransform(
+      name='cat',
+      index_to_cat_val=self.index_to_cat_val
+    )
+    trans.calc_global_values(array)
+    file_names = trans.write_examples(
+      data_iter=[array[:2], array[2:]],
+      file_name=os.path.join(self.temp_dir, 'cat.tfrecord'),
+      write_index=True
+    )
+
+    self.equals(trans.read_examples(file_names[1], [3, 2]), array[[3, 2]])
+    self.equals(trans.read_examples(file_names[0], [1]), array[[1]])
+
   # def test_read_write(self):
   #
   #   for i in xrange(3):
@@ -202,7 +503,14 @@ class TestCatTransform(th.TestTransform):
 
     with self.assertRaises(TypeError):
       trans = n.CatTransform(
-        norm_mode='min_max',
+        name='cat',
+        index_to_cat_vals=['a']
+      )
+
+    with self.assertRaises(ValueError):
+      trans = n.CatTransform(
+        norm_mode='mean_std',
+        norm_axis=1,
         name='cat',
       )
 
@@ -84,7 +84,7 @@ class TestDatasetTransform(th.TestDataset):
   #         'DT/NUM/nums': np.array([[0.09090909090909091, 0.18181818181818182, 0.0], [0.36363636363636365, 0.0, 0.0], [0.6363636363636364, 0.7272727272727273, 0.0], [0.9090909090909091, 1.0, 0.0]]),
   #         'DT/STRING/indices': [[[9, 29, 50, 30, 29, 3, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1], [6, 38, 2, 23, 49, 3, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1]], [[7, 16, 43, 28, 49, 3, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1], [5, 26, 53, 31, 22, 50, 8, 46, 42, 15, 3, -1, -1, -1, -1, -1, -1, -1, -1, -1]], [[12, 41, 29, 34, 54, 2, 30, 1, 18, 3, 10, 3, -1, -1, -1, -1, -1, -1, -1, -1], [13, 21, 45, 39, 27, 14, 20, 3, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1]], [[4, 32, 33, 14, 48, 44, 31, 51, 47, 43, 52, 17, 3, -1, -1, -1, -1, -1, -1, -1], [11, 1, 24, 19, 36, 43, 40, 35, 25, 37, 3, -1, -1, -1, -1, -1, -1, -1, -1, -1]]],
   #         'DT/STRING/missing_vals': np.array([[[u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u''], [u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'']], [[u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u''], [u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'']], [[u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u''], [u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'']], [[u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u''], [u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'']]], dtype='|U10'),
-  #         'DT/STRING/tokenize_diff': np.array([['[["d", 16, 17, ""], ["d", 18, 32, ""]]', '[["d", 8, 9, ""], ["d", 19, 20, ""], ["d", 21, 35, ""]]'], ['[["d", 24, 25, ""], ["d", 26, 40, ""]]', '[["d", 58, 59, ""], ["d", 60, 69, ""]]'], ['[["d", 21, 22, ""], ["d", 26, 27, ""], ["d", 37, 38, ""], ["d", 42, 43, ""], ["d", 44, 52, ""]]', '[["d", 35, 36, ""], ["d", 37, 49, ""]]'], ['[["d", 2, 3, ""], ["d", 57, 58, ""], ["d", 59, 66, ""]]', '[["d", 3, 4, ""], ["d", 45, 46, ""], ["d", 47, 56, ""]]']], dtype='|U95'),
+  #         'DT/STRING/tokenize_diff': np.array([['d16,17,0:d18,32,0:', 'd8,9,0:d19,20,0:d21,35,0:'], ['d24,25,0:d26,40,0:', 'd58,59,0:d60,69,0:'], ['d21,22,0:d26,27,0:d37,38,0:d42,43,0:d44,52,0:', 'd35,36,0:d37,49,0:'], ['d2,3,0:d57,58,0:d59,66,0:', 'd3,4,0:d45,46,0:d47,56,0:']], dtype='<U45'),
   #         # 'DT/Partition_0/tubes/missing_cols': np.array([1, 2]),
   #         # 'DT/Partition_0/tubes/missing_array': np.array([['b', 'None', 'b', 'c'], [1.0, 2.0, np.nan, 1.0]], dtype=np.object),
   #       }
@@ -141,7 +141,8 @@ class TestDatasetTransform(th.TestDataset):
         array,
         {
           'DT/CAT/indices': [[0], [1], [2], [0]],
-          'DT/CAT/missing_vals': np.array([[u''], [u''], [u''], [u'']]),
+          'DT/CAT/missing_vals': np.array([], dtype='|U1'),
+          'DT/CAT/missing_indices': np.array([], dtype=np.int64),
           'DT/CAT/one_hots':  [[[1.0, -0.5773502691896258, -0.5773502691896258]], [[-1.0, 1.7320508075688774, -0.5773502691896258]], [[-1.0, -0.5773502691896258, 1.7320508075688774]], [[1.0, -0.5773502691896258, -0.5773502691896258]]],
           'DT/DATE/nats':  [[False, False, True], [False, True, True], [False, False, True], [False, False, True]],
           'DT/DATE/diff': np.array([[datetime.timedelta(0), datetime.timedelta(0), datetime.timedelta(0)], [datetime.timedelta(0), datetime.timedelta(0), datetime.timedelta(0)], [datetime.timedelta(0), datetime.timedelta(0), datetime.timedelta(0)], [datetime.timedelta(0), datetime.timedelta(0), datetime.timedelta(0)]], dtype='timedelta64[us]'),
@@ -149,8 +150,9 @@ class TestDatasetTransform(th.TestDataset):
           'DT/NUM/nans': [[False, False, True], [False, True, True], [False, False, True], [False, False, True]],
           'DT/NUM/nums': [[0.09090909090909091, 0.18181818181818182, 0.0], [0.36363636363636365, 0.0, 0.0], [0.6363636363636364, 0.7272727272727273, 0.0], [0.9090909090909091, 1.0, 0.0]],
           'DT/STRING/indices': [[[9, 29, 50, 30, 29, 3, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1], [6, 38, 2, 23, 49, 3, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1]], [[7, 16, 43, 28, 49, 3, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1], [5, 26, 53, 31, 22, 50, 8, 46, 42, 15, 3, -1, -1, -1, -1, -1, -1, -1, -1, -1]], [[12, 41, 29, 34, 54, 2, 30, 1, 18, 3, 10, 3, -1, -1, -1, -1, -1, -1, -1, -1], [13, 21, 45, 39, 27, 14, 20, 3, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1]], [[4, 32, 33, 14, 48, 44, 31, 51, 47, 43, 52, 17, 3, -1, -1, -1, -1, -1, -1, -1], [11, 1, 24, 19, 36, 43, 40, 35, 25, 37, 3, -1, -1, -1, -1, -1, -1, -1, -1, -1]]],
-          'DT/STRING/missing_vals': np.array([[[u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u''], [u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'']], [[u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u''], [u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'']], [[u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u''], [u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'']], [[u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u''], [u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'']]], dtype='|U10'),
-          'DT/STRING/tokenize_diff': np.array([['[["d", 16, 17, ""], ["d", 18, 32, ""]]', '[["d", 8, 9, ""], ["d", 19, 20, ""], ["d", 21, 35, ""]]'], ['[["d", 24, 25, ""], ["d", 26, 40, ""]]', '[["d", 58, 59, ""], ["d", 60, 69, ""]]'], ['[["d", 21, 22, ""], ["d", 26, 27, ""], ["d", 37, 38, ""], ["d", 42, 43, ""], ["d", 44, 52, ""]]', '[["d", 35, 36, ""], ["d", 37, 49, ""]]'], ['[["d", 2, 3, ""], ["d", 57, 58, ""], ["d", 59, 66, ""]]', '[["d", 3, 4, ""], ["d", 45, 46, ""], ["d", 47, 56, ""]]']], dtype='|U95'),
+          'DT/STRING/missing_vals': np.array([], dtype='|U10'),
+          'DT/STRING/missing_indices': np.array([], dtype=np.int64),
+          'DT/STRING/tokenize_diff': np.array([['d16,17,0:d18,32,0:', 'd8,9,0:d19,20,0:d21,35,0:'], ['d24,25,0:d26,40,0:', 'd58,59,0:d60,69,0:'], ['d21,22,0:d26,27,0:d37,38,0:d42,43,0:d44,52,0:', 'd35,36,0:d37,49,0:'], ['d2,3,0:d57,58,0:d59,66,0:', 'd3,4,0:d45,46,0:d47,56,0:']], dtype='<U45'),
           # 'DT/Partition_0/tubes/missing_cols': np.array([1, 2]),
           # 'DT/Partition_0/tubes/missing_array': np.array([['b', 'None', 'b', 'c'], [1.0, 2.0, np.nan, 1.0]], dtype=np.object),
         }
@@ -158,6 +160,56 @@ class TestDatasetTransform(th.TestDataset):
       # self.write_read_example(dataset_transform, array, self.temp_dir)
       dataset_transform = self.write_read(dataset_transform, self.temp_dir)
 
+  def test_num_workers(self):
+    array = np.concatenate([self._get_array()[:, :7]] * 5, axis=0)
+    array_iter = [array[0: 7], array[7: 14], array[14: 20]]
+
+    dataset_transforms = []
+    for num_workers in [1, 2]:
+      dataset_transform = tr.DatasetTransform(name='DT')
+      dataset_transform.add_transform(
+        cols=[0],
+        transform=ct.CatTransform(
+          name='CAT',
+          norm_mode='mean_std',
+          index_to_cat_val=sorted(np.unique(array[:, 0: 1])),
+          input_dtype=np.dtype('U')
+        )
+      )
+      dataset_transform.add_transform(
+        cols=[1, 2, 3],
+        transform=dt.DateTimeTransform(
+          name='DATE',
+          norm_mode='mean_std',
+          norm_axis=0,
+          fill_nat_func=lambda a: np.array(datetime.datetime(1950, 1, 1)),
+          input_dtype=np.datetime64,
+        )
+      )
+      dataset_transform.add_transform(
+        cols=[4, 5, 6],
+        transform=nt.NumTransform(
+          name='NUM',
+          norm_mode='mean_std',
+          norm_axis=0,
+          input_dtype=np.float64,
+          fill_nan_func=lambda a: np.array(0),
+        )
+      )
+      dataset_transform.calc_global_values(data_iter=array_iter, num_workers=num_workers)
+      dataset_transforms.append(dataset_transform)
+
+    serial, parallel = dataset_transforms
+    self.assertEqual(parallel.num_examples, 20)
+    for key in ['CAT', 'DATE', 'NUM']:
+      self.equals(parallel[key].mean, serial[key].mean)
+      self.equals(parallel[key].std, serial[key].std)
+
+    nums = array[:, 4: 7].astype(np.float64)
+    nums[np.isnan(nums)] = 0
+    self.equals(parallel['NUM'].mean, np.mean(nums, axis=0))
+    self.equals(parallel['NUM'].std, np.where(np.std(nums, axis=0) == 0, 1., np.std(nums, axis=0)))
+
   def _get_array(self):
     cat_array = np.array([
       ['a', 'b', 1.0],
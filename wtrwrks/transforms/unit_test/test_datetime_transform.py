@@ -3,6 +3,7 @@ import tempfile
 import unittest
 import wtrwrks.utils.test_helpers as th
 import wtrwrks.transforms.datetime_transform as n
+import wtrwrks.utils.datetime_functions as dtf
 import os
 import pandas as pd
 import numpy as np
@@ -250,6 +251,61 @@ class TestDateTimeTransform(th.TestTransform):
         self.write_read_example(trans, self.array[:, 0: 1].astype(np.datetime64), self.temp_dir, test_type=False)
         trans = self.write_read(trans, self.temp_dir)
 
+    def test_strings(self):
+      def fill(array):
+        self.assertEqual(array.dtype.kind, 'M')
+        return np.array(datetime.datetime(2019, 1, 1))
+
+      array = np.array([
+        ['01/01/2019', '01/01/2019'],
+        ['1/2/2019', ''],
+        ['01/03/2019', '02/01/2019'],
+        ['01/01/2019', '03/01/2019']
+      ])
+      trans = n.DateTimeTransform(
+        name='datetime',
+        fill_nat_func=fill
+      )
+      trans.calc_global_values(array)
+      self.assertEqual(trans.input_format, '%m/%d/%Y')
+      self.assertEqual(trans.input_dtype, np.string_)
+
+      target = np.array([
+        [0., 0.],
+        [1., 0.],
+        [2., 31.],
+        [0., 59.]
+      ]) + 17897.
+      for i in xrange(2):
+        self.pour_pump(
+          trans,
+          array,
+          {
+            'datetime/nums': target,
+            'datetime/nats': [[False, False], [False, True], [False, False], [False, False]],
+            'datetime/diff': np.zeros([4, 2], dtype='timedelta64[us]'),
+            'datetime/string_diff': [[u'', u''], [u'1/2/2019', u''], [u'', u''], [u'', u'']]
+          },
+          test_type=False
+        )
+        self.write_read_example(trans, array, self.temp_dir, test_type=False)
+        trans = self.write_read(trans, self.temp_dir)
+
+      # The strings are only parsed once per pour.
+      parse_datetimes = dtf.parse_datetimes
+      calls = []
+
+      def counted_parse_datetimes(*args, **kwargs):
+        calls.append(args)
+        return parse_datetimes(*args, **kwargs)
+
+      dtf.parse_datetimes = counted_parse_datetimes
+      try:
+        trans.pour(array)
+      finally:
+        dtf.parse_datetimes = parse_datetimes
+      self.assertEqual(len(calls), 1)
+
     def test_errors(self):
 
       with self.assertRaises(ValueError):
@@ -64,6 +64,31 @@ class TestFourierTransform(th.TestTransform):
         )
         trans = self.write_read(trans, self.temp_dir)
 
+    def test_block_size(self):
+      random_state = np.random.RandomState(0)
+      times = np.datetime64('2019-01-01') + random_state.randint(365, size=50).astype('timedelta64[D]')
+      amps = random_state.normal(size=50)
+      array = np.stack([times.astype(np.object), amps.astype(np.object)], axis=1)
+      array_iter = [array[0: 17], array[17: 40], array[40: 50]]
+
+      # The spectrum using the full (examples x frequencies) matrix.
+      time_array = (times - np.datetime64('2019-01-01')) / np.timedelta64(1, 'D') / 365.
+      X_k = np.mean(amps[:, np.newaxis] * np.exp(-2.0j * np.pi * np.outer(time_array, np.arange(20))), axis=0)
+      w_k = np.argsort(np.abs(X_k))[::-1]
+
+      for block_size, num_workers in [(7, 1), (100, 1), (2 ** 20, 2)]:
+        trans = n.FourierTransform(
+          name='datetime',
+          zero_datetime=datetime.datetime(2019, 1, 1),
+          end_datetime=datetime.datetime(2020, 1, 1),
+          num_frequencies=20,
+          top_frequencies=5,
+          block_size=block_size
+        )
+        trans.calc_global_values(data_iter=array_iter, num_workers=num_workers)
+        self.equals(trans.w_k, w_k.astype(np.float64))
+        self.assertTrue(np.allclose(trans.X_k, X_k[w_k]))
+
     # def test_df(self):
     #   def fill(array):
     #     mins = np.expand_dims(np.min(array, axis=0), axis=0)
@@ -67,8 +67,9 @@ class TestMultiStringTransform(th.TestTransform):
 
   def test_multi(self):
     indices = np.array([[[6, 12, 18, 13, 12, 4, -1, -1, -1, -1]], [[0, 3, 0, 1, 0, 0, 15, 0, 0, 4]], [[8, 17, 12, 14, 19, 3, 13, 1, 11, 4]], [[10, 0, 13, 14, 19, 0, 18, 16, 0, 11]], [[0, 9, 4, 1, 8, 11, 15, 6, 5, 7]], [[6, 12, 18, 13, 12, 4, -1, -1, -1, -1]], [[5, 2, 15, 16, 10, 5, 2, 15, 0, -1]], [[8, 17, 12, 14, 19, 3, 13, 1, 11, 4]], [[0, 3, 0, 0, -1, -1, -1, -1, -1, -1]], [[0, 0, 0, 0, 9, 0, 4, -1, -1, -1]], [[0, 9, 0, -1, -1, -1, -1, -1, -1, -1]], [[0, 0, 10, 0, 13, 14, 19, 0, 18, 16]], [[0, 9, 4, 1, 8, 11, 15, 6, 5, 7]]])
-    missing_vals = np.array([[[u'', u'', u'', u'', u'', u'', u'', u'', u'', u'']], [[u'Whatever', u'', u'Bob', u'', u'mother', u'has', u'', u'the', u'world', u'']], [[u'', u'', u'', u'', u'', u'', u'', u'', u'', u'']], [[u'', u'\u30fb', u'', u'', u'', u'\u306e', u'', u'', u'\u306f', u'']], [[u'\u3059\u307f\u307e\u305b', u'', u'', u'', u'', u'', u'', u'', u'', u'']], [[u'', u'', u'', u'', u'', u'', u'', u'', u'', u'']], [[u'', u'', u'', u'', u'', u'', u'', u'', u'rain', u'']], [[u'', u'', u'', u'', u'', u'', u'', u'', u'', u'']], [[u'Hey', u'', u'you', u'!', u'', u'', u'', u'', u'', u'']], [[u'Ended', u'up', u'sleeping', u'in', u'', u'doorway', u'', u'', u'', u'']], [[u'Under', u'', u'bodega', u'', u'', u'', u'', u'', u'', u'']], [[u'\uff12', u'\uff10', u'', u'\u30fb', u'', u'', u'', u'\u306e', u'', u'']], [[u'\u3059\u307f\u307e\u305b', u'', u'', u'', u'', u'', u'', u'', u'', u'']]])
-    tokenize_diff = np.array([[u'[["d", 16, 17, ""], ["d", 18, 22, ""]]'], [u'[["d", 8, 9, ""], ["d", 14, 15, ""], ["d", 43, 44, ""]]'], [u'[["d", 21, 22, ""], ["d", 26, 27, ""], ["i", 37, 37, "."], ["i", 38, 38, "OK"]]'], [u'[["i", 16, 16, "\\u5207\\u304a\\u65ad\\u308a"]]'], [u'[["i", 18, 18, "\\u3002"]]'], [u'[["d", 16, 17, ""], ["d", 18, 22, ""]]'], [u'[["d", 1, 2, ""], ["d", 23, 24, ""], ["d", 37, 38, ""]]'], [u'[["d", 21, 22, ""], ["d", 26, 27, ""], ["i", 37, 37, "."], ["i", 38, 38, "OK"]]'], [u'[["d", 3, 4, ""], ["d", 9, 10, ""], ["d", 11, 17, ""]]'], [u'[["d", 30, 31, ""], ["d", 32, 35, ""]]'], [u'[["d", 14, 21, ""]]'], [u'[["i", 16, 16, "\\u306f\\u4e00\\u5207\\u304a\\u65ad\\u308a"]]'], [u'[["i", 18, 18, "\\u3002"]]']])
+    missing_vals = np.array([u'Whatever', u'Bob', u'mother', u'has', u'the', u'world', u'\u30fb', u'\u306e', u'\u306f', u'\u3059\u307f\u307e\u305b', u'rain', u'Hey', u'you', u'!', u'Ended', u'up', u'sleeping', u'in', u'doorway', u'Under', u'bodega', u'\uff12', u'\uff10', u'\u30fb', u'\u306e', u'\u3059\u307f\u307e\u305b'])
+    missing_indices = np.array([10, 12, 14, 15, 17, 18, 31, 35, 38, 40, 68, 80, 82, 83, 90, 91, 92, 93, 95, 100, 102, 110, 111, 113, 117, 120], dtype=np.int64)
+    tokenize_diff = np.array([[u'd16,17,0:d18,22,0:'], [u'd8,9,0:d14,15,0:d43,44,0:'], [u'd21,22,0:d26,27,0:i37,37,1:.i38,38,2:OK'], [u'i16,16,4:\u5207\u304a\u65ad\u308a'], [u'i18,18,1:\u3002'], [u'd16,17,0:d18,22,0:'], [u'd1,2,0:d23,24,0:d37,38,0:'], [u'd21,22,0:d26,27,0:i37,37,1:.i38,38,2:OK'], [u'd3,4,0:d9,10,0:d11,17,0:'], [u'd30,31,0:d32,35,0:'], [u'd14,21,0:'], [u'i16,16,6:\u306f\u4e00\u5207\u304a\u65ad\u308a'], [u'i18,18,1:\u3002']])
 
     strings = np.array([
       [u"It is what it is."],
@@ -107,6 +108,7 @@ class TestMultiStringTransform(th.TestTransform):
           'string_transform/indices': indices,
           'string_transform/languages': languages,
           'string_transform/missing_vals': missing_vals,
+          'string_transform/missing_indices': missing_indices,
           'string_transform/tokenize_diff': tokenize_diff,
 
         },
@@ -118,7 +120,7 @@ class TestMultiStringTransform(th.TestTransform):
   #
   #   indices = np.array([[[12, 13, 16, 17, 22, 7, 21, 19, 8, 14, 15, 2, 20, -1, -1]], [[5, 11, 3, 0, 10, 14, 18, 6, 4, 9, 1, -1, -1, -1, -1]]])
   #
-  #   tokenize_diff = [['[]'], ['[]']]
+  #   tokenize_diff = [[''], ['']]
   #   missing_vals = np.array([[[u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'']], [[u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'']]], dtype='|U20')
   #   index_to_word = self._get_index_to_word(strings, ja_tokenizer) + ['__UNK__']
   #   trans = n.StringTransform(
@@ -147,10 +149,10 @@ class TestMultiStringTransform(th.TestTransform):
   #
   #   indices = np.array([[[1, 0, 14, 15, 18, 19, 24, 9, 23, 21, 10, 16, 17, 4, 22]], [[7, 13, 5, 2, 12, 16, 20, 8, 6, 11, 3, -1, -1, -1, -1]]])
   #
-  #   tokenize_diff = [['[]'], ['[]']]
+  #   tokenize_diff = [[''], ['']]
   #   missing_vals = np.array([[[u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'']], [[u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'']]], dtype='|U20')
   #   index_to_word = self._get_index_to_word(strings, ja_tokenizer, half_width=True) + ['__UNK__']
-  #   half_width_diff = [[['[["i", 0, 1, "\\uff12"]]', '[["i", 0, 1, "\\uff10"]]', '[]', '[]', '[]', '[]', '[]', '[]', '[]', '[]', '[]', '[]', '[]', '[]', '[]']], [['[]', '[]', '[]', '[]', '[]', '[]', '[]', '[]', '[]', '[]', '[]', '[]', '[]', '[]', '[]']]]
+  #   half_width_diff = [[[u'i0,1,1:\uff12', u'i0,1,1:\uff10', '', '', '', '', '', '', '', '', '', '', '', '', '']], [['', '', '', '', '', '', '', '', '', '', '', '', '', '', '']]]
   #   trans = n.StringTransform(
   #     word_tokenizer=ja_tokenizer,
   #     index_to_word=index_to_word,
@@ -192,28 +194,28 @@ class TestMultiStringTransform(th.TestTransform):
   #   ])
   #   lower_case_diff = [
   #     [
-  #       ['[["i", 0, 1, "I"]]', '[]', '[]', '[]', '[]', '[]', '[]', '[]', '[]', '[]'],
-  #       ['[["i", 0, 1, "I"]]', '[]', '[]', '[]', '[]', '[["i", 0, 1, "I"]]', '[]', '[]', '[]', '[]']],
+  #       ['i0,1,1:I', '', '', '', '', '', '', '', '', ''],
+  #       ['i0,1,1:I', '', '', '', '', 'i0,1,1:I', '', '', '', '']],
   #     [
-  #       ['[["i", 0, 1, "T"]]', '[]', '[]', '[]', '[]', '[]', '[]', '[]', '[]', '[]'],
-  #       ['[["i", 0, 1, "H"]]', '[]', '[]', '[]', '[]', '[]', '[]', '[]', '[]', '[]']],
+  #       ['i0,1,1:T', '', '', '', '', '', '', '', '', ''],
+  #       ['i0,1,1:H', '', '', '', '', '', '', '', '', '']],
   #     [
-  #       ['[["i", 0, 1, "E"]]', '[]', '[]', '[]', '[]', '[]', '[]', '[]', '[]', '[]'],
-  #       ['[["i", 0, 1, "U"]]', '[]', '[]', '[]', '[]', '[]', '[]', '[]', '[]', '[]']
+  #       ['i0,1,1:E', '', '', '', '', '', '', '', '', ''],
+  #       ['i0,1,1:U', '', '', '', '', '', '', '', '', '']
   #     ]
   #   ]
   #   tokenize_diff = [
   #     [
-  #       '[["d", 16, 17, ""], ["d", 18, 22, ""]]',
-  #       '[["d", 1, 2, ""], ["d", 23, 24, ""], ["d", 37, 38, ""]]'
+  #       'd16,17,0:d18,22,0:',
+  #       'd1,2,0:d23,24,0:d37,38,0:'
   #     ],
   #     [
-  #       '[["d", 21, 22, ""], ["d", 26, 27, ""], ["i", 37, 37, "."], ["i", 38, 38, "OK"]]',
-  #       '[["d", 3, 4, ""], ["d", 9, 10, ""], ["d", 11, 17, ""]]'
+  #       'd21,22,0:d26,27,0:i37,37,1:.i38,38,2:OK',
+  #       'd3,4,0:d9,10,0:d11,17,0:'
   #     ],
   #     [
-  #       '[["d", 30, 31, ""], ["d", 32, 35, ""]]',
-  #       '[["d", 14, 21, ""]]'
+  #       'd30,31,0:d32,35,0:',
+  #       'd14,21,0:'
   #     ]
   #   ]
   #   missing_vals = np.array([[[u'', u'', u'', u'', u'', u'', u'', u'', u'', u''], [u'', u'', u'', u'', u'', u'', u'', u'', u'', u'']], [[u'', u'', u'', u'', u'', u'', u'', u'', u'', u''], [u'', u'', u'you', u'', u'', u'', u'', u'', u'', u'']], [[u'', u'', u'', u'', u'', u'', u'', u'', u'', u''], [u'', u'', u'', u'', u'', u'', u'', u'', u'', u'']]], dtype='|S40')
@@ -159,6 +159,76 @@ class TestNumTransform(th.TestTransform):
         )
         trans = self.write_read(trans, self.temp_dir)
 
+    def test_num_workers(self):
+      array = np.random.RandomState(0).normal(size=(30, 3)) * [1., 10., 100.]
+      array_iter = [array[0: 7], array[7: 20], array[20: 30]]
+      for num_workers in [1, 2]:
+        trans = n.NumTransform(
+          name='num',
+          norm_mode='mean_std',
+          norm_axis=0
+        )
+        trans.calc_global_values(data_iter=array_iter, num_workers=num_workers)
+        self.equals(trans.mean, np.mean(array, axis=0))
+        self.equals(trans.std, np.std(array, axis=0))
+        self.assertEqual(trans.num_examples, 30)
+
+        target = (array - trans.mean)/(trans.std)
+        self.pour_pump(
+          trans,
+          array,
+          {
+            'num/nums': target,
+            'num/nans': np.zeros(array.shape, dtype=bool),
+          }
+        )
+
+    def test_quantile(self):
+      array = np.random.RandomState(0).lognormal(size=(2000, 2)) * [1., 100.]
+      array_iter = [array[0: 700], array[700: 1300], array[1300: 2000]]
+      for num_workers in [1, 2]:
+        trans = n.NumTransform(
+          name='num',
+          norm_mode='quantile',
+          norm_axis=0,
+          num_quantiles=50
+        )
+        trans.calc_global_values(data_iter=array_iter, num_workers=num_workers)
+        self.assertEqual(len(trans.quantiles), 2)
+
+        # The quantiles should be close to the fraction of values below each
+        # value.
+        ranks = np.argsort(np.argsort(array, axis=0), axis=0) / (array.shape[0] - 1.)
+        nums = trans.pour(array)['num/nums']
+        self.assertTrue(np.max(np.abs(nums - ranks)) < 0.05)
+
+        self.pour_pump(
+          trans,
+          array[:10],
+          {
+            'num/nums': nums[:10],
+            'num/nans': np.zeros([10, 2], dtype=bool),
+          }
+        )
+        trans = self.write_read(trans, self.temp_dir)
+        self.pour_pump(
+          trans,
+          array[:10],
+          {
+            'num/nums': nums[:10],
+            'num/nans': np.zeros([10, 2], dtype=bool),
+          }
+        )
+
+      trans = n.NumTransform(
+        name='num',
+        norm_mode='quantile'
+      )
+      trans.calc_global_values(self.array[:, 0: 2])
+      self.equals(trans.quantiles[0], trans.quantiles[1])
+      self.assertEqual(trans.quantiles[0][0], 0.)
+      self.assertEqual(trans.quantiles[0][-1], 11.)
+
     def test_read_write(self):
       def fill(array):
         return np.array(0.0)
@@ -180,6 +250,13 @@ class TestNumTransform(th.TestTransform):
           name='num'
         )
 
+      with self.assertRaises(ValueError):
+        trans = n.NumTransform(
+          norm_mode='quantile',
+          norm_axis=1,
+          name='num'
+        )
+
       trans = n.NumTransform(
         name='num',
         norm_mode='min_max',
@@ -4,6 +4,7 @@ import tempfile
 import unittest
 import wtrwrks.utils.test_helpers as th
 import wtrwrks.transforms.string_transform as n
+import wtrwrks.utils.array_functions as af
 from chop.mmseg import Tokenizer as MMSEGTokenizer
 from chop.hmm import Tokenizer as HMMTokenizer
 from nltk.stem.wordnet import WordNetLemmatizer
@@ -70,8 +71,9 @@ class TestStringTransform(th.TestTransform):
       ["Whatever, Bob's mother has seen the world."],
       ["The sun is not yellow, it's chicken. OK."]
     ])
-    tokenize_diff = [['[["d", 16, 17, ""], ["d", 18, 22, ""]]'], ['[["d", 8, 9, ""], ["d", 14, 15, ""], ["d", 43, 44, ""]]'], ['[["d", 21, 22, ""], ["d", 26, 27, ""], ["i", 37, 37, "."], ["i", 38, 38, "OK"]]']]
-    missing_vals = np.array([[['', '', '', '', '', '', '', '', '', '']], [['', '', '', '', '', '', '', '', '', '']], [['', '', '', '', '', '', '', '', '', '']]], dtype='|S42')
+    tokenize_diff = [['d16,17,0:d18,22,0:'], ['d8,9,0:d14,15,0:d43,44,0:'], ['d21,22,0:d26,27,0:i37,37,1:.i38,38,2:OK']]
+    missing_vals = np.array([], dtype='|S42')
+    missing_indices = np.array([], dtype=np.int64)
     index_to_word = ['[UNK]'] + self._get_index_to_word(strings, en_tokenizer)
     trans = n.StringTransform(
       index_to_word=index_to_word,
@@ -87,6 +89,7 @@ class TestStringTransform(th.TestTransform):
         {
           'string_transform/indices': indices,
           'string_transform/missing_vals': missing_vals,
+          'string_transform/missing_indices': missing_indices,
           'string_transform/tokenize_diff': tokenize_diff,
 
         },
@@ -102,8 +105,9 @@ class TestStringTransform(th.TestTransform):
       ["Whatever, Bob's mother has seen the world."],
       ["The sun is not yellow, it's chicken. OK."]
     ])
-    tokenize_diff = [['[["d", 16, 17, ""], ["d", 18, 22, ""]]'], ['[["d", 8, 9, ""], ["d", 14, 15, ""], ["d", 43, 44, ""]]'], ['[["d", 21, 22, ""], ["d", 26, 27, ""], ["i", 37, 37, "."], ["i", 38, 38, "OK"]]']]
-    missing_vals = np.array([[['It', '', '', '', '', '', '', '', '', '']], [['', '', '', '', '', '', '', '', '', '']], [['', '', '', '', '', '', '', '', '', '']]], dtype='|S42')
+    tokenize_diff = [['d16,17,0:d18,22,0:'], ['d8,9,0:d14,15,0:d43,44,0:'], ['d21,22,0:d26,27,0:i37,37,1:.i38,38,2:OK']]
+    missing_vals = np.array(['It'], dtype='|S42')
+    missing_indices = np.array([0], dtype=np.int64)
     # index_to_word = ['[UNK]'] + self._get_index_to_word(strings, en_tokenizer)
     trans = n.StringTransform(
       # index_to_word=index_to_word,
@@ -123,6 +127,7 @@ class TestStringTransform(th.TestTransform):
         {
           'string_transform/indices': indices,
           'string_transform/missing_vals': missing_vals,
+          'string_transform/missing_indices': missing_indices,
           'string_transform/tokenize_diff': tokenize_diff,
 
         },
@@ -137,8 +142,9 @@ class TestStringTransform(th.TestTransform):
       [u'チラシ・勧誘印刷物の無断投函は一切お断り'],
       [u'すみませんが、もう一度どお願いします。']
     ])
-    tokenize_diff = [['[]'], ['[]']]
-    missing_vals = np.array([[[u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'']], [[u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'']]], dtype='|U20')
+    tokenize_diff = [[''], ['']]
+    missing_vals = np.array([], dtype='|U20')
+    missing_indices = np.array([], dtype=np.int64)
     index_to_word = ['__UNK__'] + self._get_index_to_word(strings, ja_tokenizer)
     trans = n.StringTransform(
       name='',
@@ -155,12 +161,14 @@ class TestStringTransform(th.TestTransform):
         {
           'indices': indices,
           'missing_vals': missing_vals,
+          'missing_indices': missing_indices,
           'tokenize_diff': tokenize_diff,
 
         },
         test_type=False
       )
       trans = self.write_read(trans, self.temp_dir)
+    self.write_read_example(trans, strings, self.temp_dir, test_type=False)
 
   def test_ja_normalize_2(self):
 
@@ -169,10 +177,11 @@ class TestStringTransform(th.TestTransform):
       [u'２０チラシ・勧誘印刷物の無断投函は一切お断り'],
       [u'すみませんが、もう一度どお願いします。']
     ])
-    tokenize_diff = [['[]'], ['[]']]
-    missing_vals = np.array([[[u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'']], [[u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'', u'']]], dtype='|U20')
+    tokenize_diff = [[''], ['']]
+    missing_vals = np.array([], dtype='|U20')
+    missing_indices = np.array([], dtype=np.int64)
     index_to_word = ['[UNK]'] + self._get_index_to_word(strings, ja_tokenizer, half_width=True)
-    half_width_diff = [[['[["i", 0, 1, "\\uff12"]]', '[["i", 0, 1, "\\uff10"]]', '[]', '[]', '[]', '[]', '[]', '[]', '[]', '[]', '[]', '[]', '[]', '[]', '[]']], [['[]', '[]', '[]', '[]', '[]', '[]', '[]', '[]', '[]', '[]', '[]', '[]', '[]', '[]', '[]']]]
+    half_width_diff = [[[u'i0,1,1:\uff12', u'i0,1,1:\uff10', '', '', '', '', '', '', '', '', '', '', '', '', '']], [['', '', '', '', '', '', '', '', '', '', '', '', '', '', '']]]
     trans = n.StringTransform(
       name='',
       word_tokenizer=ja_tokenizer,
@@ -189,6 +198,7 @@ class TestStringTransform(th.TestTransform):
         {
           'indices': indices,
           'missing_vals': missing_vals,
+          'missing_indices': missing_indices,
           'tokenize_diff': tokenize_diff,
           'half_width_diff': half_width_diff
 
@@ -197,6 +207,131 @@ class TestStringTransform(th.TestTransform):
       )
       trans = self.write_read(trans, self.temp_dir)
 
+  def test_tokenize_cache(self):
+    indices = np.array([[[13, 14, 17, 18, 23, 8, 22, 20, 9, 15, 16, 3, 21, -1, -1]], [[6, 12, 4, 1, 11, 15, 19, 7, 5, 10, 2, -1, -1, -1, -1]]])
+    strings = np.array([
+      [u'チラシ・勧誘印刷物の無断投函は一切お断り'],
+      [u'すみませんが、もう一度どお願いします。']
+    ])
+    tokenize_diff = [[''], ['']]
+    missing_vals = np.array([], dtype='|U20')
+    missing_indices = np.array([], dtype=np.int64)
+    index_to_word = ['__UNK__'] + self._get_index_to_word(strings, ja_tokenizer)
+    trans = n.StringTransform(
+      name='',
+      word_tokenizer=ja_tokenizer,
+      index_to_word=index_to_word,
+      word_detokenizer=lambda a: ''.join(a),
+      max_sent_len=15,
+      tokenize_cache_size=10
+    )
+    trans.calc_global_values(strings)
+    for i in xrange(2):
+      self.pour_pump(
+        trans,
+        strings,
+        {
+          'indices': indices,
+          'missing_vals': missing_vals,
+          'missing_indices': missing_indices,
+          'tokenize_diff': tokenize_diff,
+
+        },
+        test_type=False
+      )
+
+    # The second pour only looks up the strings tokenized by the first.
+    metrics = trans.tokenize_cache.get_metrics()
+    self.assertEqual(metrics['hits'], 2)
+    self.assertEqual(metrics['misses'], 2)
+    self.assertEqual(metrics['size'], 2)
+
+  def test_vocab(self):
+    strings = np.array([
+      ["a b c d"],
+      ["a b c"],
+      ["a b e"],
+      ["a f"]
+    ])
+    for num_workers in [1, 2]:
+      trans = n.StringTransform(
+        name='',
+        max_vocab_size=4,
+        max_sent_len=4,
+        max_tracked_words=4
+      )
+      trans.calc_global_values(data_iter=[strings[:2], strings[2:]], num_workers=num_workers)
+
+      # 'c' is kept over 'd', 'e' and 'f' even though the counts of the rare
+      # words are pruned.
+      self.assertEqual(trans.index_to_word, ['[UNK]', 'a', 'b', 'c'])
+
+  def test_hash_buckets(self):
+    strings = np.array([
+      ["a b c"],
+      ["b d"]
+    ])
+    tokens = np.array([[['a', 'b', 'c', '']], [['b', 'd', '', '']]])
+    trans = n.StringTransform(
+      name='',
+      max_sent_len=4,
+      hash_buckets=8
+    )
+    trans.calc_global_values(strings)
+    self.assertEqual(trans.index_to_word, None)
+
+    # The VARCHAR limit comes from the longest string.
+    self.assertEqual(trans.get_schema_dict(), {'_0': 'VARCHAR(5)'})
+    for i in xrange(2):
+      self.pour_pump(
+        trans,
+        strings,
+        {
+          'indices': af.hash_to_buckets(tokens, 8),
+          'missing_vals': np.array(['a', 'b', 'c', 'b', 'd']),
+          'missing_indices': np.array([0, 1, 2, 4, 5]),
+          'tokenize_diff': [['d5,6,0:'], ['d3,5,0:']],
+        },
+        test_type=False
+      )
+      trans = self.write_read(trans, self.temp_dir)
+    self.write_read_example(trans, strings, self.temp_dir, test_type=False)
+
+  def test_stopwords(self):
+    strings = np.array([
+      ["the cat sat"],
+      ["a dog"]
+    ])
+    trans = n.StringTransform(
+      name='',
+      max_sent_len=4,
+      max_vocab_size=10,
+      stopwords=set(['the', 'a'])
+    )
+    trans.calc_global_values(strings)
+    self.assertEqual(trans.index_to_word, ['[UNK]', 'cat', 'dog', 'sat'])
+
+    # The vocabulary is memory mapped when the transform is read back in.
+    remade = self.write_read(trans, self.temp_dir)
+    self.assertTrue(isinstance(remade.word_to_index.array, np.memmap))
+    self.assertEqual(remade.index_to_word, trans.index_to_word)
+    for i in xrange(2):
+      self.pour_pump(
+        trans,
+        strings,
+        {
+          'indices': [[[1, 3, -1, -1]], [[2, -1, -1, -1]]],
+          'missing_vals': np.array([], dtype='|S3'),
+          'missing_indices': np.array([], dtype=np.int64),
+          'removed_stopwords': np.array(['the', 'a']),
+          'removed_stopword_indices': np.array([0, 4]),
+          'tokenize_diff': [['d11,12,0:'], ['d5,7,0:']],
+        },
+        test_type=False
+      )
+      trans = self.write_read(trans, self.temp_dir)
+    self.write_read_example(trans, strings, self.temp_dir, test_type=False)
+
   def test_read_write(self):
     indices = np.array([
       [
@@ -214,31 +349,32 @@ class TestStringTransform(th.TestTransform):
     ])
     lower_case_diff = [
       [
-        ['[["i", 0, 1, "I"]]', '[]', '[]', '[]', '[]', '[]', '[]', '[]', '[]', '[]'],
-        ['[["i", 0, 1, "I"]]', '[]', '[]', '[]', '[]', '[["i", 0, 1, "I"]]', '[]', '[]', '[]', '[]']],
+        ['i0,1,1:I', '', '', '', '', '', '', '', '', ''],
+        ['i0,1,1:I', '', '', '', '', 'i0,1,1:I', '', '', '', '']],
       [
-        ['[["i", 0, 1, "T"]]', '[]', '[]', '[]', '[]', '[]', '[]', '[]', '[]', '[]'],
-        ['[["i", 0, 1, "H"]]', '[]', '[]', '[]', '[]', '[]', '[]', '[]', '[]', '[]']],
+        ['i0,1,1:T', '', '', '', '', '', '', '', '', ''],
+        ['i0,1,1:H', '', '', '', '', '', '', '', '', '']],
       [
-        ['[["i", 0, 1, "E"]]', '[]', '[]', '[]', '[]', '[]', '[]', '[]', '[]', '[]'],
-        ['[["i", 0, 1, "U"]]', '[]', '[]', '[]', '[]', '[]', '[]', '[]', '[]', '[]']
+        ['i0,1,1:E', '', '', '', '', '', '', '', '', ''],
+        ['i0,1,1:U', '', '', '', '', '', '', '', '', '']
       ]
     ]
     tokenize_diff = [
       [
-        '[["d", 16, 17, ""], ["d", 18, 22, ""]]',
-        '[["d", 1, 2, ""], ["d", 23, 24, ""], ["d", 37, 38, ""]]'
+        'd16,17,0:d18,22,0:',
+        'd1,2,0:d23,24,0:d37,38,0:'
       ],
       [
-        '[["d", 21, 22, ""], ["d", 26, 27, ""], ["i", 37, 37, "."], ["i", 38, 38, "OK"]]',
-        '[["d", 3, 4, ""], ["d", 9, 10, ""], ["d", 11, 17, ""]]'
+        'd21,22,0:d26,27,0:i37,37,1:.i38,38,2:OK',
+        'd3,4,0:d9,10,0:d11,17,0:'
       ],
       [
-        '[["d", 30, 31, ""], ["d", 32, 35, ""]]',
-        '[["d", 14, 21, ""]]'
+        'd30,31,0:d32,35,0:',
+        'd14,21,0:'
       ]
     ]
-    missing_vals = np.array([[[u'', u'', u'', u'', u'', u'', u'', u'', u'', u''], [u'', u'', u'', u'', u'', u'', u'', u'', u'', u'']], [[u'', u'', u'', u'', u'', u'', u'', u'', u'', u''], [u'', u'', u'you', u'', u'', u'', u'', u'', u'', u'']], [[u'', u'', u'', u'', u'', u'', u'', u'', u'', u''], [u'', u'', u'', u'', u'', u'', u'', u'', u'', u'']]], dtype='|S40')
+    missing_vals = np.array(['you'], dtype='|S40')
+    missing_indices = np.array([32], dtype=np.int64)
     strings = np.array([
       ["It is what it is.", "I've seen summer and I've seen rain"],
       ["The sun is not yellow, it's chicken. OK.", "Hey, you!"],
@@ -263,6 +399,7 @@ class TestStringTransform(th.TestTransform):
       {
         'indices': indices,
         'missing_vals': missing_vals,
+        'missing_indices': missing_indices,
         'tokenize_diff': tokenize_diff,
         'lower_case_diff': lower_case_diff
 
@@ -273,6 +410,42 @@ class TestStringTransform(th.TestTransform):
     self.write_read_example(trans, strings, self.temp_dir)
     trans = self.write_read(trans, self.temp_dir)
 
+  def test_old_save_dict(self):
+    strings = np.array([
+      ["the cat sat"],
+      ["a dog"]
+    ])
+    trans = n.StringTransform(
+      name='',
+      max_sent_len=4,
+      max_vocab_size=10
+    )
+    trans.calc_global_values(strings)
+
+    # Transforms saved before the newer attributes were added, with a
+    # word_to_index dict rather than a Vocabulary, can still be read in.
+    old_keys = ['name', 'cols', 'num_examples', 'is_calc_run', 'input_dtype', 'dtype', 'input_shape', 'index_to_word', 'word_to_index', 'max_sent_len', 'word_tokenizer', 'half_width', 'lower_case', 'word_detokenizer', 'max_vocab_size']
+    save_dict = trans._save_dict()
+    old_save_dict = {key: save_dict[key] for key in old_keys + ['__class__']}
+    old_save_dict['index_to_word'] = trans.index_to_word
+    old_save_dict['word_to_index'] = {word: num for num, word in enumerate(trans.index_to_word)}
+    old_trans = n.StringTransform(save_dict=old_save_dict)
+
+    self.assertEqual(old_trans.word_to_index, trans.word_to_index)
+    self.assertEqual(old_trans.narrow_dtypes, False)
+    self.assertEqual(old_trans.sparse_missing_vals, True)
+    self.pour_pump(
+      old_trans,
+      strings,
+      {
+        'indices': [[[5, 2, 4, -1]], [[1, 3, -1, -1]]],
+        'missing_vals': np.array([], dtype='|S3'),
+        'missing_indices': np.array([], dtype=np.int64),
+        'tokenize_diff': [['d11,12,0:'], ['d5,7,0:']],
+      },
+      test_type=False
+    )
+
   def _get_index_to_word(self, strings, tokenizer, lemmatizer=None, half_width=False):
     index_to_word = set()
     for string in strings.flatten():
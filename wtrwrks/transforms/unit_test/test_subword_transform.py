@@ -0,0 +1,71 @@
+import shutil
+import tempfile
+import unittest
+import wtrwrks.utils.test_helpers as th
+import wtrwrks.transforms.subword_transform as n
+import numpy as np
+
+
+class TestSubwordTransform(th.TestTransform):
+  def setUp(self):
+    self.temp_dir = tempfile.mkdtemp()
+
+  def tearDown(self):
+    shutil.rmtree(self.temp_dir)
+
+  def test_learn_vocab(self):
+    strings = np.array([['The lower newest'], ['the widest low'], ['lowest news']])
+    for num_workers in [1, 2]:
+      trans = n.SubwordTransform(
+        name='',
+        lower_case=True,
+        max_vocab_size=16,
+        max_sent_len=8
+      )
+      trans.calc_global_values(data_iter=[strings[:1], strings[1:]], num_workers=num_workers)
+      self.assertEqual(trans.index_to_word, ['[UNK]', '##d', '##e', '##es', '##est', '##h', '##i', '##o', '##r', '##s', '##t', '##w', 'l', 'n', 't', 'w'])
+
+      # Every word is built out of pieces, so nothing is unknown.
+      for i in xrange(2):
+        self.pour_pump(
+          trans,
+          strings,
+          {
+            'indices': [[[14, 5, 2, 12, 7, 11, 2, 8]], [[14, 5, 2, 15, 6, 1, 4, 12]], [[12, 7, 11, 4, 13, 2, 11, 9]]],
+            'missing_vals': np.array([], dtype='|S5'),
+            'missing_indices': np.array([], dtype=np.int64),
+            'tokenize_diff': [['i9,9,7: newest'], ['i12,12,2:ow'], ['']],
+            'lower_case_diff': [[['i0,1,1:T', '', '', '', '', '', '', '']], [[''] * 8], [[''] * 8]],
+          },
+          test_type=False
+        )
+        trans = self.write_read(trans, self.temp_dir)
+    self.write_read_example(trans, strings, self.temp_dir, test_type=False)
+
+  def test_index_to_word(self):
+    strings = np.array([['unwanted running'], ['xyz wanted']])
+    trans = n.SubwordTransform(
+      name='',
+      index_to_word=['[UNK]', '##ed', '##ing', '##want', 'runn', 'un', 'want'],
+      max_sent_len=5
+    )
+    trans.calc_global_values(strings)
+
+    # Words which can't be split into pieces are unknown.
+    self.pour_pump(
+      trans,
+      strings,
+      {
+        'indices': [[[5, 3, 1, 4, 2]], [[0, 6, 1, -1, -1]]],
+        'missing_vals': np.array(['xyz']),
+        'missing_indices': np.array([5]),
+        'tokenize_diff': [[''], ['']],
+      },
+      test_type=False
+    )
+
+    with self.assertRaises(ValueError):
+      n.SubwordTransform(name='', max_vocab_size=10, max_sent_len=5, hash_buckets=10)
+
+if __name__ == "__main__":
+    unittest.main()
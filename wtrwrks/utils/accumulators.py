@@ -0,0 +1,393 @@
+"""Accumulators of statistics which can be updated one chunk of data at a time and merged with each other. Since merging is associative, the chunks can be processed independently (e.g. by separate processes) and the partial results reduced together to give the exact statistics of the full dataset."""
+import numpy as np
+import heapq
+
+
+class MomentAccumulator(object):
+  """Running count, mean, sum of squared deviations from the mean (M2), min and max of arrays along some axis. Uses the pairwise update of Chan et al. so that merging two accumulators gives the same result as having seen all the data in one.
+
+  Parameters
+  ----------
+  axis : int, tuple of ints or None
+    The axis (or axes) the statistics are computed along. None implies all axes.
+
+  Attributes
+  ----------
+  count : float
+    The number of values that went into each of the statistics.
+  mean : np.ndarray or None
+    The running mean.
+  m2 : np.ndarray or None
+    The running sum of squared deviations from the mean.
+  min : np.ndarray or None
+    The running min.
+  max : np.ndarray or None
+    The running max.
+
+  """
+
+  def __init__(self, axis=None):
+    self.axis = axis
+    self.count = 0.
+    self.mean = None
+    self.m2 = None
+    self.min = None
+    self.max = None
+
+  @classmethod
+  def from_counts(cls, counts, count, axis=None):
+    """Create the accumulator of arrays of zeros and ones (e.g. one hots) directly from the number of ones, without having to create the arrays. Since every value is 0 or 1 the mean is the fraction of ones and the variance is mean * (1 - mean).
+
+    Parameters
+    ----------
+    counts : np.ndarray
+      The number of ones that went into each of the statistics.
+    count : int
+      The number of values that went into each of the statistics.
+    axis : int, tuple of ints or None
+      The axis (or axes) the statistics were computed along.
+
+    Returns
+    -------
+    MomentAccumulator
+      The accumulator with the statistics set.
+
+    """
+    moments = cls(axis)
+    if not count:
+      return moments
+
+    moments.count = float(count)
+    moments.mean = np.asarray(counts, dtype=np.float64) / moments.count
+    moments.m2 = moments.mean * (1. - moments.mean) * moments.count
+    moments.min = (moments.mean == 1.).astype(np.float64)
+    moments.max = (moments.mean > 0.).astype(np.float64)
+    return moments
+
+  @property
+  def var(self):
+    """The (population) variance of all the values seen so far."""
+    if self.m2 is None:
+      return None
+    return self.m2 / self.count
+
+  def update(self, array):
+    """Add the statistics of a new chunk of data to the accumulator.
+
+    Parameters
+    ----------
+    array : np.ndarray
+      The chunk of data.
+
+    Returns
+    -------
+    MomentAccumulator
+      self, with the chunk added in.
+
+    """
+    if not array.size:
+      return self
+
+    other = MomentAccumulator(self.axis)
+    other.mean = np.mean(array, axis=self.axis)
+    other.count = float(array.size / np.size(other.mean))
+    other.m2 = np.var(array, axis=self.axis) * other.count
+    other.min = np.min(array, axis=self.axis)
+    other.max = np.max(array, axis=self.axis)
+    return self.merge(other)
+
+  def merge(self, other):
+    """Merge the statistics of another accumulator into this one.
+
+    Parameters
+    ----------
+    other : MomentAccumulator
+      The accumulator to merge in. Must have been computed along the same axis.
+
+    Returns
+    -------
+    MomentAccumulator
+      self, with the other accumulator's statistics merged in.
+
+    """
+    if self.axis != other.axis:
+      raise ValueError("Cannot merge accumulators along different axes. Got {} and {}".format(self.axis, other.axis))
+
+    if not other.count:
+      return self
+    if not self.count:
+      self.count = other.count
+      self.mean = np.copy(other.mean)
+      self.m2 = np.copy(other.m2)
+      self.min = np.copy(other.min)
+      self.max = np.copy(other.max)
+      return self
+
+    total = self.count + other.count
+    delta = other.mean - self.mean
+
+    self.mean = self.mean + delta * (other.count / total)
+    self.m2 = self.m2 + other.m2 + delta ** 2 * (self.count * other.count / total)
+    self.min = np.minimum(self.min, other.min)
+    self.max = np.maximum(self.max, other.max)
+    self.count = total
+    return self
+
+
+class CountAccumulator(object):
+  """Running counts of the distinct values in arrays. The counts are kept exactly in a hash table until it holds more than max_size values, after which it falls back to a Misra-Gries heavy hitters summary: every count is reduced by the (max_size + 1)th largest count and the values whose counts drop to zero are forgotten. Any value that occurs more than error times is guaranteed to be kept, and each kept count is at most error below its true count. Misra-Gries summaries stay mergeable.
+
+  Parameters
+  ----------
+  max_size : int or None
+    The maximum number of distinct values to hold counts for. None implies no limit.
+
+  Attributes
+  ----------
+  counts : dict
+    The mapping from value to its (possibly reduced) count.
+  error : int
+    The most any count can be below its true count. Zero while the counts are exact.
+
+  """
+
+  def __init__(self, max_size=None):
+    self.max_size = max_size
+    self.counts = {}
+    self.error = 0
+
+  @property
+  def is_exact(self):
+    """Whether or not the counts are still exact."""
+    return self.error == 0
+
+  def update(self, array):
+    """Add the values of a new chunk of data to the counts.
+
+    Parameters
+    ----------
+    array : np.ndarray
+      The chunk of data. NaN values are not counted.
+
+    Returns
+    -------
+    CountAccumulator
+      self, with the chunk added in.
+
+    """
+    array = np.asarray(array).flatten()
+    # NaN is the only value not equal to itself.
+    array = array[array == array]
+    if not array.size:
+      return self
+
+    # Add any new values to the counts in the order they first appear, so that
+    # counting the values in one go or a chunk at a time fills the counts the
+    # same way.
+    uniques, first_indices, counts = np.unique(array, return_index=True, return_counts=True)
+    order = np.argsort(first_indices, kind='mergesort')
+    for value, count in zip(uniques[order].tolist(), counts[order].tolist()):
+      self.counts[value] = self.counts.get(value, 0) + count
+    self._prune()
+    return self
+
+  def merge(self, other):
+    """Merge the counts of another accumulator into this one.
+
+    Parameters
+    ----------
+    other : CountAccumulator
+      The accumulator to merge in.
+
+    Returns
+    -------
+    CountAccumulator
+      self, with the other accumulator's counts merged in.
+
+    """
+    for value, count in other.counts.iteritems():
+      self.counts[value] = self.counts.get(value, 0) + count
+    self.error += other.error
+    self._prune()
+    return self
+
+  def most_common(self, num=None, min_count=1, break_ties=True):
+    """Get the most frequent values, ordered by descending count. If num is given, the values are pulled out with a heap rather than sorting all of them.
+
+    Parameters
+    ----------
+    num : int or None
+      The maximum number of values to return. None implies all of them.
+    min_count : int
+      The minimum count a value must have to be returned.
+    break_ties : bool
+      Whether to break ties by the ordering of the values themselves. Otherwise tied values are left in the order the counts dict iterates through them, the same as stably sorting a plain dict of counts.
+
+    Returns
+    -------
+    list
+      The most frequent values.
+
+    """
+    values = [v for v, c in self.counts.iteritems() if c >= min_count]
+    if break_ties:
+      key = lambda v: (-self.counts[v], v)
+    else:
+      key = lambda v: -self.counts[v]
+    if num is not None:
+      return heapq.nsmallest(num, values, key=key)
+    return sorted(values, key=key)
+
+  def _prune(self):
+    """Reduce the counts down to max_size values if there are more."""
+    if self.max_size is None or len(self.counts) <= self.max_size:
+      return
+
+    counts = np.array(self.counts.values())
+    kth = len(counts) - self.max_size - 1
+    cutoff = int(np.partition(counts, kth)[kth])
+
+    self.counts = {v: c - cutoff for v, c in self.counts.iteritems() if c > cutoff}
+    self.error += cutoff
+
+
+class QuantileSketch(object):
+  """Bounded memory summary of the distribution of a stream of values, following the KLL sketch of Karnin, Lang and Liberty. The values are held in a hierarchy of compactors, where an item in level h stands in for 2**h of the original values. Whenever a level holds more than its capacity it's sorted and every other item, starting from a random offset, is promoted to the level above while the rest are dropped. The capacities shrink geometrically going down from the top level, so the sketch holds around 3 * k items no matter how many values it has seen, and the rank error of any quantile estimate is roughly proportional to 1 / k. KLL sketches stay mergeable.
+
+  Parameters
+  ----------
+  k : int
+    The capacity of the top level. Controls the trade off between memory and accuracy.
+  random_seed : int or None
+    The seed of the random offsets used when compacting.
+
+  Attributes
+  ----------
+  levels : list of np.ndarray
+    The items held at each level.
+  count : int
+    The number of values the sketch has seen.
+  min : float or None
+    The exact min of the values seen.
+  max : float or None
+    The exact max of the values seen.
+
+  """
+
+  def __init__(self, k=200, random_seed=0):
+    self.k = k
+    self.levels = [np.array([], dtype=np.float64)]
+    self.count = 0
+    self.min = None
+    self.max = None
+    self.random_state = np.random.RandomState(random_seed)
+
+  def merge(self, other):
+    """Merge the values summarized by another sketch into this one.
+
+    Parameters
+    ----------
+    other : QuantileSketch
+      The sketch to merge in. Must have the same k.
+
+    Returns
+    -------
+    QuantileSketch
+      self, with the other sketch merged in.
+
+    """
+    if self.k != other.k:
+      raise ValueError("Cannot merge sketches of different sizes. Got {} and {}".format(self.k, other.k))
+    if not other.count:
+      return self
+
+    for level_num, level in enumerate(other.levels):
+      if level_num == len(self.levels):
+        self.levels.append(np.array([], dtype=np.float64))
+      self.levels[level_num] = np.concatenate([self.levels[level_num], level])
+
+    self.count += other.count
+    self.min = other.min if self.min is None else min(self.min, other.min)
+    self.max = other.max if self.max is None else max(self.max, other.max)
+    self._compress()
+    return self
+
+  def quantiles(self, probs):
+    """Estimate the values at some quantiles of the values seen so far. The quantiles 0 and 1 are exactly the min and the max.
+
+    Parameters
+    ----------
+    probs : np.ndarray
+      The quantiles, between 0 and 1.
+
+    Returns
+    -------
+    np.ndarray
+      The estimated value at each of the quantiles.
+
+    """
+    if not self.count:
+      raise ValueError("Cannot estimate quantiles of an empty sketch.")
+
+    values = np.concatenate(self.levels)
+    weights = np.concatenate([np.full(level.size, 2. ** level_num) for level_num, level in enumerate(self.levels)])
+    order = np.argsort(values, kind='mergesort')
+    values = values[order]
+    weights = weights[order]
+
+    # Place each item at the middle of the range of ranks it stands in for,
+    # and pin the ends to the exact min and max.
+    ranks = (np.cumsum(weights) - weights / 2.) / np.sum(weights)
+    ranks = np.concatenate([[0.], ranks, [1.]])
+    values = np.concatenate([[self.min], values, [self.max]])
+    return np.interp(probs, ranks, values)
+
+  def update(self, array):
+    """Add the values of a new chunk of data to the sketch.
+
+    Parameters
+    ----------
+    array : np.ndarray
+      The chunk of data. NaN values are skipped.
+
+    Returns
+    -------
+    QuantileSketch
+      self, with the chunk added in.
+
+    """
+    array = np.asarray(array, dtype=np.float64).flatten()
+    array = array[~np.isnan(array)]
+    if not array.size:
+      return self
+
+    self.levels[0] = np.concatenate([self.levels[0], array])
+    self.count += array.size
+    self.min = np.min(array) if self.min is None else min(self.min, np.min(array))
+    self.max = np.max(array) if self.max is None else max(self.max, np.max(array))
+    self._compress()
+    return self
+
+  def _capacity(self, level_num):
+    """Get the number of items a level can hold before it has to be compacted."""
+    depth = len(self.levels) - level_num - 1
+    return max(2, int(np.ceil(self.k * (2. / 3.) ** depth)))
+
+  def _compress(self):
+    """Compact any levels which are over capacity, starting from the bottom."""
+    level_num = 0
+    while level_num < len(self.levels):
+      level = self.levels[level_num]
+      if level.size > self._capacity(level_num):
+        if level_num + 1 == len(self.levels):
+          self.levels.append(np.array([], dtype=np.float64))
+
+        # Hold back one item if there are an odd number of them, so that the
+        # total weight is preserved exactly.
+        level = np.sort(level)
+        num_held = level.size % 2
+        offset = self.random_state.randint(2)
+
+        self.levels[level_num + 1] = np.concatenate([self.levels[level_num + 1], level[num_held + offset::2]])
+        self.levels[level_num] = level[:num_held]
+      level_num += 1
@@ -87,3 +87,47 @@ def get_default_val(a):
     default_val = None
 
   return default_val
+
+
+def hash_to_buckets(a, num_buckets):
+  """Map every value of an array to one of num_buckets buckets using the 64 bit FNV-1a hash of its characters. The hash is computed one character position at a time over the whole array rather than value by value, and it doesn't depend on the python process (unlike the builtin hash), so the same value always lands in the same bucket. Byte strings and unicode strings with the same (ascii) characters land in the same bucket, anything else is hashed by its unicode representation.
+
+  Parameters
+  ----------
+  a : np.ndarray
+    The values to hash.
+  num_buckets : int
+    The number of buckets.
+
+  Returns
+  -------
+  np.ndarray of ints
+    The bucket of each value, -1 for empty strings.
+
+  """
+  a = np.asarray(a)
+  if a.dtype.kind == 'S':
+    codes = np.ascontiguousarray(a).view(np.uint8)
+    width = a.dtype.itemsize
+  else:
+    if a.dtype.kind != 'U':
+      a = a.astype(np.unicode)
+    codes = np.ascontiguousarray(a).view(np.uint32)
+    width = a.dtype.itemsize // 4
+  codes = codes.reshape(a.shape + (width,)).astype(np.uint64)
+
+  # Strings are padded out with null characters, which are skipped so the
+  # hash of a value doesn't depend on the width of the array it's in.
+  hashes = np.full(a.shape, 14695981039346656037, dtype=np.uint64)
+  prime = np.uint64(1099511628211)
+  with np.errstate(over='ignore'):
+    for pos in xrange(width):
+      col = codes[..., pos]
+      hashes = np.where(col != 0, (hashes ^ col) * prime, hashes)
+
+  target = np.array(hashes % np.uint64(num_buckets), dtype=np.int64)
+  if width:
+    target[~codes.any(axis=-1)] = -1
+  else:
+    target[...] = -1
+  return target
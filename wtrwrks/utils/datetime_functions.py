@@ -0,0 +1,146 @@
+"""Functions for converting arrays of strings to datetimes and back. Rather than parsing every element, the distinct values of an array are parsed once and the results are broadcast back out, and the format is detected once per array rather than once per value."""
+import numpy as np
+import datetime
+import re
+
+# The strptime formats tried, in order, when an array isn't ISO 8601.
+DETECT_FORMATS = [
+  '%Y-%m-%d %H:%M:%S.%f',
+  '%Y-%m-%d %H:%M:%S',
+  '%Y-%m-%d %H:%M',
+  '%Y/%m/%d %H:%M:%S',
+  '%Y/%m/%d',
+  '%m/%d/%Y %H:%M:%S',
+  '%m/%d/%Y',
+  '%d/%m/%Y',
+  '%d-%m-%Y',
+  '%Y%m%d',
+  '%d %b %Y',
+  '%d %B %Y',
+  '%b %d, %Y',
+  '%B %d, %Y',
+]
+
+# The shape of the ISO 8601 strings which are handed straight to numpy. Numpy
+# parses anything that's all digits as a year (e.g. '20190101' is the year
+# 20190101), so apart from a bare four digit year the date parts have to be
+# separated.
+ISO_PATTERN = re.compile(r'^-?\d{4}(-\d{2}(-\d{2}([T ]\d{2}(:\d{2}(:\d{2}(\.\d+)?)?)?(Z|[+-]\d{2}:?\d{2})?)?)?)?$')
+
+# The strings that are parsed as NaT.
+NAT_STRINGS = ['', 'NaT']
+
+
+def detect_format(strings):
+  """Find a format that all the strings can be parsed with.
+
+  Parameters
+  ----------
+  strings : np.ndarray of strs
+    The (non null) strings to be parsed.
+
+  Returns
+  -------
+  str or None
+    The strptime format, or None if the strings are ISO 8601 and can be parsed directly by numpy.
+
+  """
+  if all(ISO_PATTERN.match(string) for string in strings):
+    try:
+      strings.astype(np.datetime64)
+      return None
+    except ValueError:
+      pass
+
+  for input_format in DETECT_FORMATS:
+    try:
+      for string in strings:
+        datetime.datetime.strptime(string, input_format)
+      return input_format
+    except ValueError:
+      continue
+
+  raise ValueError("Could not detect the format of the datetime strings. Set input_format to one of the form {}".format(DETECT_FORMATS[0]))
+
+
+def parse_datetimes(a, input_format=None, return_format=False):
+  """Convert an array of strings (or objects) to an array of datetime64. Each distinct value is parsed only once.
+
+  Parameters
+  ----------
+  a : np.ndarray
+    The array to convert. Empty strings, 'NaT', None and NaN are converted to NaT.
+  input_format : str or None
+    The strptime format of the strings. If None, then the format is detected from the strings themselves.
+  return_format : bool
+    Whether or not to also return the format the strings were parsed with.
+
+  Returns
+  -------
+  np.ndarray of datetime64
+    The parsed datetimes.
+  str or None
+    The strptime format the strings were parsed with, None if they were parsed directly by numpy. Only returned if return_format is True.
+
+  """
+  a = np.asarray(a)
+  if a.dtype.kind not in ('S', 'U', 'O'):
+    target = a.astype(np.datetime64)
+    return (target, input_format) if return_format else target
+
+  flat = a.ravel()
+  if a.dtype.kind == 'O':
+    is_null = np.array([v is None or v in NAT_STRINGS or v != v for v in flat], dtype=bool)
+  else:
+    is_null = np.isin(flat, NAT_STRINGS)
+
+  uniques, inverse = np.unique(flat[~is_null], return_inverse=True)
+
+  # Anything other than strings (e.g. datetime objects) can be converted by
+  # numpy directly.
+  if a.dtype.kind == 'O' and not all(isinstance(v, basestring) for v in uniques):
+    parsed = uniques.astype(np.datetime64)
+  else:
+    if input_format is None and uniques.size:
+      input_format = detect_format(uniques)
+
+    if input_format is None:
+      parsed = uniques.astype(np.datetime64)
+    else:
+      parsed = np.array([datetime.datetime.strptime(v, input_format) for v in uniques], dtype='datetime64[us]')
+
+  target = np.full(flat.shape, np.datetime64('NaT'), dtype=parsed.dtype if parsed.size else np.datetime64)
+  target[~is_null] = parsed[inverse]
+  target = target.reshape(a.shape)
+  return (target, input_format) if return_format else target
+
+
+def format_datetimes(a, input_format=None):
+  """Convert an array of datetime64 to strings, the inverse of parse_datetimes. Each distinct value is formatted only once.
+
+  Parameters
+  ----------
+  a : np.ndarray of datetime64
+    The datetimes to convert. NaT values are converted to empty strings.
+  input_format : str or None
+    The strftime format to write the strings in. If None, then they are written in ISO 8601 with as little precision as needed to keep all the information.
+
+  Returns
+  -------
+  np.ndarray of unicode
+    The formatted strings.
+
+  """
+  a = np.asarray(a)
+  flat = a.ravel()
+  is_null = np.isnat(flat)
+  uniques, inverse = np.unique(flat[~is_null], return_inverse=True)
+
+  if input_format is None:
+    formatted = np.datetime_as_string(uniques, unit='auto')
+  else:
+    formatted = np.array([unicode(v.strftime(input_format)) for v in uniques.astype('datetime64[us]').tolist()], dtype=np.unicode)
+
+  target = np.full(flat.shape, u'', dtype=formatted.dtype if formatted.size else np.unicode)
+  target[~is_null] = formatted[inverse]
+  return target.reshape(a.shape)
@@ -0,0 +1,117 @@
+"""Bounded least recently used cache which keeps track of how often it's hit, so that expensive per element work (e.g. tokenizing strings which are repeated over and over) only has to be done once per distinct value."""
+import collections
+
+
+class LRUCache(object):
+  """Mapping which holds at most max_size values. When it's full, the value which was least recently set or looked up is evicted to make room for a new one.
+
+  Parameters
+  ----------
+  max_size : int or None
+    The maximum number of values to hold. None implies no limit.
+
+  Attributes
+  ----------
+  hits : int
+    The number of lookups which found a value.
+  misses : int
+    The number of lookups which didn't find a value.
+  evictions : int
+    The number of values evicted to make room for new ones.
+
+  """
+
+  def __init__(self, max_size=None):
+    if max_size is not None and max_size < 1:
+      raise ValueError("max_size must be a positive int or None. Got {}".format(max_size))
+
+    self.max_size = max_size
+    self.values = collections.OrderedDict()
+    self.hits = 0
+    self.misses = 0
+    self.evictions = 0
+
+  def __contains__(self, key):
+    """Whether or not key has a value. Doesn't count as a lookup."""
+    return key in self.values
+
+  def __len__(self):
+    """The number of values held."""
+    return len(self.values)
+
+  @property
+  def hit_rate(self):
+    """The fraction of lookups which found a value. None if there haven't been any lookups."""
+    num_lookups = self.hits + self.misses
+    if not num_lookups:
+      return None
+    return float(self.hits) / num_lookups
+
+  def clear(self):
+    """Remove all the values and reset the metrics."""
+    self.values.clear()
+    self.hits = 0
+    self.misses = 0
+    self.evictions = 0
+
+  def get(self, key, default=None):
+    """Look up the value of key, marking it as the most recently used.
+
+    Parameters
+    ----------
+    key : hashable
+      The key to look up.
+    default : object
+      What to return if key has no value.
+
+    Returns
+    -------
+    object
+      The value of key, or default if it has none.
+
+    """
+    if key not in self.values:
+      self.misses += 1
+      return default
+
+    # Move the key to the most recently used end.
+    value = self.values.pop(key)
+    self.values[key] = value
+    self.hits += 1
+    return value
+
+  def get_metrics(self):
+    """Get the hit rate metrics of the cache.
+
+    Returns
+    -------
+    dict
+      The number of hits, misses and evictions, the hit rate, and the number of values held.
+
+    """
+    return {
+      'hits': self.hits,
+      'misses': self.misses,
+      'evictions': self.evictions,
+      'hit_rate': self.hit_rate,
+      'size': len(self.values),
+    }
+
+  def set(self, key, value):
+    """Set the value of key, marking it as the most recently used. Evicts the least recently used value if the cache is full.
+
+    Parameters
+    ----------
+    key : hashable
+      The key to set.
+    value : object
+      The value to set it to.
+
+    """
+    if key in self.values:
+      del self.values[key]
+    elif self.max_size is not None and len(self.values) >= self.max_size:
+      self.values.popitem(last=False)
+      self.evictions += 1
+
+    self.values[key] = value
@@ -0,0 +1,91 @@
+"""Tokenizers which run in a pool of long lived worker processes. Some tokenizers (e.g. the konlpy ones, which go through JPype) are expensive to create and have to be attached to a JVM before they can be used, so rather than paying that cost for every task, each worker creates its own tokenizer once when it starts and keeps it for as long as the pool is alive."""
+import pathos.multiprocessing as mp
+import pathos.helpers as ph
+
+# The tokenizer of the current worker process, created by _start_worker.
+_worker_tokenizer = None
+
+
+def _start_worker(tokenizer_factory):
+  """Create the tokenizer of a newly started worker process."""
+  global _worker_tokenizer
+  _worker_tokenizer = tokenizer_factory()
+
+
+def _tokenize_chunk(strings):
+  """Tokenize a chunk of strings with the tokenizer of the current worker process."""
+  return [list(_worker_tokenizer(string)) for string in strings]
+
+
+class TokenizerPool(object):
+  """Tokenizer that hands strings off to a pool of warm worker processes. Can be used anywhere a tokenizer function can (e.g. in the tokenizers of MultiLingualStringTransform), and since it has a tokenize_batch method the tokenize tanks will give it all of their strings at once. The worker processes are started the first time they're needed and are left out when pickling, so a TokenizerPool can be saved along with a transform and its workers start up again after it's read back in.
+
+  Daemonic processes (e.g. the workers of multi_map, which write examples and calculate global values in parallel) aren't allowed to start processes of their own. In those the strings are tokenized in the process itself, with a tokenizer that's created once and kept.
+
+  Parameters
+  ----------
+  tokenizer_factory : func
+    Function which takes no arguments and returns the tokenizer (i.e. a function which converts a string into a list of strings). Called once in each worker process.
+  num_workers : int
+    The number of worker processes.
+  chunk_size : int
+    The maximum number of strings handed to a worker at a time.
+
+  """
+
+  def __init__(self, tokenizer_factory, num_workers=1, chunk_size=1000):
+    self.tokenizer_factory = tokenizer_factory
+    self.num_workers = num_workers
+    self.chunk_size = chunk_size
+    self.pool = None
+    self.tokenizer = None
+
+  def __call__(self, string):
+    """Tokenize a single string."""
+    return self.tokenize_batch([string])[0]
+
+  def __getstate__(self):
+    """Leave out the pool and the tokenizer when pickling."""
+    state = dict(self.__dict__)
+    state['pool'] = None
+    state['tokenizer'] = None
+    return state
+
+  def close(self):
+    """Shut down the worker processes. They are started up again if the pool is used afterwards."""
+    if self.pool is not None:
+      self.pool.close()
+      self.pool.join()
+      self.pool = None
+
+  def tokenize_batch(self, strings):
+    """Tokenize a list of strings, splitting them into chunks to be handed to the workers.
+
+    Parameters
+    ----------
+    strings : list of strs
+      The strings to tokenize.
+
+    Returns
+    -------
+    list of lists of strs
+      The tokens of each string, in the same order as the strings.
+
+    """
+    strings = list(strings)
+    if not strings:
+      return []
+
+    # A daemonic process can't have a pool of its own, so tokenize in place.
+    if ph.mp.current_process().daemon:
+      if self.tokenizer is None:
+        self.tokenizer = self.tokenizer_factory()
+      return [list(self.tokenizer(string)) for string in strings]
+
+    if self.pool is None:
+      self.pool = mp.Pool(self.num_workers, _start_worker, (self.tokenizer_factory,))
+
+    # Make sure every worker gets a chunk if there are enough strings.
+    chunk_size = min(self.chunk_size, -(-len(strings) // self.num_workers))
+    chunks = [strings[start: start + chunk_size] for start in xrange(0, len(strings), chunk_size)]
+    return [tokens for chunk_tokens in self.pool.map(_tokenize_chunk, chunks) for tokens in chunk_tokens]
@@ -0,0 +1,103 @@
+import unittest
+import wtrwrks.utils.accumulators as acc
+import wtrwrks.utils.test_helpers as th
+import numpy as np
+
+
+class TestAccumulators(unittest.TestCase):
+  def setUp(self):
+    self.array = np.random.RandomState(0).normal(size=(20, 3, 2)) * 5 + 1
+
+  def test_update(self):
+    for axis in [0, (0, 1), None]:
+      moments = acc.MomentAccumulator(axis=axis)
+      for chunk in np.array_split(self.array, 3):
+        moments.update(chunk)
+
+      self.assertTrue(th.arrays_equal(moments.mean, np.mean(self.array, axis=axis)))
+      self.assertTrue(th.arrays_equal(moments.var, np.var(self.array, axis=axis)))
+      self.assertTrue(th.arrays_equal(moments.min, np.min(self.array, axis=axis)))
+      self.assertTrue(th.arrays_equal(moments.max, np.max(self.array, axis=axis)))
+
+  def test_merge(self):
+    chunks = np.array_split(self.array, 4)
+    partials = [acc.MomentAccumulator(axis=0).update(chunk) for chunk in chunks]
+
+    left = partials[0].merge(partials[1])
+    right = partials[2].merge(partials[3])
+    moments = acc.MomentAccumulator(axis=0).merge(left).merge(right)
+
+    self.assertEqual(moments.count, 20)
+    self.assertTrue(th.arrays_equal(moments.mean, np.mean(self.array, axis=0)))
+    self.assertTrue(th.arrays_equal(moments.var, np.var(self.array, axis=0)))
+
+    with self.assertRaises(ValueError):
+      moments.merge(acc.MomentAccumulator(axis=1).update(self.array))
+
+  def test_counts(self):
+    array = np.array([1., 2., 2., np.nan, 3., 3., 3., 4., 4., 4., 4.])
+    counts = acc.CountAccumulator()
+    for chunk in np.array_split(array, 3):
+      counts.update(chunk)
+
+    self.assertTrue(counts.is_exact)
+    self.assertEqual(counts.counts, {1.: 1, 2.: 2, 3.: 3, 4.: 4})
+    self.assertEqual(counts.most_common(), [4., 3., 2., 1.])
+    self.assertEqual(counts.most_common(2), [4., 3.])
+    self.assertEqual(counts.most_common(min_count=3), [4., 3.])
+
+  def test_counts_unbroken_ties(self):
+    words = "the cat sat on the mat and the dog sat on a log by the cat".split()
+
+    # Without breaking ties, the same values should come out as from stably
+    # sorting a plain dict of counts filled in word by word.
+    all_words = {}
+    for word in words:
+      all_words.setdefault(word, 0)
+      all_words[word] += 1
+    expected = [w for w, c in sorted(all_words.items(), key=lambda i: i[1], reverse=True)]
+
+    for num_chunks in [1, 4]:
+      counts = acc.CountAccumulator()
+      for chunk in np.array_split(np.array(words), num_chunks):
+        counts.update(chunk)
+      self.assertEqual(counts.most_common(break_ties=False), expected)
+      self.assertEqual(counts.most_common(5, break_ties=False), expected[:5])
+
+  def test_heavy_hitters(self):
+    array = np.array(['a'] * 50 + ['b'] * 30 + list('cdefghij') * 2)
+    np.random.RandomState(0).shuffle(array)
+
+    partials = [acc.CountAccumulator(max_size=3).update(chunk) for chunk in np.array_split(array, 4)]
+    counts = acc.CountAccumulator(max_size=3)
+    for partial in partials:
+      counts.merge(partial)
+
+    self.assertFalse(counts.is_exact)
+    self.assertTrue(len(counts.counts) <= 3)
+    self.assertEqual(counts.most_common(2), ['a', 'b'])
+    self.assertTrue(50 - counts.error <= counts.counts['a'] <= 50)
+
+  def test_quantiles(self):
+    array = np.random.RandomState(1).lognormal(size=100000)
+    probs = np.linspace(0, 1, 11)
+    partials = [acc.QuantileSketch(k=100).update(chunk) for chunk in np.array_split(array, 7)]
+    sketch = acc.QuantileSketch(k=100)
+    for partial in partials:
+      sketch.merge(partial)
+
+    self.assertEqual(sketch.count, array.size)
+    self.assertTrue(sum(level.size for level in sketch.levels) < 1000)
+
+    quantiles = sketch.quantiles(probs)
+    self.assertEqual(quantiles[0], np.min(array))
+    self.assertEqual(quantiles[-1], np.max(array))
+    ranks = np.searchsorted(np.sort(array), quantiles) / float(array.size)
+    self.assertTrue(np.max(np.abs(ranks - probs)) < 0.03)
+
+    with self.assertRaises(ValueError):
+      sketch.merge(acc.QuantileSketch(k=200).update(array[:10]))
+
+
+if __name__ == "__main__":
+    unittest.main()
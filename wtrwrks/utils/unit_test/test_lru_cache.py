@@ -0,0 +1,29 @@
+import unittest
+import wtrwrks.utils.lru_cache as lc
+
+
+class TestLRUCache(unittest.TestCase):
+  def test_eviction(self):
+    cache = lc.LRUCache(max_size=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+
+    # Looking up 'a' makes 'b' the least recently used.
+    self.assertEqual(cache.get('a'), 1)
+    cache.set('c', 3)
+
+    self.assertTrue('a' in cache)
+    self.assertFalse('b' in cache)
+    self.assertEqual(cache.get('b', 0), 0)
+    self.assertEqual(len(cache), 2)
+    self.assertEqual(cache.get_metrics(), {'hits': 1, 'misses': 1, 'evictions': 1, 'hit_rate': 0.5, 'size': 2})
+
+    cache.clear()
+    self.assertEqual(len(cache), 0)
+    self.assertEqual(cache.hit_rate, None)
+
+    with self.assertRaises(ValueError):
+      lc.LRUCache(max_size=0)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,35 @@
+import unittest
+import pickle
+import wtrwrks.utils.tokenizer_pool as tp
+import wtrwrks.utils.multiprocessing as mh
+
+
+def _make_tokenizer():
+  return lambda s: s.split()
+
+
+class TestTokenizerPool(unittest.TestCase):
+  def test_tokenize_batch(self):
+    strings = ['a b', 'c', '', 'd e f'] * 5
+    tokenizer = tp.TokenizerPool(_make_tokenizer, num_workers=2, chunk_size=3)
+
+    self.assertEqual(tokenizer.tokenize_batch(strings), [s.split() for s in strings])
+    self.assertEqual(tokenizer('g h'), ['g', 'h'])
+    self.assertEqual(tokenizer.tokenize_batch([]), [])
+
+    # The workers are left out when pickling and restarted when needed.
+    tokenizer = pickle.loads(pickle.dumps(tokenizer))
+    self.assertTrue(tokenizer.pool is None)
+    self.assertEqual(tokenizer.tokenize_batch(strings[:4]), [s.split() for s in strings[:4]])
+    tokenizer.close()
+
+  def test_multi_map(self):
+    # The workers of multi_map are daemonic, so they can't start a pool.
+    strings = ['a b', 'c', '', 'd e f']
+    tokenizer = tp.TokenizerPool(_make_tokenizer, num_workers=2)
+    tokens = mh.multi_map(tokenizer.tokenize_batch, [strings[:2], strings[2:]], num_threads=2)
+    self.assertEqual(tokens, [[['a', 'b'], ['c']], [[], ['d', 'e', 'f']]])
+    self.assertTrue(tokenizer.pool is None)
+
+if __name__ == "__main__":
+    unittest.main()
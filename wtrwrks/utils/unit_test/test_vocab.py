@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+import os
+import pickle
+import shutil
+import tempfile
+import unittest
+import wtrwrks.utils.vocab as vo
+import numpy as np
+
+
+class TestVocabulary(unittest.TestCase):
+  def setUp(self):
+    self.temp_dir = tempfile.mkdtemp()
+
+  def tearDown(self):
+    shutil.rmtree(self.temp_dir)
+
+  def test_lookup(self):
+    vocab = vo.Vocabulary(['[UNK]', 'the', 'cat', 'sat'])
+    self.assertEqual(len(vocab), 4)
+    self.assertEqual(list(vocab), [u'[UNK]', u'the', u'cat', u'sat'])
+    self.assertEqual(vocab.get('cat'), 2)
+    self.assertEqual(vocab.get('dog', -1), -1)
+    self.assertTrue('sat' in vocab)
+
+    target, isnan = vocab.to_indices(np.array([['the', 'dog'], ['', 'sat']]))
+    self.assertEqual(target.tolist(), [[1, -1], [-1, 3]])
+    self.assertFalse(isnan.any())
+    self.assertEqual(vocab.isin(np.array(['the', 'dog', ''])).tolist(), [True, False, True])
+    self.assertEqual(vocab.to_cats(np.array([2, -1])).tolist(), [u'cat', u'[UNK]'])
+
+    self.assertEqual(vo.Vocabulary([]).to_indices(np.array(['a']))[0].tolist(), [-1])
+    self.assertEqual(vocab[-1], u'sat')
+    with self.assertRaises(ValueError):
+      vo.Vocabulary(['a', 'b', 'a'])
+
+  def test_variable_length(self):
+    vocab = vo.Vocabulary([u'ab', u'a', u'abc', u'b', u'x' * 2000])
+
+    # Words that are prefixes of each other are told apart.
+    target, _ = vocab.to_indices(np.array([u'a', u'ab', u'abc', u'abcd', u'aa', u'', u'x' * 2000, u'x' * 1999]))
+    self.assertEqual(target.tolist(), [1, 0, 2, -1, -1, -1, 4, -1])
+    self.assertEqual(vocab.to_cats(np.array([4, 0]))[0], u'x' * 2000)
+
+    # Each word only takes up its own bytes, not those of the longest word.
+    self.assertLess(vocab.array.nbytes, 2200)
+
+  def test_undecodable(self):
+    vocab = vo.Vocabulary([u'[UNK]', u'a', u'チラシ'])
+
+    # Only the elements which can't be decoded miss the vocabulary.
+    cats = np.array([u'チラシ'.encode('utf-8'), 'a', '\xff'])
+    self.assertEqual(vocab.to_indices(cats)[0].tolist(), [2, 1, -1])
+
+    cats = np.array([u'a', 'a', '\xff', u''], dtype=np.object)
+    self.assertEqual(vocab.to_indices(cats)[0].tolist(), [1, 1, -1, -1])
+
+  def test_save_load(self):
+    vocab = vo.Vocabulary([u'[UNK]', u'b', u'a', u'チラシ'])
+    file_name = os.path.join(self.temp_dir, 'vocab.npy')
+    vocab.save(file_name)
+
+    loaded = vo.Vocabulary.load(file_name)
+    self.assertTrue(isinstance(loaded.array, np.memmap))
+    self.assertEqual(loaded, vocab)
+    self.assertEqual(loaded.to_indices(np.array([u'チラシ', u'a']))[0].tolist(), [3, 2])
+
+    self.assertEqual(pickle.loads(pickle.dumps(loaded)), vocab)
+
+    # Overwriting the file it's memory mapped from leaves it intact.
+    loaded.save(file_name)
+    self.assertEqual(loaded, vocab)
+    self.assertEqual(vo.Vocabulary.load(file_name), vocab)
+
+  def test_save_vocabularies(self):
+    vocab = vo.Vocabulary([u'[UNK]', u'a'])
+    save_dict = {'name': 'a', 'word_to_index': vocab, 'transforms': {'b': {'word_to_index_maps': {'en': vocab}}}}
+    file_name = os.path.join(self.temp_dir, 'trans.pickle')
+
+    saved = vo.save_vocabularies(save_dict, file_name)
+    self.assertEqual(saved['word_to_index'], {'__vocabulary__': 'trans.word_to_index.npy'})
+    self.assertEqual(saved['transforms']['b']['word_to_index_maps']['en'], {'__vocabulary__': 'trans.transforms.b.word_to_index_maps.en.npy'})
+    self.assertTrue(save_dict['word_to_index'] is vocab)
+
+    loaded = vo.load_vocabularies(pickle.loads(pickle.dumps(saved)), file_name)
+    self.assertEqual(loaded['name'], 'a')
+    for loaded_vocab in [loaded['word_to_index'], loaded['transforms']['b']['word_to_index_maps']['en']]:
+      self.assertTrue(isinstance(loaded_vocab.array, np.memmap))
+      self.assertEqual(loaded_vocab, vocab)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,31 @@
+import unittest
+import wtrwrks.utils.word_piece as wpi
+
+
+class TestWordPiece(unittest.TestCase):
+  def test_train(self):
+    word_counts = [('low', 5), ('lower', 2), ('newest', 6), ('widest', 3)]
+    pieces = wpi.train_word_pieces(word_counts, 16)
+
+    # All the characters go in first, then the most frequent merges.
+    self.assertEqual(len(pieces), 16)
+    self.assertEqual(pieces[:3], ['##e', '##w', '##s'])
+    self.assertEqual(pieces[-5:], ['##es', '##est', '##ow', 'low', '##ew'])
+
+    # Not enough room for all the characters.
+    self.assertEqual(wpi.train_word_pieces(word_counts, 2), ['##e', '##w'])
+
+  def test_tokenize(self):
+    index_to_word = ['[UNK]', 'un', 'want', '##ed', '##want', 'runn', '##ing', ',']
+    tokenizer = wpi.WordPieceTokenizer(index_to_word, lambda a: a.split(), lower_case=True)
+
+    tokens = tokenizer(u'Unwanted running , xyz')
+    self.assertEqual(tokens, [u'Un', u'##want', u'##ed', u'runn', u'##ing', u',', u'xyz'])
+    self.assertEqual(wpi.detokenize(tokens + ['', '']), u'Unwanted running , xyz')
+
+    # Words that are too long are kept whole.
+    tokenizer = wpi.WordPieceTokenizer(index_to_word, lambda a: a.split(), max_word_len=4)
+    self.assertEqual(tokenizer('unwanted un'), ['unwanted', 'un'])
+
+if __name__ == "__main__":
+    unittest.main()
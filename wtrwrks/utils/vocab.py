@@ -0,0 +1,360 @@
+"""Word vocabularies stored as a single numpy array rather than a list and a dict of python strings. The words are packed into a blob of utf-8 bytes with a table of offsets and are looked up with a vectorized binary search. The vocabulary pickles as one buffer, and since the words aren't individual python objects the pages holding them are never touched by reference counting, so they stay shared between forked worker processes. A vocabulary can also be saved to a .npy file and memory mapped back in without copying."""
+import os
+import numpy as np
+
+# Roughly the most bytes of the queries to compare against the words at once.
+SEARCH_CHUNK_BYTES = 2 ** 22
+
+
+def _as_unicode(a):
+  """Convert an array to unicode so it can be compared against the words, along with a mask of which elements could be converted. Any that can't be are left as the empty string."""
+  if a.dtype.kind == 'U':
+    return a, np.ones(a.shape, dtype=bool)
+  try:
+    return a.astype(np.unicode), np.ones(a.shape, dtype=bool)
+  except (TypeError, ValueError, UnicodeError):
+    pass
+
+  # Fall back to converting one element at a time, so that only the elements
+  # that can't be converted are lost.
+  words = []
+  valid = np.ones(a.size, dtype=bool)
+  for num, element in enumerate(a.flat):
+    try:
+      words.append(element.decode('utf-8') if isinstance(element, bytes) else np.unicode(element))
+    except (TypeError, ValueError, UnicodeError):
+      words.append(u'')
+      valid[num] = False
+  return np.array(words, dtype=np.unicode).reshape(a.shape), valid.reshape(a.shape)
+
+
+def _encode(word):
+  """Get the utf-8 bytes of a word."""
+  return (word.decode('utf-8') if isinstance(word, bytes) else np.unicode(word)).encode('utf-8')
+
+
+class Vocabulary(object):
+  """Mapping from words to indices (and back) where the index of a word is its position in index_to_word. The words are held as one blob of their utf-8 bytes, along with the offset of each word in the blob and the order that sorts them, which is what the binary search runs through. All three are views into a single uint8 array, so each word only takes up as many bytes as it has, however long the longest word is. Can be used in place of the word_to_index dict in the cat_to_index tanks and in place of the list of words in the isin tanks.
+
+  The empty string is the padding token of the tokenized strings. It's never given an index, but always counts as being in the vocabulary so that padding is never replaced by the unknown token.
+
+  Parameters
+  ----------
+  index_to_word : list of strs or None
+    The words, in index order. Must be unique.
+  array : np.ndarray or None
+    The uint8 array of a vocabulary, e.g. as read in by load. Used instead of index_to_word.
+
+  Attributes
+  ----------
+  array : np.ndarray of uint8s
+    The number of words, the offsets, the sorter and the blob, one after the other.
+  offsets : np.ndarray of ints
+    Where each word starts in the blob, plus where the last one ends.
+  sorter : np.ndarray of ints
+    The indices of the words in sorted (i.e. utf-8 byte) order.
+  blob : np.ndarray of uint8s
+    The utf-8 bytes of all the words, in index order.
+
+  """
+
+  def __init__(self, index_to_word=None, array=None):
+    if array is None:
+      encoded = [_encode(word) for word in (index_to_word if index_to_word is not None else [])]
+      sorter = sorted(xrange(len(encoded)), key=encoded.__getitem__)
+      for prev_index, index in zip(sorter[:-1], sorter[1:]):
+        if encoded[prev_index] == encoded[index]:
+          raise ValueError("All the words of a Vocabulary must be unique.")
+
+      offsets = np.zeros([len(encoded) + 1], dtype=np.int64)
+      np.cumsum([len(word) for word in encoded], out=offsets[1:])
+      array = np.concatenate([
+        np.array([len(encoded)], dtype=np.int64).view(np.uint8),
+        offsets.view(np.uint8),
+        np.array(sorter, dtype=np.int64).view(np.uint8),
+        np.array(bytearray(b''.join(encoded)), dtype=np.uint8)
+      ])
+    self.array = array
+
+    # Split the array back up into its parts, without copying.
+    num_words = int(array[:8].view(np.int64)[0])
+    sorter_start = 8 * (num_words + 2)
+    blob_start = 8 * (2 * num_words + 2)
+    self.offsets = array[8: sorter_start].view(np.int64)
+    self.sorter = array[sorter_start: blob_start].view(np.int64)
+    self.blob = array[blob_start:]
+
+  def __contains__(self, word):
+    """Whether or not word has an index."""
+    return self.get(word) is not None
+
+  def __eq__(self, other):
+    """Whether or not other is a Vocabulary of the same words in the same order."""
+    return isinstance(other, Vocabulary) and np.array_equal(self.offsets, other.offsets) and np.array_equal(self.blob, other.blob)
+
+  def __ne__(self, other):
+    return not self == other
+
+  def __getitem__(self, index):
+    """Get the word of an index."""
+    if index < 0:
+      index += len(self)
+    if not 0 <= index < len(self):
+      raise IndexError("Vocabulary index out of range.")
+    return self.blob[self.offsets[index]: self.offsets[index + 1]].tostring().decode('utf-8')
+
+  def __getstate__(self):
+    """Only pickle the array, which the offsets, sorter and blob are views into."""
+    return {'array': self.array}
+
+  def __iter__(self):
+    """Iterate through the words in index order."""
+    for index in xrange(len(self)):
+      yield self[index]
+
+  def __len__(self):
+    """The number of words."""
+    return self.offsets.shape[0] - 1
+
+  def __setstate__(self, state):
+    self.__init__(array=state['array'])
+
+  def _compare(self, queries, indices):
+    """Compare each of an array of queries with the word of the corresponding index.
+
+    Parameters
+    ----------
+    queries : np.ndarray of int16s
+      The utf-8 bytes of the queries, which all have the same length.
+    indices : np.ndarray of ints
+      The index of the word to compare each of the queries with.
+
+    Returns
+    -------
+    np.ndarray of ints
+      -1, 0 or 1 for whether each query is less than, equal to, or greater than its word.
+
+    """
+    # Pull out the bytes of each word, up to one past the length of the
+    # queries, with -1 wherever the word has run out. The extra column makes
+    # any word that the query is a prefix of come after it.
+    width = queries.shape[1] + 1
+    cols = np.arange(width)
+    starts = self.offsets[indices]
+    inside = cols < (self.offsets[indices + 1] - starts)[:, np.newaxis]
+    words = -1 * np.ones(inside.shape, dtype=np.int16)
+    words[inside] = self.blob[(starts[:, np.newaxis] + cols)[inside]]
+
+    # Compare at the first byte where they differ.
+    queries = np.concatenate([queries, -1 * np.ones([queries.shape[0], 1], dtype=np.int16)], axis=1)
+    differs = queries != words
+    first = differs.argmax(axis=1)
+    rows = np.arange(queries.shape[0])
+    return np.where(differs.any(axis=1), np.sign(queries[rows, first] - words[rows, first]), 0)
+
+  def _search(self, queries):
+    """Find the indices of an array of queries with a binary search through the sorted words.
+
+    Parameters
+    ----------
+    queries : np.ndarray of int16s
+      The utf-8 bytes of the queries, which all have the same length.
+
+    Returns
+    -------
+    np.ndarray of ints
+      The index of each query, -1 for any not in the vocabulary.
+
+    """
+    lo = np.zeros([queries.shape[0]], dtype=np.int64)
+    hi = len(self) * np.ones([queries.shape[0]], dtype=np.int64)
+    while (lo < hi).any():
+      active = lo < hi
+      mid = (lo + hi) // 2
+      greater = self._compare(queries, self.sorter[np.minimum(mid, len(self) - 1)]) > 0
+      lo = np.where(active & greater, mid + 1, lo)
+      hi = np.where(active & ~greater, mid, hi)
+
+    indices = self.sorter[np.minimum(lo, len(self) - 1)]
+    return np.where(self._compare(queries, indices) == 0, indices, -1)
+
+  @classmethod
+  def load(cls, file_name, mmap_mode='r'):
+    """Read in a vocabulary written by save.
+
+    Parameters
+    ----------
+    file_name : str
+      The .npy file the vocabulary was written to.
+    mmap_mode : str or None
+      How to memory map the file, see np.load. None reads the whole file into memory.
+
+    Returns
+    -------
+    Vocabulary
+      The vocabulary.
+
+    """
+    return cls(array=np.load(file_name, mmap_mode=mmap_mode))
+
+  def get(self, word, default=None):
+    """Get the index of a word, or default if it doesn't have one."""
+    index = self.to_indices(np.array([word]))[0][0]
+    return default if index == -1 else int(index)
+
+  def isin(self, words):
+    """Find which of an array of words are in the vocabulary (or are the empty string).
+
+    Parameters
+    ----------
+    words : np.ndarray of strs
+      The words to look for.
+
+    Returns
+    -------
+    np.ndarray of bools
+      Whether each of the words is in the vocabulary.
+
+    """
+    words = np.asarray(words)
+    return (self.to_indices(words)[0] != -1) | (words == '')
+
+  def save(self, file_name):
+    """Write the vocabulary to a .npy file, which can be memory mapped back in by load.
+
+    Parameters
+    ----------
+    file_name : str
+      The .npy file to write to.
+
+    """
+    if not file_name.endswith('.npy'):
+      file_name = file_name + '.npy'
+
+    # Write to a temporary file and move it into place, since the array may
+    # itself be memory mapped from file_name.
+    temp_file_name = file_name + '.tmp'
+    with open(temp_file_name, 'wb') as temp_file:
+      np.save(temp_file, self.array)
+    os.rename(temp_file_name, file_name)
+
+  def to_cats(self, target):
+    """Map an array of indices back to their words.
+
+    Parameters
+    ----------
+    target : np.ndarray
+      The indices. Any -1's are given the word of index 0.
+
+    Returns
+    -------
+    np.ndarray of objects
+      The words.
+
+    """
+    target = np.asarray(target)
+    if not len(self):
+      return np.empty(target.shape, dtype=np.object)
+
+    # Only decode each distinct index once.
+    indices, inverse = np.unique(np.where(target == -1, 0, target), return_inverse=True)
+    words = np.empty(indices.shape, dtype=np.object)
+    words[:] = [self[index] for index in indices.tolist()]
+    return words[inverse].reshape(target.shape)
+
+  def to_indices(self, cats):
+    """Map an array of words to their indices.
+
+    Parameters
+    ----------
+    cats : np.ndarray
+      The words.
+
+    Returns
+    -------
+    target : np.ndarray of ints
+      The indices, -1 for any word not in the vocabulary.
+    isnan : np.ndarray of bools
+      Where cats is NaN, which is never the case for words.
+
+    """
+    cats = np.asarray(cats)
+    isnan = np.zeros(cats.shape, dtype=bool)
+    if not len(self):
+      return -1 * np.ones(cats.shape, dtype=np.int64), isnan
+
+    # Only look up each distinct word once.
+    words, valid = _as_unicode(cats)
+    uniques, inverse = np.unique(words, return_inverse=True)
+    queries = [word.encode('utf-8') for word in uniques.tolist()]
+    lengths = np.array([len(query) for query in queries], dtype=np.int64)
+    unique_indices = -1 * np.ones(uniques.shape, dtype=np.int64)
+
+    # Search for the queries of each length together, a chunk at a time so
+    # that the bytes being compared stay bounded. Any longer than the longest
+    # word can't be in the vocabulary.
+    max_len = np.diff(self.offsets).max()
+    for length in np.unique(lengths[lengths <= max_len]).tolist():
+      query_nums = np.flatnonzero(lengths == length)
+      chunk_size = max(SEARCH_CHUNK_BYTES // (length + 1), 1)
+      for start in xrange(0, query_nums.size, chunk_size):
+        chunk = query_nums[start: start + chunk_size]
+        chunk_bytes = np.array(bytearray(b''.join([queries[num] for num in chunk])), dtype=np.uint8)
+        unique_indices[chunk] = self._search(chunk_bytes.reshape(chunk.size, length).astype(np.int16))
+
+    target = unique_indices[inverse].reshape(cats.shape)
+    target[~valid] = -1
+    return target, isnan
+
+
+def save_vocabularies(save_dict, file_name, keys=()):
+  """Write out the Vocabularies of a (possibly nested) save dict to their own .npy files next to file_name, so that they can be memory mapped back in by load_vocabularies.
+
+  Parameters
+  ----------
+  save_dict : dict
+    The save dict of a transform.
+  file_name : str
+    The file the save dict itself is written to.
+  keys : tuple of strs
+    The keys leading to save_dict, which are used to name the .npy files.
+
+  Returns
+  -------
+  dict
+    A copy of the save dict with each Vocabulary replaced by the name of its .npy file, relative to the directory of file_name.
+
+  """
+  if isinstance(save_dict, Vocabulary):
+    vocab_file_name = '.'.join([os.path.splitext(file_name)[0]] + [str(key) for key in keys]) + '.npy'
+    save_dict.save(vocab_file_name)
+    return {'__vocabulary__': os.path.basename(vocab_file_name)}
+  if type(save_dict) is dict:
+    return {key: save_vocabularies(save_dict[key], file_name, keys + (key,)) for key in save_dict}
+  return save_dict
+
+
+def load_vocabularies(save_dict, file_name, mmap_mode='r'):
+  """Read back in the Vocabularies written out by save_vocabularies. By default they're memory mapped, so every process that reads in the transform shares the same pages rather than holding its own copy of the words.
+
+  Parameters
+  ----------
+  save_dict : dict
+    The save dict as read in from file_name.
+  file_name : str
+    The file the save dict was read from.
+  mmap_mode : str or None
+    How to memory map the .npy files, see np.load.
+
+  Returns
+  -------
+  dict
+    A copy of the save dict with the Vocabularies put back in.
+
+  """
+  if type(save_dict) is dict:
+    if set(save_dict) == set(['__vocabulary__']):
+      vocab_file_name = os.path.join(os.path.dirname(file_name), save_dict['__vocabulary__'])
+      return Vocabulary.load(vocab_file_name, mmap_mode=mmap_mode)
+    return {key: load_vocabularies(save_dict[key], file_name, mmap_mode) for key in save_dict}
+  return save_dict
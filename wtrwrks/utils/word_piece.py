@@ -0,0 +1,222 @@
+"""Subword (WordPiece) tokenization. Words are split into the longest pieces found in a vocabulary, with every piece after the first marked by a '##' prefix, so that rare words can be built out of common pieces rather than all being mapped to the unknown token. The vocabulary is trained by repeatedly merging the most frequent pair of adjacent pieces (as in byte pair encoding), and the pieces are looked up by walking a trie so each word is split in a single pass over its characters."""
+import collections
+import heapq
+import unicodedata
+
+# The prefix which marks a piece as continuing the word of the piece before it.
+CONTINUATION_PREFIX = '##'
+
+
+def _normalize(word, lower_case=False, half_width=False):
+  """Lower case and/or half width a word in the same order the string transforms do."""
+  if lower_case:
+    word = word.lower()
+  if half_width:
+    word = unicodedata.normalize('NFKC', unicode(word))
+  return word
+
+
+def detokenize(tokens):
+  """Join word pieces back into a string, attaching the continuation pieces to the piece before them and putting spaces between the words.
+
+  Parameters
+  ----------
+  tokens : list of strs
+    The word pieces. Empty strings (i.e. padding) are skipped.
+
+  Returns
+  -------
+  str
+    The joined string.
+
+  """
+  words = []
+  for token in tokens:
+    if not token:
+      continue
+    if token.startswith(CONTINUATION_PREFIX) and words:
+      words[-1] += token[len(CONTINUATION_PREFIX):]
+    else:
+      words.append(token)
+  return ' '.join(words)
+
+
+def train_word_pieces(word_counts, vocab_size):
+  """Build a vocabulary of word pieces by starting with the individual characters and merging the most frequent pair of adjacent pieces until there are vocab_size pieces. Ties are broken by the ordering of the pieces so the result is reproducible.
+
+  Parameters
+  ----------
+  word_counts : list of tuples
+    The (word, count) pairs to train on.
+  vocab_size : int
+    The maximum number of pieces in the vocabulary.
+
+  Returns
+  -------
+  list of strs
+    The word pieces, with the continuation pieces prefixed by '##'.
+
+  """
+  words = []
+  counts = []
+  char_counts = collections.defaultdict(int)
+  for word, count in word_counts:
+    if not word:
+      continue
+    symbols = [word[0]] + [CONTINUATION_PREFIX + c for c in word[1:]]
+    words.append(symbols)
+    counts.append(count)
+    for symbol in symbols:
+      char_counts[symbol] += count
+
+  # All the characters go in first so that as few words as possible end up
+  # unknown. If there isn't room for all of them, keep the most frequent.
+  vocab = sorted(char_counts, key=lambda s: (-char_counts[s], s))[:vocab_size]
+  in_vocab = set(vocab)
+
+  # Keep the count of every pair of adjacent pieces and the words they're in,
+  # with a heap of the counts that is cleaned up lazily, so that each merge
+  # only has to touch the words containing the merged pair.
+  pair_counts = collections.defaultdict(int)
+  pair_words = collections.defaultdict(set)
+  for word_num, symbols in enumerate(words):
+    for pair in zip(symbols[:-1], symbols[1:]):
+      pair_counts[pair] += counts[word_num]
+      pair_words[pair].add(word_num)
+  heap = [(-count, pair) for pair, count in pair_counts.iteritems()]
+  heapq.heapify(heap)
+
+  while len(vocab) < vocab_size and heap:
+    neg_count, pair = heapq.heappop(heap)
+    if pair_counts.get(pair) != -neg_count:
+      continue
+
+    merged = pair[0] + pair[1][len(CONTINUATION_PREFIX):]
+    changed = set()
+    for word_num in pair_words.pop(pair):
+      symbols = words[word_num]
+      count = counts[word_num]
+      for old_pair in zip(symbols[:-1], symbols[1:]):
+        pair_counts[old_pair] -= count
+        changed.add(old_pair)
+
+      new_symbols = []
+      pos = 0
+      while pos < len(symbols):
+        if pos < len(symbols) - 1 and (symbols[pos], symbols[pos + 1]) == pair:
+          new_symbols.append(merged)
+          pos += 2
+        else:
+          new_symbols.append(symbols[pos])
+          pos += 1
+      words[word_num] = new_symbols
+
+      for new_pair in zip(new_symbols[:-1], new_symbols[1:]):
+        pair_counts[new_pair] += count
+        pair_words[new_pair].add(word_num)
+        changed.add(new_pair)
+
+    for changed_pair in changed:
+      if pair_counts[changed_pair] > 0:
+        heapq.heappush(heap, (-pair_counts[changed_pair], changed_pair))
+      else:
+        del pair_counts[changed_pair]
+
+    if merged not in in_vocab:
+      vocab.append(merged)
+      in_vocab.add(merged)
+
+  return vocab
+
+
+class WordPieceTokenizer(object):
+  """Tokenizer which splits a string into words and then each word into the longest pieces found in the vocabulary, working left to right. Any word which can't be completely split into pieces is kept whole, so that it gets replaced by the unknown token (and stored in the missing values) downstream.
+
+  Parameters
+  ----------
+  index_to_word : list of strs
+    The vocabulary of word pieces, with the continuation pieces prefixed by '##'. Any other tokens (e.g. '[UNK]') are never matched.
+  word_splitter : func
+    A function that takes in a string and splits it up into a list of words.
+  lower_case : bool
+    Whether or not to match the words against the vocabulary lower cased.
+  half_width : bool
+    Whether or not to match the words against the vocabulary half widthed.
+  max_word_len : int
+    Words longer than this are kept whole rather than split.
+
+  """
+
+  def __init__(self, index_to_word, word_splitter, lower_case=False, half_width=False, max_word_len=100):
+    self.word_splitter = word_splitter
+    self.lower_case = lower_case
+    self.half_width = half_width
+    self.max_word_len = max_word_len
+
+    # Separate tries for the pieces that start a word and the ones that
+    # continue it. The None key marks the end of a piece.
+    self.start_trie = {}
+    self.continuation_trie = {}
+    for piece in index_to_word:
+      trie = self.start_trie
+      if piece.startswith(CONTINUATION_PREFIX) and len(piece) > len(CONTINUATION_PREFIX):
+        trie = self.continuation_trie
+        piece = piece[len(CONTINUATION_PREFIX):]
+
+      node = trie
+      for char in piece:
+        node = node.setdefault(char, {})
+      node[None] = True
+
+  def __call__(self, string):
+    """Split a string into word pieces."""
+    tokens = []
+    for word in self.word_splitter(string):
+      tokens.extend(self.tokenize_word(word))
+    return tokens
+
+  def tokenize_word(self, word):
+    """Split a single word into the longest pieces found in the vocabulary.
+
+    Parameters
+    ----------
+    word : str
+      The word to split.
+
+    Returns
+    -------
+    list of strs
+      The pieces, or just the word itself if it can't be completely split.
+
+    """
+    if len(word) > self.max_word_len:
+      return [word]
+
+    # Match on the normalized word, but hand back pieces of the original when
+    # normalizing doesn't change its length so any differences stay with the
+    # lower case and half width diffs.
+    normalized = _normalize(word, self.lower_case, self.half_width)
+    source = word if len(normalized) == len(word) else normalized
+
+    pieces = []
+    start = 0
+    trie = self.start_trie
+    while start < len(normalized):
+      node = trie
+      end = None
+      for pos in xrange(start, len(normalized)):
+        node = node.get(normalized[pos])
+        if node is None:
+          break
+        if None in node:
+          end = pos + 1
+
+      if end is None:
+        return [word]
+
+      piece = source[start: end]
+      pieces.append(piece if not start else CONTINUATION_PREFIX + piece)
+      start = end
+      trie = self.continuation_trie
+
+    return pieces
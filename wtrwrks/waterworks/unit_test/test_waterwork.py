@@ -151,6 +151,34 @@ class TestWaterwork(unittest.TestCase):
       for key in d:
         self.assertEqual(d[key].get_val(), None)
 
+  def test_read_examples_by_id(self):
+    cat_to_index_map = {'a': 0, 'b': 1}
+    with wa.Waterwork() as ww:
+      cti_tubes, cti_slots = td.cat_to_index(
+        cats=empty,
+        cat_to_index_map=cat_to_index_map,
+        tube_plugs={'cat_to_index_map': cat_to_index_map, 'input_dtype': np.dtype('S1')}
+      )
+      cti_slots['cats'].set_name('cats')
+
+    cats = np.array([['a', 'c'], ['b', 'a'], ['d', 'b']])
+    file_name = os.path.join(self.temp_dir, 'cats.tfrecord')
+    ww.write_examples(
+      {'cats': cats},
+      file_name,
+      sparse_keys=['CatToIndex_0/tubes/missing_vals'],
+      write_index=True
+    )
+
+    funnel_dict = ww.read_examples(file_name, key_type='str', example_ids=[2, 0])
+    th.assert_arrays_equal(self, funnel_dict['cats'], cats[[2, 0]])
+
+    funnel_dict = ww.read_examples(file_name, key_type='str')
+    th.assert_arrays_equal(self, funnel_dict['cats'], cats)
+
+    with self.assertRaises(ValueError):
+      ww.read_examples(file_name, key_type='str', example_ids=[3])
+
   def test_plug(self):
     with wa.Waterwork() as ww:
       add0_tubes, add0_slots = empty + empty
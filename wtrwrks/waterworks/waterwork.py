@@ -6,6 +6,7 @@ import wtrwrks.utils.multi as mu
 import wtrwrks.utils.batch_functions as b
 from wtrwrks.waterworks.empty import Empty, empty
 import wtrwrks.read_write.tf_features as feat
+import wtrwrks.read_write.offset_index as oi
 import os
 import pprint
 import importlib
@@ -456,17 +457,19 @@ class Waterwork(object):
 
     return funnel_dicts
 
-  def multi_write_examples(self, funnel_dict_iter, file_name, num_threads=1, use_threading=False, batch_size=None, file_num_offset=0, skip_fails=False, skip_keys=None, serialize_func=None):
+  def multi_write_examples(self, funnel_dict_iter, file_name, num_threads=1, use_threading=False, batch_size=None, file_num_offset=0, skip_fails=False, skip_keys=None, serialize_func=None, sparse_keys=None, write_index=False):
     if serialize_func is None:
       save_dict = self._save_dict()
 
       def serialize_func(funnel_dict):
-        jpype.attachThreadToJVM()
+        # Only attach the thread to the JVM the first time it runs a task.
+        if jpype.isJVMStarted() and not jpype.isThreadAttachedToJVM():
+          jpype.attachThreadToJVM()
         ww = Waterwork()
         ww._from_save_dict(save_dict)
 
         tap_dict = ww.pour(funnel_dict, 'str', False)
-        feature_dict, func_dict = self._get_feature_dicts(tap_dict)
+        feature_dict, func_dict = self._get_feature_dicts(tap_dict, sparse_keys)
 
         serial = ww._serialize_tap_dict(tap_dict, func_dict)
         return serial
@@ -475,6 +478,7 @@ class Waterwork(object):
       funnel_dict_iter = (i for i in funnel_dict_iter)
 
     file_names = []
+    num_written = 0
     if not file_name.endswith('.tfrecord'):
       raise ValueError("file_name must end in '.tfrecord'")
 
@@ -484,7 +488,7 @@ class Waterwork(object):
     for batch_num, batch in enumerate(b.batcher(funnel_dict_iter, batch_size)):
       if batch_num == 0:
         tap_dict = self.pour(batch[0], key_type='str', return_plugged=False)
-        feature_dict, func_dict = self._get_feature_dicts(tap_dict)
+        feature_dict, func_dict = self._get_feature_dicts(tap_dict, sparse_keys)
         feature_dict_fn = re.sub(r'_?[0-9]*.tfrecord', '.pickle', file_name)
         d.save_to_file(feature_dict, feature_dict_fn)
 
@@ -511,6 +515,12 @@ class Waterwork(object):
       logging.info("Finished writing batch %s", batch_num)
       writer.close()
 
+      all_serials = [serial for serials in all_serials for serial in serials]
+      if write_index:
+        example_ids = np.arange(num_written, num_written + len(all_serials))
+        oi.write_index(fn, all_serials, example_ids)
+      num_written += len(all_serials)
+
     return file_names
 
   def multi_read_examples(self, file_name_iter, num_threads=1, key_type='slot', return_plugged=False, use_threading=False, skip_fails=False):
@@ -757,7 +767,7 @@ class Waterwork(object):
     serialized_example : tfrecord serialized example
       The serialized example to read and convert to a dictionary of tensors.
     feature_dict :
-      A dictionary with the keys being the keys of the tap dict (and their shapes) and the values being the FixedLenFeature's with the proper values all filled in
+      A dictionary with the keys being the keys of the tap dict and the values being dictionaries of the shapes, dtypes and (if sparsely encoded) default values of the arrays.
 
     Returns
     -------
@@ -769,18 +779,120 @@ class Waterwork(object):
     for key in feature_dict:
       shape = feature_dict[key]['shape']
       tf_dtype = feature_dict[key]['tf_dtype']
-      feat_dict[key] = tf.io.FixedLenFeature(shape, tf_dtype)
+
+      # Sparsely encoded arrays are read from their index and value features.
+      if feature_dict[key].get('sparse', False):
+        indices_key, values_key = feat.sparse_feature_keys(key)
+        feat_dict[key] = tf.io.SparseFeature(
+          index_key=indices_key,
+          value_key=values_key,
+          dtype=tf_dtype,
+          size=int(feat.size_from_shape(shape))
+        )
+      else:
+        feat_dict[key] = tf.io.FixedLenFeature(shape, tf_dtype)
 
     features = tf.io.parse_single_example(
       serialized=serialized_example,
       features=feat_dict
     )
 
+    for key in feature_dict:
+      if not feature_dict[key].get('sparse', False):
+        continue
+      features[key] = tf.sparse.to_dense(
+        features[key],
+        default_value=feature_dict[key]['default_val']
+      )
+      features[key] = tf.reshape(features[key], feature_dict[key]['shape'])
+
     return features
 
-  def read_examples(self, file_name, key_type='slot', return_plugged=False):
-    tap_dicts = self._files_to_tap_dicts([file_name])
-    return self.pump(tap_dicts[0], key_type=key_type, return_plugged=return_plugged)
+  def read_examples(self, file_name, key_type='slot', return_plugged=False, example_ids=None):
+    """Read the examples of a tfrecord file and pump them back into the funnel dict.
+
+    Parameters
+    ----------
+    file_name : str
+      The name of the tfrecord file.
+    key_type : str ('tube', 'tuple', 'name')
+      The type of keys to return in the return dictionary. Can either be the tube objects themselves (tube), the tank, output key pair (tuple) or the name (str) of the tube.
+    return_plugged : bool
+      Whether or to return the plugged funnels.
+    example_ids : list of ints or None
+      The ids of the examples to read. Requires the file to have been written with write_index=True. Defaults to reading the entire file.
+
+    Returns
+    -------
+    dict
+      The funnel dictionary of the pumped examples.
+
+    """
+    if example_ids is None:
+      tap_dicts = self._files_to_tap_dicts([file_name])
+      return self.pump(tap_dicts[0], key_type=key_type, return_plugged=return_plugged)
+
+    feature_dict = self._read_feature_dict(file_name)
+    serials = oi.read_serials(file_name, example_ids)
+    tap_dict = self._serials_to_tap_dict(serials, feature_dict)
+    return self.pump(tap_dict, key_type=key_type, return_plugged=return_plugged)
+
+  def _read_feature_dict(self, file_name):
+    """Read the feature dictionary written alongside a tfrecord file."""
+    feature_dict_fn = re.sub(r'_?[0-9]*.tfrecord', '.pickle', file_name)
+
+    if not os.path.isfile(feature_dict_fn):
+      raise ValueError("Expected a feature_dict file named", feature_dict_fn)
+
+    return d.read_from_file(feature_dict_fn)
+
+  def _serials_to_tap_dict(self, serials, feature_dict):
+    """Convert serialized examples into a tap dict without going through a tensorflow pipeline.
+
+    Parameters
+    ----------
+    serials : list of strs
+      The serialized examples.
+    feature_dict : dict
+      The feature dictionary written alongside the tfrecord file.
+
+    Returns
+    -------
+    tap_dict : dict
+      The stacked arrays of the examples.
+
+    """
+    tap_dict = {}
+    for serial in serials:
+      array_dict = oi.serial_to_array_dict(serial)
+      for key in feature_dict:
+        shape = list(feature_dict[key]['shape'])
+        if feature_dict[key].get('sparse', False):
+          indices_key, values_key = feat.sparse_feature_keys(key)
+          array = feat.sparse_to_dense(
+            array_dict[indices_key],
+            array_dict[values_key],
+            shape,
+            feature_dict[key]['default_val']
+          )
+        else:
+          array = array_dict[key].reshape(shape)
+
+        tap_dict.setdefault(key, [])
+        tap_dict[key].append(array)
+
+    for key in feature_dict:
+      np_dtype = feature_dict[key]['np_dtype']
+      array = np.stack(tap_dict[key], axis=0)
+
+      if np_dtype.char == 'U':
+        tap_dict[key] = np.char.decode(array.astype(str), encoding='utf-8')
+      elif np_dtype.char == 'S':
+        tap_dict[key] = array.astype(np.str)
+      else:
+        tap_dict[key] = array.astype(np_dtype)
+
+    return tap_dict
 
   def _files_to_tap_dicts(self, file_names):
     """Run the pump transformation on a list of example dictionaries to reconstruct the original array.
@@ -799,12 +911,7 @@ class Waterwork(object):
     if not file_names:
       return []
 
-    feature_dict_fn = re.sub(r'_?[0-9]*.tfrecord', '.pickle', file_names[0])
-
-    if not os.path.isfile(feature_dict_fn):
-      raise ValueError("Expected a feature_dict file named", feature_dict_fn)
-
-    feature_dict = d.read_from_file(feature_dict_fn)
+    feature_dict = self._read_feature_dict(file_names[0])
 
     tap_dicts = []
     for file_name in file_names:
@@ -868,16 +975,20 @@ class Waterwork(object):
       num_examples = array.shape[0]
       break
 
+    serials = []
     for row_num in xrange(num_examples):
       example_dict = {}
       for key in keys_to_write:
         flat = tap_dict[key][row_num].flatten()
-        example_dict[key] = func_dict[key](flat)
+        feat.add_features(example_dict, key, func_dict[key](flat))
 
       example = tf.train.Example(
         features=tf.train.Features(feature=example_dict)
       )
-      writer.write(example.SerializeToString())
+      serial = example.SerializeToString()
+      writer.write(serial)
+      serials.append(serial)
+    return serials
 
   def _serialize_tap_dict(self, tap_dict, func_dict, skip_keys=None):
     if skip_keys is None:
@@ -896,7 +1007,7 @@ class Waterwork(object):
       example_dict = {}
       for key in keys_to_write:
         flat = tap_dict[key][row_num].flatten()
-        example_dict[key] = func_dict[key](flat)
+        feat.add_features(example_dict, key, func_dict[key](flat))
 
       example = tf.train.Example(
         features=tf.train.Features(feature=example_dict)
@@ -904,7 +1015,10 @@ class Waterwork(object):
       serials.append(example.SerializeToString())
     return serials
 
-  def _get_feature_dicts(self, tap_dict):
+  def _get_feature_dicts(self, tap_dict, sparse_keys=None):
+    if sparse_keys is None:
+      sparse_keys = []
+
     func_dict = {}
     feature_dict = {}
     for key in tap_dict:
@@ -922,24 +1036,35 @@ class Waterwork(object):
       feature_dict[key]['shape'] = array.shape[1:]
       func_dict[key] = feat.select_feature_func(array.dtype)
 
+      # Only store the elements that differ from the default value for arrays
+      # which are mostly empty.
+      if key in sparse_keys:
+        feature_dict[key]['sparse'] = True
+        feature_dict[key]['default_val'] = feat.select_default_val(array.dtype)
+        func_dict[key] = feat.select_sparse_feature_func(array.dtype)
+
     return feature_dict, func_dict
 
-  def write_tap_dicts(self, tap_dicts, file_name, skip_keys=None):
+  def write_tap_dicts(self, tap_dicts, file_name, skip_keys=None, sparse_keys=None, write_index=False):
 
-    feature_dict, func_dict = self._get_feature_dicts(tap_dicts[0])
+    feature_dict, func_dict = self._get_feature_dicts(tap_dicts[0], sparse_keys)
 
     writer = tf.io.TFRecordWriter(file_name)
+    serials = []
     for tap_dict in tap_dicts:
       if not tap_dict:
         continue
-      self._write_tap_dict(writer, tap_dict, func_dict, skip_keys)
+      serials.extend(self._write_tap_dict(writer, tap_dict, func_dict, skip_keys))
+
+    if write_index:
+      oi.write_index(file_name, serials)
 
     feature_dict_fn = re.sub(r'_?[0-9]*.tfrecord', '.pickle', file_name)
     d.save_to_file(feature_dict, feature_dict_fn)
 
     writer.close()
 
-  def write_examples(self, funnel_dict, file_name):
+  def write_examples(self, funnel_dict, file_name, sparse_keys=None, write_index=False):
     """Pours the array then writes the examples to tfrecords. It creates one example per 'row', i.e. axis=0 of the arrays. All arrays must have the same axis=0 dimension and must be of a type that can be written to a tfrecord
 
     Parameters
@@ -951,6 +1076,10 @@ class Waterwork(object):
         The inputs to the waterwork's full pour function.
     file_name : str
       The name of the tfrecord file to write to.
+    sparse_keys : list of str
+      The tap keys whose arrays are mostly default values (e.g. diffs or missing values) and should only store their non default elements.
+    write_index : bool
+      Whether or not to write a sidecar offset index so that individual examples can be read with read_examples. The example ids are the row numbers of the arrays.
 
     """
     if not file_name.endswith('.tfrecord'):
@@ -962,9 +1091,11 @@ class Waterwork(object):
     writer = tf.io.TFRecordWriter(file_name)
     tap_dict = self.pour(funnel_dict, key_type='str')
 
-    feature_dict, func_dict = self._get_feature_dicts(tap_dict)
+    feature_dict, func_dict = self._get_feature_dicts(tap_dict, sparse_keys)
 
-    self._write_tap_dict(writer, tap_dict, func_dict)
+    serials = self._write_tap_dict(writer, tap_dict, func_dict)
+    if write_index:
+      oi.write_index(file_name, serials)
 
     feature_dict_fn = re.sub(r'_?[0-9]*.tfrecord', '.pickle', file_name)
     d.save_to_file(feature_dict, feature_dict_fn)